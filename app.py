@@ -11,6 +11,9 @@ import mecha_part_generator as mpg
 import ship_generator as sg
 import gemini_service as gs
 import core.openai_service as oi
+import core.rate_limiter as rate_limiter
+import core.response_cache as response_cache
+import core.translation_cache as translation_cache
 import slicer_tool as st
 import curation_tool as ct
 import json
@@ -454,6 +457,12 @@ class PromptApp:
         self.items_save_dir = self.config.get("items_save_dir", "")
         self.character_save_dir = self.config.get("character_save_dir", "")
         self.clothing_save_dir = self.config.get("clothing_save_dir", "")
+        rate_limiter.configure(rpm=self.config.get("rate_limit_rpm"),
+                               max_retries=self.config.get("max_retries"))
+        response_cache.configure(self.config.get("response_cache_enabled", False),
+                                 max_mb=self.config.get("response_cache_mb"),
+                                 ttl_hours=self.config.get("response_cache_ttl_hours"))
+        translation_cache.preload_in_background()
         
         # Color variables
         self.primary_color = None
@@ -2557,21 +2566,24 @@ class PromptApp:
             model = self.model_var.get().strip() if hasattr(self, "model_var") else self.gemini_model
             return "Gemini", key, model, {}
 
-    def _generate_image_with_active_provider(self, prompt, reference_images=None, text_last=False):
+    def _generate_image_with_active_provider(self, prompt, reference_images=None, text_last=False,
+                                             variant=0):
         """Route image generation to Gemini or OpenAI based on current settings."""
         provider, key, model, extra = self._get_active_api_credentials()
         if not key:
             raise ValueError("API key is missing.")
+        limiter = rate_limiter.limiter_for(provider, model, key)
+        # limiter= wraps only the network call: a response-cache hit never waits on it
         if provider == "OpenAI":
             return oi.generate_image_bytes(
                 prompt, api_key=key, model=model,
-                reference_images=reference_images or [], **extra,
+                reference_images=reference_images or [], variant=variant, limiter=limiter, **extra,
             )
         else:
             return gs.generate_image_bytes(
                 prompt, api_key=key, model=model,
                 reference_images=reference_images if reference_images else None,
-                text_last=text_last,
+                text_last=text_last, variant=variant, limiter=limiter,
             )
 
     def _edit_image_with_active_provider(self, prompt, image_bytes, image_mime):
@@ -2746,16 +2758,19 @@ class PromptApp:
             # Smart crop: detect grid boundaries automatically
             img_row_cuts = None
             img_col_cuts = None
+            source = fp
             if use_smart_crop:
                 try:
                     self.status_var.set(f"{self.t('Detecting grid...')} ({i+1}/{total_files}): {os.path.basename(fp)}...")
-                    img_row_cuts, img_col_cuts = st.detect_grid(fp)
+                    # Decode once; the same sheet is reused for slicing below
+                    source = st.SheetImage(fp)
+                    img_row_cuts, img_col_cuts = st.detect_grid(source)
                 except Exception as e:
                     print(f"Smart crop detection failed for {os.path.basename(fp)}: {e}, falling back to manual grid")
 
             try:
                 success, msg, count = st.slice_image(
-                                                   image_path=fp,
+                                                   image_path=source,
                                                    grid_rows=rows,
                                                    grid_cols=cols,
                                                    output_dir=out_dir,
@@ -2778,7 +2793,7 @@ class PromptApp:
                     success_count += 1
                     try:
                         from core import library
-                        library.add_entry(
+                        library.queue_entry(
                             generator_type="slicer",
                             params={
                                 "source_image": fp,
@@ -2797,11 +2812,14 @@ class PromptApp:
                         )
                     except Exception as e:
                         from core.logging_setup import get_logger
-                        get_logger("app").warning("library.add_entry (slicer) failed: %s", e)
+                        get_logger("app").warning("library.queue_entry (slicer) failed: %s", e)
                 else:
                     errors.append(f"{os.path.basename(fp)}: {msg}")
             except Exception as e:
                 errors.append(f"{os.path.basename(fp)}: {str(e)}")
+            finally:
+                if source is not fp:
+                    source.close()
                 
         self.root.after(0, lambda: self.set_ui_busy(False, self.t("Batch Complete")))
         
@@ -3951,13 +3969,16 @@ class PromptApp:
             self.root.after(0, lambda: self.set_ui_busy(False, self.t("Error Occurred")))
 
     def _generate_images_task(self, prompt: str, reference_images, count: int):
-        def worker():
-            return self._generate_image_with_active_provider(prompt, reference_images=reference_images)
+        def worker(variant):
+            return self._generate_image_with_active_provider(prompt, reference_images=reference_images,
+                                                             variant=variant)
 
         results = []
         try:
+            from core import http_pool
+            http_pool.ensure_pool_size(count)
             with ThreadPoolExecutor(max_workers=count) as executor:
-                futures = [executor.submit(worker) for _ in range(count)]
+                futures = [executor.submit(worker, i) for i in range(count)]
                 for future in as_completed(futures):
                     results.append(future.result())
         except Exception as e:
@@ -4148,7 +4169,7 @@ class PromptApp:
         try:
             from core import library
             current_prompt = self.output_text.get("1.0", tk.END).strip() if hasattr(self, "output_text") else ""
-            library.add_entry(
+            library.queue_entry(
                 generator_type=prefix,
                 prompt=current_prompt,
                 image_path=output_path,
@@ -4156,7 +4177,7 @@ class PromptApp:
             )
         except Exception as e:
             from core.logging_setup import get_logger
-            get_logger("app").warning("library.add_entry failed: %s", e)
+            get_logger("app").warning("library.queue_entry failed: %s", e)
         return output_path
 
     def save_preview_image(self):
@@ -31,4 +31,7 @@ def main() -> int:
 
 
 if __name__ == "__main__":
+    # Slicer process pool (spawn) must not re-run the GUI in frozen builds
+    import multiprocessing
+    multiprocessing.freeze_support()
     sys.exit(main())
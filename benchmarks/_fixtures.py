@@ -0,0 +1,43 @@
+"""benchmark 共用的合成素材：确定性生成，不依赖网络 / 仓库外文件。"""
+from __future__ import annotations
+
+import os
+import tempfile
+
+from PIL import Image, ImageDraw
+
+
+def make_sheet(path, rows, cols, cell=96, lines=False, size=None):
+    """画一张 rows×cols 的白底 sprite sheet，每格一个椭圆 + 竖条。
+
+    lines=True 时在格子之间画黑色分隔线；size 非空时整体 LANCZOS 缩放到该尺寸
+    （模拟放大后的 4K / 8K 图）。
+    """
+    w, h = cols * cell, rows * cell
+    img = Image.new("RGB", (w, h), "white")
+    d = ImageDraw.Draw(img)
+    for r in range(rows):
+        for c in range(cols):
+            x0, y0 = c * cell, r * cell
+            m = cell // 5 + (r * 7 + c * 3) % (cell // 10)
+            d.ellipse([x0 + m, y0 + m, x0 + cell - m, y0 + cell - m - (c % 3) * 4],
+                      fill=(40 + r * 10, 80, 120 + c * 8))
+            d.rectangle([x0 + cell // 2 - 3, y0 + m - 6, x0 + cell // 2 + 3, y0 + cell - m + 4],
+                        fill=(20, 20, 20))
+    if lines:
+        for r in range(1, rows):
+            d.line([0, r * cell, w, r * cell], fill=(0, 0, 0), width=2)
+        for c in range(1, cols):
+            d.line([c * cell, 0, c * cell, h], fill=(0, 0, 0), width=2)
+    if size:
+        img = img.resize(size, Image.Resampling.LANCZOS)
+    img.save(path)
+    return path
+
+
+def temp_dir(prefix="promptgen_bench_"):
+    return tempfile.TemporaryDirectory(prefix=prefix)
+
+
+def repo_file(*parts):
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), *parts)
@@ -0,0 +1,196 @@
+"""手工运行：python -m benchmarks.bench_batch_load [选项]
+
+离线压测 BatchImageGenWorker 式的批量出图：benchmarks.fake_provider 跑在子进程里
+（服务端线程不和客户端抢 GIL / 不计入客户端），按 ui/workers.py 的两条路径各跑
+--batches 批、每批 --count 张：
+  - threads：线程池路径，每张图一个线程调 _gen_fn（同步服务带 limiter=，只有缓存未命中才过限流），
+             和 main_window._generate_image 里的 _gen_fn 一致
+  - async：  request= 路径，一个事件循环上 AsyncProviderClient.generate_many
+
+输出每种模式的吞吐（成功张数 / 墙钟秒）、单张完成时间 p50 / p95（从批开始算）、
+失败数、服务端收到的请求 / 429 / 500 数和同时在处理的峰值请求数，以及
+rate_limiter 最后的自适应并发上限。故障注入参数与 fake_provider 相同，原样转发。
+
+例：
+  python -m benchmarks.bench_batch_load --count 16 --latency 0.5 --jitter 0.3
+  python -m benchmarks.bench_batch_load --provider Gemini --throttle-rate 0.2 --retry-after 0.2
+  python -m benchmarks.bench_batch_load --image-bytes 6000000 --modes async --json out.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from benchmarks.fake_provider import add_profile_args
+from core import gemini_service as gs
+from core import http_pool
+from core import openai_service as oi
+from core import rate_limiter as rl
+from core.provider_client import AsyncProviderClient
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PROFILE_OPTS = ("latency", "jitter", "error_rate", "throttle_rate", "throttle_first",
+                 "retry_after", "image_bytes", "replay", "seed")
+
+
+def _server_argv(args):
+    argv = [sys.executable, "-m", "benchmarks.fake_provider"]
+    for name in _PROFILE_OPTS:
+        value = getattr(args, name)
+        if value is not None:
+            argv += ["--" + name.replace("_", "-"), str(value)]
+    if args.url_mode:
+        argv.append("--url-mode")
+    return argv
+
+
+def _server_stats(base_url, reset_peak=False):
+    url = base_url + ("/__stats?reset=1" if reset_peak else "/__stats")
+    with urllib.request.urlopen(url, timeout=10) as resp:
+        return json.load(resp)
+
+
+def _request(args, base_url):
+    """BatchImageGenWorker 的 request 字典（main_window 里 concurrent > 1 时构造的那种）。"""
+    if args.provider == "OpenAI":
+        return {"provider": "OpenAI", "api_key": "bench", "model": args.model or "dall-e-3",
+                "base_url": base_url + "/v1"}
+    gs._get_api_base_url = lambda _key: base_url
+    return {"provider": "Gemini", "api_key": "bench", "model": args.model or gs.DEFAULT_MODEL}
+
+
+def _run_threads(request, count, policy):
+    provider, key, model = request["provider"], request["api_key"], request["model"]
+    limiter = rl.limiter_for(provider, model, key)
+
+    def _gen_fn(prompt, variant=0):
+        if provider == "OpenAI":
+            return oi.generate_image_bytes(prompt, api_key=key, model=model,
+                                           base_url=request["base_url"], variant=variant,
+                                           limiter=limiter, retry=policy)
+        return gs.generate_image_bytes(prompt, api_key=key, model=model, variant=variant,
+                                       limiter=limiter, retry=policy)
+
+    start = time.perf_counter()
+    done = []
+    http_pool.ensure_pool_size(count)
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        futures = [pool.submit(_gen_fn, "bench prompt", i) for i in range(count)]
+        for fut in as_completed(futures):
+            ok = fut.exception() is None
+            done.append((time.perf_counter() - start, ok))
+    return done
+
+
+def _run_async(request, count, policy):
+    request = dict(request)
+    provider = request.pop("provider")
+    start = time.perf_counter()
+    done = []
+
+    def _on_result(_idx, res):
+        done.append((time.perf_counter() - start, not isinstance(res, Exception)))
+
+    async def _main():
+        client = AsyncProviderClient(max_in_flight=count, retry=policy)
+        try:
+            await client.generate_many(provider, "bench prompt", count,
+                                       on_result=_on_result, **request)
+        finally:
+            await client.aclose()
+
+    asyncio.run(_main())
+    return done
+
+
+_MODES = {"threads": _run_threads, "async": _run_async}
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def run_mode(mode, args, base_url):
+    rl.reset()
+    http_pool.close()
+    policy = rl.RetryPolicy(max_retries=args.max_retries, base_delay=args.base_delay)
+    request = _request(args, base_url)
+    before = _server_stats(base_url, reset_peak=True)
+    times, ok, wall = [], 0, 0.0
+    for _ in range(args.batches):
+        t0 = time.perf_counter()
+        done = _MODES[mode](request, args.count, policy)
+        wall += time.perf_counter() - t0
+        times += [t for t, _ok in done]
+        ok += sum(1 for _t, good in done if good)
+    after = _server_stats(base_url)
+    limiter = (rl.snapshot() or [{}])[0]
+    return {
+        "mode": mode,
+        "images": args.batches * args.count,
+        "ok": ok,
+        "failed": args.batches * args.count - ok,
+        "wall_s": round(wall, 3),
+        "images_per_s": round(ok / wall, 2) if wall else 0.0,
+        "p50_s": round(_percentile(times, 0.5), 3),
+        "p95_s": round(_percentile(times, 0.95), 3),
+        "server_requests": after["requests"] - before["requests"],
+        "server_429": after["throttled"] - before["throttled"],
+        "server_500": after["errors"] - before["errors"],
+        "server_peak_active": after["peak_active"],
+        "retries": limiter.get("retries", 0),
+        "final_limit": limiter.get("limit"),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="offline batch image generation load test")
+    add_profile_args(ap)
+    ap.add_argument("--provider", choices=("OpenAI", "Gemini"), default="OpenAI")
+    ap.add_argument("--model", default=None)
+    ap.add_argument("--count", type=int, default=8, help="每批张数（UI 的并发数）")
+    ap.add_argument("--batches", type=int, default=3)
+    ap.add_argument("--modes", default="threads,async")
+    ap.add_argument("--max-retries", type=int, default=rl.DEFAULT_MAX_RETRIES)
+    ap.add_argument("--base-delay", type=float, default=rl.DEFAULT_BASE_DELAY)
+    ap.add_argument("--json", default=None, help="把结果写到这个 JSON 文件")
+    args = ap.parse_args()
+
+    proc = subprocess.Popen(_server_argv(args), cwd=_ROOT, stdout=subprocess.PIPE, text=True)
+    try:
+        base_url = proc.stdout.readline().strip()
+        if not base_url:
+            raise SystemExit("fake_provider failed to start")
+        rows = [run_mode(mode, args, base_url) for mode in args.modes.split(",")]
+    finally:
+        http_pool.close()
+        proc.kill()
+        proc.wait()
+        proc.stdout.close()
+
+    print(f"{args.provider}  count={args.count}  batches={args.batches}  latency={args.latency}s"
+          f"  err={args.error_rate}  429={args.throttle_rate}")
+    print(f"{'mode':<9}{'ok':>6}{'fail':>6}{'img/s':>9}{'p50 s':>8}{'p95 s':>8}"
+          f"{'reqs':>7}{'429':>6}{'500':>6}{'peak':>6}{'limit':>7}")
+    for r in rows:
+        print(f"{r['mode']:<9}{r['ok']:>6}{r['failed']:>6}{r['images_per_s']:>9.2f}"
+              f"{r['p50_s']:>8.3f}{r['p95_s']:>8.3f}{r['server_requests']:>7}{r['server_429']:>6}"
+              f"{r['server_500']:>6}{r['server_peak_active']:>6}{str(r['final_limit']):>7}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": rows}, f, indent=2)
+    return rows
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""手工运行：python -m benchmarks.bench_library_contention [选项]
+
+core.library 的读写争用压测：--writers 个线程循环 add_entry（模拟并发出图 / 切片入库），
+同时 --readers 个线程循环读（list_entries 一页轻量投影 + tag_counts，即库页签刷新 /
+标签补全），持续 --seconds 秒。库里先灌 --rows 行。
+
+两种模式：
+  - split：  当前实现，WAL + 单写连接 + 每线程读连接，读不拿写锁
+  - locked： 读也包在 library._LOCK 里，还原旧的"一条连接 + 全局锁"串行化
+
+输出每种模式的写 / 读吞吐，和读延迟 p50 / p95 / max（UI 刷新要等多久）。
+
+例：
+  python -m benchmarks.bench_library_contention
+  python -m benchmarks.bench_library_contention --writers 8 --readers 4 --rows 100000 --json out.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+import time
+
+from benchmarks._fixtures import temp_dir
+from benchmarks.suite import _seed_library
+from core import library
+
+_MODES = ("split", "locked")
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def _read_once():
+    library.list_entries(limit=200, light=True)
+    library.tag_counts()
+
+
+def _read_locked():
+    with library._LOCK:
+        _read_once()
+
+
+def run_mode(mode, args, tmp):
+    db_path = os.path.join(tmp, f"contention_{mode}.db")
+    library.configure(db_path)
+    try:
+        _seed_library(db_path, args.rows)
+        read = _read_locked if mode == "locked" else _read_once
+        stop = threading.Event()
+        writes = [0] * args.writers
+        latencies = [[] for _ in range(args.readers)]
+
+        def writer(i):
+            n = 0
+            while not stop.is_set():
+                library.add_entry(generator_type="items", params={"w": i, "n": n},
+                                  prompt=f"contention prompt {i} {n}", tags=["bench", f"w{i}"])
+                n += 1
+            writes[i] = n
+
+        def reader(i):
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                read()
+                latencies[i].append(time.perf_counter() - t0)
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+        threads += [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - start
+    finally:
+        library.reset_for_test()
+
+    lat = [x for per in latencies for x in per]
+    return {
+        "mode": mode,
+        "writes": sum(writes),
+        "reads": len(lat),
+        "writes_per_s": round(sum(writes) / wall, 1),
+        "reads_per_s": round(len(lat) / wall, 1),
+        "read_p50_ms": round(_percentile(lat, 0.5) * 1e3, 2),
+        "read_p95_ms": round(_percentile(lat, 0.95) * 1e3, 2),
+        "read_max_ms": round(max(lat, default=0.0) * 1e3, 2),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="library read/write contention load test")
+    ap.add_argument("--writers", type=int, default=8)
+    ap.add_argument("--readers", type=int, default=4)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--rows", type=int, default=10_000, help="预先灌入的行数")
+    ap.add_argument("--modes", default=",".join(_MODES))
+    ap.add_argument("--json", default=None, help="把结果写到这个 JSON 文件")
+    args = ap.parse_args()
+
+    with temp_dir() as tmp:
+        rows = [run_mode(mode, args, tmp) for mode in args.modes.split(",")]
+
+    print(f"writers={args.writers}  readers={args.readers}  rows={args.rows}  seconds={args.seconds}")
+    print(f"{'mode':<8}{'writes/s':>10}{'reads/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}")
+    for r in rows:
+        print(f"{r['mode']:<8}{r['writes_per_s']:>10.1f}{r['reads_per_s']:>10.1f}"
+              f"{r['read_p50_ms']:>9.2f}{r['read_p95_ms']:>9.2f}{r['read_max_ms']:>9.2f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": rows}, f, indent=2)
+    return rows
+
+
+if __name__ == "__main__":
+    main()
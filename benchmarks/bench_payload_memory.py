@@ -0,0 +1,87 @@
+"""手工运行：python -m benchmarks.bench_payload_memory [--sizes 6,24]
+
+单次出图调用的 Python 堆峰值（tracemalloc），桩服务器跑在独立进程里不计入：
+  - legacy：重构前的写法——json= 发请求、resp.json() 后整串 b64decode。
+  - stream：core.b64stream——参考图边发边编码，响应边收边解码。
+--sizes 是图片字节数（MB），默认 6 / 24，约等于 2K / 4K 的 PNG 输出。
+Gemini 行带一张同样大小的参考图（请求方向），OpenAI 行只有响应方向。
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import os
+import subprocess
+import sys
+import tracemalloc
+
+from core import gemini_service as gs
+from core import http_pool
+from core import openai_service as oi
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _legacy_gemini(base_url, ref):
+    url = f"{base_url}/v1beta/models/m:generateContent?key=k"
+    payload = {"contents": [{"role": "user", "parts": [
+        {"text": "p"},
+        {"inline_data": {"mime_type": "image/png",
+                         "data": base64.b64encode(ref).decode("utf-8")}}]}]}
+    resp = http_pool.post(url, json=payload, timeout=60)
+    part = resp.json()["candidates"][0]["content"]["parts"][0]["inlineData"]
+    return base64.b64decode(part["data"])
+
+
+def _stream_gemini(base_url, ref):
+    gs._get_api_base_url = lambda _key: base_url
+    return gs.generate_image_bytes("p", "k", model="m", reference_images=[(ref, "image/png")])[0]
+
+
+def _legacy_openai(base_url, _ref):
+    resp = http_pool.post(base_url + "/v1/images/generations", json={"model": "dall-e-3", "prompt": "p"},
+                          timeout=60)
+    return base64.b64decode(resp.json()["data"][0]["b64_json"])
+
+
+def _stream_openai(base_url, _ref):
+    return oi.generate_image_bytes("p", "k", model="dall-e-3", base_url=base_url + "/v1")[0]
+
+
+def _peak(fn, base_url, ref):
+    fn(base_url, ref)  # 预热连接池
+    tracemalloc.start()
+    try:
+        out = fn(base_url, ref)
+        return tracemalloc.get_traced_memory()[1], len(out)
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="6,24")
+    args = ap.parse_args()
+
+    print(f"{'MB':>5}  {'case':<16}{'legacy MB':>10}{'stream MB':>10}{'ratio':>7}")
+    for mb in (float(x) for x in args.sizes.split(",")):
+        n = int(mb * 2**20)
+        proc = subprocess.Popen([sys.executable, "-m", "tests.stub_http_server", "--image-bytes", str(n)],
+                                cwd=_ROOT, stdout=subprocess.PIPE, text=True)
+        try:
+            base_url = proc.stdout.readline().strip()
+            ref = os.urandom(n)
+            for case, legacy, stream in (("gemini+ref", _legacy_gemini, _stream_gemini),
+                                         ("openai", _legacy_openai, _stream_openai)):
+                old, size_a = _peak(legacy, base_url, ref)
+                new, size_b = _peak(stream, base_url, ref)
+                assert size_a == size_b == n
+                print(f"{mb:>5.0f}  {case:<16}{old / 2**20:>10.1f}{new / 2**20:>10.1f}{old / new:>7.2f}")
+        finally:
+            http_pool.close()
+            proc.kill()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
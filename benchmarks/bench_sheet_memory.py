@@ -0,0 +1,96 @@
+"""手工运行：python -m benchmarks.bench_sheet_memory [--size 8192] [--budget-mb 2048]
+
+大图切图的峰值 RSS（每张 sheet 一个全新 spawn 子进程，ru_maxrss 互不污染）：
+  - legacy：detect_grid 与切图各自 Image.open 一次（重构前的流程）。
+  - shared：一个 SheetImage 同时喂给 detect_grid 和 iter_slices。
+分别测 PNG（必须整图解码）与 BMP（无压缩，按行带懒读取），
+并与 --budget-mb 比较，超出预算的行标 OVER。
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import time
+
+from PIL import Image
+
+from benchmarks._fixtures import make_sheet, temp_dir
+from core import sheet_image as si
+from core import slicer_tool as st
+
+ROWS = COLS = 8
+
+
+def _legacy(path, out):
+    img = Image.open(path).convert("L")  # 旧 detect_grid 的整图灰度副本
+    img.load()
+    row_cuts, col_cuts = st.detect_grid(path)
+    with Image.open(path) as sheet:
+        sheet.load()
+        for r in range(len(row_cuts) - 1):
+            for c in range(len(col_cuts) - 1):
+                box = (col_cuts[c], row_cuts[r], col_cuts[c + 1], row_cuts[r + 1])
+                sheet.crop(box).save(os.path.join(out, f"{r}_{c}.png"), compress_level=1)
+        del img
+
+
+def _shared(path, out):
+    with si.SheetImage(path) as sheet:
+        row_cuts, col_cuts = st.detect_grid(sheet)
+        for _ in st.iter_slices(sheet, output_dir=out, row_cuts=row_cuts, col_cuts=col_cuts,
+                                png_preset="fast"):
+            pass
+
+
+def _child(mode, path, out, conn):
+    os.makedirs(out, exist_ok=True)
+    base = si.peak_rss_bytes() or 0
+    t0 = time.perf_counter()
+    (_legacy if mode == "legacy" else _shared)(path, out)
+    conn.send((base, si.peak_rss_bytes() or 0, time.perf_counter() - t0))
+    conn.close()
+
+
+def _make_fixtures(tmp, size):
+    png = make_sheet(os.path.join(tmp, "sheet.png"), ROWS, COLS, cell=128, size=(size, size))
+    Image.open(png).save(os.path.join(tmp, "sheet.bmp"))
+
+
+def _run(mode, path, out):
+    ctx = multiprocessing.get_context("spawn")
+    parent, child = ctx.Pipe()
+    p = ctx.Process(target=_child, args=(mode, path, out, child))
+    p.start()
+    result = parent.recv()
+    p.join()
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size", type=int, default=8192)
+    ap.add_argument("--budget-mb", type=float, default=si.DEFAULT_MEMORY_BUDGET_MB)
+    args = ap.parse_args()
+
+    with temp_dir() as tmp:
+        # 素材也在子进程里生成：Linux 的 ru_maxrss 会跨 exec 继承父进程峰值
+        maker = multiprocessing.get_context("spawn").Process(
+            target=_make_fixtures, args=(tmp, args.size))
+        maker.start()
+        maker.join()
+        png, bmp = os.path.join(tmp, "sheet.png"), os.path.join(tmp, "sheet.bmp")
+
+        print(f"{args.size}x{args.size} sheet, {ROWS}x{COLS} cells, budget {args.budget_mb:.0f} MB")
+        print(f"{'format':<8}{'mode':<8}{'peak MB':>9}{'Δ MB':>9}{'est MB':>9}{'s':>7}")
+        for path in (png, bmp):
+            est = si.sheet_cost_bytes(path, smart_crop=True) / 2**20
+            for mode in ("legacy", "shared"):
+                base, peak, secs = _run(mode, path, os.path.join(tmp, f"out_{mode}"))
+                flag = "  OVER" if peak / 2**20 > args.budget_mb else ""
+                print(f"{os.path.splitext(path)[1][1:]:<8}{mode:<8}{peak / 2**20:>9.0f}"
+                      f"{(peak - base) / 2**20:>9.0f}{est:>9.0f}{secs:>7.2f}{flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""手工运行：python -m benchmarks.bench_slicer
+
+slicer_tool 的性能基准：
+  - detect_grid：旧版逐像素 pix[x, y] 扫描 vs 现行前缀和实现，
+    同时校验两者的全局 / 逐 band 密度曲线完全一致（即 cuts 逐字节相同）。
+  - normalize_image_content：旧版 getdata/putdata 列表 vs 现行 alpha 掩码合成，
+    报告每格耗时与 tracemalloc 峰值内存，并校验输出像素一致。
+  - 批量切图：逐张 slice_image vs slice_images_parallel（进程池）。
+  - PNG 编码预设：fast / balanced / small 各自的写出字节数与编码耗时。
+
+素材：仓库里的 test_grid.png / test_smart_grid.png，外加合成的 512 ~ 4096px sheet。
+"""
+from __future__ import annotations
+
+import os
+import time
+import tracemalloc
+
+from PIL import Image
+
+from core import png_writer as pw
+from core import slicer_tool as st
+from benchmarks._fixtures import make_sheet, repo_file, temp_dir
+
+REPEAT = 3
+
+
+# --- 旧版实现（仅作对照，逻辑与重构前 detect_grid 内联代码一致） ---
+
+def _legacy_profiles(small, bg_threshold):
+    pix = small.load()
+    sw, sh = small.size
+    row_content = [0.0] * sh
+    col_content = [0.0] * sw
+    for y in range(sh):
+        c = 0
+        for x in range(sw):
+            if pix[x, y] < bg_threshold:
+                c += 1
+        row_content[y] = c / sw
+    for x in range(sw):
+        c = 0
+        for y in range(sh):
+            if pix[x, y] < bg_threshold:
+                c += 1
+        col_content[x] = c / sh
+    return row_content, col_content
+
+
+def _legacy_band_density(small, bg_threshold, axis, band_s, band_e):
+    pix = small.load()
+    sw, sh = small.size
+    span = max(1, band_e - band_s)
+    if axis == 'col':
+        return [sum(1 for y in range(band_s, band_e) if pix[x, y] < bg_threshold) / span
+                for x in range(sw)]
+    return [sum(1 for x in range(band_s, band_e) if pix[x, y] < bg_threshold) / span
+            for y in range(sh)]
+
+
+def _prefix_band_density(row_prefix, col_prefix, axis, band_s, band_e):
+    span = max(1, band_e - band_s)
+    if axis == 'col':
+        return [(b - t) / span for t, b in zip(col_prefix[band_s], col_prefix[band_e])]
+    return [(rp[band_e] - rp[band_s]) / span for rp in row_prefix]
+
+
+def _downsampled(path):
+    img = Image.open(path).convert("L")
+    w, h = img.size
+    if max(w, h) > 512:
+        sf = 512 / max(w, h)
+        return img.resize((max(1, int(w * sf)), max(1, int(h * sf))), Image.Resampling.BOX)
+    return img
+
+
+def _bands(n, parts=8):
+    return [(n * i // parts, n * (i + 1) // parts) for i in range(parts)]
+
+
+def _time(fn, repeat=REPEAT):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def _legacy_all(small, bg):
+    sw, sh = small.size
+    rows, cols = _legacy_profiles(small, bg)
+    bands = [_legacy_band_density(small, bg, 'col', s, e) for s, e in _bands(sh)]
+    bands += [_legacy_band_density(small, bg, 'row', s, e) for s, e in _bands(sw)]
+    return rows, cols, bands
+
+
+def _prefix_all(small, bg):
+    sw, sh = small.size
+    row_prefix, col_prefix = st._content_prefix_sums(small, bg)
+    rows = [rp[sw] / sw for rp in row_prefix]
+    cols = [c / sh for c in col_prefix[sh]]
+    bands = [_prefix_band_density(row_prefix, col_prefix, 'col', s, e) for s, e in _bands(sh)]
+    bands += [_prefix_band_density(row_prefix, col_prefix, 'row', s, e) for s, e in _bands(sw)]
+    return rows, cols, bands
+
+
+def bench_detect_grid(paths, bg_threshold=245):
+    print(f"{'image':<28}{'size':>11}{'legacy ms':>12}{'prefix ms':>12}{'speedup':>9}"
+          f"{'detect_grid ms':>16}  identical")
+    for path in paths:
+        small = _downsampled(path)
+        t_old, old = _time(lambda: _legacy_all(small, bg_threshold), repeat=1)
+        t_new, new = _time(lambda: _prefix_all(small, bg_threshold))
+        t_full, _ = _time(lambda: st.detect_grid(path, bg_threshold=bg_threshold))
+        w, h = Image.open(path).size
+        print(f"{os.path.basename(path):<28}{f'{w}x{h}':>11}{t_old * 1e3:>12.1f}"
+              f"{t_new * 1e3:>12.1f}{t_old / max(t_new, 1e-9):>8.1f}x"
+              f"{t_full * 1e3:>16.1f}  {old == new}")
+        assert old == new, f"density mismatch on {path}"
+
+
+def _legacy_normalize(img, threshold=30, scale_factor=0.85):
+    img = img.convert("RGBA")
+    new_data = []
+    for item in img.getdata():
+        new_data.append((0, 0, 0, 0) if item[3] < threshold else item)
+    img.putdata(new_data)
+    bbox = img.getbbox()
+    if not bbox:
+        return img
+    content = img.crop(bbox)
+    target_w, target_h = img.size
+    max_w, max_h = int(target_w * scale_factor), int(target_h * scale_factor)
+    ratio = min(max_w / content.size[0], max_h / content.size[1])
+    new_w, new_h = int(content.size[0] * ratio), int(content.size[1] * ratio)
+    content = content.resize((new_w, new_h), Image.Resampling.LANCZOS)
+    new_img = Image.new("RGBA", (target_w, target_h), (0, 0, 0, 0))
+    new_img.paste(content, ((target_w - new_w) // 2, (target_h - new_h) // 2))
+    return new_img
+
+
+def _measure(fn):
+    """返回 (耗时秒, tracemalloc 峰值字节, 结果)。"""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def _cells(path, rows, cols):
+    img = Image.open(path).convert("RGBA")
+    w, h = img.size
+    cw, ch = w // cols, h // rows
+    return [img.crop((c * cw, r * ch, (c + 1) * cw, (r + 1) * ch))
+            for r in range(rows) for c in range(cols)]
+
+
+def bench_normalize(path, rows, cols):
+    cells = _cells(path, rows, cols)
+    n = len(cells)
+    variants = [
+        ("legacy", _legacy_normalize),
+        ("mask", st.normalize_image_content),
+        ("mask, upscale=False", lambda c: st.normalize_image_content(c, upscale=False)),
+    ]
+    cw, ch = cells[0].size
+    print(f"{os.path.basename(path)}: {n} cells of {cw}x{ch}")
+    print(f"{'variant':<24}{'ms/cell':>10}{'peak KiB/cell':>16}")
+    outputs = {}
+    for name, fn in variants:
+        total_t = 0.0
+        peak_max = 0
+        outs = []
+        for cell in cells:
+            t, peak, out = _measure(lambda: fn(cell))
+            total_t += t
+            peak_max = max(peak_max, peak)
+            outs.append(out.tobytes())
+        outputs[name] = outs
+        print(f"{name:<24}{total_t / n * 1e3:>10.2f}{peak_max / 1024:>16.1f}")
+    assert outputs["legacy"] == outputs["mask"], f"normalize mismatch on {path}"
+
+
+def bench_batch(tmp, n_images=8, workers=None):
+    sheets = [make_sheet(os.path.join(tmp, f"batch_{i}.png"), 8, 8, cell=128)
+              for i in range(n_images)]
+    opts = dict(grid_rows=8, grid_cols=8, normalize_mode=True, rename="b")
+
+    def sequential():
+        out = os.path.join(tmp, "batch_seq")
+        for i, fp in enumerate(sheets):
+            st.slice_image(fp, output_dir=out, start_index=1 + 64 * i, num_digits=3, **opts)
+
+    def parallel():
+        st.slice_images_parallel(sheets, output_dir=os.path.join(tmp, "batch_par"),
+                                 max_workers=workers, **opts)
+
+    t_seq, _ = _time(sequential, repeat=1)
+    t_par, _ = _time(parallel, repeat=1)
+    cells = n_images * 64
+    print(f"{n_images} sheets x 64 cells, normalize on, workers={workers or os.cpu_count()}")
+    print(f"{'sequential':<12}{t_seq:>8.2f}s{t_seq / cells * 1e3:>10.2f} ms/cell")
+    print(f"{'parallel':<12}{t_par:>8.2f}s{t_par / cells * 1e3:>10.2f} ms/cell"
+          f"  ({t_seq / max(t_par, 1e-9):.1f}x)")
+
+
+def bench_png_presets(sheet, tmp, rows=8, cols=8):
+    print(f"{'preset':<10}{'files':>7}{'KiB':>10}{'encode ms':>12}{'wall s':>9}")
+    for preset in pw.PRESET_NAMES:
+        out = os.path.join(tmp, f"preset_{preset}")
+        os.makedirs(out, exist_ok=True)
+        writer = pw.PngWriter(preset)
+        t0 = time.perf_counter()
+        with writer:
+            for _ in st.iter_slices(sheet, rows, cols, output_dir=out, rename=preset,
+                                    writer=writer, png_preset=preset):
+                pass
+        wall = time.perf_counter() - t0
+        stats = writer.stats
+        print(f"{preset:<10}{stats['files']:>7}{stats['bytes'] / 1024:>10.1f}"
+              f"{stats['encode_seconds'] * 1e3:>12.1f}{wall:>9.2f}")
+
+
+def main():
+    with temp_dir() as tmp:
+        paths = [repo_file("test_grid.png"), repo_file("test_smart_grid.png")]
+        paths.append(make_sheet(os.path.join(tmp, "synth_8x8_512.png"), 8, 8, cell=64))
+        paths.append(make_sheet(os.path.join(tmp, "synth_3x5_lines.png"), 3, 5, cell=120, lines=True))
+        paths.append(make_sheet(os.path.join(tmp, "synth_8x8_4096.png"), 8, 8, cell=128,
+                                size=(4096, 4096)))
+        print("== detect_grid ==")
+        bench_detect_grid(paths)
+
+        print("\n== normalize_image_content ==")
+        sheet = make_sheet(os.path.join(tmp, "synth_8x8_2048.png"), 8, 8, cell=128,
+                           size=(2048, 2048))
+        bench_normalize(sheet, 8, 8)
+
+        print("\n== batch slicing ==")
+        bench_batch(tmp)
+
+        print("\n== PNG encode presets ==")
+        bench_png_presets(sheet, tmp)
+
+
+if __name__ == "__main__":
+    main()
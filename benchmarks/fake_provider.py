@@ -0,0 +1,278 @@
+"""离线压测用的假 provider 服务器：python -m benchmarks.fake_provider [选项]
+
+实现 core.gemini_service / core.openai_service 解析的三种接口：
+  - POST .../models/<m>:generateContent   → candidates[0].content.parts[].inlineData
+  - POST .../images/generations           → data[0].b64_json（--url-mode 时给 url）
+  - POST .../images/edits（multipart）     → 同上
+  - GET  /out/<n>.png                      → url 模式下的图片下载
+  - GET  /__stats[?reset=1]               → 计数器 JSON（压测驱动读取；reset=1 清零峰值并发）
+
+可配置的故障注入（按请求独立抽样，--seed 固定后可复现）：
+  --latency / --jitter    每个请求的服务端延迟：latency × (1 ± jitter) 均匀分布
+  --error-rate            返回 500（Gemini INTERNAL / OpenAI server_error）的概率
+  --throttle-rate         返回 429 + Retry-After 的概率；--throttle-first N 固定让前 N 个 429
+  --image-bytes           合成图片的字节数（0 = 1×1 PNG）
+  --replay DIR            "录制流量"：按顺序轮流返回 DIR 里的图片文件；
+                          也认 core.response_cache 的条目文件（去掉头部那行）
+
+错误体与真实服务一致（Gemini 429 带 RetryInfo.retryDelay，OpenAI 带 error.code），
+所以 core.rate_limiter 的 Retry-After / 可重试判断走的是和线上相同的分支。
+首行输出 base_url：OpenAI 用 base_url + "/v1"，Gemini 把 _get_api_base_url 指过来。
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PNG_BYTES = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR4nGNgYGD4DwABBAEAwS2OUAAAAABJRU5ErkJggg==")
+
+_CACHE_MAGIC = b"PGRC1 "    # core.response_cache 条目文件的头部
+_DOWNLOAD_RE = re.compile(r"^/out/(\d+)\.png$")
+
+
+def load_recorded(directory):
+    """读出 directory（递归）下的全部图片字节，按路径排序；response_cache 条目去掉头部。"""
+    images = []
+    for root, _dirs, files in sorted(os.walk(directory)):
+        for name in sorted(files):
+            if name.endswith(".tmp"):
+                continue
+            with open(os.path.join(root, name), "rb") as f:
+                data = f.read()
+            if data.startswith(_CACHE_MAGIC):
+                data = data.split(b"\n", 1)[1]
+            if data:
+                images.append(data)
+    return images
+
+
+class Profile:
+    """故障注入与载荷配置；draw() 在锁内调用，保证同一 seed 下的序列可复现。"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0,
+                 throttle_first=0, retry_after="1", images=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.throttle_first = throttle_first
+        self.retry_after = retry_after
+        self.images = images or [PNG_BYTES]
+        self._rng = random.Random(seed)
+
+    def draw(self, n):
+        """第 n 个（从 0 计）POST 的 (延迟秒数, 结果)；结果是 "ok" / "throttle" / "error"。"""
+        rng = self._rng
+        delay = self.latency * (1.0 + rng.uniform(-self.jitter, self.jitter)) if self.latency else 0.0
+        roll = rng.random()
+        if n < self.throttle_first or roll < self.throttle_rate:
+            outcome = "throttle"
+        elif roll < self.throttle_rate + self.error_rate:
+            outcome = "error"
+        else:
+            outcome = "ok"
+        return max(0.0, delay), outcome
+
+    def image(self, n):
+        return self.images[n % len(self.images)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        srv = self.server
+        if self.path in ("/__stats", "/__stats?reset=1"):
+            self._send(200, srv.stats(reset_peak=self.path.endswith("reset=1")))
+            return
+        m = _DOWNLOAD_RE.match(self.path)
+        if m:
+            srv.count("downloads")
+            self._send(200, srv.profile.image(int(m.group(1))), "image/png")
+        else:
+            self._send(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        srv = self.server
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        gemini = ":generateContent" in self.path
+        if not (gemini or self.path.endswith("/images/generations")
+                or self.path.endswith("/images/edits")):
+            self._send(404, {"error": {"message": "not found"}})
+            return
+
+        n, delay, outcome = srv.begin()
+        try:
+            if delay:
+                time.sleep(delay)
+            if outcome == "throttle":
+                self._throttle(gemini)
+            elif outcome == "error":
+                self._error(gemini)
+            else:
+                self._image(gemini, n)
+        finally:
+            srv.end(outcome)
+
+    def _throttle(self, gemini):
+        retry_after = self.server.profile.retry_after
+        if gemini:
+            body = {"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).",
+                              "status": "RESOURCE_EXHAUSTED",
+                              "details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo",
+                                           "retryDelay": f"{retry_after}s"}]}}
+        else:
+            body = {"error": {"message": "Rate limit reached for requests", "type": "requests",
+                              "code": "rate_limit_exceeded"}}
+        self._send(429, body, headers={"Retry-After": retry_after})
+
+    def _error(self, gemini):
+        if gemini:
+            body = {"error": {"code": 500, "message": "Internal error encountered.", "status": "INTERNAL"}}
+        else:
+            body = {"error": {"message": "The server had an error while processing your request.",
+                              "type": "server_error", "code": None}}
+        self._send(500, body)
+
+    def _image(self, gemini, n):
+        srv = self.server
+        if srv.url_mode and not gemini:
+            host, port = srv.server_address[:2]
+            self._send(200, {"created": int(time.time()),
+                             "data": [{"url": f"http://{host}:{port}/out/{n}.png"}]})
+            return
+        b64 = base64.b64encode(srv.profile.image(n)).decode("ascii")
+        if gemini:
+            self._send(200, {"candidates": [{"content": {"role": "model", "parts": [
+                {"text": "Here is the image."},
+                {"inlineData": {"mimeType": "image/png", "data": b64}}]},
+                "finishReason": "STOP"}]})
+        else:
+            self._send(200, {"created": int(time.time()), "data": [{"b64_json": b64}]})
+
+
+class FakeProviderServer(ThreadingHTTPServer):
+    """线程版 HTTP/1.1 keep-alive 服务器；with 语句里在后台线程 serve。"""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, profile=None, url_mode=False, port=0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.profile = profile or Profile()
+        self.url_mode = url_mode
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "ok": 0, "throttled": 0, "errors": 0, "downloads": 0}
+        self._active = 0
+        self._peak = 0
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def begin(self):
+        with self._lock:
+            n = self._counts["requests"]
+            self._counts["requests"] += 1
+            self._active += 1
+            self._peak = max(self._peak, self._active)
+            delay, outcome = self.profile.draw(n)
+        return n, delay, outcome
+
+    def end(self, outcome):
+        key = {"ok": "ok", "throttle": "throttled", "error": "errors"}[outcome]
+        with self._lock:
+            self._active -= 1
+            self._counts[key] += 1
+
+    def count(self, key):
+        with self._lock:
+            self._counts[key] += 1
+
+    def stats(self, reset_peak=False):
+        with self._lock:
+            out = dict(self._counts, active=self._active, peak_active=self._peak)
+            if reset_peak:
+                self._peak = self._active
+            return out
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+def add_profile_args(ap):
+    """把故障注入选项加到 ap 上（压测驱动复用同一套参数再转发给子进程）。"""
+    ap.add_argument("--latency", type=float, default=0.0, help="每个请求的服务端延迟（秒）")
+    ap.add_argument("--jitter", type=float, default=0.0, help="延迟的相对抖动，0.5 = ±50%%")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的概率")
+    ap.add_argument("--throttle-rate", type=float, default=0.0, help="返回 429 的概率")
+    ap.add_argument("--throttle-first", type=int, default=0, help="前 N 个请求固定返回 429")
+    ap.add_argument("--retry-after", default="1", help="429 的 Retry-After（秒）")
+    ap.add_argument("--image-bytes", type=int, default=0, help="合成图片字节数，0 = 1×1 PNG")
+    ap.add_argument("--replay", default=None, help="录制的图片 / response_cache 目录")
+    ap.add_argument("--url-mode", action="store_true", help="OpenAI 返回 url 而不是 b64_json")
+    ap.add_argument("--seed", type=int, default=0)
+
+
+def profile_from_args(args):
+    if args.replay:
+        images = load_recorded(args.replay)
+        if not images:
+            raise SystemExit(f"no recorded images under {args.replay}")
+    elif args.image_bytes:
+        images = [random.Random(args.seed).randbytes(args.image_bytes)]
+    else:
+        images = [PNG_BYTES]
+    return Profile(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                   throttle_rate=args.throttle_rate, throttle_first=args.throttle_first,
+                   retry_after=args.retry_after, images=images, seed=args.seed)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="offline fake image provider")
+    add_profile_args(ap)
+    ap.add_argument("--port", type=int, default=0)
+    args = ap.parse_args()
+    srv = FakeProviderServer(profile_from_args(args), url_mode=args.url_mode, port=args.port)
+    print(srv.base_url, flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
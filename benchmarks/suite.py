@@ -0,0 +1,363 @@
+"""离线性能基准套件：python -m benchmarks.suite [选项]
+
+覆盖 core/ 的热路径，每个 case 按规模参数化，名字形如 "detect_grid[2048]"：
+  - detect_grid：512 / 2048 / 4096px 合成 sheet
+  - slice_image：8x8 sheet，normalize 开 / 关
+  - generate_*_prompt_by_strings：spaceship / ship / mecha / mecha-part 全部 tier × 子类
+  - library.add_entry / add_entries / queue_entry / list_entries（含 FTS5 关键字 / 前缀 + bm25 排序、keyset 翻页、轻量投影）：库里已有 10k / 100k / 1M 行时
+  - AssetCurator.scan_files：两个源目录、1k / 10k 文件的合成目录树
+  - sanitize_for_openai：生成器产出的真实 prompt
+
+结果写成 JSON（--json），并与存档基线（默认 benchmarks/baseline.json）比较：
+中位数变慢超过 --tolerance（默认 25%）记为回归，进程退出码为 1。
+--update-baseline 用本次结果覆盖基线。默认只跑小规模；--full 加上大规模
+（1M 行 library、10k 文件目录树、4096px sheet）。
+
+基线与机器相关：换机器 / 换 Python 后先 --update-baseline 再比较。
+"""
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import PIL
+
+from benchmarks._fixtures import make_sheet, temp_dir
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+QUICK = {
+    "sheet_px": (512, 2048),
+    "library_rows": (10_000,),
+    "tree_files": (1_000,),
+}
+FULL = {
+    "sheet_px": (512, 2048, 4096),
+    "library_rows": (10_000, 100_000, 1_000_000),
+    "tree_files": (1_000, 10_000),
+}
+
+
+class Suite:
+    """收集 case 的计时结果；每个 case 取 repeat 次的中位数 / 最小值。"""
+
+    def __init__(self, only=None, repeat=5):
+        self.only = only
+        self.repeat = repeat
+        self.results = {}
+
+    def wanted(self, name):
+        # 名字里的 [] 会被 fnmatch 当成字符集，所以完全相等也算匹配
+        return not self.only or any(name == p or fnmatch.fnmatchcase(name, p)
+                                    for p in self.only)
+
+    def time(self, name, fn, ops=1, repeat=None):
+        """fn() 执行 ops 次操作；记录每次调用的秒数。"""
+        if not self.wanted(name):
+            return
+        samples = []
+        for _ in range(repeat or self.repeat):
+            t0 = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - t0)
+        median = statistics.median(samples)
+        self.results[name] = {
+            "median_s": median,
+            "min_s": min(samples),
+            "repeat": len(samples),
+            "ops": ops,
+            "per_op_us": median / ops * 1e6,
+        }
+        print(f"{name:<44}{median * 1e3:>11.2f} ms{median / ops * 1e6:>12.1f} us/op", flush=True)
+
+
+# --- slicer ---
+
+def bench_slicer(suite, tmp, sizes):
+    from core import slicer_tool as st
+
+    for px in sizes:
+        if not suite.wanted(f"detect_grid[{px}]"):
+            continue
+        sheet = make_sheet(os.path.join(tmp, f"sheet_{px}.png"), 8, 8, cell=64, size=(px, px))
+        suite.time(f"detect_grid[{px}]", lambda: st.detect_grid(sheet))
+
+    names = {n: f"slice_image[1024,normalize={'on' if n else 'off'}]" for n in (False, True)}
+    if not any(suite.wanted(n) for n in names.values()):
+        return
+    sheet = make_sheet(os.path.join(tmp, "slice_1024.png"), 8, 8, cell=128)
+    for normalize, name in names.items():
+        out = os.path.join(tmp, name.replace(",", "_").replace("=", "_"))
+        suite.time(name, lambda: st.slice_image(sheet, 8, 8, output_dir=out, rename="c",
+                                                normalize_mode=normalize),
+                   ops=64, repeat=3)
+
+
+# --- prompt generators ---
+
+def _generator_calls():
+    from core import mecha_generator as mg
+    from core import mecha_part_generator as mpg
+    from core import prompt_generator as pg
+    from core import ship_generator as sg
+
+    tiers = pg.get_tier_list()
+    return {
+        "generate_prompt_by_strings": [
+            (pg.generate_prompt_by_strings, (t, cat, sub, "#445566", "#FFAA00", "None", "None"))
+            for cat, subs in pg.get_component_map().items() for sub in subs for t in tiers
+        ],
+        "generate_ship_prompt_by_strings": [
+            (sg.generate_ship_prompt_by_strings, (t, a, "#445566", "#FFAA00"))
+            for a in sg.ARCHETYPE_BY_NAME for t in tiers
+        ],
+        "generate_mecha_prompt_by_strings": [
+            (mg.generate_mecha_prompt_by_strings, (t, sub, "#445566", "#FFAA00"))
+            for sub in mg.MECHA_SUBCATEGORIES for t in tiers
+        ],
+        "generate_mecha_part_prompt_by_strings": [
+            (mpg.generate_mecha_part_prompt_by_strings, (t, key, "#445566", "#FFAA00"))
+            for key, _en, _zh in mpg.MECHA_PART_SUBCATEGORIES for t in tiers
+        ],
+    }
+
+
+def bench_generators(suite):
+    prompts = []
+    for name, calls in _generator_calls().items():
+        def run(calls=calls):
+            random.seed(42)
+            for fn, args in calls:
+                fn(*args)
+        suite.time(f"{name}[{len(calls)}]", run, ops=len(calls))
+        random.seed(42)
+        prompts.extend(fn(*args) for fn, args in calls)
+    return prompts
+
+
+def bench_sanitizer(suite, prompts):
+    from core.prompt_sanitizer import sanitize_for_openai
+
+    def run():
+        for p in prompts:
+            sanitize_for_openai(p)
+    suite.time(f"sanitize_for_openai[{len(prompts)}]", run, ops=len(prompts))
+    long_prompt = "\n".join(prompts)
+    suite.time(f"sanitize_for_openai[{len(long_prompt) // 1024}KiB]",
+               lambda: sanitize_for_openai(long_prompt))
+
+
+# --- library ---
+
+_GENERATORS = ("spaceship", "ship", "mecha", "items", "character", "slicer")
+_TAGS = ("hero", "wip", "favorite", "enemy", "ui", "boss")
+
+
+def _seed_library(db_path, rows):
+    """绕过 add_entry 直接 executemany 灌入 rows 行（只为造规模，不计时）。"""
+    conn = sqlite3.connect(db_path)
+    rng = random.Random(rows)
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+
+    def gen():
+        for i in range(rows):
+            ts = datetime.fromtimestamp(base + i * 30, timezone.utc).isoformat(timespec="seconds")
+            tags = ",".join(rng.sample(_TAGS, rng.randint(0, 2)))
+            yield (ts, _GENERATORS[i % len(_GENERATORS)], json.dumps({"seed": i}),
+                   f"prompt {i} armored {rng.choice(_TAGS)} unit, flat colors",
+                   f"/out/{i}.png", None, rng.randint(0, 5), tags, f"batch{i // 64}", "")
+    conn.executemany(
+        "INSERT INTO assets (created_at, generator_type, params_json, prompt, image_path, "
+        "thumbnail_path, rating, tags, source_batch_id, notes) VALUES (?,?,?,?,?,?,?,?,?,?)",
+        gen())
+    # 规范化标签表（add_entry 会同步写，这里直接灌的要自己补）
+    tagged = conn.execute("SELECT id, tags FROM assets WHERE tags <> ''").fetchall()
+    conn.executemany("INSERT OR IGNORE INTO asset_tags(tag, asset_id) VALUES (?, ?)",
+                     ((t, i) for i, tags in tagged for t in tags.split(",")))
+    conn.commit()
+    conn.close()
+
+
+def bench_library(suite, tmp, sizes):
+    from core import library
+
+    for rows in sizes:
+        if not any(suite.wanted(f"library.{op}[{rows}]") for op in
+                   ("add_entry", "add_entries", "queue_entry", "list_entries", "list_entries_tag", "list_entries_tags_all",
+                    "list_entries_keyword", "list_entries_keyword_ranked",
+                    "list_entries_deep_offset", "list_entries_keyset_deep",
+                    "list_entries_light", "all_tags")):
+            continue
+        db_path = os.path.join(tmp, f"library_{rows}.db")
+        library.configure(db_path)
+        try:
+            _seed_library(db_path, rows)
+            n = 200
+
+            def add():
+                for i in range(n):
+                    library.add_entry(generator_type="items", params={"i": i},
+                                      prompt=f"bench prompt {i}", tags=["bench"])
+            suite.time(f"library.add_entry[{rows}]", add, ops=n, repeat=3)
+
+            def add_bulk():
+                library.add_entries([dict(generator_type="items", params={"i": i},
+                                          prompt=f"bench prompt {i}", tags=["bench"])
+                                     for i in range(n)])
+            suite.time(f"library.add_entries[{rows}]", add_bulk, ops=n, repeat=3)
+
+            def add_queued():
+                # 入队 + flush：后台写线程合并提交的总耗时
+                for i in range(n):
+                    library.queue_entry(generator_type="items", params={"i": i},
+                                        prompt=f"bench prompt {i}", tags=["bench"])
+                library.flush()
+            suite.time(f"library.queue_entry[{rows}]", add_queued, ops=n, repeat=3)
+            suite.time(f"library.list_entries[{rows}]", lambda: library.list_entries())
+            suite.time(f"library.list_entries_tag[{rows}]",
+                       lambda: library.list_entries(tag="boss"))
+            suite.time(f"library.list_entries_tags_all[{rows}]",
+                       lambda: library.list_entries(tags=["boss", "hero"]))
+            suite.time(f"library.list_entries_keyword[{rows}]",
+                       lambda: library.list_entries(keyword="armored enemy"))
+            suite.time(f"library.list_entries_keyword_ranked[{rows}]",
+                       lambda: library.list_entries(keyword="armo", order="relevance"))
+            suite.time(f"library.list_entries_deep_offset[{rows}]",
+                       lambda: library.list_entries(offset=rows // 2))
+            # 同一位置的下一页，用 keyset 游标代替 OFFSET
+            cursor = library.list_entries(limit=1, offset=rows // 2 - 1)[0].cursor
+            suite.time(f"library.list_entries_keyset_deep[{rows}]",
+                       lambda: library.list_entries(after=cursor))
+            suite.time(f"library.list_entries_light[{rows}]",
+                       lambda: library.list_entries(limit=200, light=True))
+            suite.time(f"library.all_tags[{rows}]", library.all_tags)
+        finally:
+            library.reset_for_test()
+
+
+# --- curation ---
+
+def _make_tree(root, files):
+    """两个源目录，每个 files // 2 个文件，约 20% 文件名在两边重复。"""
+    sources = [os.path.join(root, "src_a"), os.path.join(root, "src_b")]
+    per_src = files // 2
+    for s, src in enumerate(sources):
+        for i in range(per_src):
+            d = os.path.join(src, f"batch_{i // 100:03d}")
+            os.makedirs(d, exist_ok=True)
+            name = f"icon_{i:05d}.png" if i % 5 == 0 else f"icon_{s}_{i:05d}.png"
+            open(os.path.join(d, name), "wb").close()
+    return sources
+
+
+def bench_curation(suite, tmp, sizes):
+    from core.curation_tool import AssetCurator
+
+    for files in sizes:
+        name = f"AssetCurator.scan_files[{files}]"
+        if not suite.wanted(name):
+            continue
+        sources = _make_tree(os.path.join(tmp, f"tree_{files}"), files)
+        curator = AssetCurator()
+        curator.set_config(sources, os.path.join(tmp, "target"))
+        suite.time(name, curator.scan_files, ops=files)
+
+
+# --- runner ---
+
+def run(profile, only=None, repeat=5):
+    suite = Suite(only=only, repeat=repeat)
+    with temp_dir() as tmp:
+        bench_slicer(suite, tmp, profile["sheet_px"])
+        prompts = bench_generators(suite)
+        bench_sanitizer(suite, prompts)
+        bench_library(suite, tmp, profile["library_rows"])
+        bench_curation(suite, tmp, profile["tree_files"])
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": suite.results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """返回 (rows, regressions)；rows 为 (name, base_s, cur_s, ratio, flag)。"""
+    rows, regressions = [], []
+    base_results = baseline.get("results", {})
+    for name, cur in current["results"].items():
+        base = base_results.get(name)
+        if base is None:
+            rows.append((name, None, cur["median_s"], None, "new"))
+            continue
+        ratio = cur["median_s"] / max(base["median_s"], 1e-12)
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 / (1 + tolerance):
+            flag = "faster"
+        rows.append((name, base["median_s"], cur["median_s"], ratio, flag))
+    return rows, regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--full", action="store_true", help="include the large sizes")
+    ap.add_argument("--only", nargs="*", help="fnmatch patterns, e.g. 'library.*' 'detect_grid*'")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--baseline", default=BASELINE_PATH)
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    ap.add_argument("--update-baseline", action="store_true")
+    args = ap.parse_args(argv)
+
+    current = run(FULL if args.full else QUICK, only=args.only, repeat=args.repeat)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+
+    if args.update_baseline:
+        merged = {"meta": current["meta"], "results": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                merged["results"] = json.load(f).get("results", {})
+        merged["results"].update(current["results"])
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(merged, f, indent=2, sort_keys=True)
+        print(f"\nBaseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to create one.")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    rows, regressions = compare(current, baseline, args.tolerance)
+    print(f"\n{'case':<44}{'base ms':>10}{'now ms':>10}{'ratio':>8}")
+    for name, base_s, cur_s, ratio, flag in rows:
+        base_txt = f"{base_s * 1e3:>10.2f}" if base_s is not None else f"{'-':>10}"
+        ratio_txt = f"{ratio:>8.2f}" if ratio is not None else f"{'-':>8}"
+        print(f"{name:<44}{base_txt}{cur_s * 1e3:>10.2f}{ratio_txt}  {flag}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
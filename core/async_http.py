@@ -0,0 +1,369 @@
+"""Minimal asyncio HTTP/1.1 client for the image providers.
+
+requests is blocking, so N concurrent generations used to cost N threads
+parked in recv() for up to 480 s. This client speaks just enough HTTP/1.1
+for the provider APIs on asyncio streams:
+
+  - POST with a ready-made or streamed body (bytes or a sized iterable),
+    GET for URL downloads
+  - Content-Length, chunked and read-to-close response bodies, optionally
+    handed to a callback chunk by chunk
+  - per-host keep-alive pools; a pooled connection the server already
+    closed is detected on first read and the request is retried once on a
+    fresh connection
+  - proxies like requests' trust_env: HTTP(S)_PROXY / NO_PROXY, or the
+    system settings, via urllib.request.getproxies() / proxy_bypass().
+    http:// targets go to the proxy in absolute form, https:// ones through
+    a CONNECT tunnel; only http:// proxy URLs are supported
+  - up to MAX_REDIRECTS 3xx redirects, rewritten the way requests does:
+    303 (and 301 / 302 after a POST) become a body-less GET, 307 / 308
+    resend the body, and Authorization is dropped when the host changes
+
+Any number of in-flight requests share the event-loop thread. Timeouts
+follow core.http_pool: (connect, read) where read bounds the whole response.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import json as _json
+import socket
+import ssl
+import urllib.request
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import SplitResult, unquote, urljoin, urlsplit
+
+from core import http_pool
+
+USER_AGENT = "PromptGen/async"
+_READ_SIZE = 64 * 1024
+MAX_REDIRECTS = 5
+_REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+
+class TransportError(Exception):
+    """Connection, protocol or timeout failure (the async RequestException)."""
+
+
+class _StaleConnection(Exception):
+    pass
+
+
+class Response:
+    """The subset of requests.Response the provider modules read."""
+
+    def __init__(self, status_code: int, reason: str, headers: Dict[str, str], content: bytes):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers  # lower-cased names
+        self.content = content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", "replace")
+
+    def json(self):
+        return _json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise TransportError(f"HTTP {self.status_code} {self.reason}")
+
+
+_Conn = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+def _proxy_auth(proxy: SplitResult) -> Dict[str, str]:
+    if not proxy.username:
+        return {}
+    cred = f"{unquote(proxy.username)}:{unquote(proxy.password or '')}"
+    return {"Proxy-Authorization": "Basic " + base64.b64encode(cred.encode("utf-8")).decode("ascii")}
+
+
+class AsyncHTTPClient:
+    """Keep-alive HTTP/1.1 client bound to one event loop (create it inside the loop).
+
+    param proxies: {"http": url, "https": url, "no": "host,.domain"} overrides;
+                   None reads the environment / system settings once, here.
+    """
+
+    def __init__(self, max_idle_per_host: int = 64, proxies: Optional[Dict[str, str]] = None):
+        self.max_idle_per_host = max_idle_per_host
+        self._idle: Dict[tuple, List[_Conn]] = {}
+        self._ssl: Optional[ssl.SSLContext] = None
+        self._env_proxies = proxies is None
+        self._proxies = urllib.request.getproxies() if proxies is None else dict(proxies)
+        self._bypass: Dict[str, bool] = {}
+        self.connections_opened = 0
+
+    def _proxy_for(self, scheme: str, host: str) -> Optional[SplitResult]:
+        url = self._proxies.get(scheme)
+        if not url:
+            return None
+        bypass = self._bypass.get(host)
+        if bypass is None:
+            # the registry lookup on Windows may resolve the host: once per host
+            bypass = bool(urllib.request.proxy_bypass(host) if self._env_proxies
+                          else urllib.request.proxy_bypass_environment(host, self._proxies))
+            self._bypass[host] = bypass
+        if bypass:
+            return None
+        proxy = urlsplit(url if "://" in url else "http://" + url)
+        if proxy.scheme != "http" or not proxy.hostname:
+            raise TransportError(f"Unsupported proxy for {scheme}:// requests: {proxy.scheme}://"
+                                 " (only http:// proxies are supported)")
+        return proxy
+
+    def _context(self) -> ssl.SSLContext:
+        if self._ssl is None:
+            self._ssl = ssl.create_default_context()
+        return self._ssl
+
+    async def _open(self, host: str, port: int, https: bool, connect_timeout: float,
+                    proxy: Optional[SplitResult] = None) -> _Conn:
+        ctx = self._context() if https else None
+        try:
+            if proxy is None:
+                opening = asyncio.open_connection(host, port, ssl=ctx,
+                                                  server_hostname=host if https else None)
+            elif not https:
+                opening = asyncio.open_connection(proxy.hostname, proxy.port or 80)
+            else:
+                opening = self._open_tunnel(proxy, host, port, ctx)
+            conn = await asyncio.wait_for(opening, connect_timeout)
+        except asyncio.TimeoutError as exc:
+            raise TransportError(f"Connection to {host}:{port} timed out") from exc
+        except (OSError, ValueError) as exc:
+            via = f" via proxy {proxy.hostname}:{proxy.port or 80}" if proxy else ""
+            raise TransportError(f"Connection to {host}:{port}{via} failed: {exc}") from exc
+        self.connections_opened += 1
+        return conn
+
+    async def _open_tunnel(self, proxy: SplitResult, host: str, port: int,
+                           ctx: ssl.SSLContext) -> _Conn:
+        """CONNECT host:port through the proxy on a raw socket, then start TLS over it."""
+        loop = asyncio.get_running_loop()
+        infos = await loop.getaddrinfo(proxy.hostname, proxy.port or 80, type=socket.SOCK_STREAM)
+        sock, error = None, None
+        for family, type_, proto, _name, addr in infos:
+            sock = socket.socket(family, type_, proto)
+            sock.setblocking(False)
+            try:
+                await loop.sock_connect(sock, addr)
+                break
+            except OSError as exc:
+                sock.close()
+                sock, error = None, exc
+        if sock is None:
+            raise error or OSError(f"cannot resolve proxy {proxy.hostname}")
+        try:
+            head = {"Host": f"{host}:{port}", "User-Agent": USER_AGENT, **_proxy_auth(proxy)}
+            await loop.sock_sendall(sock, (f"CONNECT {host}:{port} HTTP/1.1\r\n"
+                                           + "".join(f"{k}: {v}\r\n" for k, v in head.items())
+                                           + "\r\n").encode("latin-1"))
+            reply = b""
+            while b"\r\n\r\n" not in reply:
+                piece = await loop.sock_recv(sock, 4096)
+                if not piece:
+                    raise OSError("proxy closed the connection during CONNECT")
+                reply += piece
+                if len(reply) > 65536:
+                    raise ValueError("oversized CONNECT response")
+            _version, status, reason = self._status_line(reply.split(b"\r\n", 1)[0])
+            if status != 200:
+                raise OSError(f"proxy refused CONNECT: {status} {reason}")
+            return await asyncio.open_connection(sock=sock, ssl=ctx, server_hostname=host)
+        except BaseException:
+            sock.close()
+            raise
+
+    def _take_idle(self, key: tuple) -> Optional[_Conn]:
+        idle = self._idle.get(key)
+        while idle:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return None
+
+    def _release(self, key: tuple, conn: _Conn) -> None:
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self.max_idle_per_host:
+            idle.append(conn)
+        else:
+            conn[1].close()
+
+    async def request(self, method: str, url: str, *, headers: Optional[Dict[str, str]] = None,
+                      body=b"", timeout: float = 60.0,
+                      on_chunk: Optional[Callable[[bytes], None]] = None) -> Response:
+        """body: bytes, or a sized iterable of bytes (core.b64stream.JSONBody).
+
+        on_chunk: if set, a 2xx response body is handed over chunk by chunk
+        as it arrives instead of being collected (Response.content is b"").
+        Redirects are followed (see the module docstring); timeout applies per hop.
+        """
+        headers = dict(headers or {})
+        for _hop in range(MAX_REDIRECTS + 1):
+            resp = await self._request_once(method, url, headers, body, timeout, on_chunk)
+            location = resp.headers.get("location")
+            if resp.status_code not in _REDIRECT_CODES or not location:
+                return resp
+            target = urljoin(url, location)
+            if resp.status_code == 303 or (resp.status_code in (301, 302) and method == "POST"):
+                method = "GET" if method != "HEAD" else method
+                body = b""
+                headers = {k: v for k, v in headers.items()
+                           if k.lower() not in ("content-type", "content-length")}
+            if urlsplit(target).hostname != urlsplit(url).hostname:
+                headers = {k: v for k, v in headers.items() if k.lower() != "authorization"}
+            url = target
+        raise TransportError(f"Exceeded {MAX_REDIRECTS} redirects")
+
+    async def _request_once(self, method: str, url: str, headers: Dict[str, str], body,
+                            timeout: float, on_chunk) -> Response:
+        parts = urlsplit(url)
+        https = parts.scheme == "https"
+        host = parts.hostname or ""
+        port = parts.port or (443 if https else 80)
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        connect_timeout, read_timeout = http_pool.timeouts(timeout)
+        proxy = self._proxy_for(parts.scheme, host)
+
+        head = {
+            "Host": parts.netloc.rsplit("@", 1)[-1],
+            "User-Agent": USER_AGENT,
+            "Accept": "*/*",
+            "Accept-Encoding": "identity",
+            "Connection": "keep-alive",
+        }
+        if body or method in ("POST", "PUT", "PATCH"):
+            head["Content-Length"] = str(len(body))
+        if proxy is not None and not https:
+            # plain http through the proxy: absolute-form request line
+            target = f"http://{head['Host']}{target}"
+            head.update(_proxy_auth(proxy))
+        head.update(headers)
+        raw = (f"{method} {target} HTTP/1.1\r\n"
+               + "".join(f"{k}: {v}\r\n" for k, v in head.items())
+               + "\r\n").encode("latin-1")
+
+        key = (parts.scheme, host, port) + ((proxy.netloc,) if proxy else ())
+        for attempt in range(2):
+            conn = self._take_idle(key)
+            reused = conn is not None
+            if conn is None:
+                conn = await self._open(host, port, https, connect_timeout, proxy)
+            try:
+                resp, keep = await asyncio.wait_for(
+                    self._exchange(conn, raw, body, method, on_chunk), read_timeout)
+            except _StaleConnection:
+                conn[1].close()
+                if reused and attempt == 0:
+                    continue
+                raise TransportError("Server closed the connection without a response")
+            except asyncio.TimeoutError as exc:
+                conn[1].close()
+                raise TransportError(f"Read timed out after {read_timeout:g}s") from exc
+            except (OSError, asyncio.IncompleteReadError, ValueError) as exc:
+                conn[1].close()
+                raise TransportError(f"{type(exc).__name__}: {exc}") from exc
+            except BaseException:
+                # Cancelled mid-request: the stream state is unknown, never reuse it
+                conn[1].close()
+                raise
+            if keep:
+                self._release(key, conn)
+            else:
+                conn[1].close()
+            return resp
+        raise TransportError("unreachable")
+
+    async def _exchange(self, conn: _Conn, raw: bytes, body, method: str, on_chunk):
+        reader, writer = conn
+        try:
+            writer.write(raw)
+            if isinstance(body, (bytes, bytearray)):
+                if body:
+                    writer.write(body)
+            else:
+                for piece in body:
+                    writer.write(piece)
+                    await writer.drain()
+            await writer.drain()
+            line = await reader.readline()
+        except (ConnectionResetError, BrokenPipeError) as exc:
+            raise _StaleConnection() from exc
+        if not line:
+            raise _StaleConnection()
+
+        while True:
+            version, status, reason = self._status_line(line)
+            headers = await self._headers(reader)
+            if not 100 <= status < 200:
+                break
+            line = await reader.readline()  # skip 100 Continue and friends
+
+        keep = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        parts: List[bytes] = []
+        sink = on_chunk if on_chunk is not None and 200 <= status < 300 else parts.append
+        if method == "HEAD" or status in (204, 304):
+            pass
+        elif "chunked" in headers.get("transfer-encoding", "").lower():
+            await self._chunked(reader, sink)
+        elif "content-length" in headers:
+            remaining = int(headers["content-length"])
+            while remaining:
+                piece = await reader.readexactly(min(remaining, _READ_SIZE))
+                remaining -= len(piece)
+                sink(piece)
+        else:
+            while True:
+                piece = await reader.read(_READ_SIZE)
+                if not piece:
+                    break
+                sink(piece)
+            keep = False
+        content = parts[0] if len(parts) == 1 else b"".join(parts)
+        return Response(status, reason, headers, content), keep
+
+    @staticmethod
+    def _status_line(line: bytes):
+        parts = line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+        if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+            raise ValueError(f"Bad status line: {line[:80]!r}")
+        return parts[0], int(parts[1]), parts[2] if len(parts) > 2 else ""
+
+    @staticmethod
+    async def _headers(reader: asyncio.StreamReader) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                return headers
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    @staticmethod
+    async def _chunked(reader: asyncio.StreamReader, sink: Callable[[bytes], None]) -> None:
+        while True:
+            size = int((await reader.readline()).split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass  # trailers
+                return
+            while size:
+                piece = await reader.readexactly(min(size, _READ_SIZE))
+                size -= len(piece)
+                sink(piece)
+            await reader.readexactly(2)
+
+    async def close(self) -> None:
+        writers = [w for conns in self._idle.values() for _r, w in conns]
+        self._idle.clear()
+        for w in writers:
+            w.close()
+        for w in writers:
+            try:
+                await w.wait_closed()
+            except (OSError, ssl.SSLError):
+                pass
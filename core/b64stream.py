@@ -0,0 +1,213 @@
+"""Streaming base64 for provider request and response bodies.
+
+A 4 MB image used to sit in memory three or four times per call. On the way
+out there was the raw bytes, the base64 str in the payload dict, the
+json.dumps text, and its UTF-8 encoding. On the way back there was the
+response bytes, the decoded text, the parsed dict's base64 str, and the
+b64decode result.
+
+  - Base64Blob marks raw bytes that serialize as a base64 JSON string.
+    JSONBody streams such a payload as an iterable request body with a known
+    Content-Length, encoding each blob CHUNK bytes at a time as it is sent.
+  - B64FieldDecoder takes a JSON response in chunks. It decodes the first
+    string value of a given field (Gemini's inlineData "data", OpenAI's
+    "b64_json") as the bytes arrive, and keeps the rest as a small skeleton
+    document with that value blanked, for the usual dict-based parsing.
+
+Per call, only the decoded image and about one chunk of base64 text are
+held at any time.
+"""
+from __future__ import annotations
+
+import binascii
+import hashlib
+import io
+import json
+import re
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+CHUNK = 3 * 64 * 1024          # raw bytes per encoded piece; a multiple of 3 means no mid-stream padding
+
+# A string that cannot occur in a real prompt; json.dumps renders it as _MARK_JSON
+_MARK = "\x00b64\x00"
+_MARK_JSON = json.dumps(_MARK)
+
+
+class Base64Blob:
+    """Raw bytes that serialize as a base64 string inside a JSONBody."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def encoded_len(self) -> int:
+        return 4 * ((len(self.data) + 2) // 3)
+
+    def chunks(self) -> Iterator[bytes]:
+        view = memoryview(self.data)
+        for i in range(0, len(view), CHUNK):
+            yield binascii.b2a_base64(view[i:i + CHUNK], newline=False)
+
+    def digest(self) -> str:
+        return hashlib.sha256(self.data).hexdigest()
+
+
+class JSONBody:
+    """Iterable request body: json.dumps(payload) with Base64Blob values streamed in.
+
+    len() is the exact byte length, so requests / core.async_http send a
+    Content-Length, not chunked encoding. Iterating again restarts the
+    stream, so a retried request can resend it.
+    """
+
+    def __init__(self, payload: Any):
+        blobs: List[Base64Blob] = []
+
+        def _placeholder(obj):
+            if isinstance(obj, Base64Blob):
+                blobs.append(obj)
+                return _MARK
+            raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+        text = json.dumps(payload, default=_placeholder)
+        self._pieces = [p.encode("utf-8") for p in text.split(_MARK_JSON)]
+        self._blobs = blobs
+        self._length = (sum(map(len, self._pieces))
+                        + sum(b.encoded_len() + 2 for b in blobs))
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield self._pieces[0]
+        for blob, piece in zip(self._blobs, self._pieces[1:]):
+            yield b'"'
+            yield from blob.chunks()
+            yield b'"' + piece
+
+
+# ---------------------------------------------------------------------------
+# Response side
+# ---------------------------------------------------------------------------
+
+_OUT, _STRING, _AFTER_KEY, _AFTER_COLON, _VALUE = range(5)
+_STRING_SPECIAL = re.compile(rb'["\\]')
+_WHITESPACE = b" \t\r\n"
+_KEY_MAX = 32
+
+
+class B64FieldDecoder:
+    """Incremental JSON scanner that base64-decodes one string field in place.
+
+    feed() the body chunk by chunk, then call result(). It returns the
+    parsed document, with the first value of any `keys` field replaced by
+    "", and the decoded bytes (or None if no such field was seen). Later
+    values of those fields are dropped rather than buffered.
+    """
+
+    def __init__(self, keys: Iterable[str]):
+        self._keys = {k.encode("ascii") for k in keys}
+        self._skeleton: List[bytes] = []
+        # BytesIO grows in place and getvalue() hands over its buffer without a copy
+        self._out = io.BytesIO()
+        self._state = _OUT
+        self._key = b""
+        self._escape = False
+        self._carry = b""
+        self._discard = False
+        self.found = False
+
+    def feed(self, data: bytes) -> None:
+        pos, n = 0, len(data)
+        skel = self._skeleton
+        while pos < n:
+            state = self._state
+            if state == _VALUE:
+                q = data.find(b'"', pos)
+                end = n if q < 0 else q
+                if not self._discard:
+                    self._decode(data[pos:end])
+                if q < 0:
+                    return
+                if not self._discard:
+                    self._finish()
+                skel.append(b'"')
+                self._state = _OUT
+                pos = q + 1
+            elif state == _OUT:
+                q = data.find(b'"', pos)
+                if q < 0:
+                    skel.append(data[pos:])
+                    return
+                skel.append(data[pos:q + 1])
+                self._state, self._key, pos = _STRING, b"", q + 1
+            elif state == _STRING:
+                if self._escape:
+                    # keys we look for never contain escapes
+                    self._escape, self._key = False, None
+                    skel.append(data[pos:pos + 1])
+                    pos += 1
+                    continue
+                m = _STRING_SPECIAL.search(data, pos)
+                end = n if m is None else m.start()
+                if self._key is not None:
+                    self._key += data[pos:end]
+                    if len(self._key) > _KEY_MAX:
+                        self._key = None
+                skel.append(data[pos:end + (m is not None)])
+                if m is None:
+                    return
+                pos = end + 1
+                if data[end] == 0x5C:      # backslash
+                    self._escape = True
+                else:
+                    self._state = _AFTER_KEY if self._key in self._keys else _OUT
+            else:
+                c = data[pos]
+                skel.append(data[pos:pos + 1])
+                pos += 1
+                if c in _WHITESPACE:
+                    continue
+                if state == _AFTER_KEY:
+                    self._state = _AFTER_COLON if c == 0x3A else _OUT     # ':'
+                elif c == 0x22:                                           # '"'
+                    self._state = _VALUE
+                    self._discard = self.found
+                    self.found = True
+                else:
+                    self._state = _OUT
+
+    def _decode(self, segment: bytes) -> None:
+        buf = self._carry + segment if self._carry else segment
+        tail = b""
+        if b"\\" in buf:
+            if buf.endswith(b"\\") and not buf.endswith(b"\\\\"):
+                buf, tail = buf[:-1], b"\\"
+            # JSON may escape "/" and wrap long base64 with "\n"
+            buf = buf.replace(b"\\/", b"/").replace(b"\\n", b"").replace(b"\\r", b"")
+        usable = len(buf) - len(buf) % 4
+        if usable:
+            self._out.write(binascii.a2b_base64(buf[:usable]))
+        self._carry = buf[usable:] + tail
+
+    def _finish(self) -> None:
+        if self._carry.strip(b"="):
+            # unpadded tail: restore the padding before the final decode
+            self._out.write(binascii.a2b_base64(self._carry + b"=" * (-len(self._carry) % 4)))
+        self._carry = b""
+
+    def result(self) -> Tuple[Any, Optional[bytes]]:
+        document = json.loads(b"".join(self._skeleton))
+        if not self.found:
+            return document, None
+        image = self._out.getvalue()
+        self._out = io.BytesIO()
+        return document, image
+
+
+def decode_stream(chunks: Iterable[bytes], keys: Iterable[str]) -> Tuple[Any, Optional[bytes]]:
+    decoder = B64FieldDecoder(keys)
+    for chunk in chunks:
+        decoder.feed(chunk)
+    return decoder.result()
@@ -1,8 +1,10 @@
-import base64
+import binascii
 from typing import Optional, Tuple, List
 
 import requests
 
+from core import b64stream, http_pool, rate_limiter, response_cache
+
 # ---------------------------------------------------------------------------
 # Model catalogue (updated April 2026)
 # ---------------------------------------------------------------------------
@@ -19,41 +21,38 @@ IMAGE_MODELS = [
 ]
 
 
+# Read timeouts (seconds) per endpoint; see core.http_pool for the connect timeout
+GENERATE_TIMEOUT = 90
+EDIT_TIMEOUT = 180
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
 class GeminiError(Exception):
-    pass
+    # Set from the HTTP response by core.rate_limiter.annotate()
+    status = None
+    retry_after = None
+    retryable = False
 
 
 def _get_api_base_url(api_key: str) -> str:
     return "https://generativelanguage.googleapis.com"
 
 
-def _extract_image_bytes(response_json: dict) -> Tuple[Optional[bytes], Optional[str]]:
-    candidates = response_json.get("candidates", [])
-    for cand in candidates:
-        content = cand.get("content", {})
-        parts = content.get("parts", [])
-        for part in parts:
-            inline = part.get("inlineData")
-            if inline and inline.get("data"):
-                data_b64 = inline.get("data")
-                mime_type = inline.get("mimeType")
-                return base64.b64decode(data_b64), mime_type
-    return None, None
-
-
 def normalize_model_name(model: str) -> str:
     if model.startswith("models/"):
         return model
     return f"models/{model}"
 
 
-def generate_image_bytes(
+def _generate_request(
     prompt: str,
     api_key: str,
-    model: str = DEFAULT_MODEL,
-    reference_images: Optional[List[Tuple[bytes, Optional[str]]]] = None,
-    text_last: bool = False,
-) -> Tuple[bytes, Optional[str]]:
+    model: str,
+    reference_images: Optional[List[Tuple[bytes, Optional[str]]]],
+    text_last: bool,
+) -> Tuple[str, dict]:
+    """(url, payload) for a :generateContent call. Shared by the sync and async clients."""
     if not api_key:
         raise GeminiError("Missing API key.")
     if not model:
@@ -68,8 +67,9 @@ def generate_image_bytes(
             if not image_bytes:
                 continue
             mime_type = image_mime or "image/png"
-            image_b64 = base64.b64encode(image_bytes).decode("utf-8")
-            parts.append({"inline_data": {"mime_type": mime_type, "data": image_b64}})
+            # encoded chunk by chunk as the request body is sent
+            parts.append({"inline_data": {"mime_type": mime_type,
+                                          "data": b64stream.Base64Blob(image_bytes)}})
     if text_last or not parts:
         parts.append({"text": prompt})
     else:
@@ -82,21 +82,83 @@ def generate_image_bytes(
             "responseModalities": ["IMAGE"],
         },
     }
+    return url, payload
 
-    try:
-        response = requests.post(url, json=payload, timeout=90)
-    except requests.RequestException as exc:
-        raise GeminiError(str(exc)) from exc
 
+def _check_status(response) -> None:
     if response.status_code != 200:
-        raise GeminiError(f"HTTP {response.status_code}: {response.text}")
+        raise rate_limiter.annotate(
+            GeminiError(f"HTTP {response.status_code}: {response.text}"), response)
+
+
+def _inline_mime(response_json: dict) -> Optional[str]:
+    for cand in response_json.get("candidates", []):
+        for part in cand.get("content", {}).get("parts", []):
+            inline = part.get("inlineData")
+            if inline is not None:
+                return inline.get("mimeType")
+    return None
 
-    data = response.json()
-    image_bytes_out, mime_type = _extract_image_bytes(data)
+
+def _image_from_decoded(decoder: b64stream.B64FieldDecoder) -> Tuple[bytes, Optional[str]]:
+    """The image a B64FieldDecoder pulled out of a :generateContent response."""
+    try:
+        skeleton, image_bytes_out = decoder.result()
+    except (ValueError, binascii.Error) as exc:
+        raise GeminiError(f"Malformed response: {exc}") from exc
     if not image_bytes_out:
         raise GeminiError("No image data returned. Check model or prompt.")
+    return image_bytes_out, _inline_mime(skeleton)
+
+
+def _image_decoder() -> b64stream.B64FieldDecoder:
+    return b64stream.B64FieldDecoder(("data",))
+
 
-    return image_bytes_out, mime_type
+def _post_streaming(url: str, payload: dict, timeout: float) -> Tuple[bytes, Optional[str]]:
+    """POST payload and decode inlineData.data straight off the socket."""
+    try:
+        response = http_pool.post(url, data=b64stream.JSONBody(payload), headers=JSON_HEADERS,
+                                  timeout=timeout, stream=True)
+    except requests.RequestException as exc:
+        raise GeminiError(str(exc)) from exc
+    with response:
+        _check_status(response)
+        decoder = _image_decoder()
+        try:
+            for chunk in response.iter_content(b64stream.CHUNK):
+                decoder.feed(chunk)
+        except requests.RequestException as exc:
+            raise GeminiError(str(exc)) from exc
+    return _image_from_decoded(decoder)
+
+
+def generate_image_bytes(
+    prompt: str,
+    api_key: str,
+    model: str = DEFAULT_MODEL,
+    reference_images: Optional[List[Tuple[bytes, Optional[str]]]] = None,
+    text_last: bool = False,
+    fresh: bool = False,
+    variant: int = 0,
+    limiter: Optional[rate_limiter.Limiter] = None,
+    retry: Optional[rate_limiter.RetryPolicy] = None,
+) -> Tuple[bytes, Optional[str]]:
+    """fresh / variant: see core.response_cache (used only when the cache is enabled).
+
+    limiter / retry: run the request through rate_limiter.call_with_retry. Only a
+    cache miss takes a limiter slot; a hit returns without touching it.
+    """
+    url, payload = _generate_request(prompt, api_key, model, reference_images, text_last)
+
+    def send():
+        return _post_streaming(url, payload, GENERATE_TIMEOUT)
+
+    if limiter is not None:
+        return response_cache.through(
+            url, {"json": payload}, lambda: rate_limiter.call_with_retry(send, limiter, retry),
+            fresh=fresh, variant=variant)
+    return response_cache.through(url, {"json": payload}, send, fresh=fresh, variant=variant)
 
 
 def edit_image_bytes(
@@ -114,7 +176,6 @@ def edit_image_bytes(
         raise GeminiError("Missing source image bytes.")
     model_path = normalize_model_name(model)
     mime_type = image_mime or "image/png"
-    image_b64 = base64.b64encode(image_bytes).decode("utf-8")
 
     base_url = _get_api_base_url(api_key)
     url = f"{base_url}/v1beta/{model_path}:generateContent?key={api_key}"
@@ -124,7 +185,8 @@ def edit_image_bytes(
                 "role": "user",
                 "parts": [
                     {"text": prompt},
-                    {"inline_data": {"mime_type": mime_type, "data": image_b64}},
+                    {"inline_data": {"mime_type": mime_type,
+                                     "data": b64stream.Base64Blob(image_bytes)}},
                 ],
             }
         ],
@@ -134,17 +196,4 @@ def edit_image_bytes(
         },
     }
 
-    try:
-        response = requests.post(url, json=payload, timeout=180)
-    except requests.RequestException as exc:
-        raise GeminiError(str(exc)) from exc
-
-    if response.status_code != 200:
-        raise GeminiError(f"HTTP {response.status_code}: {response.text}")
-
-    data = response.json()
-    edited_bytes, out_mime = _extract_image_bytes(data)
-    if not edited_bytes:
-        raise GeminiError("No image data returned. Check model or prompt.")
-
-    return edited_bytes, out_mime
+    return _post_streaming(url, payload, EDIT_TIMEOUT)
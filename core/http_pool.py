@@ -0,0 +1,107 @@
+"""Shared HTTP session for the image providers.
+
+gemini_service and openai_service used to call bare requests.post(), so
+every image (and every one of a batch's concurrent calls) paid for a new
+TCP + TLS handshake. They now go through one process-wide Session:
+
+  - keep-alive connections, pooled per host by urllib3
+  - pool size grows to the batch concurrency (ensure_pool_size), so N
+    parallel requests reuse N warm connections instead of discarding extras
+  - (connect, read) timeouts: connect is global, read defaults per endpoint
+    and can be overridden globally via configure()
+
+The Session is shared across threads. Cookies are never stored (the APIs
+authenticate by key/header), which leaves urllib3's thread-safe pool as the
+only shared mutable state.
+"""
+from __future__ import annotations
+
+import http.cookiejar
+import threading
+from typing import Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 10.0
+
+_LOCK = threading.Lock()
+_SESSION: Optional[requests.Session] = None
+_POOL_SIZE = DEFAULT_POOL_SIZE
+_CONNECT_TIMEOUT = DEFAULT_CONNECT_TIMEOUT
+_READ_TIMEOUT: Optional[float] = None
+
+
+def _mount(session: requests.Session, pool_size: int) -> None:
+    for prefix in ("https://", "http://"):
+        session.mount(prefix, HTTPAdapter(pool_connections=DEFAULT_POOL_SIZE,
+                                          pool_maxsize=pool_size, max_retries=0))
+
+
+def _new_session(pool_size: int) -> requests.Session:
+    session = requests.Session()
+    session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    _mount(session, pool_size)
+    return session
+
+
+def get_session() -> requests.Session:
+    """The shared Session, created on first use."""
+    global _SESSION
+    with _LOCK:
+        if _SESSION is None:
+            _SESSION = _new_session(_POOL_SIZE)
+        return _SESSION
+
+
+def ensure_pool_size(size: int) -> None:
+    """Grow the per-host pool to at least `size` keep-alive connections.
+
+    Called before a batch fans out. Remounting replaces the adapters, so
+    connections held by the old pools are dropped once their requests end.
+    """
+    global _POOL_SIZE
+    with _LOCK:
+        if size <= _POOL_SIZE:
+            return
+        _POOL_SIZE = size
+        if _SESSION is not None:
+            _mount(_SESSION, size)
+
+
+def configure(connect_timeout: Optional[float] = None,
+              read_timeout: Optional[float] = None) -> None:
+    """Set global timeouts. read_timeout None / 0 = keep each endpoint's default."""
+    global _CONNECT_TIMEOUT, _READ_TIMEOUT
+    with _LOCK:
+        if connect_timeout:
+            _CONNECT_TIMEOUT = float(connect_timeout)
+        _READ_TIMEOUT = float(read_timeout) if read_timeout else None
+
+
+def timeouts(read: float) -> Tuple[float, float]:
+    """(connect, read) tuple for requests; `read` is the endpoint's default."""
+    return _CONNECT_TIMEOUT, _READ_TIMEOUT or read
+
+
+def post(url: str, *, timeout: Union[float, Tuple[float, float]], **kwargs) -> requests.Response:
+    if not isinstance(timeout, tuple):
+        timeout = timeouts(timeout)
+    return get_session().post(url, timeout=timeout, **kwargs)
+
+
+def get(url: str, *, timeout: Union[float, Tuple[float, float]], **kwargs) -> requests.Response:
+    if not isinstance(timeout, tuple):
+        timeout = timeouts(timeout)
+    return get_session().get(url, timeout=timeout, **kwargs)
+
+
+def close() -> None:
+    """Drop the shared Session and its connections (tests / shutdown)."""
+    global _SESSION, _POOL_SIZE
+    with _LOCK:
+        if _SESSION is not None:
+            _SESSION.close()
+        _SESSION = None
+        _POOL_SIZE = DEFAULT_POOL_SIZE
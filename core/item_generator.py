@@ -1,6 +1,12 @@
+import codecs
 import csv
+import glob
+import json
 import os
-from typing import List, Tuple, Dict
+import tempfile
+import threading
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple, Dict
 from . import translation_service as ts
 from paths import resource_path
 
@@ -8,50 +14,82 @@ from paths import resource_path
 GRID_SIZE = 8
 TOTAL_ITEMS = GRID_SIZE * GRID_SIZE
 DEFAULT_CSV_PATH = resource_path("iconcsv", "item_test.csv")
+# Sidecar next to the CSV: which CSV rows went into which sheet (see IconSheetPlan)
+SHEET_INDEX_SUFFIX = ".sheets.json"
+# Append-only journal of cached translations next to the CSV (see append_csv_cache)
+CACHE_JOURNAL_SUFFIX = ".cache.jsonl"
+# Fold the journal into the CSV once it grows past this many bytes
+JOURNAL_COMPACT_BYTES = 64 * 1024
+CACHE_COLUMNS = ('prompt_en', 'file_en')
+COMPACT_LOCK_STALE_S = 60.0
 
-def read_items_from_csv(filepath: str) -> List[dict]:
+def _detect_encoding(filepath: str) -> str:
+    """utf-8-sig if the whole file decodes as UTF-8, else gbk. Checked in 64 KB steps."""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    try:
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(65536), b''):
+                decoder.decode(block)
+            decoder.decode(b'', final=True)
+        return 'utf-8-sig'
+    except UnicodeDecodeError:
+        return 'gbk'
+
+def iter_items_from_csv(filepath: str, encoding: str = None,
+                        journal: Dict[int, dict] = None) -> Iterator[dict]:
+    """
+    Streams items from CSV, one row at a time (no item limit).
+    Each item also carries 'row': its 0-based row number in the file, used
+    to write translations back to the right line and to map sheet cells to rows.
+    Translations still waiting in the cache journal are applied on the fly.
+    param encoding / journal: already detected / read by the caller (re-reads
+                              of the same file); looked up when None.
+    """
+    if not os.path.exists(filepath):
+        return
+    if journal is None:
+        journal = _read_journal(filepath)
+    if encoding is None:
+        encoding = _detect_encoding(filepath)
+    with open(filepath, 'r', encoding=encoding, newline='') as f:
+        for row_no, row in enumerate(csv.reader(f)):
+            item = _row_to_item(row)
+            if item is not None:
+                item['row'] = row_no
+                _apply_cached(item, journal.get(row_no))
+                yield item
+
+def read_items_from_csv(filepath: str, limit: Optional[int] = TOTAL_ITEMS) -> List[dict]:
     """
     Reads items from CSV. 
     Format: Name, Description, [Prompt_Name_EN], [Filename_EN]
-    Returns list of dicts: {'name': str, 'desc': str, 'prompt_en': str, 'file_en': str}
+    Returns list of dicts: {'name': str, 'desc': str, 'prompt_en': str, 'file_en': str, 'row': int}
+    param limit: Stop after this many items (one 8x8 sheet by default); None reads all.
+                 For catalogs larger than one sheet use IconSheetPlan.
     """
     items = []
-    
-    if not os.path.exists(filepath):
-        return items
-
     try:
-        # Try utf-8-sig first to handle BOM
-        encoding = 'utf-8-sig'
-        try:
-             with open(filepath, 'r', encoding=encoding) as f:
-                reader = csv.reader(f)
-                return _parse_csv_to_dict(reader)
-        except UnicodeDecodeError:
-            encoding = 'gbk'
-            with open(filepath, 'r', encoding=encoding) as f:
-                reader = csv.reader(f)
-                return _parse_csv_to_dict(reader)
+        for item in iter_items_from_csv(filepath):
+            if limit is not None and len(items) >= limit:
+                print(f"CSV has more than {limit} items; only the first sheet is used "
+                      f"(see IconSheetPlan for multi-sheet catalogs)")
+                break
+            items.append(item)
     except Exception as e:
         print(f"Error reading CSV: {e}")
         return []
-
-def _parse_csv_to_dict(reader) -> List[dict]:
-    items = []
-    for row in reader:
-        if len(row) >= 2 and row[0].strip():
-            item = {
-                'name': row[0].strip(),
-                'desc': row[1].strip(),
-                'prompt_en': row[2].strip() if len(row) > 2 else "",
-                'file_en': row[3].strip() if len(row) > 3 else ""
-            }
-            items.append(item)
-        
-        if len(items) >= TOTAL_ITEMS:
-            break
     return items
 
+def _row_to_item(row) -> Optional[dict]:
+    if len(row) >= 2 and row[0].strip():
+        return {
+            'name': row[0].strip(),
+            'desc': row[1].strip(),
+            'prompt_en': row[2].strip() if len(row) > 2 else "",
+            'file_en': row[3].strip() if len(row) > 3 else ""
+        }
+    return None
+
 def save_items_to_csv(filepath: str, items: List[dict]):
     """
     Writes items back to CSV, preserving 4 columns.
@@ -61,21 +99,209 @@ def save_items_to_csv(filepath: str, items: List[dict]):
         with open(filepath, 'w', encoding='utf-8-sig', newline='') as f:
             writer = csv.writer(f)
             for item in items:
-                writer.writerow([
-                    item.get('name', ''),
-                    item.get('desc', ''),
-                    item.get('prompt_en', ''),
-                    item.get('file_en', '')
-                ])
+                writer.writerow(_item_row(item))
+        print(f"Successfully saved cache to {filepath}")
+        return True
+    except Exception as e:
+        print(f"Error saving CSV: {e}")
+        return False
+
+def _item_row(item: dict) -> List[str]:
+    return [item.get('name', ''), item.get('desc', ''),
+            item.get('prompt_en', ''), item.get('file_en', '')]
+
+def _apply_cached(item: dict, cached: Optional[dict]) -> bool:
+    """Copies non-empty cache columns onto item if cached belongs to the same name."""
+    if not cached or cached.get('name') != item['name']:
+        return False
+    changed = False
+    for col in CACHE_COLUMNS:
+        value = cached.get(col)
+        if value and value != item.get(col):
+            item[col] = value
+            changed = True
+    return changed
+
+def update_csv_rows(filepath: str, items: Iterable[dict]) -> bool:
+    """
+    Writes the cache columns (prompt_en, file_en) back for the given items,
+    matched by 'row' and name, leaving every other line of the CSV untouched.
+    Streams the file through a temp copy, so a catalog larger than what was
+    loaded is never truncated.
+    """
+    updates = {item['row']: item for item in items if 'row' in item}
+    if not updates:
+        return True
+    tmp = None
+    try:
+        encoding = _detect_encoding(filepath)
+        fd, tmp = tempfile.mkstemp(prefix=os.path.basename(filepath) + ".",
+                                   suffix=".tmp", dir=os.path.dirname(os.path.abspath(filepath)))
+        with open(filepath, 'r', encoding=encoding, newline='') as src, \
+             open(fd, 'w', encoding='utf-8-sig', newline='') as dst:
+            writer = csv.writer(dst)
+            for row_no, row in enumerate(csv.reader(src)):
+                item = _row_to_item(row)
+                if item is not None and _apply_cached(item, updates.get(row_no)):
+                    row = _item_row(item) + row[4:]
+                writer.writerow(row)
+        os.replace(tmp, filepath)
         print(f"Successfully saved cache to {filepath}")
         return True
     except Exception as e:
         print(f"Error saving CSV: {e}")
+        if tmp:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
         return False
 
+# --- Translation cache journal ---
+#
+# Cached translations are appended to <csv>.cache.jsonl, one JSON object per
+# line ({"row", "name", "prompt_en", "file_en"}), instead of rewriting the CSV
+# on every run. Each append is a single O_APPEND write, so concurrent tool runs
+# don't overwrite each other's entries. Readers overlay the journal (last entry
+# per row wins); an entry whose name no longer matches its row is ignored.
+# Once the journal passes JOURNAL_COMPACT_BYTES it is folded into the CSV in
+# one streaming pass (compact_csv_cache).
+
+_compact_lock = threading.Lock()
+
+def cache_journal_path(csv_path: str) -> str:
+    return csv_path + CACHE_JOURNAL_SUFFIX
+
+def _journal_files(csv_path: str) -> List[str]:
+    # journals claimed by an unfinished compaction come first; the live one wins
+    journal = cache_journal_path(csv_path)
+    claimed = sorted(glob.glob(glob.escape(journal) + ".*.compacting"))
+    return claimed + [journal]
+
+def _read_journal_file(path: str, entries: Dict[int, dict]) -> None:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    row = int(entry['row'])
+                except (ValueError, KeyError, TypeError):
+                    continue   # torn / foreign line
+                merged = entries.get(row)
+                if merged is None or merged.get('name') != entry.get('name'):
+                    entries[row] = entry
+                else:
+                    merged.update((col, entry[col]) for col in CACHE_COLUMNS if entry.get(col))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Error reading translation cache journal: {e}")
+
+def _read_journal(csv_path: str) -> Dict[int, dict]:
+    """{row: {'name', 'prompt_en', 'file_en'}} from every journal of csv_path."""
+    entries: Dict[int, dict] = {}
+    for path in _journal_files(csv_path):
+        _read_journal_file(path, entries)
+    return entries
+
+def _append_lines(path: str, data: bytes) -> None:
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+def append_csv_cache(filepath: str, items: Iterable[dict], compact: bool = True) -> bool:
+    """
+    Records the cache columns of items (which must carry 'row') in the CSV's
+    journal. Compacts into the CSV when the journal has grown large.
+    Returns False if the journal could not be written.
+    """
+    lines = []
+    for item in items:
+        if 'row' not in item:
+            continue
+        entry = {'row': item['row'], 'name': item['name']}
+        entry.update((col, item.get(col, '')) for col in CACHE_COLUMNS)
+        lines.append(json.dumps(entry, ensure_ascii=False) + "\n")
+    if not lines:
+        return True
+    journal = cache_journal_path(filepath)
+    try:
+        _append_lines(journal, "".join(lines).encode('utf-8'))
+    except OSError as e:
+        print(f"Error saving translation cache: {e}")
+        return False
+    print(f"Cached {len(lines)} translations in {journal}")
+    if compact:
+        try:
+            large = os.path.getsize(journal) >= JOURNAL_COMPACT_BYTES
+        except OSError:
+            large = False
+        if large:
+            compact_csv_cache(filepath)
+    return True
+
+def _acquire_compact_lock(lock_path: str) -> bool:
+    """Cross-process compaction lock (O_EXCL lock file); a stale one is taken over."""
+    for _ in range(2):
+        try:
+            os.close(os.open(lock_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) < COMPACT_LOCK_STALE_S:
+                    return False
+                os.remove(lock_path)
+            except OSError:
+                return False
+        except OSError:
+            return False
+    return False
+
+def compact_csv_cache(filepath: str) -> bool:
+    """
+    Folds the journal into the CSV (one streaming rewrite) and removes it.
+    The journal is first renamed aside, so entries appended meanwhile land in
+    a fresh journal. If the CSV can't be written (e.g. open in Excel), the
+    renamed journal stays where readers still see it and is retried by the
+    next compaction. Returns False if nothing was folded in.
+    """
+    journal = cache_journal_path(filepath)
+    lock_path = journal + ".lock"
+    with _compact_lock:
+        if not _acquire_compact_lock(lock_path):
+            return False
+        try:
+            if os.path.exists(journal):
+                try:
+                    os.replace(journal, f"{journal}.{time.time_ns()}.{os.getpid()}.compacting")
+                except OSError as e:
+                    print(f"Translation cache compaction skipped: {e}")
+            claimed = _journal_files(filepath)[:-1]
+            if not claimed:
+                return True
+            entries: Dict[int, dict] = {}
+            for path in claimed:
+                _read_journal_file(path, entries)
+            if not update_csv_rows(filepath, [dict(entry, row=row) for row, entry in entries.items()]):
+                return False
+            for path in claimed:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f"Error removing translation cache journal: {e}")
+            return True
+        finally:
+            try:
+                os.remove(lock_path)
+            except OSError:
+                pass
+
 def generate_icon_grid_prompt(items: List[dict], translate: bool = False, cache_path: str = None) -> str:
     """
     Generates a prompt for a 8x8 sprite sheet.
+    For catalogs larger than one sheet use IconSheetPlan.
     param items: List of dicts (from read_items_from_csv)
     param translate: If True, ensures English names are available (uses cache or translates).
     param cache_path: If provided and translation happened, saves back to this path.
@@ -84,8 +310,6 @@ def generate_icon_grid_prompt(items: List[dict], translate: bool = False, cache_
     if not items:
         return "Error: No valid items found in the CSV file."
 
-    count = len(items)
-    
     # Process Translations
     if translate:
         tm = ts.TranslationManager()
@@ -115,9 +339,12 @@ def generate_icon_grid_prompt(items: List[dict], translate: bool = False, cache_
                 items[idx]['prompt_en'] = t_name
                 changed = True
             
-            # Save if cache enabled
+            # Save if cache enabled (journaled; the CSV may hold more sheets)
             if changed and cache_path:
-                save_items_to_csv(cache_path, items)
+                if all('row' in item for item in items):
+                    append_csv_cache(cache_path, [items[idx] for idx in missing_indices])
+                else:
+                    save_items_to_csv(cache_path, items)
                 
         # Access descriptions (we don't cache desc translation based on user request "Prompt Name" & "Filename")
         # But for Prompt Gen we need translated Descriptions too usually.
@@ -142,19 +369,26 @@ def generate_icon_grid_prompt(items: List[dict], translate: bool = False, cache_
         # No translate, just use original
         display_items = [(item['name'], item['desc']) for item in items]
     
+    return _grid_prompt(display_items, GRID_SIZE)
+
+def _grid_prompt(display_items: List[Tuple[str, str]], grid_size: int) -> str:
+    """The sheet prompt for (name, desc) pairs laid out row-major in a grid_size x grid_size grid."""
+    count = len(display_items)
+    total = grid_size * grid_size
+
     # --- Prompt Construction ---
     
-    header = f"""`A strictly organized technical sprite sheet in a {GRID_SIZE}x{GRID_SIZE} grid layout containing {count} distinct RPG item icons.
+    header = f"""`A strictly organized technical sprite sheet in a {grid_size}x{grid_size} grid layout containing {count} distinct RPG item icons.
 
 **LAYOUT & FORMAT CRITERIA (CRITICAL):**
 1. **ASPECT RATIO is strictly 1:1 (Square Canvas).**
-2. The canvas must be a precise {GRID_SIZE}x{GRID_SIZE} grid.
+2. The canvas must be a precise {grid_size}x{grid_size} grid.
 3. Each cell in the grid must contain EXACTLY ONE item icon.
 4. **ALIGNMENT**: Each icon must be **PERFECTLY CENTERED** within its grid cell with generous, equal whitespace padding on all sides.
 5. **SCALE**: All icons must share a **UNIFORM VISUAL SIZE** and weight. Do not allow some items to be significantly larger or smaller than others.
 6. **PERSPECTIVE**: All icons must be presented in a **UNIFORM ISOMETRIC VIEW** (approx 45 degrees).
 7. **BACKGROUND MUST BE PURE WHITE (#FFFFFF).**
-8. Total items: {count}. If fewer than {TOTAL_ITEMS}, leave remaining cells empty.
+8. Total items: {count}. If fewer than {total}, leave remaining cells empty.
 9. **NEGATIVE CONSTRAINT**: **ABSOLUTELY NO TEXT. NO CHARACTERS. NO NUMBERS. NO LABELS. NO UI ELEMENTS.** The icons must be purely visual representation only.
 
 **GRID CONTENTS:**
@@ -162,8 +396,8 @@ def generate_icon_grid_prompt(items: List[dict], translate: bool = False, cache_
     
     content = ""
     for i, (name, desc) in enumerate(display_items):
-        row = (i // GRID_SIZE) + 1
-        col = (i % GRID_SIZE) + 1
+        row = (i // grid_size) + 1
+        col = (i % grid_size) + 1
         content += f"Row {row}, Col {col}: **{name}** - {desc}\n"
 
     footer = """
@@ -176,3 +410,232 @@ def generate_icon_grid_prompt(items: List[dict], translate: bool = False, cache_
 
     return header + content + footer
 
+
+
+# --- Multi-sheet catalogs ---
+
+def page_items(items: List[dict], per_sheet: int = TOTAL_ITEMS) -> List[List[dict]]:
+    """Splits items into consecutive sheets of at most per_sheet items."""
+    per_sheet = max(1, per_sheet)
+    return [items[i:i + per_sheet] for i in range(0, len(items), per_sheet)]
+
+def sheet_index_path(csv_path: str) -> str:
+    return csv_path + SHEET_INDEX_SUFFIX
+
+def load_sheet_index(csv_path: str) -> Optional[dict]:
+    """
+    The sidecar written by IconSheetPlan.save_index():
+    {'grid_size': int, 'sheets': [[csv_row, ...], ...]}, or None if missing/unreadable.
+    """
+    try:
+        with open(sheet_index_path(csv_path), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if isinstance(index.get('sheets'), list) and int(index.get('grid_size', 0)) > 0:
+            return index
+    except (OSError, ValueError, TypeError, AttributeError):
+        pass
+    return None
+
+def sheet_items(csv_path: str, sheet: int, per_sheet: int = TOTAL_ITEMS) -> List[dict]:
+    """
+    Items of one sheet, in cell order. Uses the saved sheet index when there is one
+    (so cells map to the same CSV rows the prompt was built from), else pages the CSV.
+    """
+    return items_by_sheet(csv_path, [sheet], per_sheet).get(sheet, [])
+
+def items_by_sheet(csv_path: str, sheets: Iterable[int],
+                   per_sheet: int = TOTAL_ITEMS) -> Dict[int, List[dict]]:
+    """
+    sheet_items() for several sheets in one pass over the CSV, stopping after
+    the last row needed. A sheet that doesn't exist maps to [].
+    """
+    index = load_sheet_index(csv_path)
+    # cell keys: CSV rows with a saved index, item numbers without one
+    if index is not None:
+        cells = {s: index['sheets'][s] if 0 <= s < len(index['sheets']) else [] for s in sheets}
+    else:
+        cells = {s: range(s * per_sheet, (s + 1) * per_sheet) if s >= 0 else [] for s in sheets}
+    wanted = {key for keys in cells.values() for key in keys}
+    found: Dict[int, dict] = {}
+    if wanted:
+        last = max(wanted)
+        for i, item in enumerate(iter_items_from_csv(csv_path)):
+            key = item['row'] if index is not None else i
+            if key in wanted:
+                found[key] = item
+            if key >= last:
+                break
+    return {s: [found[key] for key in keys if key in found] for s, keys in cells.items()}
+
+class IconSheetPlan:
+    """
+    A CSV catalog of any size laid out as consecutive grid_size x grid_size sheets.
+
+    from_csv() streams the CSV once and keeps only the CSV row of every cell;
+    a sheet's items are read when that sheet is first needed, from one
+    forward-only reader (encoding and journal are looked up once per plan), so
+    visiting the sheets in order reads the file one more time in total.
+    iter_prompts(translate=True) translates every sheet in bulk up front (one
+    translate_list for missing names, one for descriptions) and write_back()
+    journals the result in one append. prompt(sheet, translate=True) on its own
+    translates only that sheet (the single-sheet UI path). row_index() maps
+    every sheet cell back to its CSV row, and save_index() stores that mapping
+    next to the CSV for the slicer (see sheet_items()).
+    """
+
+    def __init__(self, items: List[dict], grid_size: int = GRID_SIZE, csv_path: str = None):
+        self.grid_size = max(1, int(grid_size))
+        self.per_sheet = self.grid_size * self.grid_size
+        self.csv_path = csv_path
+        self._rows = page_items([item.get('row', -1) for item in items], self.per_sheet)
+        self._loaded: Dict[int, List[dict]] = dict(enumerate(page_items(items, self.per_sheet)))
+        self._descs: Dict[int, List[str]] = {}   # sheet -> translated descriptions, parallel to its items
+        self._dirty: List[dict] = []             # items whose prompt_en was filled in
+        self._encoding: Optional[str] = None
+        self._journal: Optional[Dict[int, dict]] = None
+        self._reader: Optional[Iterator[dict]] = None   # see _load
+        self._pos = -1                                   # last CSV row the reader has passed
+
+    @classmethod
+    def from_csv(cls, csv_path: str, grid_size: int = GRID_SIZE) -> "IconSheetPlan":
+        plan = cls([], grid_size, csv_path)
+        try:
+            if os.path.exists(csv_path):
+                plan._encoding = _detect_encoding(csv_path)
+                plan._journal = _read_journal(csv_path)
+            rows = [item['row'] for item in plan._stream()]
+        except Exception as e:
+            print(f"Error reading CSV: {e}")
+            rows = []
+        plan._rows = page_items(rows, plan.per_sheet)
+        return plan
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def sheets(self) -> List[List[dict]]:
+        """Items of every sheet (reads the whole catalog; prefer sheet_items(sheet))."""
+        self._load(range(len(self)))
+        return [self._loaded[sheet] for sheet in range(len(self))]
+
+    @property
+    def items(self) -> List[dict]:
+        return [item for sheet in self.sheets for item in sheet]
+
+    def sheet_items(self, sheet: int) -> List[dict]:
+        """Items of one sheet (0-based), in cell order; [] for a sheet out of range."""
+        if not 0 <= sheet < len(self):
+            return []
+        self._load([sheet])
+        return self._loaded[sheet]
+
+    def _stream(self) -> Iterator[dict]:
+        return iter_items_from_csv(self.csv_path, self._encoding, self._journal)
+
+    def _close_reader(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+        self._reader, self._pos = None, -1
+
+    def _load(self, sheets: Iterable[int]) -> None:
+        """
+        Reads the items of the given sheets, stopping after their last row.
+        The reader carries on from where the previous load stopped and only
+        starts over when a sheet before that point is asked for.
+        """
+        wanted = {row: sheet for sheet in sheets if sheet not in self._loaded
+                  for row in self._rows[sheet]}
+        if not wanted:
+            return
+        if self._reader is None or min(wanted) <= self._pos:
+            self._close_reader()
+            self._reader = self._stream()
+        by_row = {}
+        last = max(wanted)
+        try:
+            for item in self._reader:
+                self._pos = item['row']
+                if self._pos in wanted:
+                    by_row[self._pos] = item
+                if self._pos >= last:
+                    break
+        except Exception as e:
+            print(f"Error reading CSV: {e}")
+            self._close_reader()
+        for sheet in set(wanted.values()):
+            self._loaded[sheet] = [by_row[r] for r in self._rows[sheet] if r in by_row]
+        if self._pos >= self._rows[-1][-1]:
+            self._close_reader()   # past the last sheet: release the file
+
+    def row_index(self) -> List[List[int]]:
+        """CSV row of every cell, per sheet: row_index()[sheet][cell]."""
+        return [list(rows) for rows in self._rows]
+
+    def translate(self, tm=None, sheets: Iterable[int] = None) -> None:
+        """
+        Fills prompt_en and translates descriptions for the given sheets (default: all).
+        Sheets already translated are skipped; the rest share one translate_list
+        for missing names and one for descriptions.
+        """
+        todo = [s for s in (range(len(self)) if sheets is None else sheets)
+                if 0 <= s < len(self) and s not in self._descs]
+        if not todo:
+            return
+        self._load(todo)
+        items = [item for s in todo for item in self._loaded[s]]
+        tm = tm or ts.TranslationManager()
+        missing = [item for item in items if not item.get('prompt_en')]
+        if missing:
+            print(f"Translating {len(missing)} missing names...")
+            for item, t_name in zip(missing, tm.translate_list([item['name'] for item in missing])):
+                item['prompt_en'] = t_name
+            self._dirty.extend(missing)
+        print("Translating descriptions (not cached)...")
+        descs = tm.translate_list([item['desc'] for item in items])
+        start = 0
+        for s in todo:
+            end = start + len(self._loaded[s])
+            self._descs[s] = descs[start:end]
+            start = end
+
+    def prompt(self, sheet: int, translate: bool = False) -> str:
+        """The prompt for one sheet (0-based). translate=True translates only this sheet."""
+        items = self.sheet_items(sheet)
+        if not items:
+            return "Error: No valid items found in the CSV file."
+        if translate:
+            self.translate(sheets=[sheet])
+            display_items = [(item['prompt_en'] or item['name'], desc)
+                             for item, desc in zip(items, self._descs[sheet])]
+        else:
+            display_items = [(item['name'], item['desc']) for item in items]
+        return _grid_prompt(display_items, self.grid_size)
+
+    def iter_prompts(self, translate: bool = False) -> Iterator[Tuple[int, str]]:
+        """(sheet, prompt) for every sheet, built on demand; translate=True translates all sheets in bulk first."""
+        if translate:
+            self.translate()
+        for sheet in range(len(self)):
+            yield sheet, self.prompt(sheet, translate)
+
+    def save_index(self) -> bool:
+        if not self.csv_path:
+            return False
+        try:
+            with open(sheet_index_path(self.csv_path), 'w', encoding='utf-8') as f:
+                json.dump({'grid_size': self.grid_size, 'sheets': self.row_index()}, f)
+            return True
+        except OSError as e:
+            print(f"Error saving sheet index: {e}")
+            return False
+
+    def write_back(self) -> bool:
+        """Journals the translations made so far (only the sheets translated) and saves the sheet index."""
+        ok = True
+        if self._dirty and self.csv_path:
+            self._close_reader()   # the append may compact (replace) the CSV
+            ok = append_csv_cache(self.csv_path, self._dirty)
+            if ok:
+                self._dirty = []
+        return self.save_index() and ok
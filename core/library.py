@@ -12,24 +12,45 @@ Schema (assets 表):
     image_path      TEXT  (绝对或相对路径；条目可指向已被删除的文件，library 不强制存在性)
     thumbnail_path  TEXT  (可空：未来缩略图缓存)
     rating          INTEGER (0-5，0 表示未评级)
-    tags            TEXT  (逗号分隔)
+    tags            TEXT  (逗号分隔；展示 / 全文索引用的冗余副本，查询走 asset_tags)
     source_batch_id TEXT  (并发出图 / 切片产物的同批 UUID，可空)
     notes           TEXT  (用户备注)
 
+全文索引 (assets_fts，FTS5 external content 表，content='assets'):
+    prompt / notes / tags 三列，unicode61 分词 + 2/3 字前缀索引；
+    assets 上的 INSERT / DELETE / UPDATE 触发器保持同步。
+    旧库在 _open 时按 PRAGMA user_version 迁移（建表 + 触发器 + 'rebuild' 一次性回填）。
+
+标签 (asset_tags / tag_counts，均 NOCASE，与旧 LIKE 过滤一样不分 ASCII 大小写):
+    asset_tags(tag, asset_id) 主键 + asset_id 索引；add_entry / update_tags 在同一个
+    事务里写 assets.tags 和 asset_tags。tag_counts(tag, n) 由 asset_tags 上的触发器
+    增量维护（删 assets 行时触发器连带删掉它的标签）。旧库迁移时拆 tags 列回填。
+
 设计要点：
-- add_entry 是 fire-and-forget：插入失败只 log warning，不向上抛异常打断主流程
-- list_entries 默认按 created_at DESC，支持 generator_type / rating>= / tag / 关键字过滤
-- 模块级 _conn() 懒加载，多线程安全（sqlite3 默认 check_same_thread=True；这里用
-  check_same_thread=False + 串行化的 _LOCK 保证写入安全）
+- add_entry 是 fire-and-forget：插入失败只 log warning，不向上抛异常打断主流程。
+  add_entries 一个事务批量写；queue_entry 交给后台写线程，同一 FLUSH_WINDOW_S 窗口里的
+  条目合并成一次提交，进程退出时（atexit）flush 掉剩下的
+- list_entries 默认按 created_at DESC，支持 generator_type / rating>= / tag(s) 的 AND / OR / 关键字过滤；
+  关键字走 FTS5 MATCH（短语 + 末词前缀，等价于旧的 LIKE 子串匹配在词边界上的版本），
+  order="relevance" 时按 bm25 排序。关键字含 CJK 字符（unicode61 不切中文词）或
+  SQLite 没编译 FTS5 时退回 LIKE 全表扫描
+- WAL 日志 + 读写分离：写入只走一条懒加载的写连接（_open()，check_same_thread=False，
+  由 _LOCK 串行化）；list_entries / get_entry / count / tag_counts 走 _reader() 的
+  每线程只读连接，不拿 _LOCK。WAL 下读者看的是开始读时已提交的快照，
+  出图 / 切片线程提交 add_entry 时 UI 的刷新不用排队等写锁
 """
 from __future__ import annotations
 
+import atexit
 import json
+import queue
+import re
 import sqlite3
 import threading
+import time
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from .logging_setup import get_logger
 
@@ -37,6 +58,11 @@ _log = get_logger(__name__)
 _LOCK = threading.RLock()
 _CONN: Optional[sqlite3.Connection] = None
 _DB_PATH: Optional[str] = None
+_GEN = 0                      # 写连接每重开一次 +1；读连接按它判断是否过期
+_LOCAL = threading.local()    # 每线程的读连接：conn / gen / path
+_READERS: Dict[threading.Thread, sqlite3.Connection] = {}
+_READERS_LOCK = threading.Lock()
+_BUSY_TIMEOUT_MS = 5000
 
 
 _SCHEMA = """
@@ -55,10 +81,77 @@ CREATE TABLE IF NOT EXISTS assets (
 );
 CREATE INDEX IF NOT EXISTS idx_assets_created_at ON assets(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_assets_generator_type ON assets(generator_type);
+CREATE INDEX IF NOT EXISTS idx_assets_type_created ON assets(generator_type, created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_assets_rating ON assets(rating);
 CREATE INDEX IF NOT EXISTS idx_assets_batch ON assets(source_batch_id);
 """
 
+SCHEMA_VERSION = 2
+
+# user_version 0 -> 1：全文索引
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS assets_fts USING fts5(
+    prompt, notes, tags,
+    content='assets', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS assets_fts_ai AFTER INSERT ON assets BEGIN
+    INSERT INTO assets_fts(rowid, prompt, notes, tags)
+    VALUES (new.id, new.prompt, new.notes, new.tags);
+END;
+CREATE TRIGGER IF NOT EXISTS assets_fts_ad AFTER DELETE ON assets BEGIN
+    INSERT INTO assets_fts(assets_fts, rowid, prompt, notes, tags)
+    VALUES ('delete', old.id, old.prompt, old.notes, old.tags);
+END;
+CREATE TRIGGER IF NOT EXISTS assets_fts_au AFTER UPDATE OF prompt, notes, tags ON assets BEGIN
+    INSERT INTO assets_fts(assets_fts, rowid, prompt, notes, tags)
+    VALUES ('delete', old.id, old.prompt, old.notes, old.tags);
+    INSERT INTO assets_fts(rowid, prompt, notes, tags)
+    VALUES (new.id, new.prompt, new.notes, new.tags);
+END;
+"""
+
+# user_version 1 -> 2：规范化标签
+_TAGS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS asset_tags (
+    tag      TEXT    NOT NULL COLLATE NOCASE,
+    asset_id INTEGER NOT NULL,
+    PRIMARY KEY (tag, asset_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_asset_tags_asset ON asset_tags(asset_id);
+CREATE TABLE IF NOT EXISTS tag_counts (
+    tag TEXT    NOT NULL COLLATE NOCASE PRIMARY KEY,
+    n   INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS asset_tags_ai AFTER INSERT ON asset_tags BEGIN
+    INSERT INTO tag_counts(tag, n) VALUES (new.tag, 1)
+    ON CONFLICT(tag) DO UPDATE SET n = n + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS asset_tags_ad AFTER DELETE ON asset_tags BEGIN
+    UPDATE tag_counts SET n = n - 1 WHERE tag = old.tag;
+    DELETE FROM tag_counts WHERE tag = old.tag AND n <= 0;
+END;
+CREATE TRIGGER IF NOT EXISTS assets_tags_ad AFTER DELETE ON assets BEGIN
+    DELETE FROM asset_tags WHERE asset_id = old.id;
+END;
+"""
+
+# bm25 列权重：prompt / notes / tags（用户写的备注和标签比长 prompt 里的词更有指向性）
+_BM25_WEIGHTS = (1.0, 4.0, 8.0)
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+_FTS: Dict[str, bool] = {}   # db_path -> FTS5 可用
+# 轻量投影里 prompt / notes 的预览长度（列表视图只显示 80 个字符）
+PREVIEW_CHARS = 200
+_LIGHT_COLUMNS = (
+    "assets.id, assets.created_at, assets.generator_type, assets.image_path, "
+    "assets.thumbnail_path, assets.rating, assets.tags, assets.source_batch_id, "
+    f"substr(assets.prompt, 1, {PREVIEW_CHARS}) AS prompt, "
+    f"substr(assets.notes, 1, {PREVIEW_CHARS}) AS notes"
+)
+# OR 标签查询：命中总数不超过 limit 的这么多倍时先物化 asset_id 集合，否则逐行点查
+_ANY_TAG_MATERIALIZE = 20
+
 
 @dataclass
 class AssetEntry:
@@ -73,11 +166,20 @@ class AssetEntry:
     tags: List[str] = field(default_factory=list)
     source_batch_id: Optional[str] = None
     notes: str = ""
+    # list_entries(light=True) 的轻量投影：params 未加载，prompt / notes 只有前
+    # PREVIEW_CHARS 个字符。打开条目时用 get_entry(id) 取完整内容
+    partial: bool = field(default=False, compare=False)
+
+    @property
+    def cursor(self) -> Tuple[str, int]:
+        """作为 list_entries(after=...) 的翻页游标：下一页从这条之后开始。"""
+        return (self.created_at, self.id)
 
     @classmethod
     def from_row(cls, row: sqlite3.Row) -> "AssetEntry":
+        partial = "params_json" not in row.keys()
         try:
-            params = json.loads(row["params_json"]) if row["params_json"] else {}
+            params = json.loads(row["params_json"]) if not partial and row["params_json"] else {}
         except (json.JSONDecodeError, TypeError):
             params = {}
         tags_raw = row["tags"] or ""
@@ -94,6 +196,7 @@ class AssetEntry:
             tags=tags,
             source_batch_id=row["source_batch_id"],
             notes=row["notes"] or "",
+            partial=partial,
         )
 
 
@@ -102,52 +205,166 @@ def _resolve_db_path() -> str:
     return user_data_path("library.db")
 
 
+def _connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, check_same_thread=False,
+                           timeout=_BUSY_TIMEOUT_MS / 1000)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
 def _open(db_path: Optional[str] = None) -> sqlite3.Connection:
-    """初始化连接 + schema。db_path 显式传入会切换 / 重开。
+    """初始化写连接 + schema。db_path 显式传入会切换 / 重开。调用方须持有 _LOCK。
 
     无参数调用 = 使用当前已配置的 path（测试通过 configure 切换后会保留），
     若从未配置则用 paths.user_data_path('library.db')。
     """
-    global _CONN, _DB_PATH
+    global _CONN, _DB_PATH, _GEN
     if db_path is None:
         if _CONN is not None and _DB_PATH is not None:
             return _CONN
         db_path = _resolve_db_path()
     if _CONN is not None and _DB_PATH == db_path:
         return _CONN
-    if _CONN is not None:
-        try:
-            _CONN.close()
-        except sqlite3.Error:
-            pass
-    conn = sqlite3.connect(db_path, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
+    _close_all()
+    conn = _connect(db_path)
+    # WAL 是库文件的持久属性；网络盘等不支持时 SQLite 保持原模式，读写照常只是会互等
+    mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+    if mode != "wal":
+        _log.warning("library: WAL unavailable (journal_mode=%s), reads may wait on writes", mode)
+    # WAL 下 NORMAL 只在 checkpoint 时 fsync：断电可能丢最后几次提交，但库不会损坏
+    conn.execute("PRAGMA synchronous=NORMAL")
     conn.executescript(_SCHEMA)
     conn.commit()
+    _FTS[db_path] = _migrate(conn)
     _CONN = conn
     _DB_PATH = db_path
+    _GEN += 1
+    return conn
+
+
+def _reader() -> sqlite3.Connection:
+    """当前线程的只读连接（首次调用时打开）。写连接已打开时不拿 _LOCK，写入进行中也不用等。
+
+    写连接重开（configure / reset_for_test）后旧的读连接已被关掉，按 _GEN 换新的。"""
+    conn = getattr(_LOCAL, "conn", None)
+    if conn is not None and _LOCAL.gen == _GEN:
+        return conn
+    # 先读 _GEN 再读路径：与 configure 交错时拿到的是旧代号，下次调用会再换
+    gen, db_path = _GEN, _DB_PATH
+    if _CONN is None or db_path is None:
+        with _LOCK:
+            _open()   # 保证 schema / 迁移已由写连接完成
+            gen, db_path = _GEN, _DB_PATH
+    conn = _connect(db_path)
+    conn.execute("PRAGMA query_only = ON")
+    with _READERS_LOCK:
+        # 线程池里的线程会退出：顺手关掉已结束线程留下的连接
+        dead = [t for t in _READERS if not t.is_alive()]
+        stale = [_READERS.pop(t) for t in dead]
+        _READERS[threading.current_thread()] = conn
+    for old in stale:
+        try:
+            old.close()
+        except sqlite3.Error:
+            pass
+    _LOCAL.conn, _LOCAL.gen, _LOCAL.path = conn, gen, db_path
     return conn
 
 
+def _close_all() -> None:
+    """关掉写连接和所有线程的读连接（_LOCK 内调用）。"""
+    global _CONN
+    with _READERS_LOCK:
+        readers = list(_READERS.values())
+        _READERS.clear()
+    for conn in readers + ([_CONN] if _CONN is not None else []):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    _CONN = None
+
+
+def _migrate_fts(conn: sqlite3.Connection) -> None:
+    conn.executescript("BEGIN;" + _FTS_SCHEMA)
+    # 旧库：一次性从 assets 回填（新库是空表，rebuild 几乎不花时间）
+    conn.execute("INSERT INTO assets_fts(assets_fts) VALUES ('rebuild')")
+
+
+def _migrate_tags(conn: sqlite3.Connection) -> None:
+    conn.executescript("BEGIN;" + _TAGS_SCHEMA)
+    # INSERT OR IGNORE：重跑时已有的行不再触发计数
+    rows = conn.execute("SELECT id, tags FROM assets WHERE tags <> ''")
+    conn.executemany(
+        "INSERT OR IGNORE INTO asset_tags(tag, asset_id) VALUES (?, ?)",
+        ((t, r[0]) for r in rows for t in _clean_tags(r[1].split(","))))
+
+
+_MIGRATIONS = ((1, _migrate_fts), (2, _migrate_tags))
+
+
+def _migrate(conn: sqlite3.Connection) -> bool:
+    """按 user_version 升级旧库；返回 FTS5 索引是否可用。
+
+    每步一个事务、可重跑。某步失败（如 SQLite 没编译 FTS5）时版本停在它前面，
+    后面的步骤照常执行，换个带 FTS5 的环境打开同一个库会补上；
+    关键字搜索此时退回 LIKE。"""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    reached = version
+    for target, step in _MIGRATIONS:
+        if version >= target:
+            continue
+        try:
+            with conn:
+                step(conn)
+                if reached == target - 1:
+                    conn.execute(f"PRAGMA user_version = {target}")
+                    reached = target
+        except sqlite3.Error as e:
+            _log.warning("library: schema migration %d failed: %s", target, e)
+    if reached < 1:
+        _log.warning("library: full-text index unavailable, keyword search falls back to LIKE")
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'assets_fts'").fetchone() is not None
+
+
+def _clean_tags(tags) -> List[str]:
+    """去空白、去空串、按 NOCASE 去重（保留第一次出现的写法和顺序）。"""
+    seen = set()
+    out = []
+    for raw in tags or []:
+        for t in raw.split(","):   # 逗号是 assets.tags 的分隔符，不能出现在单个标签里
+            t = t.strip()
+            key = t.lower()
+            if t and key not in seen:
+                seen.add(key)
+                out.append(t)
+    return out
+
+
+def _write_tags(conn: sqlite3.Connection, entry_id: int, tags: List[str]) -> None:
+    conn.execute("DELETE FROM asset_tags WHERE asset_id = ?", (entry_id,))
+    conn.executemany("INSERT OR IGNORE INTO asset_tags(tag, asset_id) VALUES (?, ?)",
+                     [(t, entry_id) for t in tags])
+
+
 def configure(db_path: str) -> None:
     """切换到指定 db 路径（测试 / 自定义存储位置用）。
 
-    会重开连接，丢弃任何缓存的 conn。"""
+    会重开连接，丢弃任何缓存的 conn；队列里还没写的条目先写进旧库。"""
+    flush()
     with _LOCK:
         _open(db_path)
 
 
 def reset_for_test() -> None:
     """测试 tearDown 调用，清掉模块级状态以避免连接泄漏到下个 case。"""
-    global _CONN, _DB_PATH
+    global _DB_PATH, _GEN
+    flush()
     with _LOCK:
-        if _CONN is not None:
-            try:
-                _CONN.close()
-            except sqlite3.Error:
-                pass
-        _CONN = None
+        _close_all()
         _DB_PATH = None
+        _GEN += 1
 
 
 def get_db_path() -> str:
@@ -169,36 +386,149 @@ def add_entry(
     tags: Optional[List[str]] = None,
     notes: str = "",
 ) -> Optional[int]:
-    """插入一条记录，返回 rowid。失败时返回 None 并记 warning（不抛）。"""
+    """插入一条记录，返回 rowid。失败时返回 None 并记 warning（不抛）。
+
+    在调用线程上同步提交；不需要 rowid 的调用方用 queue_entry，由后台线程合并提交。"""
+    return add_entries([dict(
+        generator_type=generator_type, params=params, prompt=prompt, image_path=image_path,
+        thumbnail_path=thumbnail_path, source_batch_id=source_batch_id, rating=rating,
+        tags=tags, notes=notes)])[0]
+
+
+def add_entries(entries: Iterable[Dict[str, Any]]) -> List[Optional[int]]:
+    """批量插入，一个事务（一次提交）写完；每条是 add_entry 的关键字参数组成的 dict。
+
+    返回与 entries 同序的 rowid 列表。参数本身有错（params 不能 JSON 序列化、
+    rating 不是整数、缺 generator_type）在写库前就抛 TypeError / ValueError。
+    整批写入失败时（比如某一条违反 NOT NULL）退回逐条各自提交，坏的那条记 warning、
+    得到 None，其余照常入库。"""
+    return _write_rows([_prepare(**e) for e in entries])
+
+
+def _prepare(*, generator_type, params=None, prompt="", image_path="", thumbnail_path=None,
+             source_batch_id=None, rating=0, tags=None, notes="") -> Tuple[tuple, List[str]]:
+    """把 add_entry 的参数转成 INSERT 的列值（created_at 除外）和清洗后的标签。"""
+    tags = _clean_tags(tags)
+    values = (generator_type, json.dumps(params or {}, ensure_ascii=False), prompt,
+              image_path, thumbnail_path, int(rating), ",".join(tags), source_batch_id, notes)
+    return values, tags
+
+
+def _write_rows(rows: List[Tuple[tuple, List[str]]]) -> List[Optional[int]]:
+    if not rows:
+        return []
     try:
         with _LOCK:
             conn = _open()
-            cur = conn.execute(
-                """
-                INSERT INTO assets (
-                    created_at, generator_type, params_json, prompt,
-                    image_path, thumbnail_path, rating, tags,
-                    source_batch_id, notes
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    datetime.now(timezone.utc).isoformat(timespec="seconds"),
-                    generator_type,
-                    json.dumps(params or {}, ensure_ascii=False),
-                    prompt,
-                    image_path,
-                    thumbnail_path,
-                    int(rating),
-                    ",".join(tags or []),
-                    source_batch_id,
-                    notes,
-                ),
-            )
-            conn.commit()
-            return cur.lastrowid
-    except sqlite3.Error as e:
-        _log.warning("library.add_entry failed: %s", e)
-        return None
+            with conn:
+                return [_insert(conn, values, tags) for values, tags in rows]
+    except Exception as e:   # 不只 sqlite3.Error：一条出意外也只丢它自己，事务已回滚
+        if len(rows) == 1:
+            _log.warning("library.add_entries: skipped entry (%s, %r): %s",
+                         rows[0][0][0], rows[0][0][3], e)
+            return [None]
+        _log.warning("library.add_entries: batch of %d failed (%s); retrying one by one",
+                     len(rows), e)
+    return [_write_rows([row])[0] for row in rows]
+
+
+def _insert(conn, values: tuple, tags: List[str]) -> int:
+    # created_at 在写入时（持锁）取，而不是入队时：保证与自增 id 同序，keyset 翻页依赖这一点
+    cur = conn.execute(
+        """
+        INSERT INTO assets (
+            created_at, generator_type, params_json, prompt,
+            image_path, thumbnail_path, rating, tags,
+            source_batch_id, notes
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (datetime.now(timezone.utc).isoformat(timespec="seconds"), *values),
+    )
+    _write_tags(conn, cur.lastrowid, tags)
+    return cur.lastrowid
+
+
+# ---------------------------------------------------------------------------
+# 后台写队列：queue_entry 立即返回，写线程把一个窗口内的条目合并成一次提交
+# ---------------------------------------------------------------------------
+
+FLUSH_WINDOW_S = 0.05     # 写线程拿到第一条后再等这么久，凑一批
+MAX_BATCH = 500
+EXIT_FLUSH_TIMEOUT_S = 5.0
+
+_QUEUE: "queue.Queue[Any]" = queue.Queue()
+_WRITER: Optional[threading.Thread] = None
+_WRITER_LOCK = threading.Lock()
+
+
+def queue_entry(**fields: Any) -> None:
+    """add_entry 的 fire-and-forget 版：参数相同，不等提交、不返回 rowid。
+
+    条目在 FLUSH_WINDOW_S 内被后台线程写入（与同窗口的其它条目同一个事务），
+    之前 list_entries 看不到它；要立刻读到就先 flush()。写入失败只记 warning。
+    参数在这里就序列化 / 校验（同 add_entries），写错了调用处直接拿到异常，
+    不会到写线程里才连累同批的其它条目。"""
+    _QUEUE.put(_prepare(**fields))
+    _ensure_writer()
+
+
+def flush(timeout: Optional[float] = None) -> bool:
+    """等到此前 queue_entry 的条目全部提交（成功或已记 warning）；超时返回 False。"""
+    with _WRITER_LOCK:
+        idle = _WRITER is None or not _WRITER.is_alive()
+    if idle and _QUEUE.empty():
+        return True
+    done = threading.Event()
+    _QUEUE.put(done)
+    _ensure_writer()
+    if done.wait(timeout):
+        return True
+    _log.warning("library.flush: %d queued writes still pending after %.1fs",
+                 _QUEUE.qsize(), timeout)
+    return False
+
+
+def _ensure_writer() -> None:
+    global _WRITER
+    with _WRITER_LOCK:
+        if _WRITER is None or not _WRITER.is_alive():
+            _WRITER = threading.Thread(target=_write_loop, name="library-writer", daemon=True)
+            _WRITER.start()
+
+
+def _next_batch() -> Tuple[List[Tuple[tuple, List[str]]], List[threading.Event]]:
+    """阻塞到有条目，再收 FLUSH_WINDOW_S / MAX_BATCH 以内的；遇到 flush 标记立即收工。"""
+    batch: List[Tuple[tuple, List[str]]] = []
+    waiters: List[threading.Event] = []
+    item = _QUEUE.get()
+    deadline = time.monotonic() + FLUSH_WINDOW_S
+    while True:
+        if isinstance(item, threading.Event):
+            waiters.append(item)
+            break
+        batch.append(item)
+        remaining = deadline - time.monotonic()
+        if len(batch) >= MAX_BATCH or remaining <= 0:
+            break
+        try:
+            item = _QUEUE.get(timeout=remaining)
+        except queue.Empty:
+            break
+    return batch, waiters
+
+
+def _write_loop() -> None:
+    while True:
+        batch, waiters = _next_batch()
+        try:
+            _write_rows(batch)
+        except Exception as e:   # 写线程不能死：任何意外都只记下来
+            _log.warning("library writer: dropped %d queued entries: %s", len(batch), e)
+        for w in waiters:
+            w.set()
+
+
+atexit.register(flush, EXIT_FLUSH_TIMEOUT_S)
 
 
 def list_entries(
@@ -209,45 +539,126 @@ def list_entries(
     keyword: Optional[str] = None,
     limit: int = 200,
     offset: int = 0,
+    order: str = "recent",
+    tags: Optional[List[str]] = None,
+    tag_mode: str = "all",
+    after: Optional[Tuple[str, int]] = None,
+    light: bool = False,
 ) -> List[AssetEntry]:
-    """按 created_at DESC 列出条目，应用过滤。"""
-    sql = "SELECT * FROM assets WHERE 1=1"
-    args: List[Any] = []
+    """按 created_at DESC 列出条目，应用过滤。
+
+    tags 与 tag 合并成一组标签：tag_mode="all" 要求全部都有（AND），"any" 有一个即可（OR）。
+
+    翻页用 after=上一页最后一条的 .cursor（keyset 分页）：直接在索引上定位，
+    多深的页都一样快；offset 要先数过前面所有行。relevance 排序不支持 after，仍用 offset。
+    light=True 返回轻量投影（见 AssetEntry.partial），列表视图用。
+
+    order="relevance" 且有关键字时按 bm25 相关度排序（相同分数再按时间）。
+    相关度要给全部命中打分，极常见的词在大库上比默认顺序慢得多。"""
+    wanted = _clean_tags(([tag] if tag else []) + list(tags or []))
+    any_tag = tag_mode == "any" and len(wanted) > 1
+    conn = _reader()
+    use_fts = bool(keyword) and _FTS.get(_LOCAL.path, False) and not _CJK_RE.search(keyword)
+    # AND 查询从最少见的标签出发（tag_counts 里现成的计数）
+    if wanted and not any_tag and not use_fts:
+        wanted.sort(key=lambda t: _tag_count(conn, t))
+    # OR：命中少时先取出全部 asset_id；命中多时按时间扫 assets 逐行点查，很快凑满 limit
+    any_hits = sum(_tag_count(conn, t) for t in wanted) if any_tag else 0
+    match = fts_query(keyword) if use_fts else None
+    if use_fts and match is None:
+        return []   # 关键字里没有可检索的词（全是标点）
+    # 驱动表：FTS 命中 > 最少见标签的 asset_tags 行 > assets 本身。前两种按 rowid /
+    # asset_id 倒序流式取前 limit 条（created_at 只由 add_entry 在插入时写入，与自增 id
+    # 同序），常见词 / 常见标签不必先取出全部命中再排序
+    columns = _LIGHT_COLUMNS if light else "assets.*"
+    driver = None
+    if match is not None:
+        sql = f"SELECT {columns} FROM assets_fts JOIN assets ON assets.id = assets_fts.rowid" \
+              " WHERE assets_fts MATCH ?"
+        args: List[Any] = [match]
+        driver = "assets_fts.rowid"
+    elif wanted and not any_tag:
+        sql = f"SELECT {columns} FROM asset_tags CROSS JOIN assets" \
+              " ON assets.id = asset_tags.asset_id WHERE asset_tags.tag = ?"
+        args = [wanted.pop(0)]
+        driver = "asset_tags.asset_id"
+    else:
+        sql = f"SELECT {columns} FROM assets WHERE 1=1"
+        args = []
+    ranked = match is not None and order == "relevance"
+    if after is not None and not ranked:
+        if driver is not None:
+            sql += f" AND {driver} < ?"
+            args.append(int(after[1]))
+        else:
+            sql += " AND (assets.created_at, assets.id) < (?, ?)"
+            args.extend([after[0], int(after[1])])
     if generator_type:
         sql += " AND generator_type = ?"
         args.append(generator_type)
     if min_rating > 0:
         sql += " AND rating >= ?"
         args.append(int(min_rating))
-    if tag:
-        # 简单 LIKE 匹配 tags 字段（逗号分隔），足够当前规模使用
-        sql += " AND ',' || tags || ',' LIKE ?"
-        args.append(f"%,{tag},%")
-    if keyword:
+    if any_tag:
+        marks = ",".join("?" * len(wanted))
+        if any_hits <= _ANY_TAG_MATERIALIZE * max(1, int(limit) + int(offset)):
+            sql += f" AND assets.id IN (SELECT asset_id FROM asset_tags WHERE tag IN ({marks}))"
+        else:
+            sql += (" AND EXISTS (SELECT 1 FROM asset_tags x"
+                    f" WHERE x.tag IN ({marks}) AND x.asset_id = assets.id)")
+        args.extend(wanted)
+    else:
+        # 其余标签：(tag, asset_id) 主键上的点查
+        for t in wanted:
+            sql += " AND EXISTS (SELECT 1 FROM asset_tags x WHERE x.tag = ? AND x.asset_id = assets.id)"
+            args.append(t)
+    if keyword and match is None:
         sql += " AND (prompt LIKE ? OR notes LIKE ? OR tags LIKE ?)"
         kw = f"%{keyword}%"
         args.extend([kw, kw, kw])
-    sql += " ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?"
+    if ranked:
+        sql += " ORDER BY bm25(assets_fts, %s), assets.id DESC" % \
+               ", ".join(str(w) for w in _BM25_WEIGHTS)
+    elif driver is not None:
+        sql += f" ORDER BY {driver} DESC"
+    else:
+        sql += " ORDER BY created_at DESC, id DESC"
+    sql += " LIMIT ? OFFSET ?"
     args.extend([int(limit), int(offset)])
 
-    with _LOCK:
-        conn = _open()
-        try:
-            rows = conn.execute(sql, args).fetchall()
-        except sqlite3.Error as e:
-            _log.warning("library.list_entries failed: %s", e)
-            return []
+    try:
+        rows = conn.execute(sql, args).fetchall()
+    except sqlite3.Error as e:
+        _log.warning("library.list_entries failed: %s", e)
+        return []
     return [AssetEntry.from_row(r) for r in rows]
 
 
+def _tag_count(conn: sqlite3.Connection, tag: str) -> int:
+    try:
+        row = conn.execute("SELECT n FROM tag_counts WHERE tag = ?", (tag,)).fetchone()
+    except sqlite3.Error:
+        return 0
+    return row[0] if row else 0
+
+
+def fts_query(keyword: str) -> Optional[str]:
+    """把用户输入的关键字转成 FTS5 MATCH 表达式：整体作为短语，最后一个词按前缀匹配。
+
+    "armored ene" -> '"armored ene"*'，匹配 "armored enemy"；引号转义，
+    用户输入里的 AND / OR / NEAR / * 等不会被当成 FTS 语法。没有可检索的词时返回 None。"""
+    words = re.findall(r"\w+", keyword or "")
+    if not words:
+        return None
+    return '"' + " ".join(words).replace('"', '""') + '"*'
+
+
 def get_entry(entry_id: int) -> Optional[AssetEntry]:
-    with _LOCK:
-        conn = _open()
-        try:
-            row = conn.execute("SELECT * FROM assets WHERE id = ?", (entry_id,)).fetchone()
-        except sqlite3.Error as e:
-            _log.warning("library.get_entry failed: %s", e)
-            return None
+    try:
+        row = _reader().execute("SELECT * FROM assets WHERE id = ?", (entry_id,)).fetchone()
+    except sqlite3.Error as e:
+        _log.warning("library.get_entry failed: %s", e)
+        return None
     return AssetEntry.from_row(row) if row else None
 
 
@@ -257,7 +668,20 @@ def update_rating(entry_id: int, rating: int) -> bool:
 
 
 def update_tags(entry_id: int, tags: List[str]) -> bool:
-    return _update_field(entry_id, "tags", ",".join(t.strip() for t in tags if t.strip()))
+    """一个事务里整体替换标签（assets.tags + asset_tags + 计数），不会出现只写了一半的状态。"""
+    tags = _clean_tags(tags)
+    try:
+        with _LOCK:
+            conn = _open()
+            with conn:
+                cur = conn.execute("UPDATE assets SET tags = ? WHERE id = ?",
+                                   (",".join(tags), entry_id))
+                if cur.rowcount:
+                    _write_tags(conn, entry_id, tags)
+            return True
+    except sqlite3.Error as e:
+        _log.warning("library update tags failed: %s", e)
+        return False
 
 
 def update_notes(entry_id: int, notes: str) -> bool:
@@ -295,26 +719,21 @@ def count(generator_type: Optional[str] = None) -> int:
     if generator_type:
         sql += " WHERE generator_type = ?"
         args.append(generator_type)
-    with _LOCK:
-        conn = _open()
-        try:
-            return int(conn.execute(sql, args).fetchone()[0])
-        except sqlite3.Error:
-            return 0
+    try:
+        return int(_reader().execute(sql, args).fetchone()[0])
+    except sqlite3.Error:
+        return 0
 
 
 def all_tags() -> List[str]:
-    """聚合所有出现过的 tag，用于 UI 自动补全。"""
-    with _LOCK:
-        conn = _open()
-        try:
-            rows = conn.execute("SELECT tags FROM assets WHERE tags <> ''").fetchall()
-        except sqlite3.Error:
-            return []
-    seen = set()
-    for r in rows:
-        for t in (r["tags"] or "").split(","):
-            t = t.strip()
-            if t:
-                seen.add(t)
-    return sorted(seen)
+    """所有出现过的 tag（已排序），用于 UI 自动补全。"""
+    return sorted(tag_counts())
+
+
+def tag_counts() -> Dict[str, int]:
+    """{tag: 带这个标签的条目数}；读的是增量维护的 tag_counts 表，不扫 assets。"""
+    try:
+        rows = _reader().execute("SELECT tag, n FROM tag_counts WHERE n > 0").fetchall()
+    except sqlite3.Error:
+        return {}
+    return {r["tag"]: r["n"] for r in rows}
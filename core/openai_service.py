@@ -12,11 +12,14 @@ Both are routed through the standard /v1/images/generations endpoint
 from __future__ import annotations
 
 import base64
+import binascii
 import io
 from typing import Optional, Tuple, List
 
 import requests
 
+from core import b64stream, http_pool, rate_limiter, response_cache
+
 # ---------------------------------------------------------------------------
 # Model catalogue (updated April 2026)
 # ---------------------------------------------------------------------------
@@ -49,8 +52,16 @@ SIZES_DALLE2 = ["256x256", "512x512", "1024x1024"]
 QUALITY_OPTIONS = ["auto", "high", "medium", "low"]
 
 
+# Read timeouts (seconds); see core.http_pool for the connect timeout
+REQUEST_TIMEOUT = 480
+DOWNLOAD_TIMEOUT = 120
+
+
 class OpenAIError(Exception):
-    pass
+    # Set from the HTTP response by core.rate_limiter.annotate()
+    status = None
+    retry_after = None
+    retryable = False
 
 
 def _is_gpt_image(model: str) -> bool:
@@ -68,6 +79,14 @@ from core.prompt_sanitizer import sanitize_for_openai  # noqa: E402
 
 def _raise_api_error(resp: requests.Response) -> None:
     """Parse an error response and raise OpenAIError with a human-readable message."""
+    try:
+        _raise_described_error(resp)
+    except OpenAIError as exc:
+        rate_limiter.annotate(exc, resp)
+        raise
+
+
+def _raise_described_error(resp) -> None:
     status = resp.status_code
 
     try:
@@ -147,13 +166,9 @@ def _raise_api_error(resp: requests.Response) -> None:
 # Response decoder
 # ---------------------------------------------------------------------------
 
-def _decode_response_image(response_json: dict) -> Tuple[bytes, str]:
-    """Extract the first image from an OpenAI/LiteLLM images response.
-
-    Handles three possible response shapes:
-      - data[0].b64_json   (DALL-E or gpt-image with output_format=b64)
-      - data[0].url        (URL to download)
-      - data[0].b64        (some LiteLLM relay variants)
+def _response_image(response_json: dict) -> Tuple[Optional[bytes], str]:
+    """(image bytes, mime) for inline base64 data, or (None, url) when the
+    image still has to be downloaded. Shared by the sync and async clients.
     """
     data = response_json.get("data", [])
     if not data:
@@ -166,20 +181,66 @@ def _decode_response_image(response_json: dict) -> Tuple[bytes, str]:
     if b64:
         return base64.b64decode(b64), "image/png"
 
-    # url -- download it
     url = item.get("url")
     if url:
-        try:
-            r = requests.get(url, timeout=120)
-            r.raise_for_status()
-            content_type = r.headers.get("Content-Type", "image/png").split(";")[0]
-            return r.content, content_type
-        except requests.RequestException as exc:
-            raise OpenAIError("Failed to download image from URL: {}".format(exc)) from exc
+        return None, url
 
     raise OpenAIError("Unrecognised response shape: {}".format(list(item.keys())))
 
 
+def _download(url: str) -> Tuple[bytes, str]:
+    try:
+        r = http_pool.get(url, timeout=DOWNLOAD_TIMEOUT)
+        r.raise_for_status()
+        content_type = r.headers.get("Content-Type", "image/png").split(";")[0]
+        return r.content, content_type
+    except requests.RequestException as exc:
+        raise OpenAIError("Failed to download image from URL: {}".format(exc)) from exc
+
+
+def _image_decoder() -> b64stream.B64FieldDecoder:
+    return b64stream.B64FieldDecoder(("b64_json", "b64"))
+
+
+def _decoded_image(decoder: b64stream.B64FieldDecoder) -> Tuple[Optional[bytes], str]:
+    """Like _response_image, for a body that was streamed through a B64FieldDecoder."""
+    try:
+        skeleton, image = decoder.result()
+    except (ValueError, binascii.Error) as exc:
+        raise OpenAIError("Malformed response: {}".format(exc)) from exc
+    if image:
+        return image, "image/png"
+    return _response_image(skeleton)
+
+
+def _post_streaming(endpoint: str, **request) -> Tuple[bytes, str]:
+    """POST and return the first image of an OpenAI/LiteLLM images response.
+
+    Handles three possible response shapes:
+      - data[0].b64_json   (DALL-E or gpt-image with output_format=b64)
+      - data[0].url        (URL to download)
+      - data[0].b64        (some LiteLLM relay variants)
+    Inline base64 is decoded straight off the socket, never held as text.
+    """
+    try:
+        resp = http_pool.post(endpoint, timeout=REQUEST_TIMEOUT, stream=True, **request)
+    except requests.RequestException as exc:
+        raise OpenAIError(str(exc)) from exc
+    with resp:
+        if resp.status_code != 200:
+            _raise_api_error(resp)
+        decoder = _image_decoder()
+        try:
+            for chunk in resp.iter_content(b64stream.CHUNK):
+                decoder.feed(chunk)
+        except requests.RequestException as exc:
+            raise OpenAIError(str(exc)) from exc
+    image, mime_or_url = _decoded_image(decoder)
+    if image is not None:
+        return image, mime_or_url
+    return _download(mime_or_url)
+
+
 # ---------------------------------------------------------------------------
 # Parameter builders -- separate for gpt-image vs DALL-E
 # ---------------------------------------------------------------------------
@@ -243,17 +304,8 @@ def _edits_url(base_url):
 # Public API
 # ---------------------------------------------------------------------------
 
-def generate_image_bytes(
-    prompt,
-    api_key,
-    model=DEFAULT_MODEL,
-    base_url=DEFAULT_BASE_URL,
-    size="1024x1024",
-    quality="auto",
-    reference_images=None,
-    n=1,
-):
-    """Generate an image from a text prompt.
+def _generation_request(prompt, api_key, model, base_url, size, quality, reference_images):
+    """(endpoint, request kwargs) for a generate call. Shared by the sync and async clients.
 
     Automatically selects the correct request structure for gpt-image vs DALL-E.
     If reference_images are supplied, routes to /images/edits (gpt-image only).
@@ -278,11 +330,9 @@ def generate_image_bytes(
 
     # Reference images -> edits endpoint (gpt-image only)
     if reference_images and _is_gpt_image(model):
-        return _edit_with_references(
-            prompt=prompt, api_key=api_key, model=model,
-            base_url=base_url, size=size, quality=quality,
-            reference_images=reference_images,
-        )
+        data, files = _edit_form(model, prompt, size, quality, reference_images)
+        headers = {"Authorization": "Bearer {}".format(api_key)}
+        return _edits_url(base_url), {"data": data, "files": files, "headers": headers}
 
     # Choose payload builder
     if _is_gpt_image(model):
@@ -290,35 +340,56 @@ def generate_image_bytes(
     else:
         payload = _build_dalle_payload(model, prompt, size, quality)
 
-    endpoint = _generations_url(base_url)
-    headers = _build_headers(api_key)
+    return _generations_url(base_url), {"json": payload, "headers": _build_headers(api_key)}
 
-    try:
-        resp = requests.post(endpoint, json=payload, headers=headers, timeout=480)
-    except requests.RequestException as exc:
-        raise OpenAIError(str(exc)) from exc
 
-    if resp.status_code != 200:
-        _raise_api_error(resp)
+def generate_image_bytes(
+    prompt,
+    api_key,
+    model=DEFAULT_MODEL,
+    base_url=DEFAULT_BASE_URL,
+    size="1024x1024",
+    quality="auto",
+    reference_images=None,
+    n=1,
+    fresh=False,
+    variant=0,
+    limiter=None,
+    retry=None,
+):
+    """Generate an image from a text prompt.
+
+    Automatically selects the correct request structure for gpt-image vs DALL-E.
+    If reference_images are supplied, routes to /images/edits (gpt-image only).
+    fresh / variant: see core.response_cache (used only when the cache is enabled).
+    limiter / retry: run the request through rate_limiter.call_with_retry; only a
+    cache miss takes a limiter slot.
+    """
+    endpoint, request = _generation_request(prompt, api_key, model, base_url, size, quality,
+                                            reference_images)
 
-    return _decode_response_image(resp.json())
+    def send():
+        return _post_streaming(endpoint, **request)
 
+    if limiter is not None:
+        return response_cache.through(
+            endpoint, request, lambda: rate_limiter.call_with_retry(send, limiter, retry),
+            fresh=fresh, variant=variant)
+    return response_cache.through(endpoint, request, send, fresh=fresh, variant=variant)
 
-def _edit_with_references(prompt, api_key, model, base_url, size, quality, reference_images):
-    """Call /images/edits with multipart form data (gpt-image models only)."""
-    endpoint = _edits_url(base_url)
-    headers = {"Authorization": "Bearer {}".format(api_key)}
 
+def _edit_form(model, prompt, size, quality, reference_images):
+    """(form fields, files) for /images/edits; files hold raw bytes."""
     files = []
     primary_bytes, primary_mime = reference_images[0]
     primary_mime = primary_mime or "image/png"
     ext = "png" if "png" in primary_mime else "webp"
-    files.append(("image", ("image.{}".format(ext), io.BytesIO(primary_bytes), primary_mime)))
+    files.append(("image", ("image.{}".format(ext), primary_bytes, primary_mime)))
 
     for idx, (img_bytes, img_mime) in enumerate(reference_images[1:], start=1):
         img_mime = img_mime or "image/png"
         ext2 = "png" if "png" in img_mime else "webp"
-        files.append(("image[]", ("ref_{}.{}".format(idx, ext2), io.BytesIO(img_bytes), img_mime)))
+        files.append(("image[]", ("ref_{}.{}".format(idx, ext2), img_bytes, img_mime)))
 
     # Edits endpoint uses form data, not JSON -- same minimal param rules
     data = {"model": model, "prompt": prompt}
@@ -326,16 +397,16 @@ def _edit_with_references(prompt, api_key, model, base_url, size, quality, refer
         data["size"] = size
     if quality and quality != "auto":
         data["quality"] = quality
+    return data, files
 
-    try:
-        resp = requests.post(endpoint, data=data, files=files, headers=headers, timeout=480)
-    except requests.RequestException as exc:
-        raise OpenAIError(str(exc)) from exc
 
-    if resp.status_code != 200:
-        _raise_api_error(resp)
+def _edit_with_references(prompt, api_key, model, base_url, size, quality, reference_images):
+    """Call /images/edits with multipart form data (gpt-image models only)."""
+    endpoint = _edits_url(base_url)
+    headers = {"Authorization": "Bearer {}".format(api_key)}
+    data, files = _edit_form(model, prompt, size, quality, reference_images)
 
-    return _decode_response_image(resp.json())
+    return _post_streaming(endpoint, data=data, files=files, headers=headers)
 
 
 def edit_image_bytes(
@@ -364,10 +435,4 @@ def edit_image_bytes(
         ext = "png" if "png" in mime else "webp"
         files = [("image", ("image.{}".format(ext), io.BytesIO(image_bytes), mime))]
         data = {"model": model, "prompt": prompt, "n": "1", "response_format": "url"}
-        try:
-            resp = requests.post(endpoint, data=data, files=files, headers=headers, timeout=480)
-        except requests.RequestException as exc:
-            raise OpenAIError(str(exc)) from exc
-        if resp.status_code != 200:
-            _raise_api_error(resp)
-        return _decode_response_image(resp.json())
+        return _post_streaming(endpoint, data=data, files=files, headers=headers)
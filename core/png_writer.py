@@ -0,0 +1,167 @@
+"""PNG encode presets and a background writer pool.
+
+Presets:
+    fast     - compress_level=1; largest files, cheapest encode.
+    balanced - compress_level=6 (Pillow's default; identical to a plain save()).
+    small    - compress_level=9 + optimize, and a lossless palette (P mode)
+               when the image has <= 256 distinct colors (flat PC-98-style art).
+
+PngWriter moves encoding and disk writes onto a thread pool. Pillow's zlib
+encoder releases the GIL, so cropping / normalizing the next cell overlaps
+with writing the previous one. At most 2x max_workers jobs are queued, so a
+fast producer blocks instead of buffering a whole sheet. Byte and encode-time
+totals are kept in `stats` for benchmarks and status reporting.
+"""
+from __future__ import annotations
+
+import io
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+DEFAULT_PRESET = "balanced"
+
+PNG_PRESETS: Dict[str, dict] = {
+    "fast": {"compress_level": 1},
+    "balanced": {"compress_level": 6},
+    "small": {"compress_level": 9, "optimize": True},
+}
+
+PRESET_NAMES: List[str] = list(PNG_PRESETS)
+
+
+def _palettize(img: Image.Image) -> Image.Image:
+    """Lossless P-mode copy if img has <= 256 colors, else img unchanged."""
+    if img.mode not in ("RGB", "RGBA"):
+        return img
+    colors = img.getcolors(256)
+    if colors is None:
+        return img
+    method = Image.Quantize.FASTOCTREE if img.mode == "RGBA" else Image.Quantize.MEDIANCUT
+    pal = img.quantize(colors=max(2, len(colors)), method=method)
+    # quantize() is not guaranteed exact; only keep it if it round-trips
+    if pal.convert(img.mode).tobytes() != img.tobytes():
+        return img
+    return pal
+
+
+def _save(img: Image.Image, opts: dict) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="PNG", **opts)
+    return buf.getvalue()
+
+
+def encode_png(img: Image.Image, preset: str = DEFAULT_PRESET) -> bytes:
+    """Encode img as PNG with the named preset (unknown names fall back to balanced)."""
+    opts = PNG_PRESETS.get(preset, PNG_PRESETS[DEFAULT_PRESET])
+    data = _save(img, opts)
+    if preset == "small":
+        pal = _palettize(img)
+        if pal is not img:
+            # Palette + tRNS overhead can outweigh the savings on tiny cells
+            data = min(data, _save(pal, opts), key=len)
+    return data
+
+
+def reencode_png_bytes(data: bytes, preset: str = DEFAULT_PRESET) -> bytes:
+    """Decode any Pillow-readable image bytes and re-encode them as PNG."""
+    with Image.open(io.BytesIO(data)) as img:
+        img.load()
+        return encode_png(img, preset)
+
+
+def save_reencoded(data: bytes, path: str, preset: str = DEFAULT_PRESET) -> dict:
+    """Re-encode image bytes with a preset and write them to path.
+
+    Returns {"bytes": int, "encode_seconds": float} for status reporting.
+    """
+    t0 = time.perf_counter()
+    out = reencode_png_bytes(data, preset)
+    elapsed = time.perf_counter() - t0
+    with open(path, "wb") as f:
+        f.write(out)
+    return {"bytes": len(out), "encode_seconds": elapsed}
+
+
+class PngWriter:
+    """Thread-pool PNG writer. Use as a context manager or call close().
+
+    submit() takes ownership of the image: callers must not mutate it after.
+    """
+
+    def __init__(self, preset: str = DEFAULT_PRESET, max_workers: Optional[int] = None):
+        self.preset = preset if preset in PNG_PRESETS else DEFAULT_PRESET
+        workers = max_workers or min(4, os.cpu_count() or 1)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="png-writer")
+        self._slots = threading.BoundedSemaphore(workers * 2)
+        self._lock = threading.Lock()
+        self._futures: List[Future] = []
+        self.stats = {"files": 0, "bytes": 0, "encode_seconds": 0.0}
+
+    def _record(self, nbytes: int, seconds: float) -> None:
+        with self._lock:
+            self.stats["files"] += 1
+            self.stats["bytes"] += nbytes
+            self.stats["encode_seconds"] += seconds
+
+    def _write(self, path: str, data: bytes) -> None:
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def _encode_and_write(self, img: Image.Image, path: str) -> int:
+        t0 = time.perf_counter()
+        data = encode_png(img, self.preset)
+        self._record(len(data), time.perf_counter() - t0)
+        self._write(path, data)
+        return len(data)
+
+    def _write_bytes(self, data: bytes, path: str) -> int:
+        self._write(path, data)
+        self._record(len(data), 0.0)
+        return len(data)
+
+    def _submit(self, fn, *args) -> Future:
+        self._slots.acquire()
+        fut = self._pool.submit(fn, *args)
+        fut.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(fut)
+        return fut
+
+    def submit(self, img: Image.Image, path: str) -> Future:
+        """Encode + write in the background. The future resolves to bytes written."""
+        return self._submit(self._encode_and_write, img, path)
+
+    def submit_bytes(self, data: bytes, path: str) -> Future:
+        """Write already-encoded bytes in the background."""
+        return self._submit(self._write_bytes, data, path)
+
+    def wait(self) -> None:
+        """Block until every submitted write is done; re-raise the first failure."""
+        futures, self._futures = self._futures, []
+        first_error = None
+        for fut in futures:
+            exc = fut.exception()
+            if exc is not None and first_error is None:
+                first_error = exc
+        if first_error is not None:
+            raise first_error
+
+    def close(self) -> None:
+        try:
+            self.wait()
+        finally:
+            self._pool.shutdown(wait=True)
+
+    def __enter__(self) -> "PngWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # Already failing: finish in-flight writes but keep the original error
+            self._pool.shutdown(wait=True)
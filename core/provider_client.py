@@ -0,0 +1,212 @@
+"""asyncio client for the image providers with bounded concurrency.
+
+Runs Gemini / OpenAI generate calls on core.async_http, so a batch keeps
+dozens of generations in flight on one event loop instead of one blocking
+thread each. Request building and response parsing are shared with the sync
+services (gemini_service._generate_request, openai_service._generation_request
+and friends), so both paths send identical payloads and raise the same
+GeminiError / OpenAIError messages.
+
+Concurrency is bounded three ways: a global semaphore (max_in_flight), an
+optional per-provider limit, and the shared core.rate_limiter.Limiter for
+(provider, model, api key), which adds a token bucket, Retry-After cooldowns
+and an adaptive limit that shrinks on 429. Retryable failures (429 / 5xx)
+are rescheduled with backoff outside the semaphores so they don't hold a
+slot while they wait. With core.response_cache enabled, a cached request
+never reaches the limiter at all; batch slot i is cache variant i. Cancelling the task running generate_many() cancels
+every in-flight request and closes its connection.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+from urllib3 import encode_multipart_formdata
+
+from core import gemini_service as gs
+from core import openai_service as oi
+from core import b64stream, rate_limiter, response_cache
+from core.async_http import AsyncHTTPClient, TransportError
+
+DEFAULT_MAX_IN_FLIGHT = 64
+
+
+class AsyncProviderClient:
+    """Create inside the event loop that will use it; aclose() when done.
+
+    param max_in_flight:   global cap on concurrent requests.
+    param provider_limits: optional {"Gemini": n, "OpenAI": m} caps.
+    param retry:           RetryPolicy; defaults to rate_limiter.default_policy().
+    """
+
+    def __init__(self, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 provider_limits: Optional[Dict[str, int]] = None,
+                 http: Optional[AsyncHTTPClient] = None,
+                 retry: Optional[rate_limiter.RetryPolicy] = None):
+        self.max_in_flight = max(1, max_in_flight)
+        self._global = asyncio.Semaphore(self.max_in_flight)
+        self._limits = dict(provider_limits or {})
+        self._provider_sems: Dict[str, asyncio.Semaphore] = {}
+        self.http = http or AsyncHTTPClient(max_idle_per_host=self.max_in_flight)
+        self.retry = retry or rate_limiter.default_policy()
+        self._slot_freed = asyncio.Condition()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def _provider_sem(self, provider: str) -> asyncio.Semaphore:
+        sem = self._provider_sems.get(provider)
+        if sem is None:
+            limit = self._limits.get(provider) or self.max_in_flight
+            sem = self._provider_sems[provider] = asyncio.Semaphore(limit)
+        return sem
+
+    async def _acquire(self, limiter: rate_limiter.Limiter) -> None:
+        """Wait for a slot under the limiter's adaptive concurrency limit."""
+        async with self._slot_freed:
+            while not limiter.try_acquire():
+                # our own releases notify; the timeout catches other threads'
+                try:
+                    await asyncio.wait_for(self._slot_freed.wait(), 0.25)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _release(self, limiter: rate_limiter.Limiter) -> None:
+        limiter.release()
+        async with self._slot_freed:
+            self._slot_freed.notify_all()
+
+    async def generate(self, provider: str, prompt: str, *, api_key: str,
+                       model: Optional[str] = None, reference_images=None,
+                       text_last: bool = False, fresh: bool = False, variant: int = 0,
+                       **extra) -> tuple:
+        """One image as (bytes, mime). extra: base_url / size / quality for OpenAI.
+
+        fresh / variant: see core.response_cache (used only when it is enabled).
+        """
+        endpoint, body = self._request(provider, prompt, api_key, model, reference_images,
+                                       text_last, **extra)
+        cache = response_cache.active()
+        key = None
+        if cache is not None:
+            # hashing the body (inlined reference images) and the cache's file
+            # I/O run in a worker thread so they don't stall the event loop
+            key = await asyncio.to_thread(response_cache.request_key, endpoint, body, variant)
+            if not fresh:
+                hit = await asyncio.to_thread(cache.get, key)
+                if hit is not None:
+                    return hit
+        limiter = rate_limiter.limiter_for(provider, model, api_key)
+        send = self._openai if provider == "OpenAI" else self._gemini
+        attempt = 0
+        while True:
+            async with self._global, self._provider_sem(provider):
+                await self._acquire(limiter)
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                try:
+                    wait = limiter.reserve()
+                    if wait:
+                        await asyncio.sleep(wait)
+                    result = await send(endpoint, body)
+                except (gs.GeminiError, oi.OpenAIError) as exc:
+                    limiter.on_error(exc)
+                    attempt += 1
+                    delay = self.retry.delay(exc, attempt)
+                    if delay is None:
+                        raise
+                    limiter.note_retry()
+                else:
+                    limiter.on_success()
+                    break
+                finally:
+                    self.in_flight -= 1
+                    await self._release(limiter)
+            await asyncio.sleep(delay)
+        if key is not None:
+            # stored after the slots are released
+            await asyncio.to_thread(cache.put, key, *result)
+        return result
+
+    @staticmethod
+    def _request(provider, prompt, api_key, model, reference_images, text_last,
+                 base_url=oi.DEFAULT_BASE_URL, size="1024x1024", quality="auto"):
+        """(endpoint, body) exactly as the sync service builds it."""
+        if provider == "OpenAI":
+            return oi._generation_request(prompt, api_key, model, base_url, size, quality,
+                                          reference_images)
+        url, payload = gs._generate_request(prompt, api_key, model or gs.DEFAULT_MODEL,
+                                            reference_images or None, text_last)
+        return url, {"json": payload}
+
+    async def _gemini(self, url, request):
+        decoder = gs._image_decoder()
+        try:
+            resp = await self.http.request(
+                "POST", url, headers=gs.JSON_HEADERS, body=b64stream.JSONBody(request["json"]),
+                timeout=gs.GENERATE_TIMEOUT, on_chunk=decoder.feed)
+        except TransportError as exc:
+            raise gs.GeminiError(str(exc)) from exc
+        gs._check_status(resp)
+        return gs._image_from_decoded(decoder)
+
+    async def _openai(self, endpoint, request):
+        headers = dict(request["headers"])
+        if "json" in request:
+            body = json.dumps(request["json"]).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        else:
+            body, headers["Content-Type"] = encode_multipart_formdata(
+                list(request["data"].items()) + request["files"])
+        decoder = oi._image_decoder()
+        try:
+            resp = await self.http.request("POST", endpoint, headers=headers, body=body,
+                                           timeout=oi.REQUEST_TIMEOUT, on_chunk=decoder.feed)
+        except TransportError as exc:
+            raise oi.OpenAIError(str(exc)) from exc
+        if resp.status_code != 200:
+            oi._raise_api_error(resp)
+
+        image, mime_or_url = oi._decoded_image(decoder)
+        if image is not None:
+            return image, mime_or_url
+        try:
+            r = await self.http.request("GET", mime_or_url, timeout=oi.DOWNLOAD_TIMEOUT)
+            r.raise_for_status()
+        except TransportError as exc:
+            raise oi.OpenAIError("Failed to download image from URL: {}".format(exc)) from exc
+        return r.content, r.headers.get("content-type", "image/png").split(";")[0]
+
+    async def generate_many(self, provider: str, prompt: str, count: int, *,
+                            on_result: Optional[Callable[[int, Any], None]] = None,
+                            **kwargs) -> List[Any]:
+        """count generations of one prompt; each result is (bytes, mime) or an Exception.
+
+        on_result(index, result) fires as each one finishes. If this coroutine
+        is cancelled, the outstanding requests are cancelled before it re-raises.
+        """
+        tasks = [asyncio.ensure_future(self.generate(provider, prompt, variant=i, **kwargs))
+                 for i in range(count)]
+        index = {t: i for i, t in enumerate(tasks)}
+        results: List[Any] = [None] * count
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    i = index[t]
+                    try:
+                        results[i] = t.result()
+                    except Exception as exc:
+                        results[i] = exc
+                    if on_result:
+                        on_result(i, results[i])
+        except asyncio.CancelledError:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return results
+
+    async def aclose(self) -> None:
+        await self.http.close()
@@ -0,0 +1,394 @@
+"""Per-(provider, model, api key) rate limiting and retry scheduling.
+
+A batch of 8 used to hit a 429 and lose whichever images tripped it. Each
+(provider, model, key) now gets one Limiter, shared by every worker in the
+process:
+
+  - a token bucket (requests per minute; 0 = unlimited until throttled)
+  - an adaptive concurrency limit: unbounded at first, halved on every 429
+    (AIMD), then grown back by one slot per window of clean responses
+  - a cooldown: Retry-After (header, or Gemini's RetryInfo.retryDelay)
+    blocks the bucket for everyone, not just the request that got it
+
+RetryPolicy schedules retries for 429 / 5xx with exponential backoff and
+jitter, never sooner than the server asked. A Retry-After longer than
+max_delay (a daily quota, typically) is not retried.
+
+snapshot() / status_text() expose the limiter state for the status bar.
+The services tag their errors via annotate(); provider_client and
+call_with_retry() do the scheduling.
+"""
+from __future__ import annotations
+
+import email.utils
+import hashlib
+import random
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+DEFAULT_RPM = 0             # requests per minute; 0 = no bucket until a 429
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+# 429s that arrive within this long of a cut belong to the same burst: cut once
+CUT_WINDOW = 1.0
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """Seconds to wait from a Retry-After value.
+
+    Accepts delta-seconds ("120", "1.5"), an HTTP-date, and the Go-style
+    durations Google / OpenAI use ("30s", "1m30s", "250ms").
+    """
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return max(0.0, float(text))
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(text)
+    if parts and "".join(n + u for n, u in parts) == text.replace(" ", ""):
+        return sum(float(n) * _UNIT_SECONDS[u] for n, u in parts)
+    try:
+        when = email.utils.parsedate_to_datetime(text)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def _retry_after_from(response) -> Optional[float]:
+    headers = response.headers
+    delay = parse_retry_after(headers.get("retry-after") or headers.get("Retry-After"))
+    if delay is not None:
+        return delay
+    try:
+        body = response.json()
+    except Exception:
+        return None
+    error = body.get("error") if isinstance(body, dict) else None
+    if not isinstance(error, dict):
+        return None
+    for detail in error.get("details") or []:
+        if isinstance(detail, dict) and "retryDelay" in detail:
+            return parse_retry_after(detail["retryDelay"])
+    return None
+
+
+def annotate(exc: Exception, response) -> Exception:
+    """Tag a provider error with status / retry_after / retryable from its response."""
+    status = response.status_code
+    exc.status = status
+    exc.retry_after = _retry_after_from(response)
+    # OpenAI reports an exhausted balance as 429 too; waiting will not help
+    exc.retryable = status in RETRYABLE_STATUS and "insufficient_quota" not in response.text
+    return exc
+
+
+def is_throttle(exc: BaseException) -> bool:
+    return getattr(exc, "status", None) == 429
+
+
+# ---------------------------------------------------------------------------
+# Token bucket
+# ---------------------------------------------------------------------------
+
+class TokenBucket:
+    """Classic token bucket; reserve() hands out send times instead of blocking.
+
+    rate is tokens per second (0 = unlimited). Each reservation takes one
+    token, letting the level go negative, so concurrent callers are spaced
+    1/rate apart instead of all waking at once.
+    """
+
+    def __init__(self, rate: float = 0.0, burst: int = 1, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.rate = max(0.0, rate)
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._stamp = clock()
+        self._blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if self.rate:
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def set_rate(self, rate: float, burst: Optional[int] = None) -> None:
+        with self._lock:
+            self._refill(self._clock())
+            self.rate = max(0.0, rate)
+            if burst is not None:
+                self.burst = max(1, burst)
+                self._tokens = min(self._tokens, self.burst)
+
+    def pause_until(self, when: float) -> None:
+        """Hand out nothing before clock() == when (Retry-After)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, when)
+
+    def reserve(self) -> float:
+        """Take a token; seconds the caller must wait before sending."""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            wait = max(0.0, self._blocked_until - now)
+            if self.rate:
+                self._tokens -= 1.0
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens / self.rate)
+            return wait
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill(self._clock())
+            return self._tokens
+
+    def cooldown(self) -> float:
+        with self._lock:
+            return max(0.0, self._blocked_until - self._clock())
+
+
+# ---------------------------------------------------------------------------
+# Limiter: bucket + adaptive concurrency + counters
+# ---------------------------------------------------------------------------
+
+class Limiter:
+    """Shared state for one (provider, model, api key)."""
+
+    def __init__(self, provider: str, model: str, rpm: float = DEFAULT_RPM,
+                 max_concurrency: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.provider = provider
+        self.model = model
+        self._clock = clock
+        self._cond = threading.Condition()
+        self.bucket = TokenBucket(rpm / 60.0, burst=max(1, int(rpm // 60) or 1), clock=clock)
+        self.max_concurrency = max_concurrency
+        self._limit: Optional[float] = None   # None = not throttled yet
+        self._clean = 0
+        self._cut_at: Optional[float] = None
+        self.active = 0
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self.failures = 0
+
+    # ── concurrency ──
+
+    @property
+    def limit(self) -> Optional[int]:
+        caps = [c for c in (self.max_concurrency,
+                            None if self._limit is None else int(self._limit)) if c]
+        return min(caps) if caps else None
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            limit = self.limit
+            if limit is not None and self.active >= limit:
+                return False
+            self.active += 1
+            self.requests += 1
+            return True
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Blocking slot acquire for thread-pool callers."""
+        deadline = None if timeout is None else self._clock() + timeout
+        with self._cond:
+            while not self.try_acquire():
+                remaining = None if deadline is None else deadline - self._clock()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(0.25 if remaining is None else min(remaining, 0.25))
+        return True
+
+    def release(self) -> None:
+        with self._cond:
+            self.active = max(0, self.active - 1)
+            self._cond.notify_all()
+
+    def reserve(self) -> float:
+        return self.bucket.reserve()
+
+    # ── feedback ──
+
+    def on_success(self) -> None:
+        with self._cond:
+            if self._limit is not None:
+                # additive increase: one extra slot per `limit` clean responses
+                self._clean += 1
+                if self._clean >= self._limit:
+                    self._clean = 0
+                    self._limit += 1
+            self._cond.notify_all()
+
+    def on_error(self, exc: BaseException) -> None:
+        with self._cond:
+            self.failures += 1
+            if not is_throttle(exc):
+                return
+            self.throttled += 1
+            now = self._clock()
+            if self._cut_at is None or now - self._cut_at >= CUT_WINDOW:
+                # multiplicative decrease from what was actually in flight
+                current = self._limit if self._limit is not None else max(1, self.active)
+                self._limit = max(1.0, min(current, self.active or current) / 2.0)
+                self._cut_at = now
+            self._clean = 0
+        retry_after = getattr(exc, "retry_after", None)
+        if retry_after:
+            self.bucket.pause_until(self._clock() + retry_after)
+
+    def note_retry(self) -> None:
+        with self._cond:
+            self.retries += 1
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {
+                "provider": self.provider,
+                "model": self.model,
+                "active": self.active,
+                "limit": self.limit,
+                "rpm": round(self.bucket.rate * 60.0, 2),
+                "tokens": round(self.bucket.tokens, 2),
+                "cooldown": round(self.bucket.cooldown(), 2),
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "failures": self.failures,
+            }
+
+
+# ---------------------------------------------------------------------------
+# Retry policy
+# ---------------------------------------------------------------------------
+
+class RetryPolicy:
+    """Exponential backoff with jitter that never undercuts Retry-After."""
+
+    def __init__(self, max_retries: int = DEFAULT_MAX_RETRIES,
+                 base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY, jitter: float = 0.25):
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def delay(self, exc: BaseException, attempt: int) -> Optional[float]:
+        """Seconds before retry number `attempt` (1-based), or None to give up."""
+        if attempt > self.max_retries or not getattr(exc, "retryable", False):
+            return None
+        retry_after = getattr(exc, "retry_after", None)
+        if retry_after is not None and retry_after > self.max_delay:
+            return None
+        backoff = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        backoff *= 1.0 + random.uniform(-self.jitter, self.jitter)
+        return max(backoff, retry_after or 0.0)
+
+
+def call_with_retry(fn: Callable, limiter: Limiter, policy: Optional[RetryPolicy] = None,
+                    sleep: Callable[[float], None] = time.sleep):
+    """Run fn() under limiter (slot + bucket), retrying per policy. Thread version."""
+    policy = policy or default_policy()
+    attempt = 0
+    while True:
+        limiter.acquire()
+        try:
+            wait = limiter.reserve()
+            if wait:
+                sleep(wait)
+            result = fn()
+        except Exception as exc:
+            limiter.on_error(exc)
+            attempt += 1
+            delay = policy.delay(exc, attempt)
+            if delay is None:
+                raise
+            limiter.note_retry()
+        else:
+            limiter.on_success()
+            return result
+        finally:
+            limiter.release()
+        sleep(delay)
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+_registry: Dict[tuple, Limiter] = {}
+_registry_lock = threading.Lock()
+_settings = {"rpm": DEFAULT_RPM, "max_retries": DEFAULT_MAX_RETRIES}
+
+
+def _key_id(api_key: str) -> str:
+    # keys are never kept in plain text in limiter state
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:12]
+
+
+def configure(rpm: Optional[float] = None, max_retries: Optional[int] = None) -> None:
+    """Apply settings; rpm also updates every existing limiter. None leaves a value as is."""
+    if rpm is not None:
+        _settings["rpm"] = max(0.0, float(rpm))
+        with _registry_lock:
+            limiters = list(_registry.values())
+        for lim in limiters:
+            lim.bucket.set_rate(_settings["rpm"] / 60.0, max(1, int(_settings["rpm"] // 60) or 1))
+    if max_retries is not None:
+        _settings["max_retries"] = max(0, int(max_retries))
+
+
+def default_policy() -> RetryPolicy:
+    return RetryPolicy(max_retries=_settings["max_retries"])
+
+
+def limiter_for(provider: str, model: Optional[str], api_key: str) -> Limiter:
+    key = (provider, model or "", _key_id(api_key))
+    with _registry_lock:
+        lim = _registry.get(key)
+        if lim is None:
+            lim = _registry[key] = Limiter(provider, model or "", rpm=_settings["rpm"])
+        return lim
+
+
+def snapshot() -> List[dict]:
+    with _registry_lock:
+        limiters = list(_registry.values())
+    return [lim.snapshot() for lim in limiters]
+
+
+def status_text() -> str:
+    """One line per throttled/busy limiter, for the status bar ("" when idle)."""
+    parts = []
+    for s in snapshot():
+        if not (s["active"] or s["throttled"] or s["cooldown"]):
+            continue
+        text = f"{s['provider']}/{s['model']}: {s['active']}"
+        if s["limit"] is not None:
+            text += f"/{s['limit']}"
+        text += " in flight"
+        if s["throttled"]:
+            text += f", {s['throttled']}×429, {s['retries']} retries"
+        if s["cooldown"]:
+            text += f", cooling {s['cooldown']:.0f}s"
+        parts.append(text)
+    return " · ".join(parts)
+
+
+def reset() -> None:
+    """Forget all limiter state (tests)."""
+    with _registry_lock:
+        _registry.clear()
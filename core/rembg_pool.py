@@ -0,0 +1,248 @@
+"""Persistent rembg worker pool.
+
+worker_rembg.py runs in its own venv (or as the frozen worker_rembg.exe), so
+background removal has to cross a process boundary. Instead of one process
+(and one u2net model load) per cell, the pool keeps `--serve` workers alive
+and streams PNG bytes to them over stdin/stdout:
+
+    request : >I length + PNG bytes          (length 0 = shutdown)
+    response: B status + >I length + payload (status 0 = PNG, 1 = utf-8 error)
+
+Workers are spawned lazily up to `size` (default: CPU count), so a
+sequential caller only ever starts one. A module-level shared pool is
+created by get_pool() and shut down at interpreter exit.
+"""
+from __future__ import annotations
+
+import atexit
+import io
+import os
+import queue
+import struct
+import subprocess
+import sys
+import threading
+from collections import deque
+from typing import List, Optional
+
+from PIL import Image
+
+from .logging_setup import get_logger
+
+_log = get_logger(__name__)
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+
+class RembgError(Exception):
+    pass
+
+
+def resolve_worker_cmd() -> Optional[List[str]]:
+    """Locate the rembg worker: frozen worker_rembg.exe first, then the dev venv.
+
+    Returns the `--serve` command line, or None if no worker is installed.
+    """
+    if getattr(sys, "frozen", False):
+        worker_exe = os.path.join(os.path.dirname(sys.executable), "worker_rembg.exe")
+        if os.path.exists(worker_exe):
+            return [worker_exe, "--serve"]
+
+    workspace_dir = os.getcwd()
+    venv_python = os.path.join(workspace_dir, ".venv_rembg", "Scripts", "python.exe")
+    worker_script = os.path.join(workspace_dir, "worker_rembg.py")
+    if os.path.exists(venv_python) and os.path.exists(worker_script):
+        return [venv_python, worker_script, "--serve"]
+    return None
+
+
+def _read_exact(stream, n: int) -> Optional[bytes]:
+    buf = b""
+    while len(buf) < n:
+        chunk = stream.read(n - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return buf
+
+
+class _Worker:
+    """One `--serve` subprocess. Not thread-safe; the pool hands it to one caller at a time."""
+
+    def __init__(self, cmd: List[str]):
+        startupinfo = None
+        # Hide console window on Windows if frozen
+        if os.name == "nt" and getattr(sys, "frozen", False):
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        self._proc = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            startupinfo=startupinfo,
+        )
+        self._stderr_tail: deque = deque(maxlen=20)
+        threading.Thread(target=self._drain_stderr, daemon=True).start()
+        status, payload = self._read_frame()
+        if status != STATUS_OK:
+            self.kill()
+            raise RembgError(f"rembg worker failed to start: {payload.decode('utf-8', 'replace')}")
+
+    def _drain_stderr(self) -> None:
+        for line in iter(self._proc.stderr.readline, b""):
+            text = line.decode("utf-8", "replace").rstrip()
+            self._stderr_tail.append(text)
+            _log.debug("rembg worker: %s", text)
+
+    @property
+    def alive(self) -> bool:
+        return self._proc.poll() is None
+
+    def _read_frame(self):
+        header = _read_exact(self._proc.stdout, 5)
+        if header is None:
+            self._proc.wait()
+            tail = "\n".join(self._stderr_tail)
+            raise RembgError(f"rembg worker exited (code {self._proc.returncode}). {tail}".strip())
+        status, length = struct.unpack(">BI", header)
+        payload = _read_exact(self._proc.stdout, length)
+        if payload is None:
+            raise RembgError("rembg worker closed the pipe mid-response.")
+        return status, payload
+
+    def request(self, data: bytes) -> bytes:
+        try:
+            self._proc.stdin.write(struct.pack(">I", len(data)))
+            self._proc.stdin.write(data)
+            self._proc.stdin.flush()
+        except OSError as e:
+            raise RembgError(f"rembg worker is gone: {e}") from e
+        status, payload = self._read_frame()
+        if status != STATUS_OK:
+            raise RembgError(payload.decode("utf-8", "replace"))
+        return payload
+
+    def close(self, timeout: float = 5.0) -> None:
+        try:
+            self._proc.stdin.write(struct.pack(">I", 0))
+            self._proc.stdin.close()
+            self._proc.wait(timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+    def kill(self) -> None:
+        try:
+            self._proc.kill()
+            self._proc.wait()
+        except OSError:
+            pass
+
+
+class RembgWorkerPool:
+    """Thread-safe pool of warm rembg workers.
+
+    param cmd:  worker command line (defaults to resolve_worker_cmd()).
+    param size: max concurrent workers (defaults to the CPU count).
+    """
+
+    def __init__(self, cmd: Optional[List[str]] = None, size: Optional[int] = None):
+        self.cmd = cmd or resolve_worker_cmd()
+        if not self.cmd:
+            raise RembgError("Rembg worker not found (venv missing and no frozen exe).")
+        self.size = max(1, size or os.cpu_count() or 1)
+        self._idle: "queue.LifoQueue[_Worker]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._spawned = 0
+        self._closed = False
+
+    @property
+    def spawned(self) -> int:
+        """Number of live worker processes (idle or busy)."""
+        return self._spawned
+
+    def _acquire(self) -> _Worker:
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise RembgError("rembg pool is closed.")
+                try:
+                    return self._idle.get_nowait()
+                except queue.Empty:
+                    pass
+                if self._spawned < self.size:
+                    self._spawned += 1
+                    break
+            # All workers busy: wait for one, re-checking capacity in case a
+            # busy worker dies and frees its slot instead of returning.
+            try:
+                return self._idle.get(timeout=0.2)
+            except queue.Empty:
+                continue
+        try:
+            return _Worker(self.cmd)
+        except Exception:
+            with self._lock:
+                self._spawned -= 1
+            raise
+
+    def _release(self, worker: _Worker) -> None:
+        if worker.alive and not self._closed:
+            self._idle.put(worker)
+            return
+        worker.kill()
+        with self._lock:
+            self._spawned -= 1
+
+    def remove(self, image_bytes: bytes) -> bytes:
+        """Send encoded image bytes to a worker, return the cut-out PNG bytes."""
+        worker = self._acquire()
+        try:
+            return worker.request(image_bytes)
+        finally:
+            self._release(worker)
+
+    def remove_background(self, img: Image.Image) -> Image.Image:
+        """PIL convenience wrapper around remove(); returns an RGBA image."""
+        buf = io.BytesIO()
+        img.save(buf, format="PNG", compress_level=1)
+        out = Image.open(io.BytesIO(self.remove(buf.getvalue()))).convert("RGBA")
+        out.load()
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.close()
+            with self._lock:
+                self._spawned -= 1
+
+
+_POOL: Optional[RembgWorkerPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool(size: Optional[int] = None) -> Optional[RembgWorkerPool]:
+    """Shared pool for the app; None if no rembg worker is installed."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            cmd = resolve_worker_cmd()
+            if not cmd:
+                return None
+            _POOL = RembgWorkerPool(cmd, size=size)
+        return _POOL
+
+
+def shutdown_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.close()
+        _POOL = None
+
+
+atexit.register(shutdown_pool)
@@ -0,0 +1,242 @@
+"""Opt-in, content-addressed on-disk cache of image-generation responses.
+
+Re-running an identical request (same prompt, model, size, quality and
+reference images — typically a re-roll from the library's params_json)
+used to cost a full paid API call. With the cache enabled, the provider
+services key each generate call by a hash of its normalized request and
+return the stored (bytes, mime) instead.
+
+  - key:      sha256 over the endpoint (minus the ?key= credential), the
+              canonical JSON payload or multipart form (files by digest),
+              and a variant index so the N images of a batch stay distinct
+  - storage:  one file per entry, <dir>/<k[:2]>/<k>; a one-line JSON header
+              (mime, created) followed by the raw image bytes
+  - eviction: LRU by total bytes (mtime = last use), plus a TTL on created
+  - bypass:   fresh=True skips the lookup but still stores the new result
+
+Because entries are plain files keyed by request, tests and benchmarks can
+replay recorded responses offline by pointing the cache at a fixture dir.
+The cache is off until configure(enabled=True).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from core.b64stream import Base64Blob
+from core.logging_setup import get_logger
+
+_log = get_logger(__name__)
+
+DEFAULT_MAX_MB = 512
+DEFAULT_TTL_HOURS = 24 * 30
+
+_MAGIC = b"PGRC1 "
+
+
+def _strip_credentials(endpoint: str) -> str:
+    parts = urlsplit(endpoint)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "key"]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _blob_digest(obj):
+    # streamed reference images (core.b64stream.Base64Blob) are keyed by content digest
+    if isinstance(obj, Base64Blob):
+        return {"sha256": obj.digest()}
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def request_key(endpoint: str, body: dict, variant: int = 0) -> str:
+    """Hash of a normalized request.
+
+    body is what the services pass to the HTTP layer: {"json": payload} or
+    {"data": fields, "files": [(field, (name, bytes, mime)), ...]}. Headers
+    (credentials) are not part of the key.
+    """
+    h = hashlib.sha256()
+    h.update(_strip_credentials(endpoint).encode("utf-8"))
+    h.update(b"\0%d\0" % variant)
+    if "json" in body:
+        h.update(json.dumps(body["json"], sort_keys=True, separators=(",", ":"),
+                            default=_blob_digest).encode("utf-8"))
+    else:
+        h.update(json.dumps(sorted(body.get("data", {}).items()), separators=(",", ":")).encode("utf-8"))
+        for field, (name, content, mime) in body.get("files", []):
+            h.update(f"\0{field}\0{name}\0{mime}\0".encode("utf-8"))
+            h.update(hashlib.sha256(content).digest())
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe LRU of (bytes, mime) entries under one directory."""
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024,
+                 ttl: Optional[float] = DEFAULT_TTL_HOURS * 3600.0,
+                 clock: Callable[[], float] = time.time):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._index: Optional["OrderedDict[str, int]"] = None   # key -> size, LRU first
+        self.total_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _load_index(self) -> "OrderedDict[str, int]":
+        # One scan on first use; afterwards the index is maintained in memory
+        if self._index is None:
+            found = []
+            if os.path.isdir(self.directory):
+                for sub in os.scandir(self.directory):
+                    if not sub.is_dir():
+                        continue
+                    for entry in os.scandir(sub.path):
+                        if entry.is_file() and not entry.name.endswith(".tmp"):
+                            st = entry.stat()
+                            found.append((st.st_mtime, entry.name, st.st_size))
+            found.sort()
+            self._index = OrderedDict((name, size) for _m, name, size in found)
+            self.total_bytes = sum(self._index.values())
+        return self._index
+
+    def _drop(self, key: str) -> None:
+        size = self._index.pop(key, None)
+        if size is not None:
+            self.total_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        with self._lock:
+            index = self._load_index()
+            if key not in index:
+                self.stats["misses"] += 1
+                return None
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    header = f.readline()
+                    data = f.read()
+                meta = json.loads(header[len(_MAGIC):])
+            except (OSError, ValueError):
+                self._drop(key)
+                self.stats["misses"] += 1
+                return None
+            now = self._clock()
+            if self.ttl is not None and now - meta.get("created", 0) > self.ttl:
+                self._drop(key)
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            index.move_to_end(key)
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+            self.stats["hits"] += 1
+            return data, meta.get("mime")
+
+    def put(self, key: str, data: bytes, mime: Optional[str]) -> None:
+        """Store an entry; I/O errors are logged and the entry is skipped, never raised."""
+        header = _MAGIC + json.dumps({"mime": mime, "created": self._clock()}).encode("utf-8") + b"\n"
+        size = len(header) + len(data)
+        if size > self.max_bytes:
+            return
+        path = self._path(key)
+        with self._lock:
+            index = self._load_index()
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(tmp, "wb") as f:
+                    f.write(header)
+                    f.write(data)
+                os.replace(tmp, path)
+            except OSError as e:
+                # Best-effort: a full disk or unwritable cache dir must not cost
+                # the caller the (already paid for) result
+                _log.warning("response cache store failed (%s): %s", self.directory, e)
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+                return
+            self.total_bytes += size - index.pop(key, 0)
+            index[key] = size
+            self.stats["stores"] += 1
+            while self.total_bytes > self.max_bytes and index:
+                self._drop(next(iter(index)))
+                self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._load_index()):
+                self._drop(key)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load_index())
+
+
+# ---------------------------------------------------------------------------
+# Process-wide cache used by the provider services
+# ---------------------------------------------------------------------------
+
+_active: Optional[ResponseCache] = None
+_active_lock = threading.Lock()
+
+
+def _default_dir() -> str:
+    from paths import user_data_path
+    return user_data_path("response_cache")
+
+
+def configure(enabled: bool, directory: Optional[str] = None,
+              max_mb: Optional[float] = None, ttl_hours: Optional[float] = None) -> Optional[ResponseCache]:
+    """Turn the cache on/off. ttl_hours=0 means entries never expire."""
+    global _active
+    with _active_lock:
+        if not enabled:
+            _active = None
+            return None
+        directory = directory or _default_dir()
+        max_bytes = int((max_mb or DEFAULT_MAX_MB) * 1024 * 1024)
+        ttl_hours = DEFAULT_TTL_HOURS if ttl_hours is None else ttl_hours
+        ttl = ttl_hours * 3600.0 if ttl_hours else None
+        if _active is not None and _active.directory == directory:
+            _active.max_bytes, _active.ttl = max_bytes, ttl
+        else:
+            _active = ResponseCache(directory, max_bytes, ttl)
+        return _active
+
+
+def active() -> Optional[ResponseCache]:
+    return _active
+
+
+def through(endpoint: str, body: dict, call: Callable[[], tuple], *,
+            fresh: bool = False, variant: int = 0) -> tuple:
+    """call() unless the active cache holds this request; store what call() returns."""
+    cache = _active
+    if cache is None:
+        return call()
+    key = request_key(endpoint, body, variant)
+    if not fresh:
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+    result = call()
+    cache.put(key, *result)
+    return result
@@ -0,0 +1,205 @@
+"""Shared, decode-once sprite sheet handle.
+
+detect_grid and the slicer used to open the same file separately, each
+holding a fully decoded copy. A SheetImage is opened once and handed to
+both:
+
+  - Compressed formats (PNG, JPEG, WebP) are decoded on first use and the
+    decoded image is reused for grid detection and every crop.
+  - Uncompressed single-tile formats (BMP, PPM, raw TIFF) are never decoded
+    whole: crops read just the rows they cover straight from the file, and
+    the grayscale view for detect_grid is built strip by strip.
+
+Peak RSS helpers and a per-sheet cost estimate let callers keep concurrent
+sheets under a memory budget.
+"""
+from __future__ import annotations
+
+import os
+import sys
+from contextlib import contextmanager
+from typing import Iterable, Optional, Tuple
+
+from PIL import Image
+
+DEFAULT_MEMORY_BUDGET_MB = 2048
+
+# Bits per pixel of the raw layouts we can read band-by-band
+_RAW_BITS = {"L": 8, "RGB": 24, "BGR": 24, "RGBA": 32, "BGRA": 32, "RGBX": 32, "BGRX": 32}
+
+# Rows per strip when building the grayscale view of a lazy sheet
+_STRIP_ROWS = 256
+
+
+def _raw_layout(img: Image.Image) -> Optional[Tuple[int, str, int, int]]:
+    """(offset, rawmode, stride, orientation) if img is one uncompressed tile, else None."""
+    if img.mode not in ("L", "RGB", "RGBA") or len(img.tile) != 1:
+        return None
+    tile = img.tile[0]
+    if tile[0] != "raw" or tuple(tile[1]) != (0, 0) + img.size:
+        return None
+    args = tile[3] if isinstance(tile[3], tuple) else (tile[3],)
+    rawmode, stride, orientation = (args + (0, 1))[:3]
+    bits = _RAW_BITS.get(rawmode)
+    if bits is None or orientation not in (1, -1):
+        return None
+    if stride <= 0:
+        stride = (img.size[0] * bits + 7) // 8
+    return tile[2], rawmode, stride, orientation
+
+
+class SheetImage:
+    """One sprite sheet, opened once and shared by detect_grid and slicing.
+
+    Usable as a context manager; close() releases the file and the decoded
+    pixels. Not thread-safe: share it within one thread or worker.
+    """
+
+    def __init__(self, path: str):
+        if not os.path.exists(path):
+            raise FileNotFoundError("Image file not found.")
+        self.path = path
+        self._file = Image.open(path)
+        self.size = self._file.size
+        self.mode = self._file.mode
+        self._raw = _raw_layout(self._file)
+        self._decoded: Optional[Image.Image] = None
+
+    @property
+    def lazy(self) -> bool:
+        """True if crops are read from disk instead of a decoded copy."""
+        return self._raw is not None and self._decoded is None
+
+    def estimated_bytes(self) -> int:
+        """Pixel memory a full decode would take (Pillow keeps RGB at 4 bytes/px)."""
+        w, h = self.size
+        return w * h * (1 if self.mode in ("1", "L", "P") else 4)
+
+    def image(self) -> Image.Image:
+        """The fully decoded sheet, decoded on first call and cached."""
+        if self._decoded is None:
+            self._file.load()
+            self._decoded = self._file
+        return self._decoded
+
+    def _read_rows(self, top: int, bottom: int) -> Image.Image:
+        offset, rawmode, stride, orientation = self._raw
+        w, h = self.size
+        first = top if orientation == 1 else h - bottom
+        with open(self.path, "rb") as f:
+            f.seek(offset + first * stride)
+            data = f.read((bottom - top) * stride)
+        return Image.frombytes(self.mode, (w, bottom - top), data, "raw",
+                               rawmode, stride, orientation)
+
+    def crop(self, box: Tuple[int, int, int, int]) -> Image.Image:
+        if not self.lazy:
+            return self.image().crop(box)
+        left, top, right, bottom = box
+        band_top, band_bottom = max(0, top), min(self.size[1], bottom)
+        if band_bottom <= band_top:
+            return Image.new(self.mode, (right - left, bottom - top))
+        band = self._read_rows(band_top, band_bottom)
+        # Offsets outside the sheet pad with zeros, as Image.crop() does
+        return band.crop((left, top - band_top, right, bottom - band_top))
+
+    def gray(self) -> Image.Image:
+        """Full-size "L" copy of the sheet (for detect_grid)."""
+        if not self.lazy:
+            return self.image().convert("L")
+        w, h = self.size
+        out = Image.new("L", (w, h))
+        for top in range(0, h, _STRIP_ROWS):
+            bottom = min(h, top + _STRIP_ROWS)
+            out.paste(self._read_rows(top, bottom).convert("L"), (0, top))
+        return out
+
+    def close(self) -> None:
+        self._decoded = None
+        self._file.close()
+
+    def __enter__(self) -> "SheetImage":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+@contextmanager
+def borrow(src):
+    """Yield a SheetImage for a path or an existing SheetImage.
+
+    Only sheets opened here are closed on exit, so callers can pass a shared
+    handle through detect_grid / iter_slices without it being closed early.
+    """
+    if isinstance(src, SheetImage):
+        yield src
+        return
+    sheet = SheetImage(src)
+    try:
+        yield sheet
+    finally:
+        sheet.close()
+
+
+def sheet_cost_bytes(path: str, smart_crop: bool = False) -> int:
+    """Estimated peak pixel memory for slicing one sheet (header read only)."""
+    with SheetImage(path) as sheet:
+        w, h = sheet.size
+        cost = w * h if smart_crop else 0  # transient grayscale for detect_grid
+        if not sheet.lazy:
+            cost += sheet.estimated_bytes()
+        return cost
+
+
+def workers_within_budget(paths: Iterable[str], workers: int, budget_mb: Optional[float],
+                          smart_crop: bool = False) -> int:
+    """Cap a worker count so concurrent sheets fit in budget_mb (None = no cap)."""
+    if not budget_mb:
+        return workers
+    costs = []
+    for p in paths:
+        try:
+            costs.append(sheet_cost_bytes(p, smart_crop))
+        except Exception:
+            continue
+    worst = max(costs, default=0)
+    if worst <= 0:
+        return workers
+    return max(1, min(workers, int(budget_mb * 1024 * 1024 // worst)))
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, or None if unavailable."""
+    if os.name == "nt":
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class _Counters(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t),
+                            ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t),
+                            ("PeakPagefileUsage", ctypes.c_size_t)]
+
+            counters = _Counters()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if not ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters),
+                                                            counters.cb):
+                return None
+            return counters.PeakWorkingSetSize
+        except Exception:
+            return None
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
@@ -1,35 +1,35 @@
 import os
 import re
-import sys
+import uuid
+from dataclasses import dataclass
+from itertools import accumulate
+from operator import add
+from typing import Optional, Tuple
 from PIL import Image
 from . import item_generator as ig
+from . import png_writer as pw
+from . import rembg_pool as rb
+from . import sheet_image as si
 from . import translation_service as ts
+from .sheet_image import SheetImage
 
 def sanitize_filename(name):
     """Remove invalid characters from filename."""
     return re.sub(r'[\\/*?:"<>|]', "", name).strip().replace(" ", "_").lower()
 
-def normalize_image_content(img, threshold=30, scale_factor=0.85):
+def normalize_image_content(img, threshold=30, scale_factor=0.85, upscale=True):
     """
     Trims, Denoises, and Centers the image content.
+    param upscale: If False, content that already fits inside the scaled box
+                   is centered at its native size (no LANCZOS resample).
     """
     # 1. Denoise (Alpha Threshold)
-    # Convert manually to avoid complex dependencies, or use point lookup
-    # Load data to allow pixel access
+    # Point lookup on the alpha band -> binary mask, then one composite:
+    # pixels with alpha < threshold become fully transparent.
     img = img.convert("RGBA")
-    datas = img.getdata()
-    
-    new_data = []
-    # Simple thresholding
-    for item in datas:
-        # item is (r,g,b,a)
-        if item[3] < threshold:
-            new_data.append((0, 0, 0, 0)) # Fully transparent
-        else:
-            new_data.append(item)
-            
-    img.putdata(new_data)
-    
+    mask = img.getchannel("A").point([255 if a >= threshold else 0 for a in range(256)])
+    img = Image.composite(img, Image.new("RGBA", img.size, (0, 0, 0, 0)), mask)
+
     # 2. Trim (Get Bounding Box)
     bbox = img.getbbox()
     if not bbox:
@@ -49,11 +49,14 @@ def normalize_image_content(img, threshold=30, scale_factor=0.85):
     
     # Calculate scale to fit
     ratio = min(max_w / content_w, max_h / content_h)
+    if ratio >= 1 and not upscale:
+        ratio = 1
     new_w = int(content_w * ratio)
     new_h = int(content_h * ratio)
     
-    # Resize content (LANCZOS for quality)
-    content = content.resize((new_w, new_h), Image.Resampling.LANCZOS)
+    # Resize content (LANCZOS for quality); skipped when size is unchanged
+    if (new_w, new_h) != content.size:
+        content = content.resize((new_w, new_h), Image.Resampling.LANCZOS)
     
     # Paste into center of empty canvas
     new_img = Image.new("RGBA", (target_w, target_h), (0, 0, 0, 0))
@@ -63,6 +66,31 @@ def normalize_image_content(img, threshold=30, scale_factor=0.85):
     new_img.paste(content, (offset_x, offset_y))
     return new_img
 
+def _content_prefix_sums(small, bg_threshold):
+    """
+    Thresholds a grayscale image into a 0/1 content mask and returns
+    cumulative content counts along both axes.
+
+    row_prefix[y][x] = content pixels in row y, columns [0, x)
+    col_prefix[y][x] = content pixels in column x, rows [0, y)
+
+    Any band's density profile is then a difference of two prefix rows, so
+    per-band refinement never rescans pixels. Thresholding runs through a
+    Pillow point() lookup table and the sums through C-level iterators.
+    """
+    sw, sh = small.size
+    lut = [1 if v < bg_threshold else 0 for v in range(256)]
+    mask = small.point(lut).tobytes()
+
+    row_prefix = []
+    col_prefix = [[0] * sw]
+    for y in range(sh):
+        row = mask[y * sw:(y + 1) * sw]
+        row_prefix.append(list(accumulate(row, initial=0)))
+        col_prefix.append(list(map(add, col_prefix[-1], row)))
+    return row_prefix, col_prefix
+
+
 def detect_grid(image_path, max_divs=16, min_cell_ratio=0.08, bg_threshold=245):
     """
     Intelligently detects grid boundaries using content-block detection.
@@ -76,12 +104,17 @@ def detect_grid(image_path, max_divs=16, min_cell_ratio=0.08, bg_threshold=245):
     Also detects solid dark/colored dividing lines (rows/cols that are
     uniformly non-white but different from typical content) as separators.
 
-    Performance: downsamples to ≤512px before scanning pixels.
+    Performance: downsamples to ≤512px, thresholds once and derives every
+    global / per-band density profile from prefix sums.
+
+    image_path may also be an open SheetImage, so the slicer can reuse the
+    same decoded sheet instead of loading the file twice.
 
     Returns: (row_cuts, col_cuts) — pixel boundary positions including
              0 at start and image dimension at end.
     """
-    img = Image.open(image_path).convert("L")  # grayscale — single channel, faster
+    with si.borrow(image_path) as sheet:
+        img = sheet.gray()  # grayscale — single channel, faster
     w, h = img.size
 
     # --- Downsample for speed (max 512px on the longest side) ---
@@ -93,26 +126,12 @@ def detect_grid(image_path, max_divs=16, min_cell_ratio=0.08, bg_threshold=245):
     else:
         small, sw, sh = img, w, h
 
-    pix = small.load()
-
-    # --- Build per-row and per-column content density in a single pass ---
+    # --- Threshold once, then build prefix sums for both axes ---
     # "content pixel" = any pixel darker than bg_threshold (non-white)
-    row_content = [0.0] * sh
-    col_content = [0.0] * sw
+    row_prefix, col_prefix = _content_prefix_sums(small, bg_threshold)
 
-    for y in range(sh):
-        c = 0
-        for x in range(sw):
-            if pix[x, y] < bg_threshold:
-                c += 1
-        row_content[y] = c / sw
-
-    for x in range(sw):
-        c = 0
-        for y in range(sh):
-            if pix[x, y] < bg_threshold:
-                c += 1
-        col_content[x] = c / sh
+    row_content = [rp[sw] / sw for rp in row_prefix]
+    col_content = [c / sh for c in col_prefix[sh]]
 
     def profile_to_cuts(density, orig_dim, small_dim):
         n = len(density)
@@ -193,20 +212,14 @@ def detect_grid(image_path, max_divs=16, min_cell_ratio=0.08, bg_threshold=245):
 
     def band_density(axis, band_s, band_e):
         """Content density profile along `axis` ('col' or 'row') within a pixel band."""
+        span = max(1, band_e - band_s)
         if axis == 'col':
             # band_s/band_e are row coordinates in downsampled space
-            span = max(1, band_e - band_s)
-            return [
-                sum(1 for y in range(band_s, band_e) if pix[x, y] < bg_threshold) / span
-                for x in range(sw)
-            ]
+            top, bottom = col_prefix[band_s], col_prefix[band_e]
+            return [(b - t) / span for t, b in zip(top, bottom)]
         else:
             # band_s/band_e are col coordinates in downsampled space
-            span = max(1, band_e - band_s)
-            return [
-                sum(1 for x in range(band_s, band_e) if pix[x, y] < bg_threshold) / span
-                for y in range(sh)
-            ]
+            return [(rp[band_e] - rp[band_s]) / span for rp in row_prefix]
 
     def refine_cuts(existing_cuts, orig_dim, small_dim, scan_axis, band_cuts_orig):
         """
@@ -244,9 +257,280 @@ def detect_grid(image_path, max_divs=16, min_cell_ratio=0.08, bg_threshold=245):
     return row_cuts, col_cuts
 
 
-def slice_image(image_path, grid_rows=8, grid_cols=8, output_dir=None, csv_path=None, translate_mode=False, remove_bg=False, cache_mode=True, normalize_mode=False, scale_factor=0.85, rename="", auto_suffix=False, image_seq=0, start_index=1, num_digits=2, row_cuts=None, col_cuts=None):
+def _grid_cuts(width, height, grid_rows, grid_cols, row_cuts=None, col_cuts=None):
+    """Use custom cuts if provided (smart crop), otherwise fall back to uniform grid."""
+    if row_cuts and col_cuts:
+        return row_cuts, col_cuts
+    cell_width = width // grid_cols
+    cell_height = height // grid_rows
+    row_cuts = [i * cell_height for i in range(grid_rows + 1)]
+    col_cuts = [i * cell_width for i in range(grid_cols + 1)]
+    return row_cuts, col_cuts
+
+
+def _default_output_dir(image_path):
+    base_dir = os.path.dirname(image_path)
+    name = os.path.splitext(os.path.basename(image_path))[0]
+    return os.path.join(base_dir, f"{name}_slices")
+
+
+def _load_item_filenames(csv_path, translate_mode, cache_mode, sheet=None, per_sheet=ig.TOTAL_ITEMS):
+    """
+    Builds the per-cell base filenames from the CSV (translating + caching
+    file_en when translate_mode is on).
+    param sheet: 0-based sheet of a multi-sheet catalog (see ig.IconSheetPlan);
+                 None uses the first TOTAL_ITEMS rows.
+    Returns: (item_filenames: list[str], csv_warning: str)
+    """
+    by_sheet, csv_warning = _load_sheet_filenames(csv_path, translate_mode, cache_mode,
+                                                  [sheet], per_sheet)
+    return by_sheet.get(sheet, []), csv_warning
+
+
+def _load_sheet_filenames(csv_path, translate_mode, cache_mode, sheets, per_sheet=ig.TOTAL_ITEMS):
+    """
+    _load_item_filenames for several sheets at once: missing file_en names of
+    all sheets are translated in one batch and written back in one CSV pass.
+    Returns: ({sheet: item_filenames}, csv_warning)
+    """
+    by_sheet = {}
+    csv_warning = ""
+    if not (csv_path and os.path.exists(csv_path)):
+        return by_sheet, csv_warning
+    try:
+        items_by_sheet = ig.items_by_sheet(csv_path, [s for s in sheets if s is not None], per_sheet)
+        if None in sheets:
+            items_by_sheet[None] = ig.read_items_from_csv(csv_path)
+        
+        # Caching Logic for Filenames
+        changed = False
+        tm = None
+        
+        # Identify items needing translation (if translate_mode is on)
+        if translate_mode:
+            items_to_translate = []
+            seen_rows = set()
+            
+            for items in items_by_sheet.values():
+                for item in items:
+                    if not item.get('file_en') and item.get('row') not in seen_rows: # Check cache first
+                        seen_rows.add(item.get('row'))
+                        items_to_translate.append(item)
+            
+            if items_to_translate:
+                print(f"Translating {len(items_to_translate)} filenames...")
+                if not tm: tm = ts.TranslationManager()
+                translated = tm.translate_list([item['name'] for item in items_to_translate])
+                
+                for item, t_name in zip(items_to_translate, translated):
+                    # Sanitize immediately for storage
+                    item['file_en'] = sanitize_filename(t_name)
+                    changed = True
+                # The same row may be loaded for two sheets (overlapping requests)
+                by_row = {item['row']: item['file_en'] for item in items_to_translate}
+                for items in items_by_sheet.values():
+                    for item in items:
+                        if not item.get('file_en'):
+                            item['file_en'] = by_row.get(item.get('row'), '')
+                    
+            # Save back to CSV if we updated cache and it serves as our database
+            # NOTE: We only save if we actually translated something new AND cache is enabled.
+            # Appended to the CSV's cache journal; the CSV itself is rewritten only on compaction.
+            if changed and cache_mode:
+                if not ig.append_csv_cache(csv_path, items_to_translate):
+                    csv_warning = "Warning: Could not save translations to CSV. Check if file is open."
+                    print(csv_warning)
+
+        # Prepare final filename list
+        for sheet, items in items_by_sheet.items():
+            # translate_mode: use file_en (cached or new); otherwise the original name (sanitized)
+            if translate_mode:
+                by_sheet[sheet] = [item.get('file_en', '') for item in items]
+            else:
+                by_sheet[sheet] = [sanitize_filename(item['name']) for item in items]
+                 
+    except Exception as e:
+        print(f"Warning: Failed to read/process CSV: {e}")
+        import traceback
+        traceback.print_exc()
+    return by_sheet, csv_warning
+
+
+class _NameIndex:
+    """
+    Filenames present in, or already claimed for, one output directory.
+    The directory is listed once, on the first collision check, and claimed
+    names are added as they are handed out, so resolving a duplicate is a set
+    lookup instead of an os.path.exists() call per candidate. Keys go through
+    os.path.normcase to match the filesystem's case rules on Windows.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._names = None
+        self._next_suffix = {}
+
+    def _load(self):
+        try:
+            listing = os.listdir(self.directory)
+        except OSError:
+            listing = []
+        self._names = {os.path.normcase(n) for n in listing}
+
+    def claim(self, base_name):
+        """First free name among base.png, base_2.png, base_3.png, ...; marks it taken."""
+        if self._names is None:
+            self._load()
+        filename = f"{base_name}.png"
+        if os.path.normcase(filename) in self._names:
+            key = os.path.normcase(base_name)
+            # Names are only ever added, so the lowest free suffix never moves back
+            dup_counter = self._next_suffix.get(key, 2)
+            filename = f"{base_name}_{dup_counter}.png"
+            while os.path.normcase(filename) in self._names:
+                dup_counter += 1
+                filename = f"{base_name}_{dup_counter}.png"
+            self._next_suffix[key] = dup_counter + 1
+        self._names.add(os.path.normcase(filename))
+        return filename
+
+
+def _cell_filename(row, col, cell_index, item_filenames, rename, auto_suffix, image_seq,
+                   start_index, num_digits, output_dir, names=None):
+    """
+    Determines one cell's filename. cell_index is the 0-based position in
+    row-major order. names is the _NameIndex for output_dir, shared across
+    the cells of a run so names claimed but not yet written are seen too.
+    """
+    cell_num = cell_index + 1
+    if rename:
+        cell_str = str(cell_num).zfill(num_digits)
+        if auto_suffix and image_seq > 0:
+            img_str = str(image_seq).zfill(num_digits)
+            return f"{rename}_{img_str}_{cell_str}.png"
+        seq = start_index + cell_index
+        return f"{rename}_{str(seq).zfill(num_digits)}.png"
+
+    if cell_index < len(item_filenames) and item_filenames[cell_index].strip():
+        base_name = item_filenames[cell_index]
+    else:
+        base_name = f"icon_{row+1:02d}_{col+1:02d}"
+    if names is None:
+        names = _NameIndex(output_dir)
+    return names.claim(base_name)
+
+
+def _process_cell(cell, row, col, bg_pool, normalize_mode, scale_factor, normalize_upscale):
+    """Background removal + normalization for one cropped cell."""
+    # Remove Background if requested (warm worker pool, bytes in memory)
+    if bg_pool is not None:
+        try:
+            cell = bg_pool.remove_background(cell)
+        except Exception as e:
+            print(f"Failed to remove bg for cell {row},{col}: {e}")
+    
+    # Normalize Visual Size (Trim & Center)
+    if normalize_mode:
+        try:
+            cell = normalize_image_content(cell, scale_factor=scale_factor,
+                                          upscale=normalize_upscale)
+        except Exception as e:
+            print(f"Normalization failed for cell {row},{col}: {e}")
+    return cell
+
+
+@dataclass
+class SlicedCell:
+    """One cell produced by iter_slices."""
+    row: int
+    col: int
+    index: int                       # 0-based, row-major
+    box: Tuple[int, int, int, int]   # (left, upper, right, lower) in sheet pixels
+    filename: str
+    path: Optional[str]              # None when write=False
+    data: Optional[bytes] = None     # encoded PNG when encode=True
+
+
+def iter_slices(image_path, grid_rows=8, grid_cols=8, output_dir=None, csv_path=None, translate_mode=False, remove_bg=False, cache_mode=True, normalize_mode=False, scale_factor=0.85, normalize_upscale=True, rename="", auto_suffix=False, image_seq=0, start_index=1, num_digits=2, row_cuts=None, col_cuts=None, rembg_pool=None, write=True, encode=False, png_preset=pw.DEFAULT_PRESET, writer=None, csv_sheet=None):
+    """
+    Streaming variant of slice_image: yields a SlicedCell as soon as each
+    cell is cropped, processed and (optionally) written, so only one cell is
+    held at a time. Stop iterating (or close() the generator) to cancel.
+    param image_path: File path or an open SheetImage (e.g. the one already
+                      passed to detect_grid); a SheetImage is left open.
+    param write: Save each cell to output_dir (filenames as in slice_image).
+    param encode: Attach the encoded PNG bytes to each SlicedCell.
+    param png_preset: Encode preset name (see core.png_writer.PNG_PRESETS).
+    param writer: Optional PngWriter; writes are then queued on its thread
+                  pool and the file at cell.path exists only after
+                  writer.wait() / close().
+    param csv_sheet: Which sheet of a multi-sheet CSV catalog this image is
+                     (0-based, see ig.IconSheetPlan); cells are named after
+                     that sheet's rows. None: the first TOTAL_ITEMS rows.
+    Other params: see slice_image.
+    Returns (StopIteration.value): CSV warning string, "" if none.
+    Raises: FileNotFoundError if image_path is missing; other errors propagate.
+    """
+    with si.borrow(image_path) as sheet:
+        image_path = sheet.path
+        width, height = sheet.size
+        row_cuts, col_cuts = _grid_cuts(width, height, grid_rows, grid_cols, row_cuts, col_cuts)
+        actual_rows = len(row_cuts) - 1
+        actual_cols = len(col_cuts) - 1
+
+        # Prepare content list if CSV provided
+        item_filenames, csv_warning = _load_item_filenames(csv_path, translate_mode, cache_mode,
+                                                           csv_sheet, grid_rows * grid_cols)
+
+        # Prepare output directory
+        if not output_dir:
+            output_dir = _default_output_dir(image_path)
+        if write and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        bg_pool = None
+        if remove_bg:
+            bg_pool = rembg_pool if rembg_pool is not None else rb.get_pool()
+            if bg_pool is None:
+                print("Rembg worker not found (venv missing and no frozen exe). Skipping bg removal.")
+
+        # Listed once; also tracks names claimed this run (write=False or queued writes)
+        names = _NameIndex(output_dir)
+        index = 0
+        for row in range(actual_rows):
+            for col in range(actual_cols):
+                box = (col_cuts[col], row_cuts[row], col_cuts[col + 1], row_cuts[row + 1])
+                cell = _process_cell(sheet.crop(box), row, col, bg_pool, normalize_mode,
+                                     scale_factor, normalize_upscale)
+                filename = _cell_filename(row, col, index, item_filenames, rename, auto_suffix,
+                                          image_seq, start_index, num_digits, output_dir, names)
+                save_path = os.path.join(output_dir, filename) if write else None
+                data = None
+                if encode:
+                    data = pw.encode_png(cell, png_preset)
+                    if write:
+                        if writer is not None:
+                            writer.submit_bytes(data, save_path)
+                        else:
+                            with open(save_path, "wb") as f:
+                                f.write(data)
+                elif write:
+                    if writer is not None:
+                        writer.submit(cell, save_path)
+                    else:
+                        with open(save_path, "wb") as f:
+                            f.write(pw.encode_png(cell, png_preset))
+                del cell
+                yield SlicedCell(row, col, index, box, filename, save_path, data)
+                index += 1
+
+    return csv_warning
+
+
+def slice_image(image_path, grid_rows=8, grid_cols=8, output_dir=None, csv_path=None, translate_mode=False, remove_bg=False, cache_mode=True, normalize_mode=False, scale_factor=0.85, normalize_upscale=True, rename="", auto_suffix=False, image_seq=0, start_index=1, num_digits=2, row_cuts=None, col_cuts=None, rembg_pool=None, png_preset=pw.DEFAULT_PRESET, csv_sheet=None):
     """
     Slices an image into a grid of smaller images.
+    param image_path: File path or an open SheetImage shared with detect_grid.
     param rename: If non-empty, all cells use this as base name.
     param auto_suffix: If True, adds image-level number prefix to cell numbers (for batch).
                        e.g. rename_01_01 (image 1 cell 1), rename_02_01 (image 2 cell 1).
@@ -254,221 +538,341 @@ def slice_image(image_path, grid_rows=8, grid_cols=8, output_dir=None, csv_path=
     param image_seq: This image's sequence number when auto_suffix is True.
     param start_index: Starting cell number for flat mode (batch continuity).
     param num_digits: Minimum zero-padding width (e.g. 2 -> _01, 3 -> _001).
+    param normalize_upscale: If False, normalize never enlarges content that
+                             already fits (see normalize_image_content).
+    param rembg_pool: RembgWorkerPool used when remove_bg is set; defaults to
+                      the shared pool from core.rembg_pool.get_pool().
+    param png_preset: 'fast' | 'balanced' | 'small' (see core.png_writer).
+                      Cells are encoded and written on a PngWriter thread pool.
+    param csv_sheet: 0-based sheet of a multi-sheet CSV catalog (see iter_slices).
     Returns: (success: bool, message: str, count: int)
     """
+    if not output_dir:
+        path = image_path.path if isinstance(image_path, SheetImage) else image_path
+        output_dir = _default_output_dir(path)
+    writer = pw.PngWriter(png_preset)
+    gen = iter_slices(image_path, grid_rows, grid_cols, output_dir, csv_path, translate_mode,
+                      remove_bg, cache_mode, normalize_mode, scale_factor, normalize_upscale,
+                      rename, auto_suffix, image_seq, start_index, num_digits, row_cuts,
+                      col_cuts, rembg_pool, png_preset=png_preset, writer=writer,
+                      csv_sheet=csv_sheet)
+    count = 0
     try:
-        if not os.path.exists(image_path):
-            return False, "Image file not found.", 0
-            
+        with writer:
+            try:
+                while True:
+                    next(gen)
+                    count += 1
+            except StopIteration as stop:
+                csv_warning = stop.value
+    except Exception as e:
+        return False, str(e), 0
+
+    msg = f"Successfully sliced {count} icons to '{output_dir}'"
+    if csv_warning:
+        msg += f"\n\n{csv_warning}"
+    return True, msg, count
+
+
+# --- Parallel multi-image pipeline ---------------------------------------
+# Grid detection and cell work (crop, bg removal, normalize, PNG encode) run
+# in a spawn-context process pool. Everything that decides a filename runs
+# in the parent, in input order, so names match a sequential batch exactly.
+
+_PROGRESS_QUEUE = None
+
+
+def _init_pool_worker(progress_queue):
+    global _PROGRESS_QUEUE
+    _PROGRESS_QUEUE = progress_queue
+
+
+def _sheet_cuts(sheet, grid_rows, grid_cols, smart_crop):
+    """Grid cuts of an open SheetImage; detect_grid decodes it when smart_crop is on."""
+    row_cuts = col_cuts = None
+    width, height = sheet.size
+    if smart_crop:
+        try:
+            row_cuts, col_cuts = detect_grid(sheet)
+        except Exception as e:
+            print(f"Smart crop detection failed for {os.path.basename(sheet.path)}: {e}, falling back to manual grid")
+    return _grid_cuts(width, height, grid_rows, grid_cols, row_cuts, col_cuts)
 
 
-        img = Image.open(image_path)
-        width, height = img.size
+def _plan_image(image_path, grid_rows, grid_cols, smart_crop):
+    """Worker: read the header (and detect the grid) for one image."""
+    with SheetImage(image_path) as sheet:
+        return _sheet_cuts(sheet, grid_rows, grid_cols, smart_crop)
 
-        # Use custom cuts if provided (smart crop), otherwise fall back to uniform grid
-        if row_cuts and col_cuts:
-            actual_rows = len(row_cuts) - 1
-            actual_cols = len(col_cuts) - 1
+
+def _plan_and_slice(image_path, out_dir, part_prefix, grid_rows, grid_cols, smart_crop,
+                    remove_bg, normalize_mode, scale_factor, normalize_upscale,
+                    png_preset=pw.DEFAULT_PRESET):
+    """Worker: detect the grid and slice every cell of one image from one decode.
+
+    Cell names depend on the images before this one, so cells are written to
+    out_dir/<part_prefix><index>.part and the parent renames them.
+    Returns (row_cuts, col_cuts, part_paths), parts in row-major order.
+    """
+    bg_pool = rb.get_pool(size=1) if remove_bg else None
+    parts = []
+    try:
+        with pw.PngWriter(png_preset, max_workers=2) as writer, SheetImage(image_path) as sheet:
+            row_cuts, col_cuts = _sheet_cuts(sheet, grid_rows, grid_cols, smart_crop)
+            for row in range(len(row_cuts) - 1):
+                for col in range(len(col_cuts) - 1):
+                    box = (col_cuts[col], row_cuts[row], col_cuts[col + 1], row_cuts[row + 1])
+                    cell = _process_cell(sheet.crop(box), row, col, bg_pool, normalize_mode,
+                                         scale_factor, normalize_upscale)
+                    part = os.path.join(out_dir, f"{part_prefix}{len(parts)}.part")
+                    parts.append(part)
+                    writer.submit(cell, part)
+    except BaseException:
+        _remove_files(parts)
+        raise
+    return row_cuts, col_cuts, parts
+
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _slice_cells(image_path, jobs, remove_bg, normalize_mode, scale_factor, normalize_upscale,
+                 png_preset=pw.DEFAULT_PRESET):
+    """Worker: crop, process and save a chunk of one image's cells.
+
+    jobs: list of (row, col, box, save_path). Reports each written cell on
+    the progress queue. Returns the number of cells written.
+    """
+    bg_pool = rb.get_pool(size=1) if remove_bg else None
+    written = 0
+
+    def _report(fut, save_path):
+        if fut.exception() is None and _PROGRESS_QUEUE is not None:
+            _PROGRESS_QUEUE.put((image_path, os.path.basename(save_path)))
+
+    with pw.PngWriter(png_preset, max_workers=2) as writer, SheetImage(image_path) as sheet:
+        for row, col, box, save_path in jobs:
+            cell = _process_cell(sheet.crop(box), row, col, bg_pool, normalize_mode,
+                                 scale_factor, normalize_upscale)
+            fut = writer.submit(cell, save_path)
+            fut.add_done_callback(lambda f, p=save_path: _report(f, p))
+            written += 1
+    return written
+
+
+def _name_cells(row_cuts, col_cuts, out_dir, names, item_filenames, rename, auto_suffix,
+                image_seq, start_index, num_digits):
+    """(row, col, box, save_path) for every cell of one image, named as slice_image would."""
+    jobs = []
+    for row in range(len(row_cuts) - 1):
+        for col in range(len(col_cuts) - 1):
+            box = (col_cuts[col], row_cuts[row], col_cuts[col + 1], row_cuts[row + 1])
+            filename = _cell_filename(row, col, len(jobs), item_filenames, rename, auto_suffix,
+                                      image_seq, start_index, num_digits, out_dir, names)
+            jobs.append((row, col, box, os.path.join(out_dir, filename)))
+    return jobs
+
+
+def _split(seq, parts):
+    size, rem = divmod(len(seq), parts)
+    out, start = [], 0
+    for i in range(parts):
+        end = start + size + (1 if i < rem else 0)
+        if end > start:
+            out.append(seq[start:end])
+        start = end
+    return out
+
+
+def slice_images_parallel(image_paths, grid_rows=8, grid_cols=8, output_dir=None, csv_path=None, translate_mode=False, remove_bg=False, cache_mode=True, normalize_mode=False, scale_factor=0.85, normalize_upscale=True, rename="", auto_suffix=False, num_digits=None, smart_crop=False, max_workers=None, progress=None, png_preset=pw.DEFAULT_PRESET, memory_budget_mb=None, first_sheet=None):
+    """
+    Slices many grid images across a process pool.
+
+    Numbering matches calling slice_image once per image in order with
+    image_seq=i+1 and a running start_index (the batch loop in app.py).
+    When each image gets a single chunk of cells, detect_grid and slicing
+    run in one worker on one SheetImage, so a smart-crop sheet is decoded
+    once; split across chunks, every chunk decodes it again.
+    param num_digits: Defaults to the batch rule: cells-per-image/file count
+                      with auto_suffix, total cell count without.
+    param max_workers: Process count (defaults to the CPU count).
+    param memory_budget_mb: If set, fewer processes are used when the largest
+                            sheet's decoded size times the process count
+                            would exceed this (see core.sheet_image).
+    param png_preset: Encode preset for every cell (see core.png_writer).
+    param progress: Optional callable(done, total, image_path, filename),
+                    invoked in the caller's thread after every written cell.
+                    With smart_crop and at least as many images as processes,
+                    total counts grid_rows x grid_cols for images whose grid
+                    is not detected yet.
+    param first_sheet: For a multi-sheet CSV catalog: image i is sheet
+                       first_sheet + i (0-based). None: every image is named
+                       after the first TOTAL_ITEMS rows.
+    Returns: list of (success: bool, message: str, count: int), one per image.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+    import queue as _queue
+
+    total_files = len(image_paths)
+    if not total_files:
+        return []
+    if num_digits is None:
+        cells_per_image = grid_rows * grid_cols
+        if auto_suffix:
+            num_digits = max(2, len(str(cells_per_image)), len(str(total_files)))
         else:
-            actual_rows = grid_rows
-            actual_cols = grid_cols
-            cell_width = width // grid_cols
-            cell_height = height // grid_rows
-            row_cuts = [i * cell_height for i in range(grid_rows + 1)]
-            col_cuts = [i * cell_width for i in range(grid_cols + 1)]
-        
-        # Prepare content list if CSV provided
-        item_filenames = []
-        if csv_path and os.path.exists(csv_path):
-            try:
-                items = ig.read_items_from_csv(csv_path)
-                
-                # Caching Logic for Filenames
-                changed = False
-                tm = None
-                
-                # Identify items needing translation (if translate_mode is on)
-                if translate_mode:
-                    indices_to_translate = []
-                    names_to_translate = []
-                    
-                    for i, item in enumerate(items):
-                        if not item.get('file_en'): # Check cache first
-                             indices_to_translate.append(i)
-                             names_to_translate.append(item['name'])
-                    
-                    if names_to_translate:
-                        print(f"Translating {len(names_to_translate)} filenames...")
-                        if not tm: tm = ts.TranslationManager()
-                        translated = tm.translate_list(names_to_translate)
-                        
-                        for idx, t_name in zip(indices_to_translate, translated):
-                            # Sanitize immediately for storage
-                            sanitized = sanitize_filename(t_name)
-                            items[idx]['file_en'] = sanitized
-                            changed = True
-                            
-                    # Save back to CSV if we updated cache and it serves as our database
-                    # NOTE: We only save if we actually translated something new AND cache is enabled
-                    if changed and cache_mode:
-                        if not ig.save_items_to_csv(csv_path, items):
-                            csv_warning = "Warning: Could not save translations to CSV. Check if file is open."
-                            print(csv_warning)
-
-                # Prepare final filename list
-
-                # Prepare final filename list
-                for item in items:
-                    # Use cached/translated filename if in translate mode OR if it exists
-                    # (User said: "只要检测到csv中存在英文名，启用翻译的时候就不走接口了". 
-                    # Implies if translate_mode is off, we use original name? 
-                    # Usually filename needs to be English to avoid encoding issues, 
-                    # but original logic allowed Chinese filenames if sanitize handle it.
-                    # Let's assume: 
-                    # If translate_mode=True: Use file_en (cached or new)
-                    # If translate_mode=False: Use original name (sanitized)
-                    
-                    if translate_mode:
-                        # We ensured file_en is populated above
-                         item_filenames.append(item.get('file_en', ''))
-                    else:
-                         # Use cache if exists? User said "options default selected".
-                         # If user unchecks translate, they probably want raw original name.
-                         item_filenames.append(sanitize_filename(item['name']))
-                         
-            except Exception as e:
-                print(f"Warning: Failed to read/process CSV: {e}")
-                import traceback
-                traceback.print_exc()
-                
-        # Append warning if set
-        # We need a way to pass this warnings to the return. 
-        # But return is at the end of function.
-        # Let's verify we actually catch the error inside read_items loop or if it's outside.
-        # The entire CSV block is wrapped in try...except.
-        
-        if 'csv_warning' not in locals(): csv_warning = ""
-        
-        # Prepare output directory
-        if not output_dir:
-            base_dir = os.path.dirname(image_path)
-            name = os.path.splitext(os.path.basename(image_path))[0]
-            output_dir = os.path.join(base_dir, f"{name}_slices")
-            
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-            
-        count = 0
-        for row in range(actual_rows):
-            for col in range(actual_cols):
-                left = col_cuts[col]
-                upper = row_cuts[row]
-                right = col_cuts[col + 1]
-                lower = row_cuts[row + 1]
-                
-                # Crop
-                cell = img.crop((left, upper, right, lower))
-                
-                # Remove Background if requested
-                if remove_bg:
-                    try:
-                        # Define worker command
-                        worker_cmd = None
-                        
-                        # 1. Check for bundled/frozen worker EXE
-                        if getattr(sys, 'frozen', False):
-                            base_dir = os.path.dirname(sys.executable)
-                            worker_exe = os.path.join(base_dir, "worker_rembg.exe")
-                            if os.path.exists(worker_exe):
-                                temp_input = os.path.join(output_dir, f"temp_{row}_{col}.png")
-                                temp_output = os.path.join(output_dir, f"temp_{row}_{col}_out.png")
-                                worker_cmd = [worker_exe, temp_input, temp_output]
-
-                        # 2. Fallback to Dev Venv
-                        if not worker_cmd:
-                            workspace_dir = os.getcwd() 
-                            venv_python = os.path.join(workspace_dir, ".venv_rembg", "Scripts", "python.exe")
-                            worker_script = os.path.join(workspace_dir, "worker_rembg.py")
-                            
-                            if os.path.exists(venv_python) and os.path.exists(worker_script):
-                                temp_input = os.path.join(output_dir, f"temp_{row}_{col}.png")
-                                temp_output = os.path.join(output_dir, f"temp_{row}_{col}_out.png")
-                                worker_cmd = [venv_python, worker_script, temp_input, temp_output]
-                        
-                        if worker_cmd:
-                             # Save temp file
-                             cell.save(temp_input)
-                             
-                             # Run
-                             import subprocess
-                             # Hide console window on Windows if frozen
-                             startupinfo = None
-                             if os.name == 'nt' and getattr(sys, 'frozen', False):
-                                 startupinfo = subprocess.STARTUPINFO()
-                                 startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                                 
-                             result = subprocess.run(worker_cmd, capture_output=True, text=True, startupinfo=startupinfo)
-                             
-                             if result.returncode == 0 and os.path.exists(temp_output):
-                                 cell = Image.open(temp_output).convert("RGBA")
-                                 cell.load() # Force read
-                                 try:
-                                     os.remove(temp_input)
-                                     os.remove(temp_output)
-                                 except: pass
-                             else:
-                                 print(f"Worker failed for {row},{col}: {result.stderr}")
-                                 try:
-                                     if os.path.exists(temp_input):
-                                         os.remove(temp_input)
-                                 except: pass
-                        else:
-                             print("Rembg worker not found (venv missing and no frozen exe). Skipping bg removal.")
- 
-                    except Exception as e:
-                        print(f"Failed to remove bg for cell {row},{col}: {e}")
-                
-                # Normalize Visual Size (Trim & Center)
-                if normalize_mode:
+            num_digits = max(2, len(str(cells_per_image * total_files)))
+
+    # CSV naming (and its translation / cache write-back) happens once per batch
+    sheets = ([None] if first_sheet is None
+              else [first_sheet + i for i in range(total_files)])
+    filenames_by_sheet, csv_warning = _load_sheet_filenames(
+        csv_path, translate_mode, cache_mode, sheets, grid_rows * grid_cols)
+
+    workers = max(1, max_workers or os.cpu_count() or 1)
+    workers = si.workers_within_budget(image_paths, workers, memory_budget_mb, smart_crop)
+    ctx = multiprocessing.get_context("spawn")
+    progress_queue = ctx.Queue()
+    results = [None] * total_files
+
+    chunks_per_image = max(1, -(-workers // total_files))
+    # With one chunk per image, grid detection and slicing share a worker and one decode
+    combined = smart_crop and chunks_per_image == 1
+    current_index = 1
+    names_by_dir = {}
+    image_jobs = []
+    written = [0] * total_files
+    errors = {}
+    done = 0
+
+    def _jobs_for(i, fp, out_dir, row_cuts, col_cuts):
+        """Filenames in input order (same rules and collision handling as slice_image)."""
+        nonlocal current_index
+        dir_key = os.path.normcase(os.path.abspath(out_dir))
+        names = names_by_dir.setdefault(dir_key, _NameIndex(out_dir))
+        item_filenames = filenames_by_sheet.get(sheets[min(i, len(sheets) - 1)], [])
+        jobs = _name_cells(row_cuts, col_cuts, out_dir, names, item_filenames, rename,
+                           auto_suffix, i + 1, current_index, num_digits)
+        if not auto_suffix:
+            current_index += len(jobs)
+        return jobs
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_init_pool_worker, initargs=(progress_queue,)) as pool:
+        if combined:
+            # Cells are written under temporary names and renamed here once
+            # every earlier image's cell count (and so this image's names) is known
+            token = uuid.uuid4().hex[:8]
+            futures = []
+            for i, fp in enumerate(image_paths):
+                out_dir = output_dir or _default_output_dir(fp)
+                try:
+                    os.makedirs(out_dir, exist_ok=True)
+                except Exception as e:
+                    results[i] = (False, str(e), 0)
+                    futures.append(None)
+                    continue
+                futures.append((out_dir, pool.submit(
+                    _plan_and_slice, fp, out_dir, f".slicing_{token}_{i}_", grid_rows, grid_cols,
+                    smart_crop, remove_bg, normalize_mode, scale_factor, normalize_upscale,
+                    png_preset)))
+            # cell counts are known once each grid is detected; until then assume rows x cols
+            counts = [grid_rows * grid_cols if f else 0 for f in futures]
+            for i, entry in enumerate(futures):
+                if entry is None:
+                    image_jobs.append(None)
+                    continue
+                out_dir, fut = entry
+                try:
+                    row_cuts, col_cuts, parts = fut.result()
+                except Exception as e:
+                    results[i] = (False, str(e), 0)
+                    image_jobs.append(None)
+                    counts[i] = 0
+                    continue
+                jobs = _jobs_for(i, image_paths[i], out_dir, row_cuts, col_cuts)
+                counts[i] = len(jobs)
+                try:
+                    for part, (_, _, _, save_path) in zip(parts, jobs):
+                        os.replace(part, save_path)
+                        written[i] += 1
+                        done += 1
+                        if progress:
+                            progress(done, sum(counts), image_paths[i], os.path.basename(save_path))
+                except OSError as e:
+                    errors[i] = str(e)
+                    _remove_files(parts[written[i]:])
+                image_jobs.append((out_dir, jobs))
+        else:
+            # 1. Grid detection in parallel
+            plan_futures = [pool.submit(_plan_image, fp, grid_rows, grid_cols, smart_crop)
+                            for fp in image_paths]
+
+            # 2. Filenames in input order
+            for i, (fp, fut) in enumerate(zip(image_paths, plan_futures)):
+                try:
+                    row_cuts, col_cuts = fut.result()
+                    out_dir = output_dir or _default_output_dir(fp)
+                    os.makedirs(out_dir, exist_ok=True)
+                except Exception as e:
+                    results[i] = (False, str(e), 0)
+                    image_jobs.append(None)
+                    continue
+                image_jobs.append((out_dir, _jobs_for(i, fp, out_dir, row_cuts, col_cuts)))
+
+            # 3. Cell work in parallel; each chunk decodes its image once
+            chunk_futures = {}
+            for i, entry in enumerate(image_jobs):
+                if entry is None:
+                    continue
+                for chunk in _split(entry[1], chunks_per_image):
+                    f = pool.submit(_slice_cells, image_paths[i], chunk, remove_bg,
+                                    normalize_mode, scale_factor, normalize_upscale, png_preset)
+                    chunk_futures[f] = i
+
+            total_cells = sum(len(e[1]) for e in image_jobs if e)
+
+            def _pump(timeout):
+                """Forward one per-cell progress message; False if none arrived."""
+                nonlocal done
+                try:
+                    fp, filename = progress_queue.get(timeout=timeout)
+                except _queue.Empty:
+                    return False
+                done += 1
+                if progress:
+                    progress(done, total_cells, fp, filename)
+                return True
+
+            pending = set(chunk_futures)
+            while pending:
+                finished, pending = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+                for f in finished:
+                    i = chunk_futures[f]
                     try:
-                        cell = normalize_image_content(cell, scale_factor=scale_factor)
+                        written[i] += f.result()
                     except Exception as e:
-                        print(f"Normalization failed for cell {row},{col}: {e}")
-                
-                # Determine Filename
-                idx = row * actual_cols + col
-                cell_num = count + 1
-                
-                if rename:
-                    cell_str = str(cell_num).zfill(num_digits)
-                    if auto_suffix and image_seq > 0:
-                        img_str = str(image_seq).zfill(num_digits)
-                        filename = f"{rename}_{img_str}_{cell_str}.png"
-                    else:
-                        seq = start_index + count
-                        filename = f"{rename}_{str(seq).zfill(num_digits)}.png"
-                else:
-                    if idx < len(item_filenames) and item_filenames[idx].strip():
-                        base_name = item_filenames[idx]
-                        if not base_name:
-                            base_name = f"icon_{row+1:02d}_{col+1:02d}"
-                    else:
-                        base_name = f"icon_{row+1:02d}_{col+1:02d}"
-                    filename = f"{base_name}.png"
-                    dup_counter = 2
-                    while os.path.exists(os.path.join(output_dir, filename)):
-                        filename = f"{base_name}_{dup_counter}.png"
-                        dup_counter += 1
-                
-                save_path = os.path.join(output_dir, filename)
-                cell.save(save_path)
-                count += 1
-                
-        msg = f"Successfully sliced {count} icons to '{output_dir}'"
-        if 'csv_warning' in locals() and csv_warning:
+                        errors.setdefault(i, str(e))
+                while _pump(0):
+                    pass
+            # Queue messages can trail the chunk results slightly; collect the rest
+            while done < sum(written) and _pump(1.0):
+                pass
+
+    for i, entry in enumerate(image_jobs):
+        if entry is None:
+            continue
+        if i in errors:
+            results[i] = (False, errors[i], 0)
+            continue
+        msg = f"Successfully sliced {written[i]} icons to '{entry[0]}'"
+        if csv_warning:
             msg += f"\n\n{csv_warning}"
-            
-        return True, msg, count
-
-    except Exception as e:
-        return False, str(e), 0
+        results[i] = (True, msg, written[i])
+    return results
@@ -0,0 +1,240 @@
+"""Pluggable translation backends for TranslationManager.
+
+A backend translates a list of strings at once:
+
+    backend.translate_batch(texts, target) -> [translation or None, ...]
+
+None means "this backend can't translate that text"; the manager then
+offers it to the next backend in its chain. `cacheable` backends have their
+results persisted in core.translation_cache under `name`.
+
+  - GlossaryBackend: offline exact-match lookup built from the [en, zh] option
+    pairs in *_options.json. UI terms (roles, materials, palettes, ...)
+    resolve with zero network calls, so it is not cached.
+  - GoogleBackend: packs many short strings into one request, one per line.
+    Texts that contain a line break go alone. Chunks stay under
+    MAX_BATCH_CHARS, and a reply whose line count doesn't match the request
+    is re-sent one text per request. A 64-item CSV is one or two requests
+    instead of 64.
+"""
+from __future__ import annotations
+
+import abc
+import concurrent.futures
+import glob
+import json
+import random
+import re
+import threading
+import time
+from typing import Iterable, List, Optional, Sequence
+
+from .logging_setup import get_logger
+
+_log = get_logger(__name__)
+
+SEPARATOR = "\n"
+MAX_BATCH_CHARS = 1500     # the Google endpoint takes the text in the query string
+MAX_RETRIES = 3
+
+_CJK = re.compile(r"[㐀-鿿豈-﫿]")
+
+
+class TranslationBackend(abc.ABC):
+    """Base class; subclasses must implement translate_batch()."""
+
+    name = "base"
+    cacheable = False
+
+    @abc.abstractmethod
+    def translate_batch(self, texts: Sequence[str], target: str) -> List[Optional[str]]:
+        """One translation (or None) per text, in order."""
+
+
+# ---------------------------------------------------------------------------
+# Offline glossary
+# ---------------------------------------------------------------------------
+
+def _iter_pairs(node) -> Iterable[tuple]:
+    """Every (en, zh) pair in an options document: [en, zh] lists and {"en", "zh"} dicts."""
+    if isinstance(node, dict):
+        en, zh = node.get("en"), node.get("zh")
+        if isinstance(en, str) and isinstance(zh, str):
+            yield en, zh
+        for value in node.values():
+            yield from _iter_pairs(value)
+    elif isinstance(node, list):
+        if (len(node) == 2 and all(isinstance(x, str) for x in node)
+                and not _CJK.search(node[0]) and _CJK.search(node[1])):
+            yield node[0], node[1]
+            return
+        for value in node:
+            yield from _iter_pairs(value)
+
+
+class GlossaryBackend(TranslationBackend):
+    """Exact-match zh<->en lookup over known option labels."""
+
+    name = "glossary"
+
+    def __init__(self, pairs: Iterable[tuple] = ()):
+        self._to = {"en": {}, "zh": {}}
+        for en, zh in pairs:
+            self.add(en, zh)
+
+    def add(self, en: str, zh: str) -> None:
+        en, zh = en.strip(), zh.strip()
+        if en and zh:
+            # first definition wins, like make_option_map over the file order
+            self._to["en"].setdefault(zh, en)
+            self._to["zh"].setdefault(en.casefold(), zh)
+
+    @classmethod
+    def from_files(cls, paths: Iterable[str]) -> "GlossaryBackend":
+        glossary = cls()
+        for path in paths:
+            try:
+                with open(path, "r", encoding="utf-8") as fh:
+                    data = json.load(fh)
+            except (OSError, ValueError) as e:
+                _log.warning("glossary: skipping %s: %s", path, e)
+                continue
+            for en, zh in _iter_pairs(data):
+                glossary.add(en, zh)
+        return glossary
+
+    @classmethod
+    def default(cls) -> "GlossaryBackend":
+        """Glossary over every *_options.json shipped with the app."""
+        from paths import resource_path
+        return cls.from_files(sorted(glob.glob(resource_path("*_options.json"))))
+
+    def __len__(self) -> int:
+        return len(self._to["en"])
+
+    def lookup(self, text: str, target: str) -> Optional[str]:
+        text = text.strip()
+        if target == "zh":
+            return self._to["zh"].get(text.casefold())
+        if target == "en":
+            return self._to["en"].get(text)
+        return None
+
+    def translate_batch(self, texts: Sequence[str], target: str) -> List[Optional[str]]:
+        return [self.lookup(t, target) for t in texts]
+
+
+# ---------------------------------------------------------------------------
+# Google (deep-translator), batched
+# ---------------------------------------------------------------------------
+
+def _looks_like_error(result: str) -> bool:
+    # Known error pages that come back as "translated" text
+    lower_res = result.lower()
+    return "error" in lower_res and ("504" in lower_res or "server" in lower_res or "request" in lower_res)
+
+
+def pack(texts: Sequence[str], max_chars: int = MAX_BATCH_CHARS) -> List[List[int]]:
+    """Group indices of texts into request chunks joined by SEPARATOR.
+
+    A text containing a line break (or longer than max_chars) forms a chunk
+    on its own: splitting the reply on SEPARATOR could not recover it.
+    """
+    chunks: List[List[int]] = []
+    current: List[int] = []
+    size = 0
+    for i, text in enumerate(texts):
+        if "\n" in text or "\r" in text or len(text) >= max_chars:
+            chunks.append([i])
+            continue
+        if current and size + len(SEPARATOR) + len(text) > max_chars:
+            chunks.append(current)
+            current, size = [], 0
+        size += len(text) + (len(SEPARATOR) if current else 0)
+        current.append(i)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def unpack(reply: str, expected: int) -> Optional[List[str]]:
+    """Split a batched reply back into `expected` translations, or None if it doesn't line up."""
+    lines = [line.strip() for line in reply.strip().split(SEPARATOR)]
+    if expected > 1:
+        lines = [line for line in lines if line]
+    return lines if len(lines) == expected else None
+
+
+class GoogleBackend(TranslationBackend):
+    """Google Translate through deep-translator, many texts per request."""
+
+    name = "google"
+    cacheable = True
+
+    def __init__(self, max_workers: int = 3, max_chars: int = MAX_BATCH_CHARS,
+                 sleep=time.sleep):
+        self.max_workers = max_workers
+        self.max_chars = max_chars
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def _translate_one(self, text: str, target: str) -> str:
+        from deep_translator import GoogleTranslator
+
+        last_error = None
+        for attempt in range(MAX_RETRIES):
+            try:
+                # New instance per call: the translator keeps per-request state
+                # (the "all ores = platinum_ore" bug)
+                with self._lock:
+                    self.requests += 1
+                result = GoogleTranslator(source='auto', target=target).translate(text)
+                if result and _looks_like_error(result):
+                    raise Exception(f"Detected Error Message in response: {result}")
+                return result
+            except Exception as e:
+                last_error = e
+                _log.warning("Translation attempt %d/%d failed for %r: %s",
+                             attempt + 1, MAX_RETRIES, text[:80], e)
+                # Exponential backoff + Jitter
+                self._sleep((2 ** attempt) + random.uniform(0, 1))
+        raise last_error
+
+    def _translate_chunk(self, texts: List[str], target: str) -> List[Optional[str]]:
+        if len(texts) > 1:
+            reply = self._translate_one(SEPARATOR.join(texts), target)
+            lines = unpack(reply or "", len(texts))
+            if lines is not None:
+                return lines
+            _log.warning("batched translation returned a mismatched line count; "
+                         "retrying %d texts one by one", len(texts))
+        out: List[Optional[str]] = []
+        for text in texts:
+            try:
+                out.append(self._translate_one(text, target))
+            except Exception as e:
+                _log.warning("Batch translation error for %r: %s", text, e)
+                out.append(None)
+        return out
+
+    def translate_batch(self, texts: Sequence[str], target: str) -> List[Optional[str]]:
+        results: List[Optional[str]] = [None] * len(texts)
+        chunks = pack(texts, self.max_chars)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._translate_chunk, [texts[i] for i in chunk], target): chunk
+                       for chunk in chunks}
+            for future in concurrent.futures.as_completed(futures):
+                chunk = futures[future]
+                try:
+                    translated = future.result()
+                except Exception as e:
+                    _log.warning("Batch translation error for %d texts: %s", len(chunk), e)
+                    continue
+                for i, value in zip(chunk, translated):
+                    results[i] = value or None
+        return results
+
+
+def default_backends() -> List[TranslationBackend]:
+    return [GlossaryBackend.default(), GoogleBackend()]
@@ -0,0 +1,365 @@
+"""Persistent translation cache (SQLite in the user data dir).
+
+TranslationManager used to keep translations in a class-level dict, so every
+launch re-translated the same item names over the network, with 0.5-1.5 s
+of jitter per request. This module stores them in
+user_data_path("translation_cache.db"):
+
+    translations(source, target, backend, translated, updated_at)
+    PRIMARY KEY (source, target, backend)
+
+The key includes the target language and the backend name, so switching
+translators never serves another backend's output.
+
+  - preload(target, backend) reads one (target, backend) slice into memory
+    in a single query; the app calls it in the background at startup.
+  - get_many(texts, ...) is a bulk lookup: memory first, then one
+    IN (...) query per _SQL_BATCH misses. Only texts that come back
+    missing need the network.
+  - put_many(pairs, ...) writes new translations in one transaction.
+
+The memory front is a StripedLRU: bounded (DEFAULT_MAX_ENTRIES), split into
+independently locked stripes, with hit / miss / eviction counters (stats).
+SingleFlight lets TranslationManager's concurrent callers, e.g. the item
+prompt worker and the slicer's filename pass, share one in-flight request
+per text instead of translating it twice.
+
+Every failure is logged and treated as a miss, never raised. The
+translation path keeps working without the cache file, e.g. on a read-only
+or locked profile.
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from .logging_setup import get_logger
+
+_log = get_logger(__name__)
+
+DEFAULT_TARGET = "en"
+DEFAULT_BACKEND = "google"
+
+DEFAULT_MAX_ENTRIES = 50_000
+DEFAULT_STRIPES = 16
+
+_SQL_BATCH = 500   # well under SQLITE_MAX_VARIABLE_NUMBER (999 on old builds)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    source      TEXT NOT NULL,
+    target      TEXT NOT NULL,
+    backend     TEXT NOT NULL,
+    translated  TEXT NOT NULL,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (source, target, backend)
+) WITHOUT ROWID;
+"""
+
+
+class StripedLRU:
+    """Bounded LRU map split into `stripes` independently locked segments.
+
+    A key's stripe is hash(key) % stripes. Concurrent readers and writers
+    only contend when their keys share a stripe, and each stripe evicts its
+    own least recently used entry once it holds max_entries / stripes.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, stripes: int = DEFAULT_STRIPES):
+        self.stripes = max(1, stripes)
+        self.capacity = max(1, max_entries // self.stripes)
+        self._maps: List["OrderedDict[Hashable, str]"] = [OrderedDict() for _ in range(self.stripes)]
+        self._locks = [threading.Lock() for _ in range(self.stripes)]
+        # per-stripe [hits, misses, evictions]; summed on read
+        self._counts = [[0, 0, 0] for _ in range(self.stripes)]
+
+    def _index(self, key: Hashable) -> int:
+        return hash(key) % self.stripes
+
+    def get(self, key: Hashable) -> Optional[str]:
+        i = self._index(key)
+        with self._locks[i]:
+            m = self._maps[i]
+            value = m.get(key)
+            if value is None:
+                self._counts[i][1] += 1
+                return None
+            m.move_to_end(key)
+            self._counts[i][0] += 1
+            return value
+
+    def put(self, key: Hashable, value: str) -> None:
+        i = self._index(key)
+        with self._locks[i]:
+            m = self._maps[i]
+            m[key] = value
+            m.move_to_end(key)
+            while len(m) > self.capacity:
+                m.popitem(last=False)
+                self._counts[i][2] += 1
+
+    def clear(self) -> None:
+        for i in range(self.stripes):
+            with self._locks[i]:
+                self._maps[i].clear()
+
+    def __len__(self) -> int:
+        return sum(len(m) for m in self._maps)
+
+    @property
+    def max_entries(self) -> int:
+        return self.capacity * self.stripes
+
+    def counters(self) -> Dict[str, int]:
+        hits = misses = evictions = 0
+        for i in range(self.stripes):
+            with self._locks[i]:
+                h, m, e = self._counts[i]
+            hits, misses, evictions = hits + h, misses + m, evictions + e
+        return {"hits": hits, "misses": misses, "evictions": evictions}
+
+
+class SingleFlight:
+    """Lets concurrent callers share one in-flight computation per key.
+
+    claim(keys) splits keys into the ones this caller now owns and must
+    resolve(), and Futures for keys another caller is already computing.
+    Owners must resolve every owned key, with None on failure, or waiters
+    would block forever.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self.shared = 0      # keys that joined someone else's computation
+
+    def claim(self, keys: Iterable[Hashable]) -> Tuple[List[Hashable], Dict[Hashable, Future]]:
+        owned: List[Hashable] = []
+        waiting: Dict[Hashable, Future] = {}
+        with self._lock:
+            for key in keys:
+                fut = self._inflight.get(key)
+                if fut is None:
+                    self._inflight[key] = Future()
+                    owned.append(key)
+                elif key not in waiting:
+                    waiting[key] = fut
+            self.shared += len(waiting)
+        return owned, waiting
+
+    def resolve(self, key: Hashable, value) -> None:
+        with self._lock:
+            fut = self._inflight.pop(key, None)
+        if fut is not None:
+            fut.set_result(value)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+
+class TranslationCache:
+    """SQLite-backed (source, target, backend) -> translation store.
+
+    A StripedLRU of max_entries sits in front of the database; the
+    connection has its own lock, so memory hits never wait on disk I/O.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 stripes: int = DEFAULT_STRIPES):
+        self.db_path = db_path
+        self._db_lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._mem = StripedLRU(max_entries, stripes)
+        # (target, backend) -> eviction count when it was preloaded; while it
+        # is unchanged every stored row is in memory and misses skip the db
+        self._preloaded: Dict[Tuple[str, str], int] = {}
+        self._stat_lock = threading.Lock()
+        self._db_hits = 0
+        self._stores = 0
+
+    def _open(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None:
+            try:
+                conn = sqlite3.connect(self.db_path, check_same_thread=False)
+                conn.executescript(_SCHEMA)
+                conn.commit()
+                self._conn = conn
+            except sqlite3.Error as e:
+                _log.warning("translation cache unavailable (%s): %s", self.db_path, e)
+        return self._conn
+
+    def _complete(self, target: str, backend: str) -> bool:
+        mark = self._preloaded.get((target, backend))
+        return mark is not None and mark == self._mem.counters()["evictions"]
+
+    def preload(self, target: str = DEFAULT_TARGET, backend: str = DEFAULT_BACKEND) -> int:
+        """Load stored translations for (target, backend) into memory; returns the row count."""
+        with self._db_lock:
+            conn = self._open()
+            if conn is None:
+                return 0
+            try:
+                rows = conn.execute(
+                    "SELECT source, translated FROM translations WHERE target = ? AND backend = ?",
+                    (target, backend)).fetchall()
+            except sqlite3.Error as e:
+                _log.warning("translation cache preload failed: %s", e)
+                return 0
+        # complete only if nothing was evicted while the slice went in, so
+        # every one of its rows is still in memory
+        evictions = self._mem.counters()["evictions"]
+        for source, translated in rows:
+            self._mem.put((target, backend, source), translated)
+        if len(rows) <= self._mem.max_entries and self._mem.counters()["evictions"] == evictions:
+            self._preloaded[(target, backend)] = evictions
+        return len(rows)
+
+    def get_many(self, texts: Iterable[str], target: str = DEFAULT_TARGET,
+                 backend: str = DEFAULT_BACKEND) -> Dict[str, str]:
+        """{text: translation} for every text that is cached; missing texts are absent."""
+        wanted = list(dict.fromkeys(t for t in texts if t))
+        found: Dict[str, str] = {}
+        missing: List[str] = []
+        for t in wanted:
+            value = self._mem.get((target, backend, t))
+            if value is None:
+                missing.append(t)
+            else:
+                found[t] = value
+        if not missing or self._complete(target, backend):
+            return found
+        with self._db_lock:
+            conn = self._open()
+            if conn is None:
+                return found
+            try:
+                for i in range(0, len(missing), _SQL_BATCH):
+                    chunk = missing[i:i + _SQL_BATCH]
+                    rows = conn.execute(
+                        "SELECT source, translated FROM translations "
+                        "WHERE target = ? AND backend = ? AND source IN (%s)"
+                        % ",".join("?" * len(chunk)),
+                        (target, backend, *chunk)).fetchall()
+                    for source, translated in rows:
+                        self._mem.put((target, backend, source), translated)
+                        found[source] = translated
+                    with self._stat_lock:
+                        self._db_hits += len(rows)
+            except sqlite3.Error as e:
+                _log.warning("translation cache lookup failed: %s", e)
+        return found
+
+    def get(self, text: str, target: str = DEFAULT_TARGET,
+            backend: str = DEFAULT_BACKEND) -> Optional[str]:
+        return self.get_many([text], target, backend).get(text)
+
+    def put_many(self, pairs: Iterable[Tuple[str, str]], target: str = DEFAULT_TARGET,
+                 backend: str = DEFAULT_BACKEND) -> None:
+        """Store (source, translation) pairs; empty sources / translations are skipped."""
+        pairs = [(s, t) for s, t in pairs if s and t]
+        if not pairs:
+            return
+        for s, t in pairs:
+            self._mem.put((target, backend, s), t)
+        with self._stat_lock:
+            self._stores += len(pairs)
+        now = time.time()
+        with self._db_lock:
+            conn = self._open()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO translations "
+                        "(source, target, backend, translated, updated_at) VALUES (?, ?, ?, ?, ?)",
+                        [(s, target, backend, t, now) for s, t in pairs])
+            except sqlite3.Error as e:
+                _log.warning("translation cache write failed: %s", e)
+
+    def put(self, text: str, translated: str, target: str = DEFAULT_TARGET,
+            backend: str = DEFAULT_BACKEND) -> None:
+        self.put_many([(text, translated)], target, backend)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Memory hits / misses / evictions, rows found on disk after a memory miss, stores."""
+        out = self._mem.counters()
+        with self._stat_lock:
+            out.update(db_hits=self._db_hits, stores=self._stores)
+        out["entries"] = len(self._mem)
+        return out
+
+    def __len__(self) -> int:
+        with self._db_lock:
+            conn = self._open()
+            if conn is None:
+                return len(self._mem)
+            try:
+                return conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            except sqlite3.Error:
+                return 0
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                except sqlite3.Error:
+                    pass
+            self._conn = None
+
+
+# ---------------------------------------------------------------------------
+# Process-wide cache used by TranslationManager
+# ---------------------------------------------------------------------------
+
+_active: Optional[TranslationCache] = None
+_active_lock = threading.Lock()
+
+
+def _default_path() -> str:
+    from paths import user_data_path
+    return user_data_path("translation_cache.db")
+
+
+def default() -> TranslationCache:
+    """The shared cache, opened lazily at user_data_path('translation_cache.db')."""
+    global _active
+    with _active_lock:
+        if _active is None:
+            _active = TranslationCache(_default_path())
+        return _active
+
+
+def configure(db_path: str) -> TranslationCache:
+    """Switch the shared cache to db_path (tests / custom storage)."""
+    global _active
+    with _active_lock:
+        if _active is not None:
+            _active.close()
+        _active = TranslationCache(db_path)
+        return _active
+
+
+def reset_for_test() -> None:
+    global _active
+    with _active_lock:
+        if _active is not None:
+            _active.close()
+        _active = None
+
+
+def preload_in_background(target: str = DEFAULT_TARGET,
+                          backend: str = DEFAULT_BACKEND) -> threading.Thread:
+    """Start preload() on a daemon thread so app startup never waits on the db."""
+    t = threading.Thread(target=lambda: default().preload(target, backend),
+                         name="translation-cache-preload", daemon=True)
+    t.start()
+    return t
+
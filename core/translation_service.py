@@ -1,118 +1,123 @@
-from deep_translator import GoogleTranslator
-import concurrent.futures
+import threading
+from . import translation_cache
+from .translation_backends import TranslationBackend, default_backends
 from .logging_setup import get_logger
 
 _log = get_logger(__name__)
 
 class TranslationManager:
+    """Translator to English over a chain of pluggable backends.
+
+    Each text goes to the first backend that can translate it (default:
+    the offline option glossary, then batched Google Translate; see
+    core.translation_backends). Results of cacheable backends persist in
+    core.translation_cache, keyed by (text, target, backend), so only
+    texts no backend or cache has seen go to the network. Concurrent
+    callers asking for the same text share one request (SingleFlight).
+    """
     _instance = None
-    _cache = {}
+    _lock = threading.Lock()
+    _flight = translation_cache.SingleFlight()
+    target = translation_cache.DEFAULT_TARGET
 
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(TranslationManager, cls).__new__(cls)
-            cls._instance.translator = GoogleTranslator(source='auto', target='en')
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(TranslationManager, cls).__new__(cls)
+                cls._instance.backends = default_backends()
         return cls._instance
 
+    @property
+    def cache(self):
+        return translation_cache.default()
+
+    def set_backends(self, backends):
+        """Replace the backend chain (tried in order)."""
+        for backend in backends:
+            if not isinstance(backend, TranslationBackend):
+                raise TypeError(f"{backend!r} is not a TranslationBackend")
+        self.backends = list(backends)
+
+    def _translate_shared(self, backend, texts):
+        """{text: translation} from backend, sharing in-flight requests with other threads."""
+        owned, shared = self._flight.claim([(self.target, backend.name, t) for t in texts])
+        owned_texts = [key[2] for key in owned]
+        done = {}
+        try:
+            if owned_texts and backend.cacheable:
+                # another caller may have finished between our cache miss and the claim
+                done = self.cache.get_many(owned_texts, self.target, backend.name)
+                owned_texts = [t for t in owned_texts if t not in done]
+            if owned_texts:
+                try:
+                    translated = backend.translate_batch(owned_texts, self.target)
+                except Exception as e:
+                    _log.warning("Translation backend %s failed: %s", backend.name, e)
+                    translated = [None] * len(owned_texts)
+                new_pairs = [(t, r) for t, r in zip(owned_texts, translated) if r]
+                if backend.cacheable:
+                    self.cache.put_many(new_pairs, self.target, backend.name)
+                done.update(new_pairs)
+        finally:
+            # failures resolve to None so waiters fall through to the next backend
+            for key in owned:
+                self._flight.resolve(key, done.get(key[2]))
+        for key, fut in shared.items():
+            value = fut.result()
+            if value:
+                done[key[2]] = value
+        return done
+
+    def stats(self):
+        """Cache counters plus single-flight sharing, for instrumentation."""
+        out = dict(self.cache.stats)
+        out["shared"] = self._flight.shared
+        out["in_flight"] = self._flight.in_flight()
+        return out
+
     def translate_text(self, text):
         """
-        Translates text to English using Google Translator.
-        Includes basic caching.
+        Translates text to English.
+        Same chain as translate_list; returns the text unchanged if nothing can translate it.
         """
         if not text:
             return ""
-            
-        if text in self._cache:
-            return self._cache[text]
-            
-        try:
-            translated = self.translator.translate(text)
-            self._cache[text] = translated
-            return translated
-        except Exception as e:
-            _log.warning("Translation error for %r: %s", text, e)
-            return text
+        return self.translate_list([text])[0]
 
-    def translate_list(self, text_list, max_workers=3):
+    def translate_list(self, text_list, max_workers=None):
         """
-        Translates a list of strings concurrently.
+        Translates a list of strings; each distinct text is looked up / requested once.
+        Untranslatable texts come back unchanged. max_workers is accepted for
+        old callers; request concurrency now belongs to the backend.
         """
         if not text_list:
             return []
-            
-        # Identify what actually needs translation (not in cache)
-        to_translate = []
-        indices_to_translate = []
-        
+
         results = [""] * len(text_list)
-        
+        positions = {}
         for i, text in enumerate(text_list):
-            if not text:
-                results[i] = ""
-            elif text in self._cache:
-                results[i] = self._cache[text]
-            else:
-                to_translate.append(text)
-                indices_to_translate.append(i)
-        
-        if not to_translate:
-            return results
-            
-        # Execute concurrent requests for missing items
-        # deep-translator's batch mode is sometimes just a loop, 
-        # so using threads here gives us better control over concurrency.
-        # CRITICAL FIX: Create a NEW translator instance for each thread to avoid race conditions
-        # with internal state (which caused the "all ores = platinum_ore" bug).
-        def _translate_worker(text):
-            import time
-            import random
-            
-            retries = 3
-            last_error = None
-            
-            for attempt in range(retries):
-                try:
-                    # Add jitter delay to prevent thundering herd
-                    time.sleep(random.uniform(0.5, 1.5))
-                    
-                    # Create new instance for thread safety
-                    t = GoogleTranslator(source='auto', target='en')
-                    result = t.translate(text)
-                    
-                    # Validate result
-                    if result:
-                        lower_res = result.lower()
-                        # Check for known error signatures returned as text
-                        if "error" in lower_res and ("504" in lower_res or "server" in lower_res or "request" in lower_res):
-                            raise Exception(f"Detected Error Message in response: {result}")
-                            
-                    return result
-                    
-                except Exception as e:
-                    last_error = e
-                    _log.warning("Translation attempt %d/%d failed for %r: %s", attempt + 1, retries, text, e)
-                    # Exponential backoff + Jitter
-                    time.sleep((2 ** attempt) + random.uniform(0, 1))
-            
-            raise last_error
+            if text:
+                positions.setdefault(text, []).append(i)
+        pending = list(positions)
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_index = {
-                executor.submit(_translate_worker, text): idx 
-                for text, idx in zip(to_translate, indices_to_translate)
-            }
-            
-            for future in concurrent.futures.as_completed(future_to_index):
-                idx = future_to_index[future]
-                original_text = text_list[idx]
-                try:
-                    translated = future.result()
-                    self._cache[original_text] = translated
+        for backend in self.backends:
+            if not pending:
+                break
+            found = {}
+            if backend.cacheable:
+                found = self.cache.get_many(pending, self.target, backend.name)
+            misses = [t for t in pending if t not in found]
+            if misses:
+                found.update(self._translate_shared(backend, misses))
+            for text, translated in found.items():
+                for idx in positions[text]:
                     results[idx] = translated
-                except Exception as e:
-                    _log.warning("Batch translation error for %r: %s", original_text, e)
-                    results[idx] = original_text
-                    
+            pending = [t for t in pending if t not in found]
+
+        # Nothing could translate these: fall back to the source text (not cached)
+        for text in pending:
+            for idx in positions[text]:
+                results[idx] = text
         return results
 
 def translate_batch(texts):
@@ -0,0 +1,247 @@
+"""测试用的本地 HTTP 桩：模拟 Gemini :generateContent 与 OpenAI images 接口。
+
+HTTP/1.1 keep-alive；connections 记录服务端 accept 到的 TCP 连接数，
+用来断言客户端是否复用了连接。redirects 里的路径返回 3xx；传 ssl_context 时走 HTTPS。
+StubProxy 是配套的 HTTP 代理：CONNECT 隧道 + absolute-form 转发。
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+PNG_BYTES = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR4nGNgYGD4DwABBAEAwS2OUAAAAABJRU5ErkJggg==")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _redirect(self):
+        target = self.server.redirects.get(urlsplit(self.path).path)
+        if target is None:
+            return False
+        status, location = target
+        self._send(status, b"", "text/plain", headers={"Location": location})
+        return True
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.methods.append("GET")
+        if self._redirect():
+            return
+        if urlsplit(self.path).path.endswith(".png"):
+            self._send(200, self.server.image, "image/png")
+        else:
+            self._send(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.methods.append("POST")
+            self.server.last_body = body
+        if self._redirect():
+            return
+        with self.server.lock:
+            throttled = self.server.throttle > 0
+            if throttled:
+                self.server.throttle -= 1
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        if throttled:
+            self._send(429, {"error": {"code": 429, "message": "Resource has been exhausted",
+                                       "status": "RESOURCE_EXHAUSTED"}},
+                       headers={"Retry-After": self.server.retry_after})
+            return
+        b64 = base64.b64encode(self.server.image).decode("ascii")
+        if ":generateContent" in self.path:
+            self._send(200, {"candidates": [{"content": {"parts": [
+                {"inlineData": {"mimeType": "image/png", "data": b64}}]}}]})
+        elif self.path.endswith("/images/generations") or self.path.endswith("/images/edits"):
+            if self.server.url_mode:
+                host, port = self.server.server_address[:2]
+                self._send(200, {"data": [{"url": f"http://{host}:{port}/out.png"}]})
+            else:
+                self._send(200, {"data": [{"b64_json": b64}]})
+        else:
+            self._send(404, {"error": {"message": "not found"}})
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128    # 默认 5：64 个并发连接同时到达时会被重置
+
+    def __init__(self, url_mode=False, delay=0.0, port=0, throttle=0, retry_after="0",
+                 image=PNG_BYTES, redirects=None, ssl_context=None):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.scheme = "http"
+        if ssl_context is not None:
+            self.socket = ssl_context.wrap_socket(self.socket, server_side=True)
+            self.scheme = "https"
+        self.redirects = dict(redirects or {})   # path -> (status, Location)
+        self.methods = []
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.url_mode = url_mode
+        self.delay = delay
+        self.throttle = throttle          # 前 throttle 个 POST 返回 429
+        self.retry_after = retry_after
+        self.image = image                # 返回的图片字节（测大载荷时换成大图）
+        self.last_body = b""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"{self.scheme}://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+class _ProxyHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            lines.append(line)
+        if not lines:
+            return
+        method, target, _version = lines[0].decode("latin-1").split(" ", 2)
+        headers = [ln.decode("latin-1") for ln in lines[1:]]
+        with self.server.lock:
+            self.server.seen.append(f"{method} {target}")
+            self.server.auth += [h.split(":", 1)[1].strip() for h in headers
+                                 if h.lower().startswith("proxy-authorization:")]
+        if method == "CONNECT":
+            host, port = target.rsplit(":", 1)
+            upstream = socket.create_connection((host, int(port)))
+            self.wfile.write(b"HTTP/1.1 200 Connection established\r\n\r\n")
+        else:
+            url = urlsplit(target)
+            upstream = socket.create_connection((url.hostname, url.port or 80))
+            path = (url.path or "/") + (f"?{url.query}" if url.query else "")
+            kept = "".join(h for h in headers if not h.lower().startswith("proxy-"))
+            upstream.sendall(f"{method} {path} HTTP/1.1\r\n{kept}\r\n".encode("latin-1"))
+        self.wfile.flush()
+        back = threading.Thread(target=self._pump_back, args=(upstream,), daemon=True)
+        back.start()
+        try:
+            while True:
+                piece = self.rfile.read1(65536)
+                if not piece:
+                    break
+                upstream.sendall(piece)
+        except OSError:
+            pass
+        finally:
+            try:
+                upstream.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+            back.join(10)
+            upstream.close()
+
+    def _pump_back(self, upstream):
+        try:
+            while True:
+                piece = upstream.recv(65536)
+                if not piece:
+                    break
+                self.connection.sendall(piece)
+        except OSError:
+            pass
+        finally:
+            try:
+                self.connection.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+
+
+class StubProxy(socketserver.ThreadingTCPServer):
+    """HTTP 代理桩：seen 记录每条连接的请求行（"CONNECT h:p" / "GET http://..."），
+    auth 记录收到的 Proxy-Authorization。"""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _ProxyHandler)
+        self.lock = threading.Lock()
+        self.seen = []
+        self.auth = []
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    """独立进程运行（测客户端线程数时不把服务端线程算进去）：首行输出 base_url。"""
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--delay", type=float, default=0.0)
+    ap.add_argument("--url-mode", action="store_true")
+    ap.add_argument("--image-bytes", type=int, default=0, help="返回 N 字节的随机图片数据")
+    args = ap.parse_args()
+    image = os.urandom(args.image_bytes) if args.image_bytes else PNG_BYTES
+    srv = StubServer(url_mode=args.url_mode, delay=args.delay, image=image)
+    print(srv.base_url, flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""测试用的 rembg 替身：讲与 worker_rembg.py --serve 相同的 stdin/stdout 协议。
+
+不加载模型，只把接近白色的像素变成透明，足以验证 RembgWorkerPool 的调度与字节往返。
+    --fail   每个任务都回错误帧
+    --crash  收到第一个任务后直接退出（模拟 worker 崩溃）
+"""
+import io
+import os
+import struct
+import sys
+
+from PIL import Image
+
+
+def _read_exact(stream, n):
+    buf = b""
+    while len(buf) < n:
+        chunk = stream.read(n - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return buf
+
+
+def _write_frame(stream, status, payload):
+    stream.write(struct.pack(">BI", status, len(payload)))
+    stream.write(payload)
+    stream.flush()
+
+
+def _cut_white(data):
+    img = Image.open(io.BytesIO(data)).convert("RGBA")
+    lum = img.convert("L").point([0 if v >= 240 else 255 for v in range(256)])
+    img.putalpha(lum)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def main():
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+    _write_frame(stdout, 0, b"ready")
+    while True:
+        header = _read_exact(stdin, 4)
+        if header is None:
+            return
+        (length,) = struct.unpack(">I", header)
+        if length == 0:
+            return
+        data = _read_exact(stdin, length)
+        if "--crash" in sys.argv:
+            os._exit(3)
+        if "--fail" in sys.argv:
+            _write_frame(stdout, 1, b"stub failure")
+        else:
+            _write_frame(stdout, 0, _cut_white(data))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""测试 core.b64stream：流式请求体、边收边解码的响应解析，以及大图单次调用的内存峰值。"""
+import asyncio
+import base64
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
+import unittest
+from unittest import mock
+
+from core import b64stream as bs
+from core import gemini_service as gs
+from core import http_pool
+from core import openai_service as oi
+from core.provider_client import AsyncProviderClient
+from tests.stub_http_server import StubServer
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMG = os.urandom(300_001)   # 长度不是 3 的倍数：末尾有 padding
+
+
+def _chunks(raw, size):
+    return (raw[i:i + size] for i in range(0, len(raw), size))
+
+
+class JSONBodyTests(unittest.TestCase):
+    def test_roundtrip_length_and_reiteration(self):
+        body = bs.JSONBody({"parts": [{"data": bs.Base64Blob(IMG)}, {"data": bs.Base64Blob(b"hi")}],
+                            "text": "中文 \x00"})
+        raw = b"".join(body)
+        self.assertEqual(len(raw), len(body))
+        self.assertEqual(raw, b"".join(body))
+        self.assertEqual(json.loads(raw), {"parts": [{"data": base64.b64encode(IMG).decode()},
+                                                     {"data": "aGk="}],
+                                           "text": "中文 \x00"})
+
+    def test_rejects_other_objects(self):
+        with self.assertRaises(TypeError):
+            bs.JSONBody({"x": object()})
+
+
+class DecoderTests(unittest.TestCase):
+    def _gemini_raw(self, text="x"):
+        return json.dumps({"candidates": [{"content": {"parts": [
+            {"text": text},
+            {"inlineData": {"mimeType": "image/webp", "data": base64.b64encode(IMG).decode()}},
+            {"inlineData": {"mimeType": "image/png", "data": "AAAA"}},
+        ]}}]}, indent=1).encode()
+
+    def test_any_chunking(self):
+        raw = self._gemini_raw(text='looks like "data": "AAAA" \\ but is text')
+        for size in (1, 3, 4, 1000, 65536, len(raw)):
+            with self.subTest(size=size):
+                doc, image = bs.decode_stream(_chunks(raw, size), ("data",))
+                self.assertEqual(image, IMG)
+                parts = doc["candidates"][0]["content"]["parts"]
+                self.assertEqual(parts[0]["text"], 'looks like "data": "AAAA" \\ but is text')
+                self.assertEqual(parts[1]["inlineData"], {"mimeType": "image/webp", "data": ""})
+                self.assertEqual(parts[2]["inlineData"]["data"], "")   # 后续同名字段丢弃
+
+    def test_escaped_slashes_and_unpadded(self):
+        b64 = base64.b64encode(IMG).decode().rstrip("=").replace("/", "\\/")
+        raw = ('{"data": [{"b64_json": "' + b64 + '"}]}').encode()
+        for size in (2, 7, 4096):
+            doc, image = bs.decode_stream(_chunks(raw, size), ("b64_json", "b64"))
+            self.assertEqual(image, IMG)
+            self.assertEqual(doc, {"data": [{"b64_json": ""}]})
+
+    def test_no_field(self):
+        doc, image = bs.decode_stream([b'{"data": [{"url": "http://x/a.png"}]}'], ("b64_json",))
+        self.assertIsNone(image)
+        self.assertEqual(doc["data"][0]["url"], "http://x/a.png")
+
+
+class ServiceStreamingTests(unittest.TestCase):
+    def tearDown(self):
+        http_pool.close()
+
+    def test_gemini_reference_image_is_streamed(self):
+        with StubServer(image=IMG) as srv, mock.patch.object(gs, "_get_api_base_url",
+                                                             return_value=srv.base_url):
+            ref = os.urandom(200_000)
+            data, mime = gs.generate_image_bytes("p", "k", reference_images=[(ref, "image/jpeg")])
+            self.assertEqual((data, mime), (IMG, "image/png"))
+            sent = json.loads(srv.last_body)
+            part = sent["contents"][0]["parts"][1]["inline_data"]
+            self.assertEqual(base64.b64decode(part["data"]), ref)
+            self.assertEqual(part["mime_type"], "image/jpeg")
+
+            edited = gs.edit_image_bytes("p", ref, "image/png", "k")
+            self.assertEqual(edited, (IMG, "image/png"))
+
+    def test_openai_sync_and_async(self):
+        with StubServer(image=IMG) as srv:
+            base_url = srv.base_url + "/v1"
+            self.assertEqual(oi.generate_image_bytes("p", "k", model="dall-e-3", base_url=base_url),
+                             (IMG, "image/png"))
+
+            async def main():
+                client = AsyncProviderClient()
+                try:
+                    return await client.generate_many("OpenAI", "p", 3, api_key="k",
+                                                      model="dall-e-3", base_url=base_url)
+                finally:
+                    await client.aclose()
+            self.assertEqual(asyncio.run(main()), [(IMG, "image/png")] * 3)
+
+    def test_async_gemini_with_reference(self):
+        with StubServer(image=IMG) as srv, mock.patch.object(gs, "_get_api_base_url",
+                                                             return_value=srv.base_url):
+            async def main():
+                client = AsyncProviderClient()
+                try:
+                    return await client.generate("Gemini", "p", api_key="k",
+                                                 reference_images=[(IMG, None)])
+                finally:
+                    await client.aclose()
+            self.assertEqual(asyncio.run(main()), (IMG, "image/png"))
+            part = json.loads(srv.last_body)["contents"][0]["parts"][1]["inline_data"]
+            self.assertEqual(base64.b64decode(part["data"]), IMG)
+
+    def test_peak_memory_is_about_one_image(self):
+        n = 4 * 1024 * 1024
+        # 桩服务器放子进程：tracemalloc 只看到客户端这边的分配
+        proc = subprocess.Popen([sys.executable, "-m", "tests.stub_http_server",
+                                 "--image-bytes", str(n)],
+                                cwd=_ROOT, stdout=subprocess.PIPE, text=True)
+        try:
+            base_url = proc.stdout.readline().strip() + "/v1"
+            oi.generate_image_bytes("p", "k", model="dall-e-3", base_url=base_url)   # 预热连接
+            tracemalloc.start()
+            try:
+                data, _mime = oi.generate_image_bytes("p", "k", model="dall-e-3", base_url=base_url)
+                _cur, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        finally:
+            proc.kill()
+            proc.wait()
+            proc.stdout.close()
+        self.assertEqual(len(data), n)
+        # 旧路径约 4 倍图片大小（响应字节 + 文本 + dict 里的 base64 串 + 解码结果）
+        self.assertLess(peak, 1.5 * n)
+
+
+if __name__ == "__main__":
+    unittest.main()
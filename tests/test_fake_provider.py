@@ -0,0 +1,103 @@
+"""测试 benchmarks.fake_provider / bench_batch_load：接口形状、故障注入与压测驱动。"""
+import argparse
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from benchmarks import bench_batch_load as load
+from benchmarks import fake_provider as fp
+from core import gemini_service as gs
+from core import http_pool
+from core import openai_service as oi
+from core import rate_limiter as rl
+
+
+class ProfileTests(unittest.TestCase):
+    def test_seeded_draws_are_reproducible(self):
+        a = fp.Profile(latency=1.0, jitter=0.5, error_rate=0.2, throttle_rate=0.3, seed=7)
+        b = fp.Profile(latency=1.0, jitter=0.5, error_rate=0.2, throttle_rate=0.3, seed=7)
+        draws = [a.draw(n) for n in range(2000)]
+        self.assertEqual(draws, [b.draw(n) for n in range(2000)])
+        outcomes = [o for _d, o in draws]
+        self.assertAlmostEqual(outcomes.count("throttle") / 2000, 0.3, delta=0.05)
+        self.assertAlmostEqual(outcomes.count("error") / 2000, 0.2, delta=0.05)
+        self.assertTrue(all(0.5 <= d <= 1.5 for d, _o in draws))
+
+    def test_throttle_first(self):
+        p = fp.Profile(throttle_first=2)
+        self.assertEqual([p.draw(n)[1] for n in range(4)], ["throttle", "throttle", "ok", "ok"])
+
+    def test_recorded_images_include_cache_entries(self):
+        d = tempfile.mkdtemp()
+        try:
+            os.makedirs(os.path.join(d, "ab"))
+            with open(os.path.join(d, "a.png"), "wb") as f:
+                f.write(b"raw-image")
+            with open(os.path.join(d, "ab", "ab" * 32), "wb") as f:
+                f.write(b'PGRC1 {"mime": "image/png"}\ncached-image')
+            self.assertEqual(fp.load_recorded(d), [b"raw-image", b"cached-image"])
+        finally:
+            shutil.rmtree(d, ignore_errors=True)
+
+
+class ServerShapeTests(unittest.TestCase):
+    def tearDown(self):
+        http_pool.close()
+        rl.reset()
+
+    def test_services_parse_all_endpoints(self):
+        image = os.urandom(5000)
+        with fp.FakeProviderServer(fp.Profile(images=[image])) as srv, \
+                mock.patch.object(gs, "_get_api_base_url", return_value=srv.base_url):
+            base_url = srv.base_url + "/v1"
+            self.assertEqual(gs.generate_image_bytes("p", "k"), (image, "image/png"))
+            self.assertEqual(oi.generate_image_bytes("p", "k", model="dall-e-3", base_url=base_url),
+                             (image, "image/png"))
+            data, _mime = oi.generate_image_bytes("p", "k", model="gpt-image-1", base_url=base_url,
+                                                  reference_images=[(image, "image/png")])
+            self.assertEqual(data, image)
+            self.assertEqual(srv.stats()["ok"], 3)
+
+    def test_injected_errors_are_classified_like_real_ones(self):
+        with fp.FakeProviderServer(fp.Profile(throttle_first=1, error_rate=1.0,
+                                              retry_after="3")) as srv, \
+                mock.patch.object(gs, "_get_api_base_url", return_value=srv.base_url):
+            with self.assertRaises(gs.GeminiError) as ctx:
+                gs.generate_image_bytes("p", "k")
+            self.assertEqual((ctx.exception.status, ctx.exception.retry_after), (429, 3.0))
+            self.assertTrue(ctx.exception.retryable)
+            with self.assertRaises(oi.OpenAIError) as ctx:
+                oi.generate_image_bytes("p", "k", model="dall-e-3", base_url=srv.base_url + "/v1")
+            self.assertEqual(ctx.exception.status, 500)
+            self.assertTrue(ctx.exception.retryable)
+            self.assertEqual(srv.stats()["throttled"], 1)
+            self.assertEqual(srv.stats()["errors"], 1)
+
+
+class LoadDriverTests(unittest.TestCase):
+    def tearDown(self):
+        http_pool.close()
+        rl.reset()
+
+    def _args(self, **kw):
+        args = argparse.Namespace(provider="OpenAI", model=None, count=6, batches=2,
+                                  max_retries=3, base_delay=0.01)
+        vars(args).update(kw)
+        return args
+
+    def test_both_modes_complete_batches_through_429s(self):
+        with fp.FakeProviderServer(fp.Profile(latency=0.02, throttle_first=3, retry_after="0")) as srv:
+            for mode in ("threads", "async"):
+                with self.subTest(mode=mode):
+                    row = load.run_mode(mode, self._args(), srv.base_url)
+                    self.assertEqual((row["ok"], row["failed"]), (12, 0))
+                    self.assertGreater(row["images_per_s"], 0)
+                    self.assertLessEqual(row["p50_s"], row["p95_s"])
+            self.assertEqual(srv.stats()["throttled"], 3)
+            self.assertEqual(srv.stats()["requests"], 27)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""测试 core.http_pool：对本地桩服务器断言连接复用。"""
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from core import gemini_service as gs
+from core import http_pool
+from core import openai_service as oi
+from tests.stub_http_server import PNG_BYTES, StubServer
+
+
+class HttpPoolTests(unittest.TestCase):
+    def setUp(self):
+        http_pool.close()
+
+    def tearDown(self):
+        http_pool.close()
+        http_pool.configure(connect_timeout=http_pool.DEFAULT_CONNECT_TIMEOUT)
+
+    def test_sequential_requests_share_one_connection(self):
+        with StubServer() as srv:
+            for _ in range(10):
+                data, _mime = oi.generate_image_bytes("p", "key", model="dall-e-3",
+                                                      base_url=srv.base_url + "/v1")
+                self.assertEqual(data, PNG_BYTES)
+            self.assertEqual(srv.requests, 10)
+            self.assertEqual(srv.connections, 1)
+
+    def test_url_download_reuses_the_api_connection(self):
+        with StubServer(url_mode=True) as srv:
+            for _ in range(3):
+                data, mime = oi.generate_image_bytes("p", "key", model="dall-e-3",
+                                                     base_url=srv.base_url + "/v1")
+                self.assertEqual((data, mime), (PNG_BYTES, "image/png"))
+            self.assertEqual(srv.requests, 6)
+            self.assertEqual(srv.connections, 1)
+
+    def test_gemini_uses_the_pool(self):
+        with StubServer() as srv, mock.patch.object(gs, "_get_api_base_url",
+                                                    return_value=srv.base_url):
+            for _ in range(4):
+                data, mime = gs.generate_image_bytes("p", "key")
+                self.assertEqual((data, mime), (PNG_BYTES, "image/png"))
+            self.assertEqual(srv.connections, 1)
+
+    def test_concurrent_batches_keep_pool_sized_connections(self):
+        n = 12  # 大于 urllib3 默认的 10
+        http_pool.ensure_pool_size(n)
+
+        def call(_):
+            return oi.generate_image_bytes("p", "key", model="dall-e-3",
+                                           base_url=srv.base_url + "/v1")[0]
+
+        with StubServer() as srv:
+            with ThreadPoolExecutor(max_workers=n) as pool:
+                for _ in range(4):
+                    self.assertEqual(list(pool.map(call, range(n))), [PNG_BYTES] * n)
+            self.assertEqual(srv.requests, 4 * n)
+            self.assertLessEqual(srv.connections, n)
+
+    def test_timeouts(self):
+        self.assertEqual(http_pool.timeouts(90), (http_pool.DEFAULT_CONNECT_TIMEOUT, 90))
+        http_pool.configure(connect_timeout=3, read_timeout=30)
+        self.assertEqual(http_pool.timeouts(480), (3.0, 30.0))
+        http_pool.configure(read_timeout=0)
+        self.assertEqual(http_pool.timeouts(480), (3.0, 480))
+
+
+if __name__ == "__main__":
+    unittest.main()
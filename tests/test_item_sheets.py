@@ -0,0 +1,318 @@
+"""测试 core.item_generator 的多张图标表（超过 64 个物品）：分页、行索引、批量翻译回写、按表切图命名，
+以及翻译缓存的追加日志（journal）与延迟合并。"""
+import csv
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from core import item_generator as ig
+from core import slicer_tool as st
+from tests.sheet_fixtures import make_sheet
+
+
+class _FakeTM:
+    """记录每次 translate_list 的调用；译文 = "en:" + 原文。"""
+
+    def __init__(self):
+        self.calls = []
+
+    def translate_list(self, texts):
+        self.calls.append(list(texts))
+        return ["en:" + t for t in texts]
+
+
+def _write_csv(path, n, cached=(), encoding="utf-8-sig"):
+    with open(path, "w", encoding=encoding, newline="") as f:
+        w = csv.writer(f)
+        for i in range(n):
+            if i == 5:
+                w.writerow(["", "空行会被跳过"])
+            en = f"cached {i}" if i in cached else ""
+            w.writerow([f"物品{i}", f"描述{i}", en, en.replace(" ", "_")])
+
+
+def _read_rows(path):
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return list(csv.reader(f))
+
+
+class SheetPlanTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv = os.path.join(self.tmp.name, "items.csv")
+        _write_csv(self.csv, 150, cached={0, 70})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_read_keeps_first_sheet_cap(self):
+        self.assertEqual(len(ig.read_items_from_csv(self.csv)), ig.TOTAL_ITEMS)
+        self.assertEqual(len(ig.read_items_from_csv(self.csv, limit=None)), 150)
+
+    def test_gbk_csv(self):
+        path = os.path.join(self.tmp.name, "gbk.csv")
+        _write_csv(path, 3, encoding="gbk")
+        self.assertEqual([i["name"] for i in ig.iter_items_from_csv(path)], ["物品0", "物品1", "物品2"])
+
+    def test_pages_and_row_index(self):
+        plan = ig.IconSheetPlan.from_csv(self.csv)
+        self.assertEqual(len(plan), 3)
+        self.assertEqual([len(s) for s in plan.sheets], [64, 64, 22])
+        index = plan.row_index()
+        # 第 5 行之后有一行空名被跳过，CSV 行号比物品序号多 1
+        self.assertEqual(index[0][:7], [0, 1, 2, 3, 4, 6, 7])
+        self.assertEqual(index[1][0], 65)
+        self.assertEqual(index[2][-1], 150)
+
+    def test_small_grid(self):
+        plan = ig.IconSheetPlan.from_csv(self.csv, grid_size=4)
+        self.assertEqual(len(plan), 10)
+        prompt = plan.prompt(9)
+        self.assertIn("in a 4x4 grid layout containing 6 distinct", prompt)
+        self.assertIn("Row 2, Col 2: **物品149** - 描述149", prompt)
+
+    def test_bulk_translation_and_single_write_back(self):
+        plan = ig.IconSheetPlan.from_csv(self.csv)
+        tm = _FakeTM()
+        plan.translate(tm)
+        # 所有表一起：缺名一次，描述一次
+        self.assertEqual(len(tm.calls), 2)
+        self.assertEqual(len(tm.calls[0]), 148)
+        self.assertEqual(len(tm.calls[1]), 150)
+        prompt = plan.prompt(1, translate=True)
+        self.assertIn("Row 1, Col 1: **en:物品64** - en:描述64", prompt)
+        self.assertIn("**cached 70** - en:描述70", prompt)
+        self.assertEqual(len(tm.calls), 2)   # 按需生成，不再翻译
+
+        before = _read_rows(self.csv)
+        with mock.patch.object(ig, "append_csv_cache", wraps=ig.append_csv_cache) as append:
+            self.assertTrue(plan.write_back())
+            self.assertEqual(append.call_count, 1)
+        self.assertEqual(_read_rows(self.csv), before)        # 只追加日志，不重写 CSV
+        again = ig.IconSheetPlan.from_csv(self.csv)
+        self.assertEqual(again.items[-1]["prompt_en"], "en:物品149")
+        self.assertTrue(ig.compact_csv_cache(self.csv))
+        self.assertFalse(os.path.exists(ig.cache_journal_path(self.csv)))
+        rows = _read_rows(self.csv)
+        self.assertEqual(len(rows), 151)                     # 没有截断到 64 行
+        self.assertEqual(rows[5], ["", "空行会被跳过"])       # 未涉及的行原样保留
+        self.assertEqual(rows[150][:3], ["物品149", "描述149", "en:物品149"])
+        self.assertEqual(rows[0][2:], ["cached 0", "cached_0"])
+        self.assertEqual(ig.load_sheet_index(self.csv)["sheets"], plan.row_index())
+
+    def test_single_sheet_translates_and_writes_back_only_that_sheet(self):
+        plan = ig.IconSheetPlan.from_csv(self.csv)
+        tm = _FakeTM()
+        with mock.patch.object(ig.ts, "TranslationManager", return_value=tm):
+            prompt = plan.prompt(1, translate=True)
+            plan.prompt(1, translate=True)
+        self.assertIn("Row 1, Col 1: **en:物品64** - en:描述64", prompt)
+        # 只发第 2 张表：64 条描述，其中 cached 70 不缺名
+        self.assertEqual([len(c) for c in tm.calls], [63, 64])
+        self.assertEqual(tm.calls[1][0], "描述64")
+        self.assertNotIn(0, plan._loaded)                    # 其他表没有读进内存
+        self.assertTrue(plan.write_back())
+        journal = ig._read_journal(self.csv)
+        self.assertEqual(sorted(journal), sorted(r for r in plan.row_index()[1] if r != 71))
+
+    def test_iter_prompts_translates_all_sheets_in_bulk(self):
+        plan = ig.IconSheetPlan.from_csv(self.csv)
+        tm = _FakeTM()
+        with mock.patch.object(ig.ts, "TranslationManager", return_value=tm):
+            prompts = dict(plan.iter_prompts(translate=True))
+        self.assertEqual(len(prompts), 3)
+        # 三张表总共只调两次：缺名一次，描述一次
+        self.assertEqual([len(c) for c in tm.calls], [148, 150])
+        self.assertIn("**en:物品149** - en:描述149", prompts[2])
+        with mock.patch.object(ig, "append_csv_cache", wraps=ig.append_csv_cache) as append:
+            self.assertTrue(plan.write_back())
+            self.assertEqual(append.call_count, 1)
+
+    def test_sheets_in_order_read_csv_once_more(self):
+        with mock.patch.object(ig, "_detect_encoding", wraps=ig._detect_encoding) as enc, \
+             mock.patch.object(ig, "_read_journal", wraps=ig._read_journal) as journal, \
+             mock.patch.object(ig.csv, "reader", wraps=csv.reader) as reader:
+            plan = ig.IconSheetPlan.from_csv(self.csv, grid_size=4)
+            prompts = [p for _, p in plan.iter_prompts()]
+        self.assertEqual(len(prompts), 10)
+        self.assertEqual((enc.call_count, journal.call_count), (1, 1))
+        self.assertEqual(reader.call_count, 2)    # 统计行号一遍 + 按顺序取表一遍
+        self.assertIsNone(plan._reader)           # 读完最后一张表就关闭文件
+        # 回头取前面的表会重新开始读，结果不变
+        self.assertEqual(plan.prompt(0), ig.IconSheetPlan.from_csv(self.csv, grid_size=4).prompt(0))
+
+    def test_items_by_sheet_single_pass(self):
+        with mock.patch.object(ig.csv, "reader", wraps=csv.reader) as reader:
+            by_sheet = ig.items_by_sheet(self.csv, [2, 0, 7])
+        self.assertEqual(reader.call_count, 1)
+        self.assertEqual(sorted(by_sheet), [0, 2, 7])
+        self.assertEqual(by_sheet[7], [])
+        self.assertEqual(by_sheet[2], ig.sheet_items(self.csv, 2))
+        self.assertEqual(by_sheet[0][0]["name"], "物品0")
+
+    def test_first_sheet_prompt_matches_legacy(self):
+        plan = ig.IconSheetPlan.from_csv(self.csv)
+        legacy = ig.generate_icon_grid_prompt(ig.read_items_from_csv(self.csv))
+        self.assertEqual(plan.prompt(0), legacy)
+
+    def test_legacy_prompt_write_back_keeps_other_rows(self):
+        items = ig.read_items_from_csv(self.csv)
+        with mock.patch.object(ig.ts, "TranslationManager", _FakeTM):
+            ig.generate_icon_grid_prompt(items, translate=True, cache_path=self.csv)
+        ig.compact_csv_cache(self.csv)
+        rows = _read_rows(self.csv)
+        self.assertEqual(len(rows), 151)
+        self.assertEqual(rows[1][2], "en:物品1")
+        self.assertEqual(rows[100][2], "")
+
+    def test_sheet_items_follow_saved_index(self):
+        plan = ig.IconSheetPlan.from_csv(self.csv)
+        plan.save_index()
+        self.assertEqual([i["row"] for i in ig.sheet_items(self.csv, 1)], plan.row_index()[1])
+        self.assertEqual(ig.sheet_items(self.csv, 3), [])
+        os.remove(ig.sheet_index_path(self.csv))
+        self.assertEqual(ig.sheet_items(self.csv, 2, per_sheet=64)[0]["name"], "物品128")
+
+
+class SlicerSheetNamingTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv = os.path.join(self.tmp.name, "items.csv")
+        _write_csv(self.csv, 40)
+        ig.IconSheetPlan.from_csv(self.csv, grid_size=4).save_index()
+        self.png = make_sheet(os.path.join(self.tmp.name, "s.png"), 4, 4, cell=32)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_iter_slices_uses_sheet_rows(self):
+        out = os.path.join(self.tmp.name, "out")
+        tm = _FakeTM()
+        with mock.patch.object(st.ts, "TranslationManager", return_value=tm):
+            gen = st.iter_slices(self.png, 4, 4, out, self.csv, translate_mode=True,
+                                 write=False, csv_sheet=1)
+            names = [c.filename for c in gen]
+        self.assertEqual(names[0], "en物品16.png")
+        self.assertEqual(len(tm.calls), 1)
+        self.assertEqual(ig.sheet_items(self.csv, 1)[0]["file_en"], "en物品16")
+        ig.compact_csv_cache(self.csv)
+        rows = _read_rows(self.csv)
+        self.assertEqual(len(rows), 41)
+        self.assertEqual(rows[17][3], "en物品16")     # 第 5 行后多一行空名
+        self.assertEqual(rows[2][3], "")
+
+    def test_parallel_translates_all_sheets_once(self):
+        tm = _FakeTM()
+        with mock.patch.object(st.ts, "TranslationManager", return_value=tm):
+            by_sheet, warning = st._load_sheet_filenames(self.csv, True, True, [0, 1, 2], 16)
+        self.assertEqual(warning, "")
+        self.assertEqual(len(tm.calls), 1)
+        self.assertEqual(len(tm.calls[0]), 40)
+        self.assertEqual([len(by_sheet[s]) for s in (0, 1, 2)], [16, 16, 8])
+        self.assertEqual(by_sheet[2][0], "en物品32")
+        with open(ig.cache_journal_path(self.csv), encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 40)
+
+
+class CacheJournalTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv = os.path.join(self.tmp.name, "items.csv")
+        _write_csv(self.csv, 10)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _items(self):
+        return list(ig.iter_items_from_csv(self.csv))
+
+    def _journal(self):
+        return ig.cache_journal_path(self.csv)
+
+    def test_last_entry_wins_and_columns_merge(self):
+        items = self._items()
+        items[0]["prompt_en"] = "first"
+        ig.append_csv_cache(self.csv, [items[0]])
+        items[0].update(prompt_en="", file_en="ore")
+        ig.append_csv_cache(self.csv, [items[0]])
+        items[0]["prompt_en"] = "second"
+        ig.append_csv_cache(self.csv, [items[0]])
+        got = self._items()[0]
+        self.assertEqual((got["prompt_en"], got["file_en"]), ("second", "ore"))
+
+    def test_torn_line_and_renamed_row_are_ignored(self):
+        items = self._items()
+        items[1]["prompt_en"] = "one"
+        items[2]["prompt_en"] = "two"
+        ig.append_csv_cache(self.csv, items[1:3])
+        with open(self._journal(), "a", encoding="utf-8") as f:
+            f.write('{"row": 1, "name": "物品1", "prompt_')
+        # 有人在 Excel 里改了第 2 行的名字：旧译文不再适用
+        rows = _read_rows(self.csv)
+        rows[2][0] = "改名了"
+        with open(self.csv, "w", encoding="utf-8-sig", newline="") as f:
+            csv.writer(f).writerows(rows)
+        got = self._items()
+        self.assertEqual(got[1]["prompt_en"], "one")
+        self.assertEqual(got[2]["prompt_en"], "")
+        self.assertTrue(ig.compact_csv_cache(self.csv))
+        self.assertEqual(_read_rows(self.csv)[2], ["改名了", "描述2", "", ""])
+
+    def test_concurrent_appends_are_all_kept(self):
+        items = self._items()
+
+        def run(k):
+            for item in items:
+                ig.append_csv_cache(self.csv, [dict(item, file_en=f"t{k}_{item['row']}")],
+                                    compact=False)
+
+        threads = [threading.Thread(target=run, args=(k,)) for k in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        with open(self._journal(), encoding="utf-8") as f:
+            lines = f.readlines()
+        self.assertEqual(len(lines), 8 * len(items))
+        self.assertTrue(all(line.endswith("}\n") for line in lines))
+
+    def test_compacts_lazily_past_threshold(self):
+        items = self._items()
+        with mock.patch.object(ig, "JOURNAL_COMPACT_BYTES", 600), \
+                mock.patch.object(ig, "update_csv_rows", wraps=ig.update_csv_rows) as update:
+            for i, item in enumerate(items):
+                item["prompt_en"] = f"en{i}"
+                ig.append_csv_cache(self.csv, [item])
+            self.assertEqual(update.call_count, 1)
+        self.assertEqual(_read_rows(self.csv)[1][2], "en1")
+        self.assertEqual([i["prompt_en"] for i in self._items()], [f"en{i}" for i in range(10)])
+
+    def test_failed_compaction_keeps_entries(self):
+        items = self._items()
+        items[3]["file_en"] = "kept"
+        ig.append_csv_cache(self.csv, [items[3]])
+        with mock.patch.object(ig, "update_csv_rows", return_value=False):
+            self.assertFalse(ig.compact_csv_cache(self.csv))
+        items[4]["file_en"] = "later"
+        ig.append_csv_cache(self.csv, [items[4]])
+        got = self._items()
+        self.assertEqual((got[3]["file_en"], got[4]["file_en"]), ("kept", "later"))
+        self.assertTrue(ig.compact_csv_cache(self.csv))
+        self.assertEqual(os.listdir(self.tmp.name), ["items.csv"])
+        rows = _read_rows(self.csv)
+        self.assertEqual((rows[3][3], rows[4][3]), ("kept", "later"))
+
+    def test_held_lock_defers_compaction(self):
+        items = self._items()
+        items[0]["prompt_en"] = "x"
+        ig.append_csv_cache(self.csv, [items[0]])
+        open(self._journal() + ".lock", "w").close()
+        self.assertFalse(ig.compact_csv_cache(self.csv))
+        self.assertEqual(self._items()[0]["prompt_en"], "x")
+        self.assertEqual(_read_rows(self.csv)[0][2], "")
+
+
+if __name__ == "__main__":
+    unittest.main()
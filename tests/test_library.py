@@ -1,7 +1,10 @@
 """测试 core.library。每个 case 用独立 tmp 目录的 SQLite，互不影响。"""
 import os
+import sqlite3
 import tempfile
+import threading
 import unittest
+from unittest import mock
 
 from core import library
 
@@ -81,6 +84,133 @@ class LibraryTests(unittest.TestCase):
         rows = library.list_entries(keyword="hero")
         self.assertEqual(len(rows), 2)
 
+    def test_filter_by_tags_and_or(self):
+        a = library.add_entry(generator_type="x", prompt="a", tags=["hero", "wip"])
+        b = library.add_entry(generator_type="x", prompt="b", tags=["hero"])
+        c = library.add_entry(generator_type="x", prompt="c", tags=["wip", "boss"])
+        ids = lambda rows: sorted(r.id for r in rows)
+        self.assertEqual(ids(library.list_entries(tags=["hero", "wip"])), [a])
+        self.assertEqual(ids(library.list_entries(tags=["hero", "boss"], tag_mode="any")), [a, b, c])
+        self.assertEqual(ids(library.list_entries(tag="wip", tags=["boss"])), [c])
+        self.assertEqual(ids(library.list_entries(tag="HERO")), [a, b])   # 与旧 LIKE 一样不分大小写
+        self.assertEqual(library.list_entries(tags=["hero", "nope"]), [])
+        # 命中多时 OR 改为逐行点查，结果相同
+        with mock.patch.object(library, "_ANY_TAG_MATERIALIZE", 0):
+            self.assertEqual(ids(library.list_entries(tags=["hero", "boss"], tag_mode="any")),
+                             [a, b, c])
+
+    def test_tag_counts_follow_updates_and_deletes(self):
+        a = library.add_entry(generator_type="x", prompt="a", tags=["hero", "wip"])
+        b = library.add_entry(generator_type="x", prompt="b", tags=["hero", " hero ", "Hero"])
+        self.assertEqual(library.get_entry(b).tags, ["hero"])
+        self.assertEqual(library.tag_counts(), {"hero": 2, "wip": 1})
+        library.update_tags(a, ["boss"])
+        self.assertEqual(library.tag_counts(), {"hero": 1, "boss": 1})
+        library.delete_entry(b)
+        self.assertEqual(library.tag_counts(), {"boss": 1})
+        self.assertEqual(library.all_tags(), ["boss"])
+
+    def test_comma_inside_tag_is_split(self):
+        rid = library.add_entry(generator_type="x", prompt="a", tags=["a,b"])
+        self.assertEqual(library.get_entry(rid).tags, ["a", "b"])
+        self.assertEqual(len(library.list_entries(tag="b")), 1)
+
+    def test_update_tags_is_atomic(self):
+        rid = library.add_entry(generator_type="x", prompt="a", tags=["old"])
+        conn = library._open()
+        conn.execute("CREATE TEMP TRIGGER boom BEFORE INSERT ON asset_tags WHEN new.tag = 'boom' "
+                     "BEGIN SELECT RAISE(ABORT, 'boom'); END")
+        self.assertFalse(library.update_tags(rid, ["new", "boom"]))
+        self.assertEqual(library.get_entry(rid).tags, ["old"])
+        self.assertEqual([r.id for r in library.list_entries(tag="old")], [rid])
+        self.assertEqual(library.tag_counts(), {"old": 1})
+
+    # --- 全文索引 ---
+
+    def test_keyword_prefix_and_phrase(self):
+        library.add_entry(generator_type="x", prompt="armored enemy unit")
+        library.add_entry(generator_type="x", prompt="enemy armored unit")
+        self.assertEqual(len(library.list_entries(keyword="armor")), 2)
+        rows = library.list_entries(keyword="armored ene")
+        self.assertEqual([r.prompt for r in rows], ["armored enemy unit"])
+        self.assertEqual(library.list_entries(keyword="Armored  Enemy"), rows)
+
+    def test_relevance_order(self):
+        weak = library.add_entry(generator_type="x", prompt="a long prompt that mentions dragon once " * 5)
+        strong = library.add_entry(generator_type="x", prompt="b", tags=["dragon"])
+        newest = library.add_entry(generator_type="x", prompt="unrelated")
+        self.assertEqual([r.id for r in library.list_entries(keyword="dragon")], [strong, weak])
+        self.assertEqual([r.id for r in library.list_entries(keyword="dragon", order="relevance")],
+                         [strong, weak])
+        self.assertNotIn(newest, [r.id for r in library.list_entries(keyword="dragon")])
+
+    def test_index_follows_update_and_delete(self):
+        rid = library.add_entry(generator_type="x", prompt="alpha")
+        library.update_notes(rid, "beta note")
+        library.update_tags(rid, ["gamma"])
+        self.assertEqual(len(library.list_entries(keyword="alpha")), 1)
+        self.assertEqual(len(library.list_entries(keyword="beta")), 1)
+        self.assertEqual(len(library.list_entries(keyword="gamma")), 1)
+        library.update_tags(rid, ["delta"])
+        self.assertEqual(library.list_entries(keyword="gamma"), [])
+        library.delete_entry(rid)
+        self.assertEqual(library.list_entries(keyword="alpha"), [])
+
+    def test_keyword_is_not_fts_syntax(self):
+        library.add_entry(generator_type="x", prompt='say "hi" OR NOT')
+        self.assertEqual(len(library.list_entries(keyword='"hi" OR')), 1)
+        self.assertEqual(len(library.list_entries(keyword="NOT*")), 1)
+        self.assertEqual(library.list_entries(keyword="***"), [])
+
+    def test_cjk_keyword_falls_back_to_substring(self):
+        library.add_entry(generator_type="x", prompt="一把生锈的铁剑", notes="")
+        self.assertEqual(len(library.list_entries(keyword="铁剑")), 1)
+
+    def test_filters_combine_with_keyword(self):
+        library.add_entry(generator_type="a", prompt="ship hull", rating=5)
+        library.add_entry(generator_type="b", prompt="ship deck", rating=1)
+        rows = library.list_entries(keyword="ship", generator_type="a", min_rating=3)
+        self.assertEqual([r.prompt for r in rows], ["ship hull"])
+
+    # --- 翻页 / 轻量投影 ---
+
+    def _pages(self, size, **kwargs):
+        pages, after = [], None
+        while True:
+            page = library.list_entries(limit=size, after=after, **kwargs)
+            if not page:
+                return pages
+            pages.append([e.id for e in page])
+            after = page[-1].cursor
+
+    def test_keyset_pages_match_offset_pages(self):
+        # 同一秒里插入：created_at 大量相同，靠 id 区分先后
+        for i in range(7):
+            library.add_entry(generator_type="a" if i % 2 else "b", prompt=f"ship {i}",
+                              tags=["t"] if i % 3 else [])
+        for kwargs in ({}, {"generator_type": "a"}, {"keyword": "ship"}, {"tag": "t"}):
+            with self.subTest(**kwargs):
+                full = [e.id for e in library.list_entries(**kwargs)]
+                self.assertEqual(sum(self._pages(2, **kwargs), []), full)
+                by_offset = [library.list_entries(limit=2, offset=o, **kwargs) for o in range(0, len(full), 2)]
+                self.assertEqual(self._pages(2, **kwargs), [[e.id for e in p] for p in by_offset])
+
+    def test_light_projection(self):
+        rid = library.add_entry(generator_type="x", params={"seed": 1}, prompt="p" * 5000,
+                                notes="n" * 300, tags=["a", "b"], rating=3)
+        e = library.list_entries(light=True)[0]
+        self.assertTrue(e.partial)
+        self.assertEqual(e.params, {})
+        self.assertEqual(len(e.prompt), library.PREVIEW_CHARS)
+        self.assertEqual(len(e.notes), library.PREVIEW_CHARS)
+        self.assertEqual((e.id, e.tags, e.rating), (rid, ["a", "b"], 3))
+        full = library.get_entry(rid)
+        self.assertFalse(full.partial)
+        self.assertEqual(full.params, {"seed": 1})
+        self.assertEqual(len(full.prompt), 5000)
+        self.assertEqual(e, full.__class__(**{**full.__dict__, "params": {}, "prompt": e.prompt,
+                                              "notes": e.notes}))
+
     # --- update ---
 
     def test_update_rating_clamps_to_0_5(self):
@@ -132,5 +262,221 @@ class LibraryTests(unittest.TestCase):
         self.assertEqual(e.rating, 0)
 
 
+class ConcurrencyTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        library.configure(os.path.join(self.tmp.name, "test.db"))
+
+    def tearDown(self):
+        library.reset_for_test()
+        self.tmp.cleanup()
+
+    def _in_thread(self, fn):
+        out = []
+        t = threading.Thread(target=lambda: out.append(fn()))
+        t.start()
+        t.join(10)
+        self.assertFalse(t.is_alive())
+        return out[0]
+
+    def test_wal_mode(self):
+        conn = library._open()
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    def test_reads_do_not_wait_for_writer(self):
+        rid = library.add_entry(generator_type="x", prompt="a", tags=["t"])
+        held, release = threading.Event(), threading.Event()
+
+        def slow_writer():
+            # 模拟一次很慢的 add_entry：拿着写锁、事务未提交
+            with library._LOCK:
+                conn = library._open()
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("INSERT INTO assets (created_at, generator_type) VALUES ('z', 'x')")
+                held.set()
+                release.wait(10)
+                conn.rollback()
+        writer = threading.Thread(target=slow_writer)
+        writer.start()
+        try:
+            self.assertTrue(held.wait(10))
+            # 读在别的线程上（首次打开读连接），写锁被占着也要立即返回，且看不到未提交的行
+            got = self._in_thread(lambda: ([e.id for e in library.list_entries()],
+                                           library.get_entry(rid).prompt, library.count(),
+                                           library.tag_counts()))
+            self.assertEqual(got, ([rid], "a", 1, {"t": 1}))
+        finally:
+            release.set()
+            writer.join(10)
+
+    def test_readers_see_commits_from_other_threads(self):
+        self.assertEqual(library.count(), 0)
+        rid = self._in_thread(lambda: library.add_entry(generator_type="x", prompt="b"))
+        self.assertEqual([e.id for e in library.list_entries()], [rid])
+        self._in_thread(lambda: library.update_rating(rid, 5))
+        self.assertEqual(library.get_entry(rid).rating, 5)
+
+    def test_reader_connections_are_per_thread_and_reclaimed(self):
+        main = library._reader()
+        self.assertIs(library._reader(), main)
+        other = self._in_thread(library._reader)
+        self.assertIsNot(other, main)
+        self._in_thread(library._reader)   # 打开新连接时关掉已结束线程的
+        self.assertEqual(len(library._READERS), 2)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            other.execute("SELECT 1")
+        with self.assertRaises(sqlite3.OperationalError):
+            main.execute("DELETE FROM assets")   # 读连接是只读的
+
+
+class WriteQueueTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        library.configure(os.path.join(self.tmp.name, "test.db"))
+
+    def tearDown(self):
+        library.reset_for_test()
+        self.tmp.cleanup()
+
+    def test_add_entries_one_transaction(self):
+        commits = []
+        conn = library._open()
+        conn.set_trace_callback(lambda sql: commits.append(sql) if sql == "COMMIT" else None)
+        ids = library.add_entries([{"generator_type": "x", "prompt": f"p{i}", "tags": ["t"]}
+                                   for i in range(5)])
+        conn.set_trace_callback(None)
+        self.assertEqual(len(commits), 1)
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual([e.prompt for e in library.list_entries()], [f"p{i}" for i in range(4, -1, -1)])
+        self.assertEqual(library.tag_counts(), {"t": 5})
+        self.assertEqual(library.add_entries([]), [])
+
+    def test_add_entries_bad_row_does_not_lose_batch(self):
+        with self.assertLogs("core.library", level="WARNING"):
+            ids = library.add_entries([{"generator_type": "x"}, {"generator_type": None},
+                                       {"generator_type": "y"}])
+        self.assertIsNone(ids[1])
+        self.assertEqual([e.id for e in library.list_entries()], [ids[2], ids[0]])
+
+    def test_queue_coalesces_and_flushes(self):
+        with mock.patch.object(library, "_write_rows", wraps=library._write_rows) as spy:
+            for i in range(64):
+                library.queue_entry(generator_type="slicer", prompt=f"cell {i}", tags=["batch"])
+            self.assertTrue(library.flush(10))
+        self.assertEqual(library.count(), 64)
+        self.assertEqual(library.tag_counts(), {"batch": 64})
+        # 64 条合并成少数几次提交，而不是 64 次
+        self.assertLessEqual(spy.call_count, 4)
+        self.assertEqual(sum(len(c.args[0]) for c in spy.call_args_list), 64)
+
+    def test_queue_failure_warns_never_raises(self):
+        library._open().execute("CREATE TEMP TRIGGER boom BEFORE INSERT ON assets "
+                                "BEGIN SELECT RAISE(ABORT, 'boom'); END")
+        with self.assertLogs("core.library", level="WARNING"):
+            library.queue_entry(generator_type="x")
+            self.assertTrue(library.flush(10))
+        self.assertEqual(library.count(), 0)
+        with self.assertRaises(TypeError):
+            library.queue_entry(generator_type="x", colour="red")   # 参数错误在调用处报
+
+    def test_queue_bad_entry_raises_at_call_site(self):
+        library.queue_entry(generator_type="x", prompt="a")
+        with self.assertRaises(TypeError):
+            library.queue_entry(generator_type="x", params={"bad": object()})
+        with self.assertRaises(ValueError):
+            library.queue_entry(generator_type="x", rating="five")
+        library.queue_entry(generator_type="x", prompt="b")
+        self.assertTrue(library.flush(10))
+        self.assertEqual([e.prompt for e in library.list_entries()], ["b", "a"])
+
+    def test_unexpected_error_costs_only_that_entry(self):
+        insert = library._insert
+
+        def flaky(conn, values, tags):
+            if values[2] == "bad":
+                raise RuntimeError("boom")
+            return insert(conn, values, tags)
+        with mock.patch.object(library, "_insert", side_effect=flaky), \
+                self.assertLogs("core.library", level="WARNING") as logs:
+            for prompt in ("a", "bad", "c"):
+                library.queue_entry(generator_type="x", prompt=prompt)
+            self.assertTrue(library.flush(10))
+        self.assertEqual([e.prompt for e in library.list_entries()], ["c", "a"])
+        self.assertTrue(any("skipped entry" in line for line in logs.output))
+
+    def test_reset_flushes_pending(self):
+        path = library.get_db_path()
+        library.queue_entry(generator_type="x", prompt="late")
+        library.reset_for_test()
+        library.configure(path)
+        self.assertEqual([e.prompt for e in library.list_entries()], ["late"])
+
+
+class MigrationTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, "old.db")
+
+    def tearDown(self):
+        library.reset_for_test()
+        self.tmp.cleanup()
+
+    def test_existing_database_is_indexed(self):
+        # 旧版本建的库：只有 assets 表，user_version = 0
+        conn = sqlite3.connect(self.db)
+        conn.executescript(library._SCHEMA)
+        conn.executemany(
+            "INSERT INTO assets (created_at, generator_type, prompt, tags) VALUES (?, ?, ?, ?)",
+            [(f"2024-01-0{i + 1}T00:00:00+00:00", "x", f"legacy prompt {i}", "old")
+             for i in range(3)])
+        conn.commit()
+        conn.close()
+
+        library.configure(self.db)
+        self.assertEqual(len(library.list_entries(keyword="legacy")), 3)
+        library.add_entry(generator_type="x", prompt="legacy new")
+        self.assertEqual(len(library.list_entries(keyword="legacy")), 4)
+        library.reset_for_test()
+
+        conn = sqlite3.connect(self.db)
+        self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], library.SCHEMA_VERSION)
+        conn.close()
+        library.configure(self.db)   # 再次打开不重复回填
+        self.assertEqual(len(library.list_entries(keyword="legacy")), 4)
+
+    def test_existing_tags_are_normalized(self):
+        conn = sqlite3.connect(self.db)
+        conn.executescript(library._SCHEMA)
+        conn.executemany(
+            "INSERT INTO assets (created_at, generator_type, tags) VALUES (?, ?, ?)",
+            [("2024-01-01T00:00:00+00:00", "x", "hero, wip"),
+             ("2024-01-02T00:00:00+00:00", "x", "hero,,boss"),
+             ("2024-01-03T00:00:00+00:00", "x", "")])
+        conn.commit()
+        conn.close()
+        library.configure(self.db)
+        self.assertEqual(library.tag_counts(), {"hero": 2, "wip": 1, "boss": 1})
+        self.assertEqual(len(library.list_entries(tags=["hero", "boss"])), 1)
+
+    def test_without_fts5_falls_back_to_like(self):
+        with mock.patch.object(library, "_FTS_SCHEMA", "CREATE VIRTUAL TABLE t USING no_such_module;"):
+            library.configure(self.db)
+        library.add_entry(generator_type="x", prompt="superhero")
+        self.assertEqual(len(library.list_entries(keyword="hero")), 1)   # 子串匹配
+        conn = sqlite3.connect(self.db)
+        self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], 0)
+        conn.close()
+        # 后面的迁移照常执行
+        library.add_entry(generator_type="x", prompt="p", tags=["t"])
+        self.assertEqual(library.tag_counts(), {"t": 1})
+        library.reset_for_test()
+        library.configure(self.db)   # 这次有 FTS5：补上索引并升到最新版本
+        self.assertEqual(len(library.list_entries(keyword="superhero")), 1)
+        self.assertEqual(library.tag_counts(), {"t": 1})
+        conn = sqlite3.connect(self.db)
+        self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], library.SCHEMA_VERSION)
+        conn.close()
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,89 @@
+"""测试 core.png_writer：编码预设与后台写出线程池。"""
+import io
+import os
+import tempfile
+import unittest
+
+from PIL import Image
+
+from core import png_writer as pw
+from core import slicer_tool as st
+
+
+def _flat_art():
+    img = Image.new("RGBA", (48, 48), (0, 0, 0, 0))
+    img.paste((200, 40, 40, 255), (8, 8, 40, 40))
+    img.paste((20, 160, 60, 255), (16, 16, 32, 32))
+    return img
+
+
+def _noisy():
+    img = Image.effect_noise((64, 64), 80).convert("RGB")
+    return img
+
+
+class EncodePresetTests(unittest.TestCase):
+    def test_balanced_matches_plain_save(self):
+        img = _noisy()
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        self.assertEqual(pw.encode_png(img, "balanced"), buf.getvalue())
+
+    def test_unknown_preset_falls_back_to_balanced(self):
+        img = _noisy()
+        self.assertEqual(pw.encode_png(img, "nope"), pw.encode_png(img, "balanced"))
+
+    def test_every_preset_is_lossless(self):
+        for img in (_flat_art(), _noisy()):
+            for preset in pw.PRESET_NAMES:
+                with self.subTest(mode=img.mode, preset=preset):
+                    out = Image.open(io.BytesIO(pw.encode_png(img, preset))).convert(img.mode)
+                    self.assertEqual(out.tobytes(), img.tobytes())
+
+    def test_small_palettizes_flat_art(self):
+        img = _flat_art()
+        small = pw.encode_png(img, "small")
+        self.assertEqual(Image.open(io.BytesIO(small)).mode, "P")
+        self.assertLess(len(small), len(pw.encode_png(img, "fast")))
+
+
+class PngWriterTests(unittest.TestCase):
+    def test_writes_files_and_counts_stats(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = pw.PngWriter("fast", max_workers=2)
+            with writer:
+                for i in range(10):
+                    writer.submit(_flat_art(), os.path.join(tmp, f"{i}.png"))
+                writer.submit_bytes(pw.encode_png(_noisy()), os.path.join(tmp, "raw.png"))
+            self.assertEqual(len(os.listdir(tmp)), 11)
+            self.assertEqual(writer.stats["files"], 11)
+            total = sum(os.path.getsize(os.path.join(tmp, n)) for n in os.listdir(tmp))
+            self.assertEqual(writer.stats["bytes"], total)
+
+    def test_write_failure_is_raised_on_close(self):
+        writer = pw.PngWriter()
+        writer.submit(_flat_art(), os.path.join(tempfile.gettempdir(), "missing_dir_x", "a.png"))
+        with self.assertRaises(OSError):
+            writer.close()
+
+    def test_slice_image_presets_decode_identically(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            sheet = os.path.join(tmp, "sheet.png")
+            img = Image.new("RGB", (64, 64), "white")
+            img.paste((30, 60, 90), (4, 4, 28, 28))
+            img.paste((200, 10, 10), (36, 36, 60, 60))
+            img.save(sheet)
+            decoded = {}
+            for preset in pw.PRESET_NAMES:
+                out = os.path.join(tmp, preset)
+                ok, msg, count = st.slice_image(sheet, 2, 2, output_dir=out, png_preset=preset)
+                self.assertTrue(ok, msg)
+                self.assertEqual(count, 4)
+                decoded[preset] = [Image.open(os.path.join(out, n)).convert("RGB").tobytes()
+                                   for n in sorted(os.listdir(out))]
+            self.assertEqual(decoded["fast"], decoded["balanced"])
+            self.assertEqual(decoded["small"], decoded["balanced"])
+
+
+if __name__ == "__main__":
+    unittest.main()
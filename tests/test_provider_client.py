@@ -0,0 +1,299 @@
+"""测试 core.provider_client / core.async_http：并发上限、取消、代理与重定向，以及 64 路在途请求的线程数与内存。"""
+import asyncio
+import os
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import unittest
+from unittest import mock
+
+from core import gemini_service as gs
+from core import openai_service as oi
+from core.async_http import AsyncHTTPClient, TransportError
+from core.provider_client import AsyncProviderClient
+from tests.stub_http_server import PNG_BYTES, StubProxy, StubServer
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _ServerProcess:
+    """桩服务器放在子进程里，测试进程的线程数只反映客户端。"""
+
+    def __init__(self, *flags):
+        self.proc = subprocess.Popen([sys.executable, "-m", "tests.stub_http_server", *flags],
+                                     cwd=_ROOT, stdout=subprocess.PIPE, text=True)
+        self.base_url = self.proc.stdout.readline().strip()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.proc.kill()
+        self.proc.wait()
+        self.proc.stdout.close()
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+class AsyncProviderClientTests(unittest.TestCase):
+    def test_openai_b64_and_url_responses(self):
+        for url_mode in (False, True):
+            with self.subTest(url_mode=url_mode), StubServer(url_mode=url_mode) as srv:
+                async def main():
+                    client = AsyncProviderClient()
+                    try:
+                        out = [await client.generate("OpenAI", "p", api_key="k",
+                                                     model="dall-e-3",
+                                                     base_url=srv.base_url + "/v1")
+                               for _ in range(3)]
+                        return out, client.http.connections_opened
+                    finally:
+                        await client.aclose()
+                out, opened = _run(main())
+                self.assertEqual(out, [(PNG_BYTES, "image/png")] * 3)
+                self.assertEqual((opened, srv.connections), (1, 1))
+
+    def test_openai_references_use_multipart_edits(self):
+        with StubServer() as srv:
+            async def main():
+                client = AsyncProviderClient()
+                try:
+                    return await client.generate(
+                        "OpenAI", "p", api_key="k", model="gpt-image-1",
+                        base_url=srv.base_url + "/v1",
+                        reference_images=[(PNG_BYTES, "image/png"), (PNG_BYTES, None)])
+                finally:
+                    await client.aclose()
+            self.assertEqual(_run(main()), (PNG_BYTES, "image/png"))
+
+    def test_gemini_and_error_mapping(self):
+        with StubServer() as srv, mock.patch.object(gs, "_get_api_base_url",
+                                                    return_value=srv.base_url):
+            async def main():
+                client = AsyncProviderClient()
+                try:
+                    ok = await client.generate("Gemini", "p", api_key="k")
+                    with self.assertRaises(gs.GeminiError):
+                        await client.generate("Gemini", "p", api_key="")
+                    return ok
+                finally:
+                    await client.aclose()
+            self.assertEqual(_run(main()), (PNG_BYTES, "image/png"))
+
+    def test_unreachable_host_raises_provider_error(self):
+        async def main():
+            client = AsyncProviderClient()
+            try:
+                await client.generate("OpenAI", "p", api_key="k", model="dall-e-3",
+                                      base_url="http://127.0.0.1:9/v1")
+            finally:
+                await client.aclose()
+        with self.assertRaises(oi.OpenAIError):
+            _run(main())
+
+    def test_per_provider_limit(self):
+        with StubServer(delay=0.05) as srv:
+            async def main():
+                client = AsyncProviderClient(max_in_flight=16,
+                                             provider_limits={"OpenAI": 3})
+                try:
+                    results = await client.generate_many(
+                        "OpenAI", "p", 12, api_key="k", model="dall-e-3",
+                        base_url=srv.base_url + "/v1")
+                    return results, client.peak_in_flight
+                finally:
+                    await client.aclose()
+            results, peak = _run(main())
+            self.assertEqual(results, [(PNG_BYTES, "image/png")] * 12)
+            self.assertEqual(peak, 3)
+
+    def test_cancel_stops_outstanding_requests(self):
+        with StubServer(delay=5) as srv:
+            seen = []
+
+            async def main():
+                client = AsyncProviderClient()
+                task = asyncio.ensure_future(client.generate_many(
+                    "OpenAI", "p", 8, on_result=lambda i, r: seen.append(i),
+                    api_key="k", model="dall-e-3", base_url=srv.base_url + "/v1"))
+                await asyncio.sleep(0.3)
+                task.cancel()
+                try:
+                    with self.assertRaises(asyncio.CancelledError):
+                        await task
+                    return client.in_flight
+                finally:
+                    await client.aclose()
+            t0 = time.perf_counter()
+            self.assertEqual(_run(main()), 0)
+            self.assertLess(time.perf_counter() - t0, 3)
+            self.assertEqual(seen, [])
+
+    def test_stale_pooled_connection_is_retried(self):
+        with StubServer() as srv:
+            async def main():
+                http = AsyncHTTPClient()
+                try:
+                    first = await http.request("GET", srv.base_url + "/a.png")
+                    # 服务端关掉所有 keep-alive 连接后再发请求
+                    for _r, w in http._idle[("http", "127.0.0.1", srv.server_address[1])]:
+                        w.transport.abort()
+                    second = await http.request("GET", srv.base_url + "/b.png")
+                    return first.content, second.content, http.connections_opened
+                finally:
+                    await http.close()
+            a, b, opened = _run(main())
+            self.assertEqual((a, b), (PNG_BYTES, PNG_BYTES))
+            self.assertEqual(opened, 2)
+
+
+async def _get(http, url, **kwargs):
+    try:
+        return await http.request("GET", url, **kwargs)
+    finally:
+        await http.close()
+
+
+class RedirectTests(unittest.TestCase):
+    def test_get_follows_redirects(self):
+        with StubServer(redirects={"/old.png": (301, "/mid.png"),
+                                   "/mid.png": (302, "/out.png")}) as srv:
+            resp = _run(_get(AsyncHTTPClient(), srv.base_url + "/old.png"))
+            self.assertEqual((resp.status_code, resp.content), (200, PNG_BYTES))
+            self.assertEqual(srv.requests, 3)
+
+    def test_redirect_loop_is_bounded(self):
+        with StubServer(redirects={"/loop.png": (302, "/loop.png")}) as srv:
+            with self.assertRaises(TransportError):
+                _run(_get(AsyncHTTPClient(), srv.base_url + "/loop.png"))
+
+    def test_post_307_resends_body_and_303_switches_to_get(self):
+        with StubServer(redirects={"/v1/old/images/generations": (307, "/v1/images/generations"),
+                                   "/see/images/generations": (303, "/out.png")}) as srv:
+            async def main():
+                client = AsyncProviderClient()
+                try:
+                    image = await client.generate("OpenAI", "p", api_key="k", model="dall-e-3",
+                                                  base_url=srv.base_url + "/v1/old")
+                    self.assertIn(b'"prompt"', srv.last_body)    # 307 重发了原请求体
+                    other = await client.http.request("POST", srv.base_url + "/see/images/generations",
+                                                      body=b"{}")
+                    return image, other
+                finally:
+                    await client.aclose()
+            image, other = _run(main())
+            self.assertEqual(image, (PNG_BYTES, "image/png"))
+            self.assertEqual(other.content, PNG_BYTES)
+            self.assertEqual(srv.methods, ["POST", "POST", "POST", "GET"])
+
+
+class ProxyTests(unittest.TestCase):
+    def test_http_through_proxy_with_auth(self):
+        with StubServer() as srv, StubProxy() as proxy:
+            url = proxy.url.replace("http://", "http://user:p%40ss@")
+            resp = _run(_get(AsyncHTTPClient(proxies={"http": url}), srv.base_url + "/a.png?x=1"))
+            self.assertEqual(resp.content, PNG_BYTES)
+            self.assertEqual(proxy.seen, [f"GET {srv.base_url}/a.png?x=1"])
+            self.assertEqual(proxy.auth, ["Basic dXNlcjpwQHNz"])   # user:p@ss
+
+    def test_no_proxy_bypass(self):
+        with StubServer() as srv, StubProxy() as proxy:
+            http = AsyncHTTPClient(proxies={"http": proxy.url, "no": "127.0.0.1"})
+            self.assertEqual(_run(_get(http, srv.base_url + "/a.png")).content, PNG_BYTES)
+            self.assertEqual(proxy.seen, [])
+
+    def test_environment_proxy_is_used(self):
+        with StubServer() as srv, StubProxy() as proxy, \
+                mock.patch.dict(os.environ, {"HTTP_PROXY": proxy.url, "http_proxy": proxy.url}):
+            for name in ("NO_PROXY", "no_proxy"):
+                os.environ.pop(name, None)
+            async def main():
+                client = AsyncProviderClient()
+                try:
+                    return await client.generate("OpenAI", "p", api_key="k", model="dall-e-3",
+                                                 base_url=srv.base_url + "/v1")
+                finally:
+                    await client.aclose()
+            self.assertEqual(_run(main()), (PNG_BYTES, "image/png"))
+            self.assertEqual(proxy.seen, [f"POST {srv.base_url}/v1/images/generations"])
+
+    def test_unsupported_proxy_scheme(self):
+        http = AsyncHTTPClient(proxies={"https": "socks5://127.0.0.1:1080"})
+        with self.assertRaises(TransportError):
+            _run(_get(http, "https://127.0.0.1:9/a.png"))
+
+    @unittest.skipUnless(shutil.which("openssl"), "需要 openssl 生成自签名证书")
+    def test_https_through_connect_tunnel(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cert, key = os.path.join(tmp, "cert.pem"), os.path.join(tmp, "key.pem")
+            subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+                            "-keyout", key, "-out", cert, "-days", "1", "-subj", "/CN=127.0.0.1",
+                            "-addext", "subjectAltName=IP:127.0.0.1"],
+                           check=True, capture_output=True)
+            server_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            server_ctx.load_cert_chain(cert, key)
+            with StubServer(ssl_context=server_ctx) as srv, StubProxy() as proxy:
+                http = AsyncHTTPClient(proxies={"https": proxy.url})
+                http._ssl = ssl.create_default_context(cafile=cert)
+                resp = _run(_get(http, srv.base_url + "/a.png"))
+                self.assertEqual(resp.content, PNG_BYTES)
+                port = srv.server_address[1]
+                self.assertEqual(proxy.seen, [f"CONNECT 127.0.0.1:{port}"])
+
+
+class InFlightMetricsTest(unittest.TestCase):
+    """64 路在途请求：不新增线程，tracemalloc 峰值有界。"""
+
+    N = 64
+
+    def test_64_in_flight(self):
+        with _ServerProcess("--delay", "0.5") as srv:
+            threads_before = threading.active_count()
+            samples = []
+
+            async def sampler(client, stop):
+                while not stop.is_set():
+                    samples.append((client.in_flight, threading.active_count()))
+                    await asyncio.sleep(0.02)
+
+            async def main():
+                client = AsyncProviderClient(max_in_flight=self.N)
+                stop = asyncio.Event()
+                probe = asyncio.ensure_future(sampler(client, stop))
+                try:
+                    results = await client.generate_many(
+                        "OpenAI", "p", self.N, api_key="k", model="dall-e-3",
+                        base_url=srv.base_url + "/v1")
+                    return results, client.peak_in_flight
+                finally:
+                    stop.set()
+                    await probe
+                    await client.aclose()
+
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            try:
+                results, peak = _run(main())
+                _cur, mem_peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            elapsed = time.perf_counter() - t0
+
+        self.assertEqual(results, [(PNG_BYTES, "image/png")] * self.N)
+        self.assertEqual(peak, self.N)
+        # 全部并发：总耗时接近单次延迟，而不是 N 倍
+        self.assertLess(elapsed, 0.5 * 4)
+        # 前面用例遗留的守护线程可能在此期间退出，所以是 <= 而不是 ==
+        self.assertLessEqual(max(t for _n, t in samples), threads_before)
+        self.assertLess(mem_peak, 8 * 1024 * 1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
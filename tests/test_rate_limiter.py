@@ -0,0 +1,186 @@
+"""测试 core.rate_limiter：令牌桶、AIMD 并发、Retry-After 与重试调度。"""
+import asyncio
+import unittest
+
+from core import openai_service as oi
+from core import rate_limiter as rl
+from core.provider_client import AsyncProviderClient
+from tests.stub_http_server import PNG_BYTES, StubServer
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class _Resp:
+    def __init__(self, status, body, headers=None):
+        import json
+        self.status_code = status
+        self.text = json.dumps(body)
+        self._body = body
+        self.headers = headers or {}
+
+    def json(self):
+        return self._body
+
+
+def _throttle_error(retry_after=None):
+    exc = oi.OpenAIError("429")
+    exc.status, exc.retry_after, exc.retryable = 429, retry_after, True
+    return exc
+
+
+class ParseRetryAfterTests(unittest.TestCase):
+    def test_formats(self):
+        self.assertEqual(rl.parse_retry_after("120"), 120.0)
+        self.assertEqual(rl.parse_retry_after("1.5"), 1.5)
+        self.assertEqual(rl.parse_retry_after("30s"), 30.0)
+        self.assertEqual(rl.parse_retry_after("1m30s"), 90.0)
+        self.assertEqual(rl.parse_retry_after("250ms"), 0.25)
+        self.assertEqual(rl.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+        self.assertIsNone(rl.parse_retry_after("soon"))
+        self.assertIsNone(rl.parse_retry_after(None))
+
+    def test_annotate(self):
+        exc = rl.annotate(oi.OpenAIError("x"), _Resp(429, {"error": {"code": "rate_limit"}},
+                                                      {"retry-after": "7"}))
+        self.assertEqual((exc.status, exc.retry_after, exc.retryable), (429, 7.0, True))
+        gemini = _Resp(429, {"error": {"details": [
+            {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "12s"}]}})
+        self.assertEqual(rl.annotate(oi.OpenAIError("x"), gemini).retry_after, 12.0)
+        quota = rl.annotate(oi.OpenAIError("x"), _Resp(429, {"error": {"code": "insufficient_quota"}}))
+        self.assertFalse(quota.retryable)
+        self.assertFalse(rl.annotate(oi.OpenAIError("x"), _Resp(400, {})).retryable)
+
+
+class TokenBucketTests(unittest.TestCase):
+    def test_spacing_and_refill(self):
+        clock = _Clock()
+        b = rl.TokenBucket(rate=2.0, burst=2, clock=clock)
+        self.assertEqual([b.reserve() for _ in range(4)], [0.0, 0.0, 0.5, 1.0])
+        clock.now += 2.0
+        self.assertAlmostEqual(b.reserve(), 0.0)
+
+    def test_unlimited_and_pause(self):
+        clock = _Clock()
+        b = rl.TokenBucket(clock=clock)
+        self.assertEqual([b.reserve() for _ in range(50)], [0.0] * 50)
+        b.pause_until(clock.now + 3)
+        self.assertEqual(b.reserve(), 3.0)
+        self.assertEqual(b.cooldown(), 3.0)
+
+
+class LimiterTests(unittest.TestCase):
+    def test_aimd(self):
+        clock = _Clock()
+        lim = rl.Limiter("OpenAI", "m", clock=clock)
+        for _ in range(8):
+            self.assertTrue(lim.try_acquire())
+        self.assertIsNone(lim.limit)
+
+        lim.on_error(_throttle_error(retry_after=2))
+        self.assertEqual(lim.limit, 4)
+        lim.on_error(_throttle_error())          # 同一波 429 只减一次
+        self.assertEqual(lim.limit, 4)
+        self.assertEqual(lim.bucket.cooldown(), 2.0)
+        self.assertFalse(lim.try_acquire())
+
+        for _ in range(8):
+            lim.release()
+        for _ in range(4):
+            lim.on_success()
+        self.assertEqual(lim.limit, 5)
+
+        clock.now += rl.CUT_WINDOW
+        for _ in range(3):
+            lim.try_acquire()
+        lim.on_error(_throttle_error())
+        self.assertEqual(lim.limit, 1)
+        snap = lim.snapshot()
+        self.assertEqual((snap["throttled"], snap["limit"]), (3, 1))
+
+    def test_non_throttle_error_keeps_limit(self):
+        lim = rl.Limiter("Gemini", "m")
+        lim.try_acquire()
+        lim.on_error(oi.OpenAIError("boom"))
+        self.assertIsNone(lim.limit)
+        self.assertEqual(lim.failures, 1)
+
+
+class RetryPolicyTests(unittest.TestCase):
+    def test_backoff(self):
+        p = rl.RetryPolicy(max_retries=3, base_delay=1.0, max_delay=10.0, jitter=0)
+        exc = _throttle_error()
+        self.assertEqual([p.delay(exc, n) for n in (1, 2, 3, 4)], [1.0, 2.0, 4.0, None])
+        self.assertEqual(p.delay(_throttle_error(retry_after=5), 1), 5.0)
+        self.assertIsNone(p.delay(_throttle_error(retry_after=3600), 1))
+        self.assertIsNone(p.delay(oi.OpenAIError("400"), 1))
+
+
+class RetryIntegrationTests(unittest.TestCase):
+    def setUp(self):
+        rl.reset()
+
+    tearDown = setUp
+
+    def test_sync_call_with_retry(self):
+        with StubServer(throttle=2) as srv:
+            lim = rl.limiter_for("OpenAI", "dall-e-3", "k")
+            out = rl.call_with_retry(
+                lambda: oi.generate_image_bytes("p", "k", model="dall-e-3",
+                                                base_url=srv.base_url + "/v1"),
+                lim, rl.RetryPolicy(base_delay=0.01), sleep=lambda s: None)
+            self.assertEqual(out, (PNG_BYTES, "image/png"))
+            self.assertEqual(srv.requests, 3)
+            self.assertEqual((lim.throttled, lim.retries, lim.active), (2, 2, 0))
+
+    def test_gives_up_after_max_retries(self):
+        with StubServer(throttle=5, retry_after="0") as srv:
+            lim = rl.limiter_for("OpenAI", "dall-e-3", "k")
+            with self.assertRaises(oi.OpenAIError) as ctx:
+                rl.call_with_retry(
+                    lambda: oi.generate_image_bytes("p", "k", model="dall-e-3",
+                                                    base_url=srv.base_url + "/v1"),
+                    lim, rl.RetryPolicy(max_retries=1, base_delay=0.01))
+            self.assertEqual(ctx.exception.status, 429)
+            self.assertEqual(srv.requests, 2)
+
+    def test_async_batch_survives_429s(self):
+        with StubServer(throttle=3, delay=0.02) as srv:
+            async def main():
+                client = AsyncProviderClient(retry=rl.RetryPolicy(base_delay=0.01))
+                try:
+                    return await client.generate_many(
+                        "OpenAI", "p", 8, api_key="k", model="dall-e-3",
+                        base_url=srv.base_url + "/v1")
+                finally:
+                    await client.aclose()
+            results = asyncio.run(main())
+            self.assertEqual(results, [(PNG_BYTES, "image/png")] * 8)
+            snap, = rl.snapshot()
+            self.assertEqual(snap["throttled"], 3)
+            self.assertEqual(snap["retries"], 3)
+            self.assertIsNotNone(snap["limit"])
+            self.assertLess(snap["limit"], 8)
+            self.assertEqual(snap["active"], 0)
+            self.assertEqual(srv.requests, 11)
+            self.assertIn("3×429", rl.status_text())
+
+    def test_limiters_are_keyed_by_provider_model_and_key(self):
+        a = rl.limiter_for("OpenAI", "m", "k1")
+        self.assertIs(a, rl.limiter_for("OpenAI", "m", "k1"))
+        self.assertIsNot(a, rl.limiter_for("OpenAI", "m", "k2"))
+        self.assertIsNot(a, rl.limiter_for("Gemini", "m", "k1"))
+        rl.configure(rpm=120)
+        try:
+            self.assertEqual(a.bucket.rate, 2.0)
+        finally:
+            rl.configure(rpm=rl.DEFAULT_RPM)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""测试 core.rembg_pool：用 tests/stub_rembg_worker.py 代替真实 rembg。"""
+import os
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from core import rembg_pool
+from core import slicer_tool as st
+
+_STUB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub_rembg_worker.py")
+
+
+def _stub_cmd(*flags):
+    return [sys.executable, _STUB, *flags]
+
+
+def _sample():
+    img = Image.new("RGB", (32, 32), "white")
+    img.paste((10, 120, 200), (8, 8, 24, 24))
+    return img
+
+
+class RembgPoolTests(unittest.TestCase):
+    def test_round_trip_in_memory(self):
+        pool = rembg_pool.RembgWorkerPool(_stub_cmd(), size=1)
+        try:
+            out = pool.remove_background(_sample())
+        finally:
+            pool.close()
+        self.assertEqual(out.mode, "RGBA")
+        self.assertEqual(out.getpixel((0, 0))[3], 0)
+        self.assertEqual(out.getpixel((16, 16)), (10, 120, 200, 255))
+
+    def test_workers_are_reused(self):
+        pool = rembg_pool.RembgWorkerPool(_stub_cmd(), size=1)
+        try:
+            for _ in range(5):
+                pool.remove_background(_sample())
+            self.assertEqual(pool.spawned, 1)
+        finally:
+            pool.close()
+        self.assertEqual(pool.spawned, 0)
+
+    def test_concurrent_callers_bounded_by_size(self):
+        pool = rembg_pool.RembgWorkerPool(_stub_cmd(), size=2)
+        try:
+            with ThreadPoolExecutor(max_workers=6) as ex:
+                outs = list(ex.map(lambda _: pool.remove_background(_sample()), range(12)))
+            self.assertEqual(len(outs), 12)
+            self.assertLessEqual(pool.spawned, 2)
+        finally:
+            pool.close()
+
+    def test_worker_error_frame_raises(self):
+        pool = rembg_pool.RembgWorkerPool(_stub_cmd("--fail"), size=1)
+        try:
+            with self.assertRaises(rembg_pool.RembgError):
+                pool.remove_background(_sample())
+            self.assertEqual(pool.spawned, 1)  # 错误帧不影响 worker 存活
+        finally:
+            pool.close()
+
+    def test_crashed_worker_is_replaced(self):
+        pool = rembg_pool.RembgWorkerPool(_stub_cmd("--crash"), size=1)
+        try:
+            with self.assertRaises(rembg_pool.RembgError):
+                pool.remove_background(_sample())
+            self.assertEqual(pool.spawned, 0)
+        finally:
+            pool.close()
+
+    def test_slice_image_uses_pool(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            sheet = Image.new("RGB", (64, 64), "white")
+            sheet.paste((0, 0, 0), (4, 4, 28, 28))
+            src = os.path.join(tmp, "sheet.png")
+            sheet.save(src)
+            out_dir = os.path.join(tmp, "out")
+            pool = rembg_pool.RembgWorkerPool(_stub_cmd(), size=1)
+            try:
+                ok, msg, count = st.slice_image(src, 2, 2, output_dir=out_dir,
+                                                remove_bg=True, rembg_pool=pool)
+            finally:
+                pool.close()
+            self.assertTrue(ok, msg)
+            self.assertEqual(count, 4)
+            cell = Image.open(os.path.join(out_dir, "icon_01_01.png"))
+            self.assertEqual(cell.mode, "RGBA")
+            self.assertEqual(cell.getpixel((0, 0))[3], 0)
+            self.assertEqual(cell.getpixel((10, 10))[3], 255)
+            self.assertEqual(sorted(os.listdir(out_dir)),
+                             ["icon_01_01.png", "icon_01_02.png", "icon_02_01.png", "icon_02_02.png"])
+
+
+if __name__ == "__main__":
+    unittest.main()
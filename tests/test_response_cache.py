@@ -0,0 +1,231 @@
+"""测试 core.response_cache：请求归一化哈希、按字节 LRU、TTL、fresh 绕过与离线回放。"""
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from core import gemini_service as gs
+from core import http_pool
+from core import openai_service as oi
+from core import rate_limiter as rl
+from core import response_cache as rc
+from core.provider_client import AsyncProviderClient
+from tests.stub_http_server import PNG_BYTES, StubServer
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class RequestKeyTests(unittest.TestCase):
+    def test_normalization(self):
+        a = rc.request_key("https://h/v1beta/m:generateContent?key=AAA", {"json": {"a": 1, "b": 2}})
+        b = rc.request_key("https://h/v1beta/m:generateContent?key=BBB", {"json": {"b": 2, "a": 1}})
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, rc.request_key("https://h/v1beta/m:generateContent",
+                                              {"json": {"a": 1, "b": 2}}, variant=1))
+        self.assertNotEqual(a, rc.request_key("https://h/v1beta/m:generateContent",
+                                              {"json": {"a": 1, "b": 3}}))
+
+    def test_multipart_ignores_headers_and_hashes_files(self):
+        def body(img, token):
+            return {"data": {"model": "m", "prompt": "p"},
+                    "files": [("image", ("image.png", img, "image/png"))],
+                    "headers": {"Authorization": token}}
+        k = rc.request_key("https://h/v1/images/edits", body(b"one", "Bearer x"))
+        self.assertEqual(k, rc.request_key("https://h/v1/images/edits", body(b"one", "Bearer y")))
+        self.assertNotEqual(k, rc.request_key("https://h/v1/images/edits", body(b"two", "Bearer x")))
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.clock = _Clock()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _cache(self, **kw):
+        return rc.ResponseCache(self.dir, clock=self.clock, **kw)
+
+    def test_roundtrip_and_persistence(self):
+        c = self._cache()
+        self.assertIsNone(c.get("ab" * 32))
+        c.put("ab" * 32, PNG_BYTES, "image/png")
+        c.put("cd" * 32, b"raw", None)
+        self.assertEqual(c.get("ab" * 32), (PNG_BYTES, "image/png"))
+        self.assertEqual(c.get("cd" * 32), (b"raw", None))
+        self.assertEqual((c.stats["hits"], c.stats["misses"]), (2, 1))
+
+        reopened = self._cache()
+        self.assertEqual(len(reopened), 2)
+        self.assertEqual(reopened.total_bytes, c.total_bytes)
+        self.assertEqual(reopened.get("ab" * 32), (PNG_BYTES, "image/png"))
+
+    def test_lru_eviction_by_bytes(self):
+        blob = b"x" * 1000
+        c = self._cache(max_bytes=3500)
+        for k in ("a", "b", "c"):
+            c.put(k * 64, blob, "image/png")
+        c.get("a" * 64)                      # a 变成最近使用
+        c.put("d" * 64, blob, "image/png")   # 超出预算：淘汰 b
+        self.assertIsNone(c.get("b" * 64))
+        for k in ("a", "c", "d"):
+            self.assertIsNotNone(c.get(k * 64))
+        self.assertLessEqual(c.total_bytes, 3500)
+        self.assertEqual(c.stats["evictions"], 1)
+        self.assertFalse(os.path.exists(c._path("b" * 64)))
+
+    def test_oversized_entry_is_not_stored(self):
+        c = self._cache(max_bytes=100)
+        c.put("a" * 64, b"x" * 200, "image/png")
+        self.assertEqual(len(c), 0)
+
+    def test_store_failure_is_not_raised(self):
+        # 缓存路径是个文件：makedirs 抛 NotADirectoryError / FileExistsError
+        path = os.path.join(self.dir, "not_a_dir")
+        open(path, "wb").close()
+        c = rc.ResponseCache(path, clock=self.clock)
+        with self.assertLogs("core.response_cache", level="WARNING"):
+            c.put("a" * 64, b"x", "image/png")
+        self.assertEqual((len(c), c.total_bytes, c.stats["stores"]), (0, 0, 0))
+        self.assertIsNone(c.get("a" * 64))
+
+    def test_ttl(self):
+        c = self._cache(ttl=60)
+        c.put("a" * 64, b"x", "image/png")
+        self.clock.now += 59
+        self.assertIsNotNone(c.get("a" * 64))
+        self.clock.now += 2
+        self.assertIsNone(c.get("a" * 64))
+        self.assertEqual((c.stats["expired"], len(c)), (1, 0))
+
+
+class ServiceCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        rc.configure(True, directory=self.dir)
+
+    def tearDown(self):
+        rc.configure(False)
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_gemini_hit_fresh_and_variant(self):
+        with StubServer() as srv, mock.patch.object(gs, "_get_api_base_url",
+                                                    return_value=srv.base_url):
+            for _ in range(3):
+                self.assertEqual(gs.generate_image_bytes("p", "k"), (PNG_BYTES, "image/png"))
+            self.assertEqual(srv.requests, 1)
+            gs.generate_image_bytes("p", "other-key")      # 凭据不参与 key
+            self.assertEqual(srv.requests, 1)
+            gs.generate_image_bytes("p", "k", fresh=True)
+            gs.generate_image_bytes("p", "k", variant=1)
+            gs.generate_image_bytes("p2", "k")
+            self.assertEqual(srv.requests, 4)
+
+    def test_async_batch_replays_and_sync_shares_keys(self):
+        with StubServer() as srv:
+            kwargs = dict(api_key="k", model="dall-e-3", base_url=srv.base_url + "/v1")
+
+            async def batch():
+                client = AsyncProviderClient()
+                try:
+                    return await client.generate_many("OpenAI", "p", 4, **kwargs)
+                finally:
+                    await client.aclose()
+            self.assertEqual(asyncio.run(batch()), [(PNG_BYTES, "image/png")] * 4)
+            self.assertEqual(srv.requests, 4)
+            asyncio.run(batch())
+            self.assertEqual(srv.requests, 4)
+            oi.generate_image_bytes("p", variant=3, **kwargs)
+            self.assertEqual(srv.requests, 4)
+            self.assertEqual(len(rc.active()), 4)
+
+    def test_async_cache_io_runs_off_the_loop(self):
+        cache = rc.active()
+        calls = []
+        client = None
+
+        def spy(fn):
+            def wrapper(*args):
+                # (调用名, 所在线程, 当时占用的请求槽位数)
+                calls.append((fn.__name__, threading.get_ident(), client.in_flight))
+                return fn(*args)
+            return wrapper
+
+        async def twice():
+            nonlocal client
+            client = AsyncProviderClient()
+            try:
+                for _ in range(2):
+                    await client.generate("OpenAI", "p", api_key="k", model="dall-e-3",
+                                          base_url=srv.base_url + "/v1")
+                return threading.get_ident()
+            finally:
+                await client.aclose()
+
+        with StubServer() as srv, \
+                mock.patch.object(cache, "get", spy(cache.get)), \
+                mock.patch.object(cache, "put", spy(cache.put)), \
+                mock.patch.object(rc, "request_key", spy(rc.request_key)):
+            loop_thread = asyncio.run(twice())
+        self.assertEqual(srv.requests, 1)
+        self.assertEqual([c[0] for c in calls], ["request_key", "get", "put", "request_key", "get"])
+        self.assertNotIn(loop_thread, [c[1] for c in calls])    # 都不在事件循环线程上
+        self.assertEqual([c[2] for c in calls], [0] * 5)        # put 时槽位已释放
+
+    def test_sync_hit_skips_rate_limiter(self):
+        limiter = mock.Mock(wraps=rl.Limiter("Gemini", "m", rpm=6000))
+        with StubServer() as srv, mock.patch.object(gs, "_get_api_base_url",
+                                                    return_value=srv.base_url):
+            for _ in range(3):
+                self.assertEqual(gs.generate_image_bytes("p", "k", limiter=limiter),
+                                 (PNG_BYTES, "image/png"))
+            oi.generate_image_bytes("p", "k", model="dall-e-3", base_url=srv.base_url + "/v1",
+                                    limiter=limiter)
+            oi.generate_image_bytes("p", "k", model="dall-e-3", base_url=srv.base_url + "/v1",
+                                    limiter=limiter)
+        # 只有两次未命中（Gemini 一次、OpenAI 一次）占用过限流槽位
+        self.assertEqual(srv.requests, 2)
+        self.assertEqual(limiter.acquire.call_count, 2)
+        self.assertEqual(limiter.release.call_count, 2)
+
+    def test_unwritable_cache_still_returns_result(self):
+        path = os.path.join(self.dir, "file")
+        open(path, "wb").close()
+        rc.configure(True, directory=path)
+        with StubServer() as srv, mock.patch.object(gs, "_get_api_base_url",
+                                                    return_value=srv.base_url), \
+                self.assertLogs("core.response_cache", level="WARNING"):
+            self.assertEqual(gs.generate_image_bytes("p", "k"), (PNG_BYTES, "image/png"))
+
+            async def one():
+                client = AsyncProviderClient()
+                try:
+                    return await client.generate("OpenAI", "p", api_key="k", model="dall-e-3",
+                                                 base_url=srv.base_url + "/v1")
+                finally:
+                    await client.aclose()
+            self.assertEqual(asyncio.run(one()), (PNG_BYTES, "image/png"))
+
+    def test_offline_replay(self):
+        with StubServer() as srv:
+            oi.generate_image_bytes("p", "k", model="dall-e-3", base_url=srv.base_url + "/v1")
+            base_url = srv.base_url + "/v1"
+        http_pool.close()  # 丢掉仍连着桩服务器处理线程的 keep-alive 连接
+        # 服务器已关闭：命中缓存就不会发请求
+        self.assertEqual(oi.generate_image_bytes("p", "k", model="dall-e-3", base_url=base_url),
+                         (PNG_BYTES, "image/png"))
+        with self.assertRaises(oi.OpenAIError):
+            oi.generate_image_bytes("p", "k", model="dall-e-3", base_url=base_url, fresh=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""测试 core.sheet_image：懒读取与整图解码结果逐字节一致，以及内存预算换算。"""
+import os
+import tempfile
+import unittest
+
+from PIL import Image
+
+from core import sheet_image as si
+from core import slicer_tool as st
+from tests.sheet_fixtures import make_sheet
+
+_BOXES = [(0, 0, 301, 203), (10, 20, 150, 90), (-5, -5, 40, 40), (290, 190, 310, 210)]
+
+
+class SheetImageTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = Image.effect_noise((301, 203), 90).convert("RGB")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _save(self, name, img=None):
+        path = os.path.join(self.tmp.name, name)
+        (img or self.src).save(path)
+        return path
+
+    def test_uncompressed_formats_are_lazy_and_exact(self):
+        cases = [("a.bmp", None), ("a.ppm", None), ("a.tif", None),
+                 ("rgba.tif", self.src.convert("RGBA")), ("l.bmp", self.src.convert("L"))]
+        for name, img in cases:
+            path = self._save(name, img)
+            with self.subTest(name=name), Image.open(path) as ref, si.SheetImage(path) as sheet:
+                ref.load()
+                self.assertTrue(sheet.lazy)
+                for box in _BOXES:
+                    self.assertEqual(sheet.crop(box).tobytes(), ref.crop(box).tobytes())
+                self.assertEqual(sheet.gray().tobytes(), ref.convert("L").tobytes())
+                self.assertTrue(sheet.lazy)  # never fell back to a full decode
+
+    def test_png_decodes_once(self):
+        path = self._save("a.png")
+        with si.SheetImage(path) as sheet:
+            self.assertFalse(sheet.lazy)
+            first = sheet.image()
+            sheet.crop((0, 0, 10, 10))
+            sheet.gray()
+            self.assertIs(sheet.image(), first)
+
+    def test_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            si.SheetImage(os.path.join(self.tmp.name, "missing.png"))
+
+    def test_borrow_leaves_shared_sheet_open(self):
+        path = self._save("a.png")
+        with si.SheetImage(path) as sheet:
+            with si.borrow(sheet) as same:
+                self.assertIs(same, sheet)
+            sheet.crop((0, 0, 4, 4))  # still usable
+
+    def test_workers_within_budget(self):
+        path = self._save("a.png")  # 301*203*4 bytes decoded, + 1 byte/px gray
+        cost = si.sheet_cost_bytes(path, smart_crop=True)
+        self.assertEqual(cost, 301 * 203 * 5)
+        budget_mb = cost * 3 / 2**20
+        self.assertEqual(si.workers_within_budget([path], 8, budget_mb, True), 3)
+        self.assertEqual(si.workers_within_budget([path], 8, None, True), 8)
+        self.assertEqual(si.workers_within_budget([path], 8, 1e-9, True), 1)
+
+    def test_peak_rss_reported(self):
+        self.assertGreater(si.peak_rss_bytes() or 1, 0)
+
+
+class SharedSheetSlicingTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_shared_handle_matches_path_results(self):
+        png = make_sheet(os.path.join(self.tmp.name, "s.png"), 3, 4, cell=64, lines=True)
+        bmp = os.path.join(self.tmp.name, "s.bmp")
+        Image.open(png).save(bmp)
+        expected_cuts = st.detect_grid(png)
+        expected = [c.data for c in st.iter_slices(png, row_cuts=expected_cuts[0],
+                                                   col_cuts=expected_cuts[1],
+                                                   write=False, encode=True)]
+        for path in (png, bmp):
+            with self.subTest(path=os.path.basename(path)), si.SheetImage(path) as sheet:
+                cuts = st.detect_grid(sheet)
+                self.assertEqual(cuts, expected_cuts)
+                cells = list(st.iter_slices(sheet, row_cuts=cuts[0], col_cuts=cuts[1],
+                                            write=False, encode=True))
+                self.assertEqual([c.data for c in cells], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,249 @@
+"""测试 core.slicer_tool。素材全部在 tmp 目录里合成，不依赖仓库外文件。"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from core import slicer_tool as st
+from tests.sheet_fixtures import make_sheet, repo_file
+
+
+class DetectGridTests(unittest.TestCase):
+    """期望值由重构前的逐像素实现生成，锁定 cuts 逐字节不变。"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _sheet(self, name, *args, **kwargs):
+        return make_sheet(os.path.join(self.tmp.name, name), *args, **kwargs)
+
+    def test_blank_fixtures_yield_single_cell(self):
+        for name in ("test_grid.png", "test_smart_grid.png"):
+            self.assertEqual(st.detect_grid(repo_file(name)), ([0, 800], [0, 800]))
+
+    def test_4x4_sheet(self):
+        path = self._sheet("a.png", 4, 4, cell=96)
+        self.assertEqual(st.detect_grid(path),
+                         ([0, 97, 191, 286, 384], [0, 97, 192, 288, 384]))
+
+    def test_sheet_with_divider_lines(self):
+        path = self._sheet("c.png", 3, 5, cell=120, lines=True)
+        self.assertEqual(st.detect_grid(path),
+                         ([0, 121, 239, 360], [0, 122, 240, 361, 478, 600]))
+
+    def test_downsampled_non_square_sheet(self):
+        path = self._sheet("f.png", 2, 3, cell=200, lines=True, size=(900, 600))
+        self.assertEqual(st.detect_grid(path), ([0, 306, 600], [0, 302, 603, 900]))
+
+    def test_prefix_sums_match_direct_count(self):
+        from PIL import Image
+        img = Image.new("L", (5, 3), 255)
+        img.putpixel((1, 0), 0)
+        img.putpixel((1, 2), 0)
+        img.putpixel((4, 2), 100)
+        row_prefix, col_prefix = st._content_prefix_sums(img, 245)
+        self.assertEqual(row_prefix[2], [0, 0, 1, 1, 1, 2])
+        self.assertEqual(col_prefix[3], [0, 2, 0, 0, 1])
+        self.assertEqual(col_prefix[0], [0] * 5)
+
+
+class NormalizeImageContentTests(unittest.TestCase):
+    def _cell(self):
+        from PIL import Image
+        img = Image.new("RGBA", (100, 100), (0, 0, 0, 0))
+        img.paste((200, 10, 10, 255), (40, 40, 60, 60))   # 20x20 实体内容
+        img.putpixel((2, 2), (9, 9, 9, 20))               # 低于阈值的噪点
+        return img
+
+    def test_faint_pixels_are_cleared(self):
+        out = st.normalize_image_content(self._cell(), scale_factor=0.2, upscale=False)
+        self.assertEqual(out.getpixel((2, 2)), (0, 0, 0, 0))
+
+    def test_content_is_scaled_and_centered(self):
+        # 噪点若未清除，bbox 会被拉到 (2, 2)，缩放结果也会偏移
+        out = st.normalize_image_content(self._cell(), scale_factor=0.5)
+        self.assertEqual(out.size, (100, 100))
+        self.assertEqual(out.getbbox(), (25, 25, 75, 75))
+
+    def test_no_upscale_keeps_native_size(self):
+        out = st.normalize_image_content(self._cell(), scale_factor=0.5, upscale=False)
+        self.assertEqual(out.getbbox(), (40, 40, 60, 60))
+        self.assertEqual(out.getpixel((50, 50)), (200, 10, 10, 255))
+
+    def test_empty_cell_is_returned_transparent(self):
+        from PIL import Image
+        img = Image.new("RGBA", (8, 8), (255, 255, 255, 10))
+        out = st.normalize_image_content(img)
+        self.assertIsNone(out.getbbox())
+
+
+class IterSlicesTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.sheet = make_sheet(os.path.join(self.tmp.name, "sheet.png"), 2, 3, cell=40)
+        self.out = os.path.join(self.tmp.name, "out")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_yields_bounds_and_names_in_row_major_order(self):
+        cells = list(st.iter_slices(self.sheet, 2, 3, output_dir=self.out, rename="c"))
+        self.assertEqual([c.filename for c in cells],
+                         ["c_01.png", "c_02.png", "c_03.png", "c_04.png", "c_05.png", "c_06.png"])
+        self.assertEqual(cells[4].box, (40, 40, 80, 80))
+        self.assertEqual((cells[4].row, cells[4].col, cells[4].index), (1, 1, 4))
+        self.assertTrue(all(os.path.exists(c.path) for c in cells))
+
+    def test_encode_without_write_touches_no_files(self):
+        cells = list(st.iter_slices(self.sheet, 2, 3, output_dir=self.out,
+                                    write=False, encode=True))
+        self.assertFalse(os.path.exists(self.out))
+        self.assertTrue(all(c.path is None and c.data.startswith(b"\x89PNG") for c in cells))
+        self.assertEqual(len({c.filename for c in cells}), 6)
+
+    def test_encoded_bytes_match_written_file(self):
+        cell = next(st.iter_slices(self.sheet, 2, 3, output_dir=self.out, encode=True))
+        with open(cell.path, "rb") as f:
+            self.assertEqual(f.read(), cell.data)
+
+    def test_cancel_mid_sheet(self):
+        gen = st.iter_slices(self.sheet, 2, 3, output_dir=self.out)
+        next(gen)
+        next(gen)
+        gen.close()
+        self.assertEqual(len(os.listdir(self.out)), 2)
+
+    def test_slice_image_wrapper(self):
+        ok, msg, count = st.slice_image(self.sheet, 2, 3, output_dir=self.out)
+        self.assertTrue(ok, msg)
+        self.assertEqual(count, 6)
+        ok, msg, count = st.slice_image(os.path.join(self.tmp.name, "missing.png"))
+        self.assertEqual((ok, msg, count), (False, "Image file not found.", 0))
+
+
+class NameIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _touch(self, *names):
+        for n in names:
+            open(os.path.join(self.out, n), "wb").close()
+
+    def _probe(self, base):
+        """旧版逻辑：逐个 os.path.exists 试探。"""
+        filename, n = f"{base}.png", 2
+        while os.path.exists(os.path.join(self.out, filename)):
+            filename, n = f"{base}_{n}.png", n + 1
+        open(os.path.join(self.out, filename), "wb").close()
+        return filename
+
+    def test_matches_exists_probing(self):
+        self._touch("a.png", "a_2.png", "a_4.png", "b_2.png", "icon_01_01.png")
+        bases = ["a", "a", "a", "b", "b", "b", "a_2", "icon_01_01", "c"]
+        index = st._NameIndex(self.out)
+        got = [index.claim(b) for b in bases]
+        self.assertEqual(got, [self._probe(b) for b in bases])
+
+    def test_directory_listed_once_without_stat_calls(self):
+        self._touch(*[f"icon_01_01_{n}.png" for n in range(2, 500)], "icon_01_01.png")
+        with mock.patch.object(st.os, "listdir", wraps=os.listdir) as listdir, \
+                mock.patch.object(st.os.path, "exists", wraps=os.path.exists) as exists:
+            cells = list(st.iter_slices(make_sheet(os.path.join(self.out, "s.png"), 1, 1,
+                                                   cell=40),
+                                        1, 1, output_dir=self.out, write=False))
+        self.assertEqual(cells[0].filename, "icon_01_01_500.png")
+        self.assertEqual(listdir.call_count, 1)
+        probed = [c.args[0] for c in exists.call_args_list if "icon_" in str(c.args[0])]
+        self.assertEqual(probed, [])
+
+    def test_rename_skips_listing(self):
+        with mock.patch.object(st.os, "listdir") as listdir:
+            self.assertEqual(st._cell_filename(0, 0, 0, [], "x", False, 0, 1, 2, self.out), "x_01.png")
+        listdir.assert_not_called()
+
+
+class ParallelSliceTests(unittest.TestCase):
+    """slice_images_parallel 必须与 app.py 里逐张调用 slice_image 的结果逐文件一致。"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.sheets = [
+            make_sheet(os.path.join(self.tmp.name, f"sheet{i}.png"), 3, 3, cell=48 + 8 * i)
+            for i in range(3)
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _sequential(self, out_dir, rename="", auto_suffix=False, smart_crop=False, **kw):
+        num_digits = max(2, len(str(9)), len(str(3))) if auto_suffix else max(2, len(str(27)))
+        current_index = 1
+        for i, fp in enumerate(self.sheets):
+            cuts = st.detect_grid(fp) if smart_crop else (None, None)
+            ok, msg, count = st.slice_image(
+                fp, 3, 3, output_dir=out_dir, rename=rename, auto_suffix=auto_suffix,
+                image_seq=i + 1, start_index=current_index, num_digits=num_digits,
+                row_cuts=cuts[0], col_cuts=cuts[1], **kw)
+            self.assertTrue(ok, msg)
+            if not auto_suffix:
+                current_index += count
+
+    def _snapshot(self, out_dir):
+        from PIL import Image
+        return {f: Image.open(os.path.join(out_dir, f)).tobytes()
+                for f in sorted(os.listdir(out_dir))}
+
+    def _compare(self, **kw):
+        seq_dir = os.path.join(self.tmp.name, "seq")
+        par_dir = os.path.join(self.tmp.name, "par")
+        self._sequential(seq_dir, **kw)
+        seen = []
+        results = st.slice_images_parallel(
+            self.sheets, 3, 3, output_dir=par_dir, max_workers=2,
+            progress=lambda done, total, fp, name: seen.append((done, total)), **kw)
+        self.assertEqual([r[2] for r in results], [9, 9, 9])
+        self.assertTrue(all(r[0] for r in results))
+        self.assertEqual(self._snapshot(seq_dir), self._snapshot(par_dir))
+        self.assertEqual(seen[-1], (27, 27))
+        self.assertEqual(len(seen), 27)
+
+    def test_flat_rename_numbering(self):
+        self._compare(rename="gun")
+
+    def test_auto_suffix_numbering(self):
+        self._compare(rename="gun", auto_suffix=True)
+
+    def test_default_names_resolve_collisions_in_order(self):
+        self._compare(normalize_mode=True)
+
+    def test_smart_crop(self):
+        self._compare(rename="s", smart_crop=True)
+
+    def test_smart_crop_single_chunk_opens_each_sheet_once(self):
+        out = os.path.join(self.tmp.name, "out")
+        os.makedirs(out)
+        with mock.patch.object(st, "SheetImage", wraps=st.SheetImage) as opened:
+            row_cuts, col_cuts, parts = st._plan_and_slice(
+                self.sheets[0], out, ".p_", 3, 3, True, False, False, 0.85, True)
+        self.assertEqual(opened.call_count, 1)        # 检测网格与切图共用一次解码
+        self.assertEqual((len(row_cuts), len(col_cuts)), (4, 4))
+        self.assertEqual(sorted(os.listdir(out)), sorted(os.path.basename(p) for p in parts))
+        self.assertEqual(len(parts), 9)
+
+    def test_missing_file_reports_error(self):
+        results = st.slice_images_parallel(
+            [os.path.join(self.tmp.name, "nope.png"), self.sheets[0]], 3, 3,
+            output_dir=os.path.join(self.tmp.name, "out"), rename="x", max_workers=1)
+        self.assertFalse(results[0][0])
+        self.assertEqual(results[1][:1] + results[1][2:], (True, 9))
+
+
+if __name__ == "__main__":
+    unittest.main()
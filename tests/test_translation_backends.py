@@ -0,0 +1,123 @@
+"""测试 core.translation_backends：分隔符安全的打包 / 拆分、离线词表后端与批量 Google 后端。"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from core import translation_backends as tb
+from core import translation_cache as tc
+from core import translation_service as ts
+
+
+class _LineTranslator:
+    """按行“翻译”成大写；mangle=True 时把换行吞掉（模拟批量结果对不齐）。"""
+    calls = []
+    mangle = False
+
+    def __init__(self, source="auto", target="en"):
+        pass
+
+    def translate(self, text):
+        _LineTranslator.calls.append(text)
+        out = "\n".join(f"T({line})" for line in text.split("\n"))
+        return out.replace("\n", " ") if _LineTranslator.mangle else out
+
+
+class PackTests(unittest.TestCase):
+    def test_pack_respects_limit_and_isolates_line_breaks(self):
+        texts = ["a" * 4, "b\nc", "d" * 4, "e" * 4, "f" * 20]
+        self.assertEqual(tb.pack(texts, max_chars=10), [[1], [0, 2], [4], [3]])
+
+    def test_unpack(self):
+        self.assertEqual(tb.unpack(" x \n\ny\nz\n", 3), ["x", "y", "z"])
+        self.assertIsNone(tb.unpack("x y z", 3))
+        self.assertIsNone(tb.unpack("multi\nline", 1))
+
+
+class GlossaryTests(unittest.TestCase):
+    def test_built_from_options_files(self):
+        g = tb.GlossaryBackend.default()
+        self.assertGreater(len(g), 100)
+        self.assertEqual(g.lookup("飞行员", "en"), "pilot")
+        self.assertEqual(g.lookup(" 海军蓝与石墨灰 ", "en"), "navy and graphite")
+        self.assertEqual(g.lookup("Pilot", "zh"), "飞行员")
+        self.assertIsNone(g.lookup("铁矿石", "en"))
+        self.assertIsNone(g.lookup("飞行员", "fr"))
+
+    def test_nested_pairs_and_bad_files(self):
+        d = tempfile.mkdtemp()
+        try:
+            good, bad = os.path.join(d, "a_options.json"), os.path.join(d, "b_options.json")
+            with open(good, "w", encoding="utf-8") as f:
+                f.write('{"x": [["red", "红"], ["blue", "蓝"]], "y": {"en": "ship", "zh": "船"},'
+                        ' "z": ["not", "a pair"]}')
+            with open(bad, "w", encoding="utf-8") as f:
+                f.write("{broken")
+            g = tb.GlossaryBackend.from_files([good, bad])
+            self.assertEqual(g.translate_batch(["红", "船", "绿"], "en"), ["red", "ship", None])
+        finally:
+            shutil.rmtree(d, ignore_errors=True)
+
+
+class GoogleBackendTests(unittest.TestCase):
+    def setUp(self):
+        _LineTranslator.calls, _LineTranslator.mangle = [], False
+        p = mock.patch("deep_translator.GoogleTranslator", _LineTranslator)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def test_64_items_in_one_request(self):
+        names = [f"物品{i}" for i in range(64)]
+        backend = tb.GoogleBackend(sleep=lambda s: None)
+        self.assertEqual(backend.translate_batch(names, "en"), [f"T({n})" for n in names])
+        self.assertEqual(backend.requests, 1)
+
+    def test_mismatched_reply_falls_back_per_text(self):
+        _LineTranslator.mangle = True
+        backend = tb.GoogleBackend(sleep=lambda s: None)
+        self.assertEqual(backend.translate_batch(["甲", "乙", "丙\n丁"], "en"),
+                         ["T(甲)", "T(乙)", "T(丙) T(丁)"])
+        self.assertEqual(backend.requests, 4)      # 1 次批量 + 2 次逐条 + 含换行的单独一条
+
+
+class ChainTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        tc.configure(os.path.join(self.dir, "t.db"))
+        _LineTranslator.calls, _LineTranslator.mangle = [], False
+        for p in (mock.patch("deep_translator.GoogleTranslator", _LineTranslator),
+                  mock.patch.object(ts.TranslationManager, "_instance", None)):
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        tc.reset_for_test()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_glossary_first_then_batched_network(self):
+        tm = ts.TranslationManager()
+        google = tb.GoogleBackend(sleep=lambda s: None)
+        tm.set_backends([tb.GlossaryBackend([("pilot", "飞行员"), ("gloves", "手套")]), google])
+        self.assertEqual(tm.translate_list(["飞行员", "手套", "飞行员"]), ["pilot", "gloves", "pilot"])
+        self.assertEqual(google.requests, 0)
+
+        self.assertEqual(tm.translate_list(["手套", "铁矿石", "铜锭"]), ["gloves", "T(铁矿石)", "T(铜锭)"])
+        self.assertEqual(_LineTranslator.calls, ["铁矿石\n铜锭"])
+        self.assertIsNone(tc.default().get("手套", backend="google"))    # 词表结果不写缓存
+        self.assertEqual(tc.default().get("铜锭", backend="google"), "T(铜锭)")
+
+    def test_rejects_non_backends(self):
+        with self.assertRaises(TypeError):
+            ts.TranslationManager().set_backends([object()])
+
+    def test_backend_without_translate_batch_fails_at_construction(self):
+        class Incomplete(tb.TranslationBackend):
+            name = "incomplete"
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,213 @@
+"""测试 core.translation_cache：持久化、批量查询、按 (目标语言, 后端) 隔离，以及 TranslationManager 只翻译未命中的文本。"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from core import translation_cache as tc
+from core import translation_service as ts
+from core.translation_backends import GoogleBackend, TranslationBackend
+
+
+class _FakeTranslator:
+    """按行翻译（批量请求用换行拼接）；含“坏”的请求抛错。"""
+    calls = []
+
+    def __init__(self, source="auto", target="en"):
+        self.target = target
+
+    def translate(self, text):
+        _FakeTranslator.calls.append(text)
+        if "坏" in text:
+            raise RuntimeError("boom")
+        return "\n".join(f"{line}-{self.target}" for line in text.split("\n"))
+
+
+class TranslationCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "t.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_persistence_and_bulk_lookup(self):
+        c = tc.TranslationCache(self.path)
+        c.put_many([(f"词{i}", f"word{i}") for i in range(1200)])
+        c.put("词0", "other", target="ja")
+        c.put("词0", "deepl-word", backend="deepl")
+        c.close()
+
+        reopened = tc.TranslationCache(self.path)
+        texts = [f"词{i}" for i in range(1300)] + ["", "词5"]
+        found = reopened.get_many(texts)              # 超过 _SQL_BATCH：分批 IN 查询
+        self.assertEqual(len(found), 1200)
+        self.assertEqual(found["词5"], "word5")
+        self.assertEqual(reopened.get("词0", target="ja"), "other")
+        self.assertEqual(reopened.get("词0", backend="deepl"), "deepl-word")
+        self.assertIsNone(reopened.get("词0", target="fr"))
+        self.assertEqual(len(reopened), 1202)
+
+    def test_preload_serves_from_memory(self):
+        tc.TranslationCache(self.path).put_many([("甲", "a"), ("乙", "b")])
+        c = tc.TranslationCache(self.path)
+        self.assertEqual(c.preload(), 2)
+        c.close()   # 预加载后不再需要查库
+        c._open = lambda: self.fail("unexpected db access")
+        self.assertEqual(c.get_many(["甲", "乙", "丙"]), {"甲": "a", "乙": "b"})
+        self.assertEqual((c.stats["hits"], c.stats["misses"]), (2, 1))
+
+    def test_preload_larger_than_one_stripe_is_complete(self):
+        tc.TranslationCache(self.path).put_many([(f"词{i}", f"w{i}") for i in range(150)])
+        c = tc.TranslationCache(self.path, max_entries=400, stripes=4)   # 每段 100 条
+        self.assertEqual(c.preload(), 150)
+        self.assertEqual(c.stats["evictions"], 0)
+        c.close()
+        c._open = lambda: self.fail("unexpected db access")
+        self.assertEqual(c.get_many(["词149", "丙"]), {"词149": "w149"})
+
+    def test_preload_that_evicts_is_not_complete(self):
+        tc.TranslationCache(self.path).put_many([(f"词{i}", f"w{i}") for i in range(5)])
+        c = tc.TranslationCache(self.path, max_entries=10, stripes=1)
+        c.put_many([(f"词{i}", f"d{i}") for i in range(8)], backend="deepl")
+        self.assertEqual(c.preload(), 5)                # 挤掉了别的切片，内存里的不再可信
+        self.assertGreater(c.stats["evictions"], 0)
+        with mock.patch.object(c, "_open", wraps=c._open) as opened:
+            self.assertIsNone(c.get("丙"))
+            self.assertEqual(opened.call_count, 1)      # 未命中仍回库里查
+
+    def test_unusable_path_never_raises(self):
+        c = tc.TranslationCache(self.dir)    # 目录不是数据库文件
+        c.put("甲", "a")
+        self.assertEqual(c.get("甲"), "a")   # 仍有内存层
+        self.assertEqual(c.preload(), 0)
+
+
+class StripedLRUTests(unittest.TestCase):
+    def test_eviction_and_counters(self):
+        lru = tc.StripedLRU(max_entries=3, stripes=1)
+        for k in "abc":
+            lru.put(k, k.upper())
+        self.assertEqual(lru.get("a"), "A")       # a 变成最近使用
+        lru.put("d", "D")                         # 淘汰 b
+        self.assertIsNone(lru.get("b"))
+        self.assertEqual([lru.get(k) for k in "acd"], ["A", "C", "D"])
+        self.assertEqual(lru.counters(), {"hits": 4, "misses": 1, "evictions": 1})
+
+    def test_bounded_under_concurrency(self):
+        lru = tc.StripedLRU(max_entries=64, stripes=8)
+
+        def worker(n):
+            for i in range(2000):
+                lru.put((n, i % 100), "v")
+                lru.get((n, (i * 7) % 100))
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertLessEqual(len(lru), 64)
+        c = lru.counters()
+        self.assertEqual(c["hits"] + c["misses"], 8 * 2000)
+        self.assertGreaterEqual(c["evictions"], 8 * 100 - 64)
+
+    def test_cache_preload_beyond_capacity_still_reads_db(self):
+        d = tempfile.mkdtemp()
+        try:
+            path = os.path.join(d, "t.db")
+            tc.TranslationCache(path).put_many([(f"词{i}", f"w{i}") for i in range(50)])
+            c = tc.TranslationCache(path, max_entries=10, stripes=2)
+            self.assertEqual(c.preload(), 50)
+            self.assertEqual(c.get("词0"), "w0")       # 已被淘汰，回库里查
+            self.assertEqual(c.stats["db_hits"], 1)
+            self.assertLessEqual(c.stats["entries"], 10)
+        finally:
+            shutil.rmtree(d, ignore_errors=True)
+
+
+class SingleFlightTests(unittest.TestCase):
+    def test_claim_and_share(self):
+        sf = tc.SingleFlight()
+        owned, waiting = sf.claim(["a", "b"])
+        self.assertEqual((owned, waiting), (["a", "b"], {}))
+        owned2, waiting2 = sf.claim(["b", "c", "b"])
+        self.assertEqual(owned2, ["c"])
+        self.assertEqual(list(waiting2), ["b"])
+        sf.resolve("b", "B")
+        self.assertEqual(waiting2["b"].result(timeout=1), "B")
+        self.assertEqual((sf.shared, sf.in_flight()), (1, 2))
+
+
+class _SlowBackend(TranslationBackend):
+    name = "slow"
+    cacheable = True
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+
+    def translate_batch(self, texts, target):
+        self.calls.append(list(texts))
+        self.started.set()
+        time.sleep(0.2)
+        return [f"{t}!" for t in texts]
+
+
+class TranslationManagerTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        tc.configure(os.path.join(self.dir, "t.db"))
+        _FakeTranslator.calls = []
+        patches = [mock.patch("deep_translator.GoogleTranslator", _FakeTranslator),
+                   mock.patch.object(ts.TranslationManager, "_instance", None),
+                   mock.patch.object(ts.TranslationManager, "_flight", tc.SingleFlight())]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.tm = ts.TranslationManager()
+        self.tm.set_backends([GoogleBackend(sleep=lambda s: None)])
+
+    def tearDown(self):
+        tc.reset_for_test()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_only_misses_hit_the_network_and_survive_restart(self):
+        tm = self.tm
+        self.assertEqual(tm.translate_list(["坏"]), ["坏"])      # 失败：原文返回，不入缓存
+        out = tm.translate_list(["铁", "铜", "铁", ""])
+        self.assertEqual(out, ["铁-en", "铜-en", "铁-en", ""])
+        self.assertEqual(_FakeTranslator.calls, ["坏"] * 3 + ["铁\n铜"])  # 重复文本只请求一次
+
+        tc.configure(os.path.join(self.dir, "t.db"))     # 模拟重启：新的缓存实例
+        _FakeTranslator.calls = []
+        self.assertEqual(tm.translate_list(["铜", "铁", "银"]), ["铜-en", "铁-en", "银-en"])
+        self.assertEqual(_FakeTranslator.calls, ["银"])
+        self.assertEqual(tm.translate_text("铁"), "铁-en")
+        self.assertEqual(_FakeTranslator.calls, ["银"])
+
+
+    def test_concurrent_callers_share_one_translation(self):
+        backend = _SlowBackend()
+        self.tm.set_backends([backend])
+        out = {}
+
+        def call(name, texts):
+            out[name] = self.tm.translate_list(texts)
+        first = threading.Thread(target=call, args=("item_prompt", ["铁", "铜"]))
+        first.start()
+        backend.started.wait(1)
+        second = threading.Thread(target=call, args=("slicer", ["铜", "铁", "银"]))
+        second.start()
+        first.join()
+        second.join()
+        self.assertEqual(out, {"item_prompt": ["铁!", "铜!"], "slicer": ["铜!", "铁!", "银!"]})
+        self.assertEqual(backend.calls, [["铁", "铜"], ["银"]])
+        stats = self.tm.stats()
+        self.assertEqual((stats["shared"], stats["in_flight"]), (2, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -17,10 +17,12 @@ from PySide6.QtWidgets import (
 from paths import migrate_legacy_file
 import gemini_service as gs
 import core.openai_service as oi
+from core import http_pool, png_writer, rate_limiter, response_cache, sheet_image, translation_cache
 
 from ui.right_panel import RightPanel
 from ui.workers import (
     ImageGenWorker, BatchImageGenWorker, ImageEditWorker, GeminiEditWorker,
+    PromptWorker,
 )
 
 # Tab imports – added as tabs are migrated
@@ -66,6 +68,24 @@ class MainWindow(QMainWindow):
         self.items_save_dir    = self.config.get("items_save_dir", "")
         self.character_save_dir = self.config.get("character_save_dir", "")
         self.clothing_save_dir  = self.config.get("clothing_save_dir", "")
+        # "original" writes provider bytes as-is; otherwise a core.png_writer preset
+        self.png_save_preset    = self.config.get("png_save_preset", "original")
+        self.slicer_memory_budget_mb = self.config.get(
+            "slicer_memory_budget_mb", sheet_image.DEFAULT_MEMORY_BUDGET_MB)
+        http_pool.configure(connect_timeout=self.config.get("http_connect_timeout"),
+                            read_timeout=self.config.get("http_read_timeout"))
+        # 0 rpm = no fixed rate; the limiter still backs off on 429
+        self.rate_limit_rpm = self.config.get("rate_limit_rpm", rate_limiter.DEFAULT_RPM)
+        self.max_retries    = self.config.get("max_retries", rate_limiter.DEFAULT_MAX_RETRIES)
+        rate_limiter.configure(rpm=self.rate_limit_rpm, max_retries=self.max_retries)
+        # Opt-in: identical generate requests reuse the stored image
+        self.response_cache_enabled = self.config.get("response_cache_enabled", False)
+        self.response_cache_mb      = self.config.get("response_cache_mb", response_cache.DEFAULT_MAX_MB)
+        self.response_cache_ttl_hours = self.config.get("response_cache_ttl_hours",
+                                                        response_cache.DEFAULT_TTL_HOURS)
+        self._configure_response_cache()
+        # Item-name translations from earlier sessions, loaded off the UI thread
+        translation_cache.preload_in_background()
 
         # ── Active async workers (kept alive until done) ──
         self._active_workers: list = []
@@ -75,6 +95,11 @@ class MainWindow(QMainWindow):
 
     # ── Config helpers ────────────────────────────────────────────────────
 
+    def _configure_response_cache(self):
+        response_cache.configure(self.response_cache_enabled,
+                                 max_mb=self.response_cache_mb,
+                                 ttl_hours=self.response_cache_ttl_hours)
+
     def _load_config(self) -> dict:
         if os.path.exists(APP_CONFIG_PATH):
             try:
@@ -229,23 +254,33 @@ class MainWindow(QMainWindow):
         self.set_busy(True, "Generating image…")
         self.right.set_output(prompt)
 
-        def _gen_fn(prompt, reference_images=None, text_last=False):
+        limiter = rate_limiter.limiter_for(provider, model, key)
+        # Shift+click skips the response cache for a guaranteed new image
+        fresh = bool(QApplication.keyboardModifiers() & Qt.ShiftModifier)
+
+        def _gen_fn(prompt, reference_images=None, text_last=False, variant=0):
+            # limiter= wraps only the network call: a response-cache hit never waits on it
             if provider == "OpenAI":
                 return oi.generate_image_bytes(
                     prompt, api_key=key, model=model,
-                    reference_images=reference_images or [], **extra)
+                    reference_images=reference_images or [], fresh=fresh,
+                    variant=variant, limiter=limiter, **extra)
             else:
                 return gs.generate_image_bytes(
                     prompt, api_key=key, model=model,
                     reference_images=reference_images if reference_images else None,
-                    text_last=text_last)
+                    text_last=text_last, fresh=fresh, variant=variant, limiter=limiter)
 
         ref_images = getattr(tab, "get_reference_images", lambda: [])()
         text_last  = getattr(tab, "text_last", False)
 
         if concurrent > 1:
-            w = BatchImageGenWorker(_gen_fn, prompt, concurrent, ref_images, text_last)
+            request = {"provider": provider, "api_key": key, "model": model,
+                       "fresh": fresh, **extra}
+            w = BatchImageGenWorker(_gen_fn, prompt, concurrent, ref_images, text_last,
+                                    request=request)
             w.image_ready.connect(lambda idx, data: None)  # partial update hook
+            w.progress.connect(self._on_batch_progress)
             w.finished.connect(self._on_batch_done)
         else:
             w = ImageGenWorker(_gen_fn, prompt, ref_images, text_last)
@@ -265,6 +300,10 @@ class MainWindow(QMainWindow):
             data, mime = result, "image/png"
         self.right.show_single_image(data, mime)
 
+    def _on_batch_progress(self, done: str):
+        limits = rate_limiter.status_text()
+        self.set_status(f"Generating image… {done}" + (f"  ({limits})" if limits else ""))
+
     def _on_batch_done(self, results: list):
         self.set_busy(False)
         # Each successful entry is (bytes, mime) or bare bytes
@@ -354,16 +393,36 @@ class MainWindow(QMainWindow):
         filename = f"{prefix}_{ts}.png"
         filepath = os.path.join(save_dir, filename)
 
+        preset = self.png_save_preset
+        if preset in png_writer.PNG_PRESETS:
+            # Re-encode off the GUI thread; "small" can take a while on 2K images
+            w = PromptWorker(png_writer.save_reencoded, data, filepath, preset)
+            w.finished.connect(
+                lambda stats: self._on_preview_saved(tab, filepath, preset, stats))
+            w.error.connect(lambda msg: QMessageBox.critical(self, "Save Error", msg))
+            self._active_workers.append(w)
+            w.finished.connect(lambda _: self._active_workers.remove(w))
+            w.start()
+            return
+
         try:
             with open(filepath, "wb") as f:
                 f.write(data)
-            self.set_status(f"Saved → {filepath}")
-            # Notify the active tab (e.g. library tab may want to refresh)
-            if hasattr(tab, "on_image_saved"):
-                tab.on_image_saved(filepath)
+            self._on_preview_saved(tab, filepath)
         except Exception as exc:
             QMessageBox.critical(self, "Save Error", str(exc))
 
+    def _on_preview_saved(self, tab, filepath: str, preset: str = "", stats=None):
+        if stats:
+            self.set_status(
+                f"Saved → {filepath}  ({stats['bytes'] / 1024:.0f} KiB, {preset}, "
+                f"{stats['encode_seconds'] * 1000:.0f} ms)")
+        else:
+            self.set_status(f"Saved → {filepath}")
+        # Notify the active tab (e.g. library tab may want to refresh)
+        if hasattr(tab, "on_image_saved"):
+            tab.on_image_saved(filepath)
+
     def _discard_preview_image(self):
         self.right.clear_preview()
         self.set_status("Image discarded.")
@@ -402,6 +461,17 @@ class MainWindow(QMainWindow):
         self.items_save_dir       = cfg.get("items_save_dir", self.items_save_dir)
         self.character_save_dir   = cfg.get("character_save_dir", self.character_save_dir)
         self.clothing_save_dir    = cfg.get("clothing_save_dir", self.clothing_save_dir)
+        self.png_save_preset      = cfg.get("png_save_preset", self.png_save_preset)
+        self.slicer_memory_budget_mb = cfg.get("slicer_memory_budget_mb",
+                                               self.slicer_memory_budget_mb)
+        self.rate_limit_rpm       = cfg.get("rate_limit_rpm", self.rate_limit_rpm)
+        self.max_retries          = cfg.get("max_retries", self.max_retries)
+        rate_limiter.configure(rpm=self.rate_limit_rpm, max_retries=self.max_retries)
+        self.response_cache_enabled = cfg.get("response_cache_enabled", self.response_cache_enabled)
+        self.response_cache_mb    = cfg.get("response_cache_mb", self.response_cache_mb)
+        self.response_cache_ttl_hours = cfg.get("response_cache_ttl_hours",
+                                                self.response_cache_ttl_hours)
+        self._configure_response_cache()
         self.ui_lang              = cfg.get("language", self.ui_lang)
         self.save_config(cfg)
 
@@ -497,6 +567,8 @@ class MainWindow(QMainWindow):
 
     def closeEvent(self, event: QCloseEvent):
         for w in self._active_workers:
+            if hasattr(w, "cancel"):
+                w.cancel()
             w.quit()
             w.wait(500)
         event.accept()
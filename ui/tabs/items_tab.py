@@ -4,13 +4,13 @@ from __future__ import annotations
 import os
 
 from PySide6.QtWidgets import (
-    QLabel, QCheckBox, QPushButton, QHBoxLayout,
+    QLabel, QCheckBox, QPushButton, QHBoxLayout, QSpinBox,
     QFileDialog, QMessageBox,
 )
 
 import item_generator as ig
 from ui.tabs.base_tab import BaseTab
-from ui.workers import ItemPromptWorker
+from ui.workers import ItemPromptWorker, PromptWorker
 
 
 class ItemsTab(BaseTab):
@@ -29,7 +29,8 @@ class ItemsTab(BaseTab):
 
         desc = QLabel(
             "Generates a prompt for a 8×8 sprite sheet (64 items) "
-            "from the selected CSV file.")
+            "from the selected CSV file. Larger CSVs are split into "
+            "consecutive sheets of 64.")
         desc.setObjectName("subheader")
         desc.setWordWrap(True)
         lay.addWidget(desc)
@@ -52,6 +53,18 @@ class ItemsTab(BaseTab):
         self.lbl_status.setWordWrap(True)
         lay.addWidget(self.lbl_status)
 
+        # sheet of a multi-sheet CSV (1-based in the UI)
+        sheet_row = QHBoxLayout()
+        sheet_row.addWidget(QLabel("Sheet:"))
+        self.spin_sheet = QSpinBox()
+        self.spin_sheet.setMinimum(1)
+        sheet_row.addWidget(self.spin_sheet)
+        self.lbl_sheets = QLabel("")
+        self.lbl_sheets.setObjectName("subheader")
+        sheet_row.addWidget(self.lbl_sheets, 1)
+        lay.addLayout(sheet_row)
+        self._update_sheet_count()
+
         # ── Options ──
         self.chk_translate = QCheckBox(
             "Auto-Translate Content to English (Recommended)")
@@ -81,6 +94,27 @@ class ItemsTab(BaseTab):
                 f"✓ CSV selected: {path}" if exists
                 else f"✗ File not found: {path}")
             self.btn_gen.setEnabled(exists)
+            self._update_sheet_count()
+
+    def _update_sheet_count(self):
+        # Paging streams the whole CSV; keep it off the GUI thread
+        path = self._csv_path
+        self.lbl_sheets.setText("(counting…)")
+        w = PromptWorker(ig.IconSheetPlan.from_csv, path)
+        w.finished.connect(lambda plan: self._on_sheet_count(path, plan))
+        w.error.connect(lambda _msg: self._on_sheet_count(path, None))
+        self.window._active_workers.append(w)
+        w.finished.connect(lambda _: self.window._active_workers.remove(w))
+        w.error.connect(lambda _: self.window._active_workers.remove(w))
+        w.start()
+
+    def _on_sheet_count(self, path: str, plan):
+        if path != self._csv_path:
+            return   # another CSV was selected meanwhile
+        sheets = max(1, len(plan)) if plan is not None else 1
+        count = sum(len(rows) for rows in plan.row_index()) if plan is not None else 0
+        self.spin_sheet.setMaximum(sheets)
+        self.lbl_sheets.setText(f"of {sheets}  ({count} items)")
 
     def _generate(self):
         self.window.set_busy(True, "Generating prompt…")
@@ -88,6 +122,7 @@ class ItemsTab(BaseTab):
             self._csv_path,
             self.chk_translate.isChecked(),
             self.chk_cache.isChecked(),
+            sheet=self.spin_sheet.value() - 1,
         )
         w.finished.connect(self._on_done)
         w.error.connect(self._on_error)
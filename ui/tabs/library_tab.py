@@ -21,8 +21,13 @@ from ui.tabs.base_tab import BaseTab
 class LibraryTab(BaseTab):
     """Browse all saved library entries, rate them, and act on them."""
 
+    PAGE_SIZE = 200
+
     def __init__(self, window, parent=None):
         self._selected_id: int | None = None
+        self._query: dict = {}
+        self._cursor = None        # (created_at, id) of the last loaded row
+        self._loaded = 0
         super().__init__(window, parent)
 
     def _build_ui(self, body):
@@ -57,10 +62,21 @@ class LibraryTab(BaseTab):
         self.edit_search.returnPressed.connect(self._refresh)
         toolbar.addWidget(self.edit_search)
 
+        self.combo_order = QComboBox()
+        self.combo_order.addItems(["Newest", "Best match"])
+        self.combo_order.setToolTip("Order of keyword search results")
+        self.combo_order.currentIndexChanged.connect(self._refresh)
+        toolbar.addWidget(self.combo_order)
+
         btn_refresh = QPushButton("Refresh")
         btn_refresh.clicked.connect(self._refresh)
         toolbar.addWidget(btn_refresh)
 
+        self.btn_more = QPushButton("Load more")
+        self.btn_more.clicked.connect(self._load_more)
+        self.btn_more.setEnabled(False)
+        toolbar.addWidget(self.btn_more)
+
         self.lbl_count = QLabel("")
         self.lbl_count.setObjectName("subheader")
         toolbar.addWidget(self.lbl_count)
@@ -158,16 +174,32 @@ class LibraryTab(BaseTab):
             gtype = None
         kw = self.edit_search.text().strip() or None
         min_r = self.spin_rating.value()
+        ranked = bool(kw) and self.combo_order.currentIndex() == 1
 
-        entries = self._lib.list_entries(
+        self._query = dict(
             generator_type=gtype,
             min_rating=min_r,
             keyword=kw,
-            limit=500,
+            order="relevance" if ranked else "recent",
+        )
+        self._cursor = None
+        self._loaded = 0
+        self.tree.clear()
+        self._load_more()
+
+    def _load_more(self):
+        """Append the next PAGE_SIZE rows (light projection; _on_select loads the full entry)."""
+        ranked = self._query.get("order") == "relevance"
+        entries = self._lib.list_entries(
+            **self._query,
+            limit=self.PAGE_SIZE,
+            # Best match has no keyset; page it by offset instead
+            offset=self._loaded if ranked else 0,
+            after=None if ranked else self._cursor,
+            light=True,
         )
 
         self.tree.setSortingEnabled(False)
-        self.tree.clear()
         for e in entries:
             time_str = e.created_at.replace("T", " ").rsplit("+", 1)[0]
             stars    = "★" * e.rating + "·" * (5 - e.rating)
@@ -181,8 +213,14 @@ class LibraryTab(BaseTab):
             item.setTextAlignment(3, Qt.AlignCenter)
             self.tree.addTopLevelItem(item)
 
-        self.tree.setSortingEnabled(True)
-        self.lbl_count.setText(f"{len(entries)} entries")
+        # Best match: keep the ranked order until the next refresh
+        self.tree.setSortingEnabled(not ranked)
+        if entries:
+            self._cursor = entries[-1].cursor
+        self._loaded += len(entries)
+        self.btn_more.setEnabled(len(entries) == self.PAGE_SIZE)
+        more = "+" if len(entries) == self.PAGE_SIZE else ""
+        self.lbl_count.setText(f"{self._loaded}{more} entries")
 
     def _on_select(self):
         items = self.tree.selectedItems()
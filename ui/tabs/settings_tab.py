@@ -6,11 +6,12 @@ import os
 from PySide6.QtWidgets import (
     QLabel, QLineEdit, QComboBox, QPushButton, QGroupBox,
     QRadioButton, QButtonGroup, QHBoxLayout, QGridLayout,
-    QWidget, QMessageBox, QFileDialog,
+    QWidget, QMessageBox, QFileDialog, QSpinBox, QCheckBox,
 )
 
 import gemini_service as gs
 import core.openai_service as oi
+from core import png_writer
 from ui.tabs.base_tab import BaseTab
 
 
@@ -130,6 +131,78 @@ class SettingsTab(BaseTab):
             d_lay.addWidget(btn, r, 2)
         lay.addWidget(grp_dirs)
 
+        # ── PNG encoding ──
+        grp_png = QGroupBox("Saved Image Encoding")
+        p_lay = QHBoxLayout(grp_png)
+        p_lay.addWidget(QLabel("Preset:"))
+        self.combo_png_preset = QComboBox()
+        self.combo_png_preset.addItems(["original"] + png_writer.PRESET_NAMES)
+        self.combo_png_preset.setCurrentText(self.window.png_save_preset)
+        self.combo_png_preset.setToolTip(
+            "original: keep provider bytes · fast: quick, larger files · "
+            "balanced: Pillow default · small: optimize + palette for flat art")
+        p_lay.addWidget(self.combo_png_preset)
+        p_lay.addStretch()
+        lay.addWidget(grp_png)
+
+        # ── Slicer memory ──
+        grp_mem = QGroupBox("Slicer Memory")
+        m_lay = QHBoxLayout(grp_mem)
+        m_lay.addWidget(QLabel("Budget (MB):"))
+        self.spin_memory_budget = QSpinBox()
+        self.spin_memory_budget.setRange(256, 65536)
+        self.spin_memory_budget.setSingleStep(256)
+        self.spin_memory_budget.setValue(self.window.slicer_memory_budget_mb)
+        self.spin_memory_budget.setToolTip(
+            "Batch slicing runs fewer processes at once when large sheets "
+            "would exceed this much decoded image memory.")
+        m_lay.addWidget(self.spin_memory_budget)
+        m_lay.addStretch()
+        lay.addWidget(grp_mem)
+
+        # ── Rate limiting ──
+        grp_rate = QGroupBox("API Rate Limit")
+        r_lay = QHBoxLayout(grp_rate)
+        r_lay.addWidget(QLabel("Requests/min:"))
+        self.spin_rate_rpm = QSpinBox()
+        self.spin_rate_rpm.setRange(0, 10000)
+        self.spin_rate_rpm.setValue(int(self.window.rate_limit_rpm))
+        self.spin_rate_rpm.setToolTip(
+            "0 = no fixed rate. Concurrency still drops automatically on "
+            "HTTP 429 and honours the server's Retry-After.")
+        r_lay.addWidget(self.spin_rate_rpm)
+        r_lay.addWidget(QLabel("Retries:"))
+        self.spin_max_retries = QSpinBox()
+        self.spin_max_retries.setRange(0, 10)
+        self.spin_max_retries.setValue(int(self.window.max_retries))
+        r_lay.addWidget(self.spin_max_retries)
+        r_lay.addStretch()
+        lay.addWidget(grp_rate)
+
+        # ── Response cache ──
+        grp_cache = QGroupBox("Response Cache")
+        c_lay = QHBoxLayout(grp_cache)
+        self.chk_response_cache = QCheckBox("Reuse identical requests")
+        self.chk_response_cache.setChecked(bool(self.window.response_cache_enabled))
+        self.chk_response_cache.setToolTip(
+            "Same prompt, model, size, quality and reference images return the "
+            "stored image instead of a new paid call. Shift+click Generate to "
+            "force a fresh image.")
+        c_lay.addWidget(self.chk_response_cache)
+        c_lay.addWidget(QLabel("Size (MB):"))
+        self.spin_cache_mb = QSpinBox()
+        self.spin_cache_mb.setRange(16, 65536)
+        self.spin_cache_mb.setSingleStep(64)
+        self.spin_cache_mb.setValue(int(self.window.response_cache_mb))
+        c_lay.addWidget(self.spin_cache_mb)
+        c_lay.addWidget(QLabel("Keep (hours, 0 = forever):"))
+        self.spin_cache_ttl = QSpinBox()
+        self.spin_cache_ttl.setRange(0, 24 * 365)
+        self.spin_cache_ttl.setValue(int(self.window.response_cache_ttl_hours))
+        c_lay.addWidget(self.spin_cache_ttl)
+        c_lay.addStretch()
+        lay.addWidget(grp_cache)
+
         # ── Language ──
         grp_lang = QGroupBox("UI Language")
         l_lay = QHBoxLayout(grp_lang)
@@ -174,6 +247,13 @@ class SettingsTab(BaseTab):
             "items_save_dir":      self.edit_items_dir.text().strip(),
             "character_save_dir":  self.edit_character_dir.text().strip(),
             "clothing_save_dir":   self.edit_clothing_dir.text().strip(),
+            "png_save_preset":     self.combo_png_preset.currentText(),
+            "slicer_memory_budget_mb": self.spin_memory_budget.value(),
+            "rate_limit_rpm":      self.spin_rate_rpm.value(),
+            "max_retries":         self.spin_max_retries.value(),
+            "response_cache_enabled": self.chk_response_cache.isChecked(),
+            "response_cache_mb":   self.spin_cache_mb.value(),
+            "response_cache_ttl_hours": self.spin_cache_ttl.value(),
             "language":            "zh" if self.combo_lang.currentIndex() == 1 else "en",
         }
         self.window.on_settings_saved(cfg)
@@ -2,14 +2,14 @@
 
 from __future__ import annotations
 import os
-import sys
 
 from PySide6.QtWidgets import (
-    QLabel, QLineEdit, QPushButton, QCheckBox, QGroupBox,
+    QLabel, QLineEdit, QPushButton, QCheckBox, QGroupBox, QComboBox, QSpinBox,
     QHBoxLayout, QGridLayout, QFrame, QFileDialog, QMessageBox,
 )
 
 import item_generator as ig
+from core import png_writer, rembg_pool
 from ui.tabs.base_tab import BaseTab
 from ui.workers import SlicerWorker
 
@@ -80,6 +80,15 @@ class SlicerTab(BaseTab):
         self.chk_smart = QCheckBox("Smart Crop (auto-detect grid — overrides row/col)")
         self.chk_smart.toggled.connect(self._toggle_smart)
         cfg_lay.addWidget(self.chk_smart, 1, 0, 1, 4)
+
+        cfg_lay.addWidget(QLabel("PNG Encoding:"), 2, 0)
+        self.combo_png_preset = QComboBox()
+        self.combo_png_preset.addItems(png_writer.PRESET_NAMES)
+        self.combo_png_preset.setCurrentText(png_writer.DEFAULT_PRESET)
+        self.combo_png_preset.setToolTip(
+            "fast: quick, larger files · balanced: Pillow default · "
+            "small: optimize + palette for flat art")
+        cfg_lay.addWidget(self.combo_png_preset, 2, 1, 1, 3)
         lay.addWidget(grp_cfg)
 
         # ── 4. Naming ──
@@ -122,6 +131,19 @@ class SlicerTab(BaseTab):
         csv_row.addWidget(self.lbl_csv, 1)
         lay.addLayout(csv_row)
 
+        # CSVs longer than one sheet: image i is named after sheet N + i
+        sheet_row = QHBoxLayout()
+        sheet_row.addWidget(QLabel("First CSV sheet:"))
+        self.spin_first_sheet = QSpinBox()
+        self.spin_first_sheet.setRange(0, 9999)
+        self.spin_first_sheet.setSpecialValueText("— (first rows)")
+        self.spin_first_sheet.setToolTip(
+            "For multi-sheet item CSVs: the first image uses this sheet's rows, "
+            "the next image the following sheet, and so on.")
+        sheet_row.addWidget(self.spin_first_sheet)
+        sheet_row.addStretch(1)
+        lay.addLayout(sheet_row)
+
         # ── 5. Processing ──
         lay.addWidget(_sep())
         sec4 = QLabel("4. Processing Options:")
@@ -146,11 +168,7 @@ class SlicerTab(BaseTab):
     # ── Logic ─────────────────────────────────────────────────────────────
 
     def _rembg_available(self) -> bool:
-        if getattr(sys, "frozen", False):
-            return os.path.exists(os.path.join(
-                os.path.dirname(sys.executable), "worker_rembg.exe"))
-        venv_py = os.path.join(os.getcwd(), ".venv_rembg", "Scripts", "python.exe")
-        return os.path.exists(venv_py)
+        return rembg_pool.resolve_worker_cmd() is not None
 
     def _select_files(self):
         paths, _ = QFileDialog.getOpenFileNames(
@@ -199,6 +217,7 @@ class SlicerTab(BaseTab):
         self.chk_translate.setEnabled(checked)
         self.chk_cache.setEnabled(checked)
         self.btn_csv.setEnabled(checked)
+        self.spin_first_sheet.setEnabled(checked)
 
     def _parse_grid(self):
         txt = self.edit_grid.text().strip()
@@ -238,6 +257,10 @@ class SlicerTab(BaseTab):
             rename=self.edit_rename.text().strip(),
             auto_suffix=self.chk_auto_suffix.isChecked(),
             smart_crop=self.chk_smart.isChecked(),
+            png_preset=self.combo_png_preset.currentText(),
+            memory_budget_mb=self.window.slicer_memory_budget_mb,
+            first_sheet=(self.spin_first_sheet.value() - 1
+                         if self.spin_first_sheet.value() else None),
         )
         w.progress.connect(self.window.set_status)
         w.finished.connect(self._on_done)
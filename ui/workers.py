@@ -78,29 +78,62 @@ class ImageGenWorker(_BaseWorker):
 class BatchImageGenWorker(_BaseWorker):
     """Generates *n* images concurrently.
 
+    With `request` ({"provider", "api_key", "model", "fresh", **extra}) the batch runs
+    on core.provider_client's asyncio client: every image is in flight on
+    this QThread's event loop, no thread per image. Without it, generate_fn
+    is called from a thread pool (one thread per image).
+
     progress emits: "done_count/total" strings
-    finished emits: list[bytes | Exception]  (one entry per image)
+    finished emits: list[(bytes, mime) | Exception]  (one entry per image)
     """
 
     image_ready = Signal(int, bytes)   # (index, data) – fires as each image arrives
 
     def __init__(self, generate_fn, prompt: str, count: int,
-                 reference_images=None, text_last: bool = False):
+                 reference_images=None, text_last: bool = False,
+                 request: dict | None = None):
         super().__init__()
         self._fn = generate_fn
         self._prompt = prompt
         self._count = count
         self._refs = reference_images
         self._text_last = text_last
+        self._request = request
+        self._loop = None
+        self._task = None
+        self._cancelled = False
+
+    def cancel(self) -> None:
+        """Abort outstanding requests (async mode). Safe to call from any thread."""
+        self._cancelled = True
+        loop, task = self._loop, self._task
+        if loop is not None and task is not None:
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def _emit_ready(self, idx, data):
+        self.image_ready.emit(idx, data[0] if isinstance(data, tuple) else data)
 
     def run(self):
+        if self._request is not None:
+            self._run_async()
+            return
+
+        from core import http_pool
+
         results: list[Any] = [None] * self._count
         done = 0
+        # One keep-alive connection per concurrent request
+        http_pool.ensure_pool_size(self._count)
 
         def _task(idx):
+            # variant keeps the images of one batch apart in core.response_cache
             return idx, self._fn(self._prompt,
                                  reference_images=self._refs,
-                                 text_last=self._text_last)
+                                 text_last=self._text_last,
+                                 variant=idx)
 
         with ThreadPoolExecutor(max_workers=self._count) as pool:
             futures = {pool.submit(_task, i): i for i in range(self._count)}
@@ -108,7 +141,7 @@ class BatchImageGenWorker(_BaseWorker):
                 try:
                     idx, data = fut.result()
                     results[idx] = data
-                    self.image_ready.emit(idx, data)
+                    self._emit_ready(idx, data)
                 except Exception as exc:
                     idx = futures[fut]
                     results[idx] = exc
@@ -118,6 +151,55 @@ class BatchImageGenWorker(_BaseWorker):
 
         self.finished.emit(results)
 
+    def _run_async(self):
+        import asyncio
+        from core.provider_client import AsyncProviderClient
+
+        request = dict(self._request)
+        provider = request.pop("provider")
+        results: list[Any] = [None] * self._count
+        done = 0
+
+        def _on_result(idx, res):
+            nonlocal done
+            results[idx] = res
+            if not isinstance(res, Exception):
+                self._emit_ready(idx, res)
+            done += 1
+            self.progress.emit(f"{done}/{self._count}")
+
+        async def _main():
+            client = AsyncProviderClient(max_in_flight=self._count)
+            try:
+                await client.generate_many(provider, self._prompt, self._count,
+                                           on_result=_on_result,
+                                           reference_images=self._refs,
+                                           text_last=self._text_last, **request)
+            finally:
+                await client.aclose()
+
+        loop = asyncio.new_event_loop()
+        self._loop = loop
+        try:
+            self._task = loop.create_task(_main())
+            if self._cancelled:
+                self._task.cancel()
+            try:
+                loop.run_until_complete(self._task)
+            except asyncio.CancelledError:
+                pass
+        except Exception as exc:
+            self._emit_error(exc)
+            return
+        finally:
+            self._loop = None
+            loop.close()
+
+        for i, r in enumerate(results):
+            if r is None:
+                results[i] = RuntimeError("Cancelled")
+        self.finished.emit(results)
+
 
 # ── Image editing ────────────────────────────────────────────────────────────
 
@@ -146,27 +228,38 @@ class ImageEditWorker(_BaseWorker):
 # ── Item prompt + translation ────────────────────────────────────────────────
 
 class ItemPromptWorker(_BaseWorker):
-    """Reads a CSV, builds a prompt, optionally translates.
+    """Reads a CSV, builds the prompt for one sheet, optionally translates.
+
+    Only the chosen sheet is read back and translated, only its new
+    translations are written back, and the sheet -> row index is saved for
+    the slicer.
 
     finished emits: str (the prompt)
     """
 
-    def __init__(self, csv_path: str, translate: bool, cache: bool):
+    def __init__(self, csv_path: str, translate: bool, cache: bool, sheet: int = 0):
         super().__init__()
         self._csv = csv_path
         self._translate = translate
         self._cache = cache
+        self._sheet = sheet
 
     def run(self):
         import item_generator as ig
         try:
-            items = ig.read_items_from_csv(self._csv)
-            if not items:
+            plan = ig.IconSheetPlan.from_csv(self._csv)
+            if not len(plan):
                 self.error.emit("Could not read items from CSV.")
                 return
-            cache_path = self._csv if self._cache else None
-            prompt = ig.generate_icon_grid_prompt(
-                items, translate=self._translate, cache_path=cache_path)
+            if not 0 <= self._sheet < len(plan):
+                self.error.emit(f"Sheet {self._sheet + 1} does not exist "
+                                f"(the CSV has {len(plan)}).")
+                return
+            prompt = plan.prompt(self._sheet, translate=self._translate)
+            if self._cache:
+                plan.write_back()
+            elif len(plan) > 1:
+                plan.save_index()
             self.finished.emit(prompt)
         except Exception as exc:
             self._emit_error(exc)
@@ -185,7 +278,9 @@ class SlicerWorker(_BaseWorker):
                  out_dir: str | None, csv_path: str | None,
                  translate: bool, remove_bg: bool, cache: bool,
                  normalize: bool, scale: float,
-                 rename: str, auto_suffix: bool, smart_crop: bool):
+                 rename: str, auto_suffix: bool, smart_crop: bool,
+                 png_preset: str = "balanced", memory_budget_mb: int | None = None,
+                 first_sheet: int | None = None):
         super().__init__()
         self.files = files
         self.rows = rows
@@ -200,61 +295,58 @@ class SlicerWorker(_BaseWorker):
         self.rename = rename
         self.auto_suffix = auto_suffix
         self.smart_crop = smart_crop
+        self.png_preset = png_preset
+        self.memory_budget_mb = memory_budget_mb
+        self.first_sheet = first_sheet
 
     def run(self):
+        import os
         import slicer_tool as st
-        import uuid as _uuid
 
         total = len(self.files)
         cells = self.rows * self.cols
         num_digits = max(2, len(str(cells)), len(str(total)))
-        batch_id = _uuid.uuid4().hex if total > 1 else None
-
-        success_count = 0
-        errors = []
-        current_index = 1
 
-        for i, fp in enumerate(self.files):
-            import os
+        def _on_cell(done, total_cells, fp, filename):
             self.progress.emit(
-                f"Processing ({i+1}/{total}): {os.path.basename(fp)}…")
+                f"Sliced {done}/{total_cells}: {os.path.basename(fp)} → {filename}")
 
-            row_cuts = col_cuts = None
-            if self.smart_crop:
-                try:
-                    self.progress.emit(
-                        f"Detecting grid ({i+1}/{total}): {os.path.basename(fp)}…")
-                    row_cuts, col_cuts = st.detect_grid(fp)
-                except Exception as e:
-                    pass  # fall back to manual grid
+        self.progress.emit(
+            f"Slicing {total} image(s)" + (" — detecting grids…" if self.smart_crop else "…"))
+        try:
+            # Grid detection, bg removal, normalize and PNG encoding run in a
+            # process pool; filenames / numbering are assigned in input order.
+            results = st.slice_images_parallel(
+                self.files,
+                grid_rows=self.rows,
+                grid_cols=self.cols,
+                output_dir=self.out_dir,
+                csv_path=self.csv_path,
+                translate_mode=self.translate,
+                remove_bg=self.remove_bg,
+                cache_mode=self.cache,
+                normalize_mode=self.normalize,
+                scale_factor=self.scale,
+                rename=self.rename,
+                auto_suffix=self.auto_suffix,
+                num_digits=num_digits,
+                smart_crop=self.smart_crop,
+                progress=_on_cell,
+                png_preset=self.png_preset,
+                memory_budget_mb=self.memory_budget_mb,
+                first_sheet=self.first_sheet,
+            )
+        except Exception as exc:
+            self._emit_error(exc)
+            return
 
-            try:
-                success, msg, count = st.slice_image(
-                    image_path=fp,
-                    grid_rows=self.rows,
-                    grid_cols=self.cols,
-                    output_dir=self.out_dir,
-                    csv_path=self.csv_path,
-                    translate_mode=self.translate,
-                    remove_bg=self.remove_bg,
-                    cache_mode=self.cache,
-                    normalize_mode=self.normalize,
-                    scale_factor=self.scale,
-                    rename_prefix=self.rename or None,
-                    start_index=current_index,
-                    num_digits=num_digits,
-                    auto_suffix=self.auto_suffix,
-                    batch_id=batch_id,
-                    row_cuts=row_cuts,
-                    col_cuts=col_cuts,
-                )
-                if success:
-                    success_count += 1
-                    current_index += count
-                else:
-                    errors.append(f"{os.path.basename(fp)}: {msg}")
-            except Exception as exc:
-                errors.append(f"{os.path.basename(fp)}: {exc}")
+        success_count = 0
+        errors = []
+        for fp, (success, msg, _count) in zip(self.files, results):
+            if success:
+                success_count += 1
+            else:
+                errors.append(f"{os.path.basename(fp)}: {msg}")
 
         self.finished.emit({"success": success_count, "errors": errors})
 
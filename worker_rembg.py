@@ -1,4 +1,5 @@
 import argparse
+import struct
 import sys
 import os
 from PIL import Image
@@ -7,9 +8,25 @@ from PIL import Image
 try:
     from rembg import remove, new_session
 except ImportError:
-    print("ERROR: rembg not installed in this environment.")
+    print("ERROR: rembg not installed in this environment.", file=sys.stderr)
     sys.exit(1)
 
+# --- Serve-mode framing (must match core/rembg_pool.py) ---
+# request : >I length + PNG bytes   (length 0 = shutdown)
+# response: B status (0 ok / 1 error) + >I length + payload (PNG bytes or utf-8 message)
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+
+def make_session():
+    """Create the u2net session once; explicit CPU provider avoids detection errors."""
+    try:
+        return new_session("u2net", providers=['CPUExecutionProvider'])
+    except Exception as e:
+        print(f"Warning: Explicit CPU session failed ({e}), using rembg default session.", file=sys.stderr)
+        return None
+
+
 def process_image(input_path, output_path):
     try:
         if not os.path.exists(input_path):
@@ -43,10 +60,66 @@ def process_image(input_path, output_path):
         traceback.print_exc()
         sys.exit(1)
 
+def _read_exact(stream, n):
+    buf = b""
+    while len(buf) < n:
+        chunk = stream.read(n - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return buf
+
+
+def _write_frame(stream, status, payload):
+    stream.write(struct.pack(">BI", status, len(payload)))
+    stream.write(payload)
+    stream.flush()
+
+
+def serve():
+    """
+    Long-lived mode: load the model once, then answer jobs on stdin/stdout
+    until EOF or a zero-length request. All logging goes to stderr so the
+    binary protocol on stdout stays clean.
+    """
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    sys.stdout = sys.stderr
+
+    session = make_session()
+    _write_frame(stdout, STATUS_OK, b"ready")
+
+    while True:
+        header = _read_exact(stdin, 4)
+        if header is None:
+            break
+        (length,) = struct.unpack(">I", header)
+        if length == 0:
+            break
+        data = _read_exact(stdin, length)
+        if data is None:
+            break
+        try:
+            if session is not None:
+                output_data = remove(data, session=session)
+            else:
+                output_data = remove(data)
+            _write_frame(stdout, STATUS_OK, output_data)
+        except Exception as e:
+            _write_frame(stdout, STATUS_ERROR, str(e).encode("utf-8", "replace"))
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Remove background from image using rembg.')
-    parser.add_argument('input', help='Input image path')
-    parser.add_argument('output', help='Output image path')
-    
+    parser.add_argument('input', nargs='?', help='Input image path')
+    parser.add_argument('output', nargs='?', help='Output image path')
+    parser.add_argument('--serve', action='store_true',
+                        help='Keep the model loaded and process framed jobs from stdin')
+
     args = parser.parse_args()
-    process_image(args.input, args.output)
+    if args.serve:
+        serve()
+    elif args.input and args.output:
+        process_image(args.input, args.output)
+    else:
+        parser.error("input and output are required unless --serve is given")